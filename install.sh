@@ -38,6 +38,7 @@ do
 done
 cp data/watchful.service /lib/systemd/system/
 cp data/watchful.timer /lib/systemd/system/
+cp data/watchful-daemon.service /lib/systemd/system/
 
 systemctl daemon-reload
 systemctl enable watchful.timer
@@ -2,7 +2,8 @@ from .switch import Switch
 from .dict_files_path import DictFilesPath
 from .object_base import ObjectBase
 from .telegram import Telegram
+from .scheduler import Scheduler
 from .monitor import Monitor
 from .exe import Exec
 
-__all__ = ['ObjectBase', 'Switch', 'DictFilesPath', 'Monitor', 'Telegram', 'Exec']
+__all__ = ['ObjectBase', 'Switch', 'DictFilesPath', 'Monitor', 'Telegram', 'Exec', 'Scheduler']
@@ -1,5 +1,8 @@
 from .config_type_return import ConfigTypeReturn
 from .config_store import ConfigStore
 from .config_control import ConfigControl
+from .config_schema import ConfigItem, ConfigOption, ConfigList, ConfigSchema
+from .status_store import StatusStore
 
-__all__ = ['ConfigStore', 'ConfigControl', 'ConfigTypeReturn']
+__all__ = ['ConfigStore', 'ConfigControl', 'ConfigTypeReturn', 'ConfigItem', 'ConfigOption', 'ConfigList',
+           'ConfigSchema', 'StatusStore']
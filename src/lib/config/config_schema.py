@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Compilador de la configuración de los módulos.
+
+Cada modulo define un esquema (ConfigSchema) con las opciones que acepta, su tipo, el valor por defecto y el rango
+valido. La sección del modulo en modules.json se valida una sola vez al cargar el modulo y se convierte en objetos
+inmutables (con __slots__) que ya tienen aplicados los valores por defecto, así en cada ciclo los checks solo leen
+atributos. Los valores que no son validos se notifican al compilar y se usa el valor por defecto.
+
+Las opciones de los targets de una lista que también existen en el modulo toman como valor por defecto el del modulo.
+
+Ejemplo:
+    >>> schema = ConfigSchema(ConfigOption('timeout', int, 5, min_val=1),
+    ...                       lists=(ConfigList('list', ConfigOption('enabled', bool, True),
+    ...                                         ConfigOption('timeout', int, 5, min_val=1)), ))
+    >>> conf = schema.compile({'timeout': 3, 'list': {'host1': {'timeout': 'x'}, 'host2': False}})
+    >>> conf.list['host1'].timeout
+    3
+    >>> conf.list['host2'].enabled
+    False
+    >>> conf.errors
+    ("list/host1/timeout: invalid value 'x' (int >= 1), using 3",)
+
+"""
+
+import math
+import types
+
+__all__ = ['ConfigItem', 'ConfigOption', 'ConfigList', 'ConfigSchema']
+
+
+class ConfigItem(object):
+
+    """ Objeto de configuración compilado, inmutable y con __slots__. """
+
+    __slots__ = ()
+    _fields = ()
+
+    def __init__(self, values: dict):
+        for (name, value) in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{0} is read only!".format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("{0} is read only!".format(type(self).__name__))
+
+    def __repr__(self):
+        return "{0}({1})".format(type(self).__name__,
+                                 ', '.join(["{0}={1!r}".format(name, getattr(self, name)) for name in self._fields]))
+
+    @classmethod
+    def new_class(cls, name: str, fields: tuple) -> type:
+        """ Crea una clase con un slot por cada campo. """
+        fields = tuple(fields)
+        return type(name, (cls, ), {'__slots__': fields, '_fields': fields})
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self._fields}
+
+
+class ModuleConfig(ConfigItem):
+
+    """ Configuración compilada de un modulo, cada lista del esquema es un atributo con {key: target}. """
+
+    __slots__ = ('errors', '_targets_default')
+
+    def target(self, key: str, list_name: str = 'list'):
+        """
+        Retorna el target de la lista. Si no esta configurado retorna un target con los valores por defecto del
+        modulo (su key es None).
+
+        :param key: Key del target.
+        :param list_name: Nombre de la lista.
+        :return: Target o None si el esquema no tiene la lista.
+
+        """
+        targets = getattr(self, list_name, None) if list_name in self._targets_default else None
+        if targets is None:
+            return None
+        return targets.get(key, None) or self._targets_default[list_name]
+
+
+class ConfigOption(object):
+
+    """ Opción de configuración, tipo (bool, int, float, str o list), valor por defecto y rango. """
+
+    __slots__ = ('name', 'type', 'default', 'min_val', 'max_val')
+
+    __bool_str = {'true': True, 'yes': True, 'on': True, '1': True,
+                  'false': False, 'no': False, 'off': False, '0': False}
+
+    def __init__(self, name: str, val_type: type = str, default=None, min_val=None, max_val=None):
+        if val_type not in (bool, int, float, str, list):
+            raise TypeError("Option {0}: type {1} is not supported!".format(name, val_type))
+        self.name = name
+        self.type = val_type
+        self.default = tuple(default) if isinstance(default, list) else default
+        self.min_val = min_val
+        self.max_val = max_val
+
+    @property
+    def hint(self) -> str:
+        """ Descripción del tipo y el rango, se usa en los mensajes de error. """
+        hint = self.type.__name__
+        if self.min_val is not None and self.max_val is not None:
+            hint += " {0}..{1}".format(self.min_val, self.max_val)
+        elif self.min_val is not None:
+            hint += " >= {0}".format(self.min_val)
+        elif self.max_val is not None:
+            hint += " <= {0}".format(self.max_val)
+        return hint
+
+    def convert(self, value):
+        """
+        Convierte el valor de la configuración al tipo de la opción.
+
+        :raises ValueError: Si el valor no es del tipo o esta fuera de rango.
+
+        """
+        if self.type is bool:
+            if isinstance(value, bool):
+                return value
+            if isinstance(value, int) and value in (0, 1):
+                return bool(value)
+            if isinstance(value, str) and value.strip().lower() in self.__bool_str:
+                return self.__bool_str[value.strip().lower()]
+            raise ValueError(value)
+
+        if self.type in (int, float):
+            if isinstance(value, bool):
+                raise ValueError(value)
+            if isinstance(value, str):
+                value = float(value.strip())
+            if not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ValueError(value)
+            if self.type is int:
+                if int(value) != value:
+                    raise ValueError(value)
+                value = int(value)
+            else:
+                value = float(value)
+            if self.min_val is not None and value < self.min_val:
+                raise ValueError(value)
+            if self.max_val is not None and value > self.max_val:
+                raise ValueError(value)
+            return value
+
+        if self.type is str:
+            if isinstance(value, (bool, dict, list)):
+                raise ValueError(value)
+            return str(value).strip()
+
+        if isinstance(value, (list, tuple)):
+            return tuple(value)
+        raise ValueError(value)
+
+
+class ConfigList(object):
+
+    """
+    Lista de targets de la configuración ({key: {opciones}}). Si el valor de un target no es un diccionario se asigna
+    a la opción value_option (por defecto enabled, "host": false).
+
+    """
+
+    def __init__(self, name: str, *options: ConfigOption, value_option: str = 'enabled'):
+        self.name = name
+        self.options = options
+        self.value_option = value_option
+
+
+class ConfigSchema(object):
+
+    # Opciones que tienen todos los módulos.
+    options_module = (
+        ConfigOption('enabled', bool, True),
+        ConfigOption('threads', int, 5, min_val=1),
+        ConfigOption('interval', float, 0, min_val=0),
+        ConfigOption('jitter', float, 0, min_val=0),
+        ConfigOption('isolate', bool, False),
+        ConfigOption('deadline', float, 0, min_val=0)
+    )
+
+    # Opciones que tienen todos los targets de las listas.
+    options_target = (
+        ConfigOption('interval', float, 0, min_val=0),
+        ConfigOption('jitter', float, 0, min_val=0)
+    )
+
+    def __init__(self, *options: ConfigOption, lists: tuple = (), strict: bool = True):
+        """
+        :param options: Opciones del modulo.
+        :param lists: Listas de targets (ConfigList).
+        :param strict: True notifica como error las opciones que no están en el esquema.
+
+        """
+        self.options = self.__merge(self.options_module, options)
+        self.lists = {}
+        self.__class_target = {}
+        for conf_list in lists:
+            if conf_list.name in self.options:
+                raise ValueError("List {0} has the same name as an option!".format(conf_list.name))
+            self.lists[conf_list.name] = self.__merge(self.options_target, conf_list.options)
+            self.__class_target[conf_list.name] = ConfigItem.new_class(
+                "Target_{0}".format(conf_list.name), ('key', ) + tuple(self.lists[conf_list.name].keys()))
+        self.__value_option = {conf_list.name: conf_list.value_option for conf_list in lists}
+        self.__class_module = ModuleConfig.new_class("ModuleConfig",
+                                                     tuple(self.options.keys()) + tuple(self.lists.keys()))
+        self.strict = strict
+
+    @staticmethod
+    def __merge(base: tuple, options: tuple) -> dict:
+        # Las opciones del modulo sustituyen a las comunes con el mismo nombre.
+        merged = {option.name: option for option in base}
+        merged.update({option.name: option for option in options})
+        return merged
+
+    @staticmethod
+    def __value(option: ConfigOption, data: dict, default, path: str, errors: list):
+        value = data.get(option.name, None)
+        if value is None:
+            return default
+        try:
+            return option.convert(value)
+        except (ValueError, TypeError):
+            errors.append("{0}: invalid value {1!r} ({2}), using {3!r}".format(path, value, option.hint, default))
+            return default
+
+    def __unknown(self, data: dict, known, path: str, errors: list):
+        if self.strict:
+            for key in data.keys():
+                if key not in known:
+                    errors.append("{0}{1}: unknown option".format(path, key))
+
+    def __compile_target(self, list_name: str, key, value, module_values: dict, errors: list) -> ConfigItem:
+        path = "{0}/{1}/".format(list_name, key)
+        if isinstance(value, dict):
+            data = value
+        elif value is None:
+            data = {}
+        elif self.__value_option[list_name]:
+            data = {self.__value_option[list_name]: value}
+        else:
+            errors.append("{0}: invalid value {1!r}, it must be a dict".format(path[:-1], value))
+            data = {}
+
+        options = self.lists[list_name]
+        values = {'key': key}
+        for option in options.values():
+            default = module_values.get(option.name, option.default)
+            values[option.name] = self.__value(option, data, default, path + option.name, errors)
+        self.__unknown(data, options, path, errors)
+        return self.__class_target[list_name](values)
+
+    def compile(self, conf: dict, defaults: dict = None) -> ModuleConfig:
+        """
+        Valida y compila la configuración de un modulo.
+
+        :param conf: Sección del modulo en modules.json.
+        :param defaults: Valores por defecto de opciones del modulo que no son fijos (interval del monitor...).
+        :return: ModuleConfig con un atributo por opción y por lista, los errores están en errors.
+
+        """
+        errors = []
+        if conf is None:
+            conf = {}
+        elif not isinstance(conf, dict):
+            errors.append("invalid config {0!r}, it must be a dict".format(conf))
+            conf = {}
+        if defaults is None:
+            defaults = {}
+
+        values = {}
+        for option in self.options.values():
+            values[option.name] = self.__value(option, conf, defaults.get(option.name, option.default), option.name,
+                                               errors)
+        self.__unknown(conf, tuple(self.options.keys()) + tuple(self.lists.keys()), '', errors)
+
+        module_values = values.copy()
+        targets_default = {}
+        for list_name in self.lists.keys():
+            items = conf.get(list_name, None)
+            if items is None:
+                items = {}
+            elif not isinstance(items, dict):
+                errors.append("{0}: invalid value {1!r}, it must be a dict".format(list_name, items))
+                items = {}
+            targets = {}
+            for (key, value) in items.items():
+                targets[key] = self.__compile_target(list_name, key, value, module_values, errors)
+            values[list_name] = types.MappingProxyType(targets)
+            targets_default[list_name] = self.__compile_target(list_name, None, {}, module_values, [])
+
+        values['errors'] = tuple(errors)
+        values['_targets_default'] = types.MappingProxyType(targets_default)
+        return self.__class_module(values)
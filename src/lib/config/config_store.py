@@ -62,14 +62,21 @@ class ConfigStore(ObjectBase):
             except Exception as e:
                 self.debug.exception(e)
         else:
-            self.debug.print("Config >> Warning: File ({0}) not exist!!!".format(self.file),  DebugLevel.warning)
+            self.debug.print(lambda: "Config >> Warning: File ({0}) not exist!!!".format(self.file),
+                             DebugLevel.warning)
         return return_date
 
     def save(self, data) -> bool:
+        # Escribimos en un archivo temporal y lo renombramos para que un corte a mitad de escritura no deje el
+        # archivo a medias.
+        file_tmp = "{0}.tmp".format(self.file)
         try:
-            f = codecs.open(self.file, 'w', 'utf-8')
+            f = codecs.open(file_tmp, 'w', 'utf-8')
             f.write(json.dumps(data))
+            f.flush()
+            os.fsync(f.fileno())
             f.close()
+            os.replace(file_tmp, self.file)
         except Exception as e:
             self.debug.exception(e)
             return False
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Almacén del estado de los módulos en SQLite.
+
+Funciona igual que ConfigControl, pero cada par (modulo, key) se guarda como una fila con su valor en JSON. Solo se
+escriben las filas que han cambiado desde el ultimo save() y todas en la misma transacción, de forma que un corte a
+mitad de escritura no deja el estado corrupto.
+
+Ejemplo:
+    >>> x = StatusStore('/var/lib/watchful/status.db')
+    >>> x.read()
+    >>> x.set_conf(['ping', '192.168.1.1', 'status'], True)
+    True
+    >>> x.save()
+    True
+
+"""
+
+import copy
+import json
+import sqlite3
+import threading
+from lib.config import ConfigControl
+
+__all__ = ['StatusStore']
+
+
+class StatusStore(ConfigControl):
+
+    # Key que se usa para guardar el valor de un modulo cuando no es un diccionario.
+    __key_module = ''
+
+    def __init__(self, file, init_data: dict = None):
+        self.__lock = threading.RLock()
+        self.__conn = None
+        self.__data_version = None
+        # Keys modificadas: (modulo, key) o (modulo, None) si se ha modificado el modulo completo.
+        self.__dirty = set()
+        self.__dirty_all = False
+        super().__init__(file, init_data)
+
+    @property
+    def data(self) -> dict:
+        return ConfigControl.data.fget(self)
+
+    @data.setter
+    def data(self, val):
+        with self.__lock:
+            ConfigControl.data.fset(self, val)
+            self.__dirty_all = True
+
+    @property
+    def is_changed(self) -> bool:
+        if self.__dirty_all or self.__dirty:
+            return True
+        return False
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """ Conexión con la base de datos, se abre y se crea la tabla la primera vez que se usa. """
+        if self.__conn is None:
+            conn = sqlite3.connect(self.file, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS status ("
+                         "module TEXT NOT NULL, "
+                         "key TEXT NOT NULL, "
+                         "value TEXT, "
+                         "PRIMARY KEY (module, key))")
+            self.__conn = conn
+        return self.__conn
+
+    def snapshot(self) -> dict:
+        """ Copia de los datos, se puede recorrer sin bloquear a los módulos que están actualizando el estado. """
+        with self.__lock:
+            return copy.deepcopy(self.data)
+
+    def close(self):
+        with self.__lock:
+            if self.__conn is not None:
+                self.__conn.close()
+                self.__conn = None
+
+    def __get_data_version(self) -> int:
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def read(self, return_data=True, def_return=None):
+        if not self.file:
+            return super().read(return_data, def_return)
+
+        with self.__lock:
+            data = {}
+            try:
+                for (module, key, value) in self.conn.execute("SELECT module, key, value FROM status"):
+                    value = json.loads(value)
+                    if key == self.__key_module:
+                        data[module] = value
+                    else:
+                        if not isinstance(data.get(module, None), dict):
+                            data[module] = {}
+                        data[module][key] = value
+                self.__data_version = self.__get_data_version()
+            except (sqlite3.Error, ValueError) as e:
+                self.debug.exception(e)
+                data = def_return
+
+            ConfigControl.data.fset(self, data)
+            self.__dirty.clear()
+            self.__dirty_all = False
+
+        if return_data:
+            return self.data
+
+    def refresh(self) -> bool:
+        """
+        Vuelve a leer el estado solo si otro proceso ha modificado la base de datos.
+
+        :return: True si se ha vuelto a leer.
+
+        """
+        if not self.file:
+            return False
+        with self.__lock:
+            try:
+                if self.__data_version is not None and self.__data_version == self.__get_data_version():
+                    return False
+            except sqlite3.Error as e:
+                self.debug.exception(e)
+                return False
+            self.read(False)
+            return True
+
+    def set_conf(self, find_key, val, str_split: str = None, data_dict: dict = None):
+        if data_dict is not None:
+            return super().set_conf(find_key, val, str_split, data_dict)
+        if not find_key:
+            return False
+
+        keys = self.convert_find_key_to_list(find_key, str_split)
+        with self.__lock:
+            work_dict = super().set_conf(keys.copy(), val, None, self.data)
+            ConfigControl.data.fset(self, work_dict)
+            if len(keys) > 1:
+                self.__dirty.add((keys[0], keys[1]))
+            else:
+                self.__dirty.add((keys[0], None))
+        return True
+
+    def clear(self) -> bool:
+        """ Borra el estado de todos los módulos, en memoria y en la base de datos. """
+        with self.__lock:
+            ConfigControl.data.fset(self, {})
+            self.__dirty.clear()
+            self.__dirty_all = True
+            return self.save()
+
+    def __rows_module(self, module):
+        value = self.data.get(module, None)
+        if isinstance(value, dict):
+            return [(module, str(key), json.dumps(val)) for (key, val) in value.items()]
+        if module in self.data:
+            return [(module, self.__key_module, json.dumps(value))]
+        return []
+
+    def save(self, data=None) -> bool:
+        if not self.file:
+            return False
+
+        with self.__lock:
+            if data is not None:
+                self.data = data
+
+            if self.__dirty_all:
+                modules = list(self.data.keys())
+                dirty = {(module, None) for module in modules}
+            else:
+                dirty = set(self.__dirty)
+            if not dirty and not self.__dirty_all:
+                return True
+
+            conn = self.conn
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                if self.__dirty_all:
+                    conn.execute("DELETE FROM status")
+                for (module, key) in dirty:
+                    if key is None:
+                        if not self.__dirty_all:
+                            conn.execute("DELETE FROM status WHERE module = ?", (module, ))
+                        conn.executemany("INSERT OR REPLACE INTO status (module, key, value) VALUES (?, ?, ?)",
+                                         self.__rows_module(module))
+                        continue
+
+                    module_data = self.data.get(module, None)
+                    if isinstance(module_data, dict) and key in module_data:
+                        conn.execute("DELETE FROM status WHERE module = ? AND key = ?", (module, self.__key_module))
+                        conn.execute("INSERT OR REPLACE INTO status (module, key, value) VALUES (?, ?, ?)",
+                                     (module, str(key), json.dumps(module_data[key])))
+                    else:
+                        conn.execute("DELETE FROM status WHERE module = ? AND key = ?", (module, str(key)))
+                conn.execute("COMMIT")
+                self.__data_version = self.__get_data_version()
+
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                self.debug.exception(e)
+                return False
+
+            self.__dirty.clear()
+            self.__dirty_all = False
+            return True
@@ -0,0 +1,3 @@
+from .mysql_pool import MySQLPool
+
+__all__ = ['MySQLPool']
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Pool de conexiones MySQL.
+
+Guarda una conexión por servidor (host, port, socket, user, db) que se reutiliza entre ciclos. Antes de usar una
+conexión que ya existe se comprueba con un ping (COM_PING) y si el servidor la ha cerrado se vuelve a conectar. Las
+conexiones que no se usan durante max_idle segundos se cierran.
+
+Ejemplo:
+    >>> pool = MySQLPool.default()
+    >>> with pool.connection(host='127.0.0.1', user='test', password='', db='test') as conn:
+    ...     conn.ping(reconnect=False)
+    >>> pool.close()
+
+"""
+
+import time
+import threading
+import contextlib
+
+__all__ = ['MySQLPool']
+
+
+class MySQLPool(object):
+
+    __default_pool = None
+    __default_pool_lock = threading.Lock()
+
+    class PoolEntry(object):
+
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.conn = None
+            self.password = None
+            self.last_used = 0
+
+        def close(self):
+            if self.conn is not None:
+                try:
+                    self.conn.close()
+                except Exception:
+                    pass
+                self.conn = None
+
+    def __init__(self, max_idle: float = 900, connect_timeout: float = 10):
+        """
+        :param max_idle: Segundos sin usar una conexión antes de cerrarla.
+        :param connect_timeout: Timeout en segundos al conectar con el servidor.
+
+        """
+        self.max_idle = max_idle
+        self.connect_timeout = connect_timeout
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """ Pool compartido por todo el proceso. """
+        with cls.__default_pool_lock:
+            if cls.__default_pool is None:
+                cls.__default_pool = cls()
+            return cls.__default_pool
+
+    @classmethod
+    def close_default(cls):
+        """ Cierra las conexiones del pool compartido si se ha creado, no lo crea. """
+        with cls.__default_pool_lock:
+            pool = cls.__default_pool
+        if pool is not None:
+            pool.close()
+
+    @property
+    def count(self) -> int:
+        """ Numero de conexiones abiertas. """
+        with self.__lock:
+            return len([e for e in self.__entries.values() if e.conn is not None])
+
+    def __get_entry(self, key):
+        now = time.monotonic()
+        with self.__lock:
+            # Cerramos las conexiones que llevan mucho tiempo sin usarse.
+            for (entry_key, entry) in list(self.__entries.items()):
+                if entry_key != key and entry.conn is not None and now - entry.last_used > self.max_idle:
+                    if entry.lock.acquire(blocking=False):
+                        try:
+                            entry.close()
+                        finally:
+                            entry.lock.release()
+            return self.__entries.setdefault(key, self.PoolEntry())
+
+    def __connect(self, host, port, user, password, db, unix_socket):
+        # Se importa al conectar, solo lo necesita el modulo mysql.
+        import pymysql
+        if unix_socket:
+            return pymysql.connect(unix_socket=unix_socket,
+                                   db=db,
+                                   charset='utf8mb4',
+                                   connect_timeout=self.connect_timeout)
+        return pymysql.connect(host=host,
+                               port=port,
+                               user=user,
+                               password=password,
+                               db=db,
+                               charset='utf8mb4',
+                               connect_timeout=self.connect_timeout)
+
+    @contextlib.contextmanager
+    def connection(self, host: str = "", port: int = 3306, user: str = "", password: str = "", db: str = "",
+                   unix_socket: str = ""):
+        """
+        Retorna (context manager) una conexión viva con el servidor. Mientras se usa, la conexión queda bloqueada para
+        el resto de hilos. Si se produce un error usando la conexión se cierra y se vuelve a crear la próxima vez.
+
+        """
+        key = (unix_socket, host, port, user, db)
+        entry = self.__get_entry(key)
+        with entry.lock:
+            if entry.conn is not None and entry.password != password:
+                entry.close()
+
+            if entry.conn is None:
+                entry.conn = self.__connect(host, port, user, password, db, unix_socket)
+                entry.password = password
+            else:
+                try:
+                    entry.conn.ping(reconnect=True)
+                except Exception:
+                    entry.close()
+                    raise
+
+            try:
+                yield entry.conn
+            except Exception:
+                entry.close()
+                raise
+            finally:
+                entry.last_used = time.monotonic()
+
+    def close(self):
+        """ Cierra todas las conexiones del pool. """
+        with self.__lock:
+            for entry in self.__entries.values():
+                with entry.lock:
+                    entry.close()
+            self.__entries.clear()
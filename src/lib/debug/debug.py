@@ -19,8 +19,31 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import pprint
-import traceback
+""" Mensajes de debug y log.
+
+El nivel se comprueba antes de generar el texto del mensaje: si el mensaje es una función (lambda) solo se llama cuando
+el mensaje se va a mostrar, y debug_obj solo formatea el objeto (pprint) si el nivel debug esta activo.
+
+Salidas (output):
+    stdout      Texto en la consola (por defecto).
+    file        Una linea JSON por mensaje en el archivo "file" ({"time", "level", "module", "message"}).
+    journald    Socket nativo de journald, con el modulo en el campo WATCHFUL_MODULE.
+
+Cada modulo puede tener su propio nivel (levels), por ejemplo {"ping": "debug"}.
+
+Ejemplo:
+    >>> x = Debug()
+    >>> x.configure({'output': 'file', 'file': '/var/log/watchful.log', 'level': 'info', 'levels': {'ping': 'debug'}})
+    >>> x.print(lambda: "Data: {0}".format(pprint.pformat(data)), DebugLevel.debug, module='ping')
+
+"""
+
+import os
+import json
+import time
+import socket
+import struct
+import threading
 from lib.debug import DebugLevel
 
 __all__ = ['Debug']
@@ -28,9 +51,59 @@ __all__ = ['Debug']
 
 class Debug(object):
 
+    outputs = ('stdout', 'file', 'journald')
+
+    __path_journald = '/run/systemd/journal/socket'
+    __journald_identifier = 'watchful'
+    # Prioridad de syslog de cada nivel.
+    __priority = {
+        DebugLevel.null: 7,
+        DebugLevel.debug: 7,
+        DebugLevel.info: 6,
+        DebugLevel.warning: 4,
+        DebugLevel.error: 3,
+        DebugLevel.emergency: 0
+    }
+
+    class Bound(object):
+
+        """ Debug con el nombre del modulo, los mensajes usan el nivel propio del modulo si lo tiene. """
+
+        __slots__ = ('parent', 'module')
+
+        def __init__(self, parent, module: str):
+            self.parent = parent
+            self.module = module
+
+        @property
+        def enabled(self) -> bool:
+            return self.parent.enabled
+
+        @property
+        def level(self) -> DebugLevel:
+            return self.parent.get_level(self.module)
+
+        def is_enabled(self, msg_level: DebugLevel) -> bool:
+            return self.parent.is_enabled(msg_level, self.module)
+
+        def print(self, message, msg_level: DebugLevel = DebugLevel.debug, force: bool = False):
+            self.parent.print(message, msg_level, force, self.module)
+
+        def exception(self, ex=None):
+            self.parent.exception(ex, self.module)
+
+        def debug_obj(self, name_module, obj_debug, obj_info="Data Object"):
+            self.parent.debug_obj(name_module, obj_debug, obj_info)
+
     def __init__(self, enable: bool = True, level: DebugLevel = DebugLevel.info):
         self.enabled = enable
         self.level = level
+        self.__levels = {}
+        self.__output = 'stdout'
+        self.__file = None
+        self.__file_handle = None
+        self.__socket = None
+        self.__lock = threading.Lock()
 
     @property
     def enabled(self) -> bool:
@@ -46,24 +119,126 @@ class Debug(object):
 
     @level.setter
     def level(self, value: DebugLevel = DebugLevel.null):
-        self.__level = value
+        self.__level = self.to_level(value, DebugLevel.info)
 
-    def print(self, message, msg_level: DebugLevel = DebugLevel.debug, force: bool = False):
-        show_msg = True
-        if self.enabled is False:
-            show_msg = False
-        elif force is False:
-            if self.level.value > msg_level.value:
-                show_msg = False
+    @property
+    def levels(self) -> dict:
+        """ Nivel de cada modulo {modulo: DebugLevel}, los módulos que no están usan level. """
+        return dict(self.__levels)
+
+    @levels.setter
+    def levels(self, value: dict):
+        levels = {}
+        if isinstance(value, dict):
+            for (module, level) in value.items():
+                level = self.to_level(level, None)
+                if level is not None:
+                    levels[str(module)] = level
+        self.__levels = levels
+
+    @property
+    def output(self) -> str:
+        return self.__output
 
-        if show_msg:
-            if isinstance(message, str):
-                print(message)
-            else:
-                pprint.pprint(message)
+    @property
+    def file(self) -> str:
+        return self.__file
 
     @staticmethod
-    def exception(ex=None):
+    def to_level(value, default=None):
+        """ Convierte el nombre ("debug", "info"...) o el numero del nivel a DebugLevel. """
+        if isinstance(value, DebugLevel):
+            return value
+        try:
+            if isinstance(value, str):
+                return DebugLevel[value.strip().lower()]
+            if isinstance(value, int) and not isinstance(value, bool):
+                return DebugLevel(value)
+        except (KeyError, ValueError):
+            pass
+        return default
+
+    def configure(self, conf: dict):
+        """
+        Aplica la configuración del log (sección "log" de config.json). Las opciones que no están no se modifican.
+
+        :param conf: {'output': 'stdout|file|journald', 'file': ruta, 'level': nivel, 'levels': {modulo: nivel}}
+
+        """
+        if not isinstance(conf, dict):
+            return
+        if 'level' in conf:
+            self.level = conf['level']
+        if 'levels' in conf:
+            self.levels = conf['levels']
+        if 'output' in conf or 'file' in conf:
+            self.set_output(conf.get('output', self.output), conf.get('file', self.file))
+
+    def set_output(self, output: str, file: str = None):
+        """ Cambia la salida de los mensajes, si no es valida (o falta el archivo) se usa stdout. """
+        if output not in self.outputs or (output == 'file' and not file):
+            self.print("Debug >> Output {0} is not valid, using stdout".format(output), DebugLevel.warning)
+            output = 'stdout'
+        with self.__lock:
+            self.__close()
+            self.__output = output
+            self.__file = file
+
+    def close(self):
+        with self.__lock:
+            self.__close()
+
+    def __close(self):
+        if self.__file_handle is not None:
+            self.__file_handle.close()
+            self.__file_handle = None
+        if self.__socket is not None:
+            self.__socket.close()
+            self.__socket = None
+
+    def bind(self, module: str):
+        """ Retorna un Debug que envía los mensajes con el nombre del modulo. """
+        return self.Bound(self, module)
+
+    def get_level(self, module: str = None) -> DebugLevel:
+        if module:
+            return self.__levels.get(module, self.level)
+        return self.level
+
+    def is_enabled(self, msg_level: DebugLevel, module: str = None) -> bool:
+        """ Nos dice si se mostraran los mensajes de ese nivel, se usa antes de generar mensajes costosos. """
+        if not self.enabled:
+            return False
+        if self.get_level(module).value > msg_level.value:
+            return False
+        return True
+
+    def print(self, message, msg_level: DebugLevel = DebugLevel.debug, force: bool = False, module: str = None):
+        """
+        :param message: Texto, objeto (se formatea con pprint) o función que retorna el texto (solo se llama si el
+                        mensaje se va a mostrar).
+        :param msg_level: Nivel del mensaje.
+        :param force: True se muestra sea cual sea el nivel.
+        :param module: Nombre del modulo que genera el mensaje.
+
+        """
+        if self.enabled is False:
+            return
+        if force is False and not self.is_enabled(msg_level, module):
+            return
+
+        if callable(message):
+            message = message()
+        if not isinstance(message, str):
+            import pprint
+            message = pprint.pformat(message)
+        self.__write(message, msg_level, module)
+
+    def exception(self, ex=None, module: str = None):
+        if self.enabled is False:
+            return
+        # traceback y pprint se importan solo cuando hacen falta, tardan en cargar y no se usan en cada arranque.
+        import traceback
         # str_obj = pprint.pformat(ex)
         msg_print = 'Exception in user code:\n'
         msg_print += '-'*60+'\n'
@@ -72,16 +247,61 @@ class Debug(object):
             msg_print += '-'*60+'\n'
         msg_print += str(traceback.format_exc()) + '\n'
         msg_print += '-'*60+'\n'
-        print(msg_print)
+        self.__write(msg_print, DebugLevel.error, module)
 
     def debug_obj(self, name_module, obj_debug, obj_info="Data Object"):
+        if not self.is_enabled(DebugLevel.debug, name_module):
+            return
+        import pprint
         str_obj = pprint.pformat(obj_debug)
         msg_debug = '*' * 60 + '\n'
         msg_debug += "Debug [{0}] - {1}:\n".format(name_module, obj_info)
         msg_debug += "Type: {0}\n".format(type(obj_debug))
         msg_debug += str_obj + '\n'
         msg_debug += '*' * 60 + '\n'
-        self.print(msg_debug, DebugLevel.debug)
+        self.__write(msg_debug, DebugLevel.debug, name_module)
+
+    def __write(self, message: str, msg_level: DebugLevel, module: str = None):
+        output = self.__output
+        if output == 'stdout':
+            print(message)
+            return
+        try:
+            with self.__lock:
+                if output == 'file':
+                    self.__write_file(message, msg_level, module)
+                else:
+                    self.__write_journald(message, msg_level, module)
+        except (OSError, ValueError) as e:
+            # Si falla la salida configurada el mensaje no se pierde.
+            print("Debug >> Output {0} >> Error: {1}".format(output, e))
+            print(message)
+
+    def __write_file(self, message: str, msg_level: DebugLevel, module: str = None):
+        if self.__file_handle is None:
+            self.__file_handle = open(self.__file, 'a', encoding='utf-8', buffering=1)
+        line = {'time': round(time.time(), 3), 'level': msg_level.name, 'module': module, 'message': message}
+        self.__file_handle.write(json.dumps(line, ensure_ascii=False) + '\n')
+
+    @staticmethod
+    def __journald_field(key: str, value: str) -> bytes:
+        value = value.encode('utf-8')
+        if b'\n' in value:
+            # Los valores con saltos de linea se envían con su tamaño (entero de 64 bits little endian).
+            return key.encode('ascii') + b'\n' + struct.pack('<Q', len(value)) + value + b'\n'
+        return key.encode('ascii') + b'=' + value + b'\n'
+
+    def __write_journald(self, message: str, msg_level: DebugLevel, module: str = None):
+        if self.__socket is None:
+            self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        data = self.__journald_field('MESSAGE', message)
+        data += self.__journald_field('PRIORITY', str(self.__priority.get(msg_level, 6)))
+        data += self.__journald_field('SYSLOG_IDENTIFIER', self.__journald_identifier)
+        data += self.__journald_field('SYSLOG_PID', str(os.getpid()))
+        data += self.__journald_field('WATCHFUL_LEVEL', msg_level.name)
+        if module:
+            data += self.__journald_field('WATCHFUL_MODULE', module)
+        self.__socket.sendto(data, self.__path_journald)
 
 
 if __name__ == '__main__':
@@ -93,6 +313,9 @@ if __name__ == '__main__':
         x.print("Msg Test 3 - Force = True and Level Debug - Yes Show", DebugLevel.debug, True)
         x.level = DebugLevel.debug
         x.print("Msg Test 4 - Level = debug - Yes Show")
+        x.print(lambda: "Msg Test 5 - Lazy - Yes Show")
+        x.levels = {'ping': 'error'}
+        x.print(lambda: "Msg Test 6 - Module level error - No Show", DebugLevel.info, module='ping')
         val = 10 * (1/0)
     except Exception as e:
         x.exception(e)
@@ -20,12 +20,20 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import os
+import re
+import time
+import uuid
 import shlex
+import signal
+import select
+import selectors
 import subprocess
-import paramiko
 
 from enum import Enum
 from lib.switch import Switch
+from lib.ssh_pool import SSHPool
+from lib.profiler import Profiler
 
 __author__ = "Javier Pastor"
 __copyright__ = "Copyright © 2019, Javier Pastor"
@@ -48,6 +56,52 @@ class Exec(object):
 
     """ Main Class. """
 
+    # Bytes que se leen de cada stream en cada lectura.
+    __read_size = 65536
+    # Segundos máximos entre cada comprobación del canal SSH mientras se espera la salida del comando remoto.
+    __remote_poll = 0.05
+    # Bytes que se guardan como máximo de stdout y de stderr si no se especifica otro valor (max_output).
+    __default_max_output = 1024 * 1024
+
+    class Output(object):
+
+        """
+        Salida de un stream del comando. Guarda como máximo max_bytes (0 sin limite) y el resto se descarta. Si tiene
+        on_line no guarda nada, cada linea se pasa a on_line (sin el salto de linea) según va llegando.
+
+        """
+
+        def __init__(self, max_bytes: int, on_line=None):
+            self.max_bytes = max_bytes
+            self.on_line = on_line
+            self.truncated = False
+            self.__data = bytearray()
+
+        def write(self, chunk: bytes):
+            self.__data += chunk
+            if self.on_line is not None:
+                *lines, rest = self.__data.split(b'\n')
+                for line in lines:
+                    self.on_line(line.decode(errors='replace'))
+                self.__data = bytearray(rest)
+                if self.max_bytes and len(self.__data) > self.max_bytes:
+                    # Linea demasiado larga, se pasa la parte que cabe y se descarta el resto.
+                    self.on_line(self.__data[:self.max_bytes].decode(errors='replace'))
+                    self.__data.clear()
+                    self.truncated = True
+            elif self.max_bytes and len(self.__data) > self.max_bytes:
+                del self.__data[self.max_bytes:]
+                self.truncated = True
+
+        def close(self) -> str:
+            """ Pasa a on_line la ultima linea si no termina en salto de linea y retorna lo que se ha guardado. """
+            if self.on_line is not None:
+                if self.__data:
+                    self.on_line(self.__data.decode(errors='replace'))
+                    self.__data.clear()
+                return ""
+            return self.__data.decode(errors='replace')
+
     def __init__(self, command: str = ""):
         """ Inicializa el objeto y lo configura con los valores por defecto.
 
@@ -62,6 +116,9 @@ class Exec(object):
         self.__user = ""
         self.__password = ""
         self.__timeout = 30
+        self.__max_output = self.__default_max_output
+        self.__on_line = None
+        self.__truncated = False
         self.set_remote()
 
     @property
@@ -120,6 +177,29 @@ class Exec(object):
     def timeout(self, val: float):
         self.__timeout = val
 
+    @property
+    def max_output(self) -> int:
+        """ Bytes que se guardan como máximo de stdout y de stderr, 0 sin limite. """
+        return self.__max_output
+
+    @max_output.setter
+    def max_output(self, val: int):
+        self.__max_output = val
+
+    @property
+    def on_line(self):
+        """ Función que recibe cada linea de stdout según llega, si se usa stdout no se guarda (retorna ""). """
+        return self.__on_line
+
+    @on_line.setter
+    def on_line(self, val):
+        self.__on_line = val
+
+    @property
+    def truncated(self) -> bool:
+        """ True si en la ultima ejecución se ha descartado parte de la salida por superar max_output. """
+        return self.__truncated
+
     def __is_command_exist(self) -> bool:
         if self.command and len(self.command.strip()) > 0:
             return True
@@ -129,23 +209,81 @@ class Exec(object):
     def __execute_local(self):
         """ Ejecuta el comando en el equipo local.
 
+        El comando se ejecuta en su propio grupo de procesos. Si no termina antes de timeout se mata el grupo entero
+        (SIGKILL), también los procesos que haya creado, y se retorna la salida leída hasta ese momento con la
+        excepción subprocess.TimeoutExpired.
+
         :return: Retorna stdout, stderr y exit_code
 
         """
-        data_return = {'out': None, 'err': None, 'code': None}
+        data_return = {'out': None, 'err': None, 'code': None, 'exception': None}
 
         if self.__is_command_exist():
             command_with_args = shlex.split(self.command)
-            execution = subprocess.Popen(command_with_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            stdout, stderr = execution.communicate()
-
-            data_return['out'] = stdout.decode()
-            data_return['err'] = stderr.decode()
-            data_return['code'] = execution.returncode
-            data_return['exception'] = None
+            execution = subprocess.Popen(command_with_args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE, start_new_session=True)
+            deadline = time.monotonic() + self.timeout if self.timeout else None
+            out = self.Output(self.max_output, self.on_line)
+            err = self.Output(self.max_output)
+            is_timeout = False
+            try:
+                is_timeout = not self.__read_local(execution, deadline, out, err)
+                if not is_timeout:
+                    try:
+                        execution.wait(None if deadline is None else max(deadline - time.monotonic(), 0))
+                    except subprocess.TimeoutExpired:
+                        is_timeout = True
+            except BaseException:
+                self.__kill_local(execution)
+                raise
+            finally:
+                execution.stdout.close()
+                execution.stderr.close()
+
+            if is_timeout:
+                self.__kill_local(execution)
+                data_return['exception'] = subprocess.TimeoutExpired(self.command, self.timeout)
+            else:
+                data_return['code'] = execution.returncode
+            data_return['out'] = out.close()
+            data_return['err'] = err.close()
+            self.__truncated = out.truncated or err.truncated
 
         return data_return
 
+    def __read_local(self, execution: subprocess.Popen, deadline, out: Output, err: Output) -> bool:
+        """
+        Lee stdout y stderr a la vez hasta que se cierran los dos o hasta deadline.
+
+        :return: True se han cerrado, False ha llegado el deadline.
+
+        """
+        streams = {execution.stdout.fileno(): out, execution.stderr.fileno(): err}
+        with selectors.DefaultSelector() as selector:
+            for fd in streams.keys():
+                selector.register(fd, selectors.EVENT_READ)
+            while selector.get_map():
+                timeout = None
+                if deadline is not None:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        return False
+                for (key, _) in selector.select(timeout):
+                    chunk = os.read(key.fd, self.__read_size)
+                    if chunk:
+                        streams[key.fd].write(chunk)
+                    else:
+                        selector.unregister(key.fd)
+        return True
+
+    @staticmethod
+    def __kill_local(execution: subprocess.Popen):
+        try:
+            os.killpg(execution.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        execution.wait()
+
     def __execute_remote(self):
         """ Ejecuta el comando en el host remoto que se ha configurado.
 
@@ -159,60 +297,167 @@ class Exec(object):
         data_return = {'out': None, 'err': None, 'code': None, 'exception': None}
 
         if self.__is_command_exist():
-            shell = None
-            client = None
-            try:
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                client.connect(hostname=self.host,
-                               port=self.port,
-                               username=self.user,
-                               password=self.password,
-                               timeout=self.timeout)
-                shell = client.invoke_shell()
-
-                # TODO: Pendiente añadir soporte para multiples commands.
-                _, stdout, stderr = client.exec_command(self.command)
-
-                # Espera a que termine de ejecutarse el comando y obtenemos el exit code.
-                exit_code = stdout.channel.recv_exit_status()
-
-                # read_out = stdout if stdout else ""
-                # read_err = stderr if stdout else ""
-
-                read_out = stdout.read().decode() if stdout else ""
-                read_err = stderr.read().decode() if stdout else ""
-
-                data_return = {'out': read_out, 'err': read_err, 'code': exit_code, 'exception': None}
+            pool = SSHPool.default()
+            # Si el comando falla sobre una sesión que ya existía (el servidor la ha cerrado) se descarta la sesión y
+            # se intenta una vez más con una sesión nueva.
+            for _ in range(2):
+                reused = pool.is_active(self.host, self.port, self.user)
+                try:
+                    client = pool.get_client(self.host, self.port, self.user, self.password, self.timeout)
+
+                    _, stdout, _ = client.exec_command(self.command, timeout=self.timeout)
+                    data_return = self.__read_remote(stdout.channel)
+                    break
+
+                except Exception as ex:
+                    # http://docs.paramiko.org/en/2.6/api/ssh_exception.html
+                    # Authentication failed.
+                    pool.discard(self.host, self.port, self.user)
+                    data_return = {'out': None, 'err': None, 'code': None, 'exception': ex}
+                    if not reused:
+                        break
 
-            except Exception as ex:
-                # http://docs.paramiko.org/en/2.6/api/ssh_exception.html
-                # print("Exception:", ex)
-                # Authentication failed.
-                data_return = {'out': None, 'err': None, 'code': None, 'exception': ex}
+        return data_return
 
-            finally:
-                if shell:
-                    shell.close()
-                if client:
-                    client.close()
+    def __read_remote(self, channel) -> dict:
+        """
+        Lee stdout y stderr del canal SSH a la vez hasta que termina el comando o hasta timeout. Hay que leer antes de
+        esperar el exit code, si la salida no cabe en la ventana del canal el comando se queda esperando a que se lea.
+        Si llega el timeout se cierra el canal (la sesión SSH se sigue usando) y se retorna la salida leída hasta ese
+        momento con la excepción subprocess.TimeoutExpired.
 
+        """
+        out = self.Output(self.max_output, self.on_line)
+        err = self.Output(self.max_output)
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        is_timeout = False
+        try:
+            while True:
+                if channel.recv_ready():
+                    out.write(channel.recv(self.__read_size))
+                elif channel.recv_stderr_ready():
+                    err.write(channel.recv_stderr(self.__read_size))
+                elif channel.exit_status_ready() and (channel.eof_received or channel.closed):
+                    break
+                else:
+                    timeout = self.__remote_poll
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            is_timeout = True
+                            break
+                        timeout = min(timeout, remaining)
+                    if channel.eof_received:
+                        # Ya no llegan mas datos, solo falta el exit code.
+                        channel.status_event.wait(timeout)
+                    else:
+                        # select se despierta al llegar datos a stdout o al cerrarse el canal, los datos de stderr no
+                        # lo despiertan y se leen como mucho remote_poll segundos después.
+                        select.select([channel], [], [], timeout)
+        finally:
+            if is_timeout:
+                channel.close()
+
+        data_return = {'out': out.close(), 'err': err.close(), 'code': None, 'exception': None}
+        self.__truncated = out.truncated or err.truncated
+        if is_timeout:
+            data_return['exception'] = subprocess.TimeoutExpired(self.command, self.timeout)
+        else:
+            data_return['code'] = channel.recv_exit_status()
         return data_return
 
+    def __span_name(self) -> str:
+        """ Nombre del programa que se ejecuta (/bin/systemctl status x -> systemctl). """
+        try:
+            program = shlex.split(self.command)[0]
+        except (ValueError, IndexError):
+            program = self.command.strip().split(' ', 1)[0]
+        return os.path.basename(program)
+
     def start(self):
         """ Ejecuta el comando y mira si tiene que ejecutarlo localmente o se tiene que ejecutar en otro host. """
 
-        tmp_exec = {'out': None, 'err': None}
+        tmp_exec = {'out': None, 'err': None, 'code': None, 'exception': None}
+        self.__truncated = False
         if self.__is_command_exist():
             with Switch(self.location) as case:
                 if case(EnumLocationExec.local):
-                    tmp_exec = self.__execute_local()
+                    with Profiler.default().span('exec', self.__span_name()):
+                        tmp_exec = self.__execute_local()
 
                 elif case(EnumLocationExec.remote):
-                    tmp_exec = self.__execute_remote()
+                    with Profiler.default().span('exec', "ssh/{0}".format(self.host)):
+                        tmp_exec = self.__execute_remote()
 
         return tmp_exec['out'], tmp_exec['err'], tmp_exec['code'], tmp_exec['exception']
 
+    @staticmethod
+    def __batch_script(commands: list, token: str) -> str:
+        """
+        Crea un script sh que ejecuta los comandos uno detrás de otro. La salida de cada comando se enmarca en stdout y
+        stderr con separadores que llevan el token, el nº del comando y en stdout el exit code.
+
+        """
+        script = []
+        for (i, cmd) in enumerate(commands):
+            begin = "__WATCHFUL_{0}_{1}_BEGIN__".format(token, i)
+            script.append("printf '%s\\n' '{0}'; printf '%s\\n' '{0}' >&2".format(begin))
+            # Subshell para que un "exit" o un "cd" de un comando no afecte al resto.
+            script.append("( {0}\n) </dev/null".format(cmd))
+            script.append("printf '\\n%s\\n' \"__WATCHFUL_{0}_{1}_END_$?__\"; "
+                          "printf '\\n%s\\n' '__WATCHFUL_{0}_{1}_END__' >&2".format(token, i))
+        return "\n".join(script)
+
+    @staticmethod
+    def __batch_parse(stdout: str, stderr: str, token: str, count: int) -> list:
+        """ Separa la salida del script creado por __batch_script en la salida de cada comando. """
+        data_return = [{'out': None, 'err': None, 'code': None} for _ in range(count)]
+        token = re.escape(token)
+        reg_out = r'__WATCHFUL_{0}_(\d+)_BEGIN__\n(.*?)\n__WATCHFUL_{0}_\1_END_(\d+)__\n'.format(token)
+        reg_err = r'__WATCHFUL_{0}_(\d+)_BEGIN__\n(.*?)\n__WATCHFUL_{0}_\1_END__\n'.format(token)
+        for (i, out, code) in re.findall(reg_out, stdout or "", re.DOTALL):
+            data_return[int(i)]['out'] = out
+            data_return[int(i)]['code'] = int(code)
+        for (i, err) in re.findall(reg_err, stderr or "", re.DOTALL):
+            data_return[int(i)]['err'] = err
+        return data_return
+
+    def start_multi(self, commands: list):
+        """
+        Ejecuta una lista de comandos. En remoto se ejecutan todos en una sola sesión (un solo round trip), en local se
+        ejecutan uno detrás de otro.
+
+        :param commands: Lista de comandos.
+        :return: Tupla (lista de diccionarios {'out', 'err', 'code'} en el mismo orden que commands, exception)
+
+        """
+        commands = [c for c in commands if c and c.strip()]
+        if not commands:
+            return [], None
+
+        if self.location == EnumLocationExec.remote:
+            token = uuid.uuid4().hex
+            tmp_exec = Exec("sh -c {0}".format(shlex.quote(self.__batch_script(commands, token))))
+            tmp_exec.location = EnumLocationExec.remote
+            tmp_exec.set_remote(host=self.host, port=self.port, user=self.user, password=self.password,
+                                timeout=self.timeout)
+            stdout, stderr, _, stdexcept = tmp_exec.start()
+            if stdexcept is not None:
+                return [{'out': None, 'err': None, 'code': None} for _ in commands], stdexcept
+            return self.__batch_parse(stdout, stderr, token, len(commands)), None
+
+        data_return = []
+        for cmd in commands:
+            stdout, stderr, exit_code, stdexcept = Exec.execute(command=cmd, timeout=self.timeout,
+                                                                max_output=self.max_output)
+            if stdexcept is not None:
+                # Igual que en remoto la lista tiene un elemento por comando, los que no se han ejecutado van vacíos.
+                data_return.extend({'out': None, 'err': None, 'code': None}
+                                   for _ in range(len(commands) - len(data_return)))
+                return data_return, stdexcept
+            data_return.append({'out': stdout, 'err': stderr, 'code': exit_code})
+        return data_return, None
+
     def set_remote(self, host: str = "", port: int = 22, user: str = "root", password: str = None,
                    timeout: float = None):
         """ Configuramos los datos de conexión al host remoto.
@@ -237,7 +482,7 @@ class Exec(object):
 
     @staticmethod
     def execute(command: str = "", host: str = "", port: int = 22, user: str = "", password: str = "",
-                timeout: float = None):
+                timeout: float = None, max_output: int = None, on_line=None):
         """ Ejecuta el comando que le pasamos sin tener que crear el objeto Exec.
 
         :param command: Comando ha ejecutar.
@@ -245,8 +490,10 @@ class Exec(object):
         :param port: Puerto SSH
         :param user: Usuario login
         :param password: Password Login
-        :param timeout: Tiempo en segundos hasta que falla el intento de conexión.
-        :return: Retorna stdout y stderr
+        :param timeout: Segundos que tiene el comando para terminar (y para conectar por SSH), por defecto 30.
+        :param max_output: Bytes que se guardan como máximo de stdout y de stderr, por defecto 1 MiB, 0 sin limite.
+        :param on_line: Función que recibe cada linea de stdout según llega, stdout no se guarda.
+        :return: Retorna stdout, stderr, exit_code y la excepción (subprocess.TimeoutExpired si se ha matado)
 
         """
 
@@ -254,4 +501,32 @@ class Exec(object):
         if len(host.strip()) > 0:
             tmp_exec.location = EnumLocationExec.remote
             tmp_exec.set_remote(host=host, port=port, user=user, password=password, timeout=timeout)
+        elif timeout is not None:
+            tmp_exec.timeout = timeout
+        if max_output is not None:
+            tmp_exec.max_output = max_output
+        tmp_exec.on_line = on_line
         return tmp_exec.start()
+
+    @staticmethod
+    def execute_multi(commands: list, host: str = "", port: int = 22, user: str = "", password: str = "",
+                      timeout: float = None):
+        """ Ejecuta una lista de comandos sin tener que crear el objeto Exec, ver start_multi.
+
+        :param commands: Lista de comandos ha ejecutar.
+        :param host: Host o IP, si no se especifica se ejecutan en local.
+        :param port: Puerto SSH
+        :param user: Usuario login
+        :param password: Password Login
+        :param timeout: Segundos que tiene cada comando para terminar (y para conectar por SSH), por defecto 30.
+        :return: Tupla (lista de diccionarios {'out', 'err', 'code'}, exception)
+
+        """
+
+        tmp_exec = Exec()
+        if len(host.strip()) > 0:
+            tmp_exec.location = EnumLocationExec.remote
+            tmp_exec.set_remote(host=host, port=port, user=user, password=password, timeout=timeout)
+        elif timeout is not None:
+            tmp_exec.timeout = timeout
+        return tmp_exec.start_multi(commands)
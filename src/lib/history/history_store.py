@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Histórico de los valores numéricos de los checks.
+
+Cada valor numérico de other_data (y el status del check como 0/1) es una serie con el nombre "modulo/key/campo".
+Cada serie guarda sus datos en buffers circulares de tamaño fijo con tres resoluciones: 1 minuto, 1 hora y 1 día.
+Cada punto guarda count, sum, min y max del intervalo, así que la memoria que usa una serie no crece con el tiempo y
+el numero de series esta limitado por max_series. Los buffers solo reservan los arrays cuando tienen bastantes
+puntos, una serie con pocos puntos ocupa unos pocos bytes por punto.
+
+Las series se guardan en SQLite con una fila por punto y solo se escriben los puntos que han cambiado. Los puntos de
+una serie solo se leen de la base de datos cuando se consultan (get, summary). Si no se han leído, los valores nuevos
+se guardan en memoria como incremento y al guardar se suman a los puntos de la base de datos, así en el modo oneshot
+cada ejecución solo lee los nombres de las series y escribe unas pocas filas.
+
+Ejemplo:
+    >>> h = HistoryStore('/var/lib/watchful/history.db')
+    >>> h.add('temperature', 'thermal_zone0', {'temp': 45.1, 'type': 'cpu'}, True)
+    2
+    >>> h.get('temperature/thermal_zone0/temp', '1m')
+    [{'time': 1571400000, 'avg': 45.1, 'min': 45.1, 'max': 45.1, 'count': 1}]
+
+"""
+
+import math
+import time
+import array
+import sqlite3
+import threading
+from lib import ObjectBase
+from lib.debug import DebugLevel
+
+__all__ = ['HistoryStore']
+
+
+class HistoryStore(ObjectBase):
+
+    # Resoluciones: (nombre, segundos de cada punto, nº de puntos que se guardan).
+    rollups = (('1m', 60, 1440), ('1h', 3600, 720), ('1d', 86400, 365))
+
+    # Nº máximo de series como valor por defecto.
+    __default_max_series = 256
+    # Segundos mínimos entre cada escritura en la base de datos como valor por defecto.
+    __default_save_interval = 300
+    # Campos de other_data que no se guardan como valor por defecto (son umbrales de la configuración).
+    __default_exclude = ('alert', )
+    # Profundidad máxima de los diccionarios de other_data que se recorren.
+    __max_depth = 2
+
+    class Ring(object):
+
+        __slots__ = ('step', 'size', 'sparse', 'bucket', 'count', 'total', 'min', 'max', 'dirty')
+
+        # Mientras un ring tiene pocos puntos se guardan en un diccionario, con más de size / __dense_ratio puntos se
+        # pasan a arrays. Así las series que no se leen de la base de datos (modo oneshot) solo ocupan los puntos
+        # añadidos y una serie completa ocupa 32 bytes por punto.
+        __dense_ratio = 8
+
+        def __init__(self, step: int, size: int):
+            self.step = step
+            self.size = size
+            # Puntos {slot: (bucket, count, total, min, max)}, None cuando se usan los arrays.
+            self.sparse = {}
+            self.bucket = None
+            self.count = None
+            self.total = None
+            self.min = None
+            self.max = None
+            # Puntos que han cambiado desde que se guardaron.
+            self.dirty = set()
+
+        @property
+        def is_dense(self) -> bool:
+            return self.sparse is None
+
+        def __to_dense(self):
+            self.bucket = array.array('i', [-1]) * self.size
+            self.count = array.array('I', [0]) * self.size
+            self.total = array.array('d', [0.0]) * self.size
+            self.min = array.array('d', [0.0]) * self.size
+            self.max = array.array('d', [0.0]) * self.size
+            sparse = self.sparse
+            self.sparse = None
+            for (i, point) in sparse.items():
+                self.set_slot(i, *point)
+
+        def __to_sparse(self):
+            self.bucket = self.count = self.total = self.min = self.max = None
+            self.sparse = {}
+
+        def get_slot(self, i: int):
+            """ Retorna la tupla (bucket, count, total, min, max) del punto o None si esta vacío. """
+            if not self.is_dense:
+                return self.sparse.get(i, None)
+            if self.count[i] == 0:
+                return None
+            return self.bucket[i], self.count[i], self.total[i], self.min[i], self.max[i]
+
+        def items(self):
+            """ Tuplas (slot, (bucket, count, total, min, max)) de los puntos que no están vacíos. """
+            if not self.is_dense:
+                return list(self.sparse.items())
+            return [(i, self.get_slot(i)) for i in range(self.size) if self.count[i] > 0]
+
+        def add(self, ts: float, value: float):
+            bucket = int(ts // self.step)
+            i = bucket % self.size
+            self.dirty.add(i)
+            point = self.get_slot(i)
+            if point is None or point[0] != bucket:
+                self.set_slot(i, bucket, 1, value, value, value)
+                return
+            self.set_slot(i, bucket, point[1] + 1, point[2] + value, min(point[3], value), max(point[4], value))
+
+        def set_slot(self, i: int, bucket: int, count: int, total: float, v_min: float, v_max: float):
+            if not self.is_dense:
+                if count == 0:
+                    self.sparse.pop(i, None)
+                    return
+                self.sparse[i] = (bucket, count, total, v_min, v_max)
+                if len(self.sparse) * self.__dense_ratio <= self.size:
+                    return
+                self.__to_dense()
+                return
+            self.bucket[i] = bucket
+            self.count[i] = count
+            self.total[i] = total
+            self.min[i] = v_min
+            self.max[i] = v_max
+
+        def clear_slots(self, slots):
+            for i in slots:
+                self.set_slot(i, -1, 0, 0.0, 0.0, 0.0)
+            if self.is_dense and not any(self.count):
+                self.__to_sparse()
+
+        def dirty_slots(self) -> list:
+            """ Lista de tuplas (slot, bucket, count, total, min, max) de los puntos que han cambiado. """
+            slots = []
+            for i in sorted(self.dirty):
+                point = self.get_slot(i)
+                if point is not None:
+                    slots.append((i, ) + point)
+            return slots
+
+        def points(self, start: float = None, end: float = None) -> list:
+            """ Puntos ordenados por tiempo, solo los que están dentro del rango de la resolución. """
+            now_bucket = int(time.time() // self.step)
+            first = now_bucket - self.size + 1
+            if start is not None:
+                first = max(first, int(start // self.step))
+            last = now_bucket if end is None else int(end // self.step)
+
+            data = []
+            for (_, (bucket, count, total, v_min, v_max)) in self.items():
+                if bucket < first or bucket > last:
+                    continue
+                data.append({
+                    'time': bucket * self.step,
+                    'avg': total / count,
+                    'min': v_min,
+                    'max': v_max,
+                    'count': count
+                })
+            data.sort(key=lambda p: p['time'])
+            return data
+
+    class Series(object):
+
+        __slots__ = ('name', 'rings', 'last_time', 'last_value', 'is_dirty', 'is_loaded')
+
+        def __init__(self, name: str, rollups, is_loaded: bool = True):
+            self.name = name
+            self.rings = {r_name: HistoryStore.Ring(step, size) for (r_name, step, size) in rollups}
+            self.last_time = None
+            self.last_value = None
+            self.is_dirty = False
+            # False: los puntos de la base de datos no se han leído, los rings solo tienen lo añadido después.
+            self.is_loaded = is_loaded
+
+        def add(self, ts: float, value: float):
+            for ring in self.rings.values():
+                ring.add(ts, value)
+            self.last_time = ts
+            self.last_value = value
+            self.is_dirty = True
+
+    def __init__(self, file: str = None, max_series: int = None, save_interval: float = None, exclude=None):
+        """
+        :param file: Archivo SQLite donde se guardan las series, None solo se guardan en memoria.
+        :param max_series: Nº máximo de series, las nuevas series que superen el limite se ignoran.
+        :param save_interval: Segundos mínimos entre cada escritura en la base de datos.
+        :param exclude: Lista de campos de other_data que no se guardan.
+
+        """
+        self.file = file
+        self.max_series = max_series
+        self.save_interval = save_interval
+        self.exclude = exclude
+        self.__series = {}
+        self.__lock = threading.RLock()
+        self.__conn = None
+        self.__last_save = 0
+        self.__is_full_warning = False
+        self.__load()
+
+    @property
+    def max_series(self) -> int:
+        return self.__max_series
+
+    @max_series.setter
+    def max_series(self, val: int):
+        if not isinstance(val, int) or val <= 0:
+            val = self.__default_max_series
+        self.__max_series = val
+
+    @property
+    def save_interval(self) -> float:
+        return self.__save_interval
+
+    @save_interval.setter
+    def save_interval(self, val: float):
+        if not isinstance(val, (int, float)) or val < 0:
+            val = self.__default_save_interval
+        self.__save_interval = val
+
+    @property
+    def exclude(self) -> tuple:
+        return self.__exclude
+
+    @exclude.setter
+    def exclude(self, val):
+        if not isinstance(val, (list, tuple)):
+            val = self.__default_exclude
+        self.__exclude = tuple(val)
+
+    @property
+    def names(self) -> list:
+        """ Lista de los nombres de las series ordenada. """
+        with self.__lock:
+            return sorted(self.__series.keys())
+
+    @property
+    def is_changed(self) -> bool:
+        with self.__lock:
+            return any(s.is_dirty for s in self.__series.values())
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self.__conn is None:
+            conn = sqlite3.connect(self.file, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS history_series ("
+                         "name TEXT PRIMARY KEY, "
+                         "last_time REAL, "
+                         "last_value REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS history_points ("
+                         "name TEXT, "
+                         "rollup TEXT, "
+                         "slot INTEGER, "
+                         "bucket INTEGER, "
+                         "count INTEGER, "
+                         "total REAL, "
+                         "min REAL, "
+                         "max REAL, "
+                         "PRIMARY KEY (name, rollup, slot)) WITHOUT ROWID")
+            self.__conn = conn
+        return self.__conn
+
+    @staticmethod
+    def to_number(value):
+        """ Retorna el valor como float si es un numero (o un str con un numero), si no retorna None. """
+        if isinstance(value, bool):
+            return float(value)
+        if isinstance(value, (int, float)):
+            value = float(value)
+        elif isinstance(value, str):
+            try:
+                value = float(value.strip().rstrip('%'))
+            except ValueError:
+                return None
+        else:
+            return None
+        if math.isnan(value) or math.isinf(value):
+            return None
+        return value
+
+    def __flatten(self, data: dict, prefix: str = '', depth: int = 1) -> dict:
+        values = {}
+        for (key, value) in data.items():
+            if isinstance(value, bool) or key in self.exclude:
+                # Los bool de other_data (remediation...) y los campos excluidos no son valores que medir.
+                continue
+            name = "{0}{1}".format(prefix, key)
+            if isinstance(value, dict):
+                if depth < self.__max_depth:
+                    values.update(self.__flatten(value, name + '.', depth + 1))
+                continue
+            value = self.to_number(value)
+            if value is not None:
+                values[name] = value
+        return values
+
+    def add(self, module: str, key: str, other_data: dict, status: bool = None, ts: float = None) -> int:
+        """
+        Añade los valores numéricos de other_data y el status de un check.
+
+        :param module: Nombre del modulo.
+        :param key: Key del check dentro del modulo.
+        :param other_data: Diccionario other_data del check.
+        :param status: Status del check, se guarda como 1 (True) o 0 (False).
+        :param ts: Timestamp del valor, por defecto ahora.
+        :return: Nº de valores añadidos.
+
+        """
+        values = self.__flatten(other_data) if isinstance(other_data, dict) else {}
+        if isinstance(status, bool):
+            values['status'] = float(status)
+
+        count = 0
+        for (field, value) in values.items():
+            if self.add_value("{0}/{1}/{2}".format(module, key, field), value, ts):
+                count += 1
+        return count
+
+    def add_value(self, name: str, value, ts: float = None) -> bool:
+        """
+        Añade un valor a una serie, si no existe se crea.
+
+        :return: True si se ha añadido, False si el valor no es un numero o se ha llegado a max_series.
+
+        """
+        value = self.to_number(value)
+        if value is None:
+            return False
+        if ts is None:
+            ts = time.time()
+
+        with self.__lock:
+            series = self.__series.get(name, None)
+            if series is None:
+                if len(self.__series) >= self.max_series:
+                    if not self.__is_full_warning:
+                        self.__is_full_warning = True
+                        self.debug.print(lambda: "> History >> Max series ({0}) reached, {1} is ignored!".format(
+                            self.max_series, name), DebugLevel.warning)
+                    return False
+                series = self.Series(name, self.rollups)
+                self.__series[name] = series
+            series.add(ts, value)
+        return True
+
+    def get(self, name: str, rollup: str = '1m', start: float = None, end: float = None) -> list:
+        """
+        Puntos de una serie en una resolución.
+
+        :param name: Nombre de la serie.
+        :param rollup: Resolución (1m, 1h o 1d).
+        :param start: Timestamp inicial, por defecto todos los puntos que se guardan.
+        :param end: Timestamp final, por defecto ahora.
+        :return: Lista de diccionarios {'time', 'avg', 'min', 'max', 'count'}.
+
+        """
+        with self.__lock:
+            series = self.__series.get(name, None)
+            if series is None or rollup not in series.rings:
+                return []
+            self.__load_points(series)
+            return series.rings[rollup].points(start, end)
+
+    def last(self, name: str):
+        """ Retorna (timestamp, valor) del ultimo valor de la serie o (None, None) si no existe. """
+        with self.__lock:
+            series = self.__series.get(name, None)
+            if series is None:
+                return None, None
+            return series.last_time, series.last_value
+
+    def summary(self, name: str, seconds: float = 3600, rollup: str = '1m') -> dict:
+        """
+        Resumen (avg, min, max, count) de los últimos segundos de una serie.
+
+        :return: Diccionario o None si no hay datos en ese periodo.
+
+        """
+        points = self.get(name, rollup, time.time() - seconds)
+        count = sum(p['count'] for p in points)
+        if not count:
+            return None
+        return {
+            'avg': sum(p['avg'] * p['count'] for p in points) / count,
+            'min': min(p['min'] for p in points),
+            'max': max(p['max'] for p in points),
+            'count': count
+        }
+
+    def __load(self):
+        """ Lee los nombres y el ultimo valor de las series, los puntos se leen cuando se consultan. """
+        if not self.file:
+            return
+        with self.__lock:
+            try:
+                for (name, last_time, last_value) in self.conn.execute(
+                        "SELECT name, last_time, last_value FROM history_series"):
+                    if len(self.__series) >= self.max_series:
+                        break
+                    series = self.Series(name, self.rollups, is_loaded=False)
+                    series.last_time = last_time
+                    series.last_value = last_value
+                    self.__series[name] = series
+            except sqlite3.Error as e:
+                self.debug.exception(e)
+
+    def __load_points(self, series: Series):
+        """ Lee los puntos de la serie de la base de datos, antes se guardan los valores añadidos desde el inicio. """
+        if series.is_loaded or not self.file:
+            return
+        if series.is_dirty and not self.__save_series([series]):
+            return
+        try:
+            for (rollup, slot, bucket, count, total, v_min, v_max) in self.conn.execute(
+                    "SELECT rollup, slot, bucket, count, total, min, max FROM history_points WHERE name = ?",
+                    (series.name, )):
+                ring = series.rings.get(rollup, None)
+                if ring is not None and 0 <= slot < ring.size:
+                    ring.set_slot(slot, bucket, count, total, v_min, v_max)
+            series.is_loaded = True
+        except sqlite3.Error as e:
+            self.debug.exception(e)
+
+    @staticmethod
+    def __write(conn: sqlite3.Connection, series_list: list):
+        """
+        Escribe los puntos que han cambiado. Los de las series leídas sustituyen a los de la base de datos y los de
+        las series sin leer se suman a los de la base de datos si son del mismo intervalo (bucket).
+
+        """
+        rows_series = []
+        rows_replace = []
+        rows_merge = []
+        for series in series_list:
+            rows_series.append((series.name, series.last_time, series.last_value))
+            rows = rows_replace if series.is_loaded else rows_merge
+            for (r_name, ring) in series.rings.items():
+                rows.extend([(series.name, r_name) + slot for slot in ring.dirty_slots()])
+        conn.executemany("INSERT OR REPLACE INTO history_series (name, last_time, last_value) VALUES (?, ?, ?)",
+                         rows_series)
+        conn.executemany("INSERT OR REPLACE INTO history_points (name, rollup, slot, bucket, count, total, min, max) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows_replace)
+        conn.executemany("INSERT INTO history_points (name, rollup, slot, bucket, count, total, min, max) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                         "ON CONFLICT (name, rollup, slot) DO UPDATE SET "
+                         "count = CASE WHEN bucket = excluded.bucket THEN count + excluded.count "
+                         "ELSE excluded.count END, "
+                         "total = CASE WHEN bucket = excluded.bucket THEN total + excluded.total "
+                         "ELSE excluded.total END, "
+                         "min = CASE WHEN bucket = excluded.bucket THEN min(min, excluded.min) ELSE excluded.min END, "
+                         "max = CASE WHEN bucket = excluded.bucket THEN max(max, excluded.max) ELSE excluded.max END, "
+                         "bucket = excluded.bucket", rows_merge)
+
+    def __save_series(self, series_list: list) -> bool:
+        conn = self.conn
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self.__write(conn, series_list)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self.debug.exception(e)
+            return False
+
+        for series in series_list:
+            for ring in series.rings.values():
+                if not series.is_loaded:
+                    # Ya se han sumado a la base de datos, los rings vuelven a guardar solo los valores nuevos.
+                    ring.clear_slots(ring.dirty)
+                ring.dirty.clear()
+            series.is_dirty = False
+        return True
+
+    def save(self, force: bool = False) -> bool:
+        """
+        Guarda los puntos que han cambiado.
+
+        :param force: True guarda aunque no haya pasado save_interval desde la ultima vez.
+        :return: True si se ha guardado o no había nada que guardar.
+
+        """
+        if not self.file:
+            return False
+        with self.__lock:
+            if not force and time.monotonic() - self.__last_save < self.save_interval:
+                return True
+            self.__last_save = time.monotonic()
+            dirty = [s for s in self.__series.values() if s.is_dirty]
+            if not dirty:
+                return True
+            return self.__save_series(dirty)
+
+    def close(self):
+        """ Guarda los cambios pendientes y cierra la base de datos. """
+        with self.__lock:
+            if self.file:
+                self.save(True)
+            if self.__conn is not None:
+                self.__conn.close()
+                self.__conn = None
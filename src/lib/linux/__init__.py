@@ -1,5 +1,8 @@
 from .mem import Mem
 from .thermal_info_collection import ThermalInfoCollection
 from .raid_mdstat import RaidMdstat
+from .mounts import Mounts
+from .systemd_units import SystemdUnits
+from .inotify import Inotify
 
-__all__ = ['Mem', 'ThermalInfoCollection', 'RaidMdstat']
+__all__ = ['Mem', 'ThermalInfoCollection', 'RaidMdstat', 'Mounts', 'SystemdUnits', 'Inotify']
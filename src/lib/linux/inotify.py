@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Aviso de cambios en archivos con inotify (libc mediante ctypes).
+
+El descriptor es no bloqueante, se puede registrar en un event loop (add_reader) o en select/poll y leer los eventos
+solo cuando el kernel avisa de que hay alguno, sin comprobar los archivos periódicamente.
+
+Ejemplo:
+    >>> watch = Inotify()
+    >>> watch.add_watch('/etc/watchful', Inotify.IN_CLOSE_WRITE | Inotify.IN_MOVED_TO)
+    >>> for event in watch.read():
+    ...     print(event.name)
+
+"""
+
+import os
+import errno
+import ctypes
+import ctypes.util
+import struct
+
+__all__ = ['Inotify']
+
+
+class Inotify(object):
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+
+    # struct inotify_event {int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[];}
+    __event = struct.Struct('iIII')
+    __libc = None
+
+    class Event(object):
+
+        __slots__ = ('wd', 'mask', 'cookie', 'name')
+
+        def __init__(self, wd: int, mask: int, cookie: int, name: str):
+            self.wd = wd
+            self.mask = mask
+            self.cookie = cookie
+            self.name = name
+
+        @property
+        def is_overflow(self) -> bool:
+            """ La cola del kernel se ha llenado y se han perdido eventos. """
+            if self.mask & Inotify.IN_Q_OVERFLOW:
+                return True
+            return False
+
+    @classmethod
+    def __get_libc(cls):
+        if cls.__libc is None:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            cls.__libc = libc
+        return cls.__libc
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """ Nos dice si el sistema tiene inotify (Linux). """
+        try:
+            cls.__get_libc()
+        except (OSError, AttributeError):
+            return False
+        return True
+
+    def __init__(self):
+        """ :raises OSError: Si no se puede crear la instancia de inotify. """
+        libc = self.__get_libc()
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.__fd = fd
+
+    def fileno(self) -> int:
+        return self.__fd
+
+    @property
+    def is_open(self) -> bool:
+        if self.__fd is not None:
+            return True
+        return False
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """
+        Vigila un archivo o directorio (los eventos de un directorio incluyen el nombre del archivo).
+
+        :return: Descriptor de la vigilancia (wd).
+        :raises OSError: Si no se puede vigilar la ruta.
+
+        """
+        wd = self.__get_libc().inotify_add_watch(self.__fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read(self) -> list:
+        """ Retorna los eventos pendientes (lista de Event), vacía si no hay ninguno. """
+        events = []
+        if self.__fd is None:
+            return events
+        while True:
+            try:
+                data = os.read(self.__fd, 65536)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            if not data:
+                break
+            offset = 0
+            while offset + self.__event.size <= len(data):
+                wd, mask, cookie, length = self.__event.unpack_from(data, offset)
+                offset += self.__event.size
+                name = data[offset:offset + length].split(b'\0', 1)[0]
+                offset += length
+                events.append(self.Event(wd, mask, cookie, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        if self.__fd is not None:
+            os.close(self.__fd)
+            self.__fd = None
@@ -19,11 +19,33 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+""" Memoria RAM y SWAP leyendo /proc/meminfo.
+
+El archivo se abre una sola vez para todo el proceso y se vuelve a leer con pread, cada lectura es una foto
+(Mem.Snapshot) con todos los campos de meminfo en kB. Un objeto Mem usa la misma foto para ram y swap.
+
+Ejemplo:
+    >>> mem = Mem()
+    >>> mem.ram.used_percent, mem.swap.used_percent
+    (35.2, 0.0)
+    >>> mem.snapshot['MemAvailable']
+    2716912
+
+"""
+
+import os
+import time
+import threading
+
 __all__ = ['Mem']
 
 
 class Mem(object):
 
+    __path_meminfo = '/proc/meminfo'
+    __fd = None
+    __fd_lock = threading.Lock()
+
     class MemInfo(object):
         def __init__(self, total: int = 0, free: int = 0):
             self.total = total
@@ -36,6 +58,9 @@ class Mem(object):
 
         @property
         def used_percent(self) -> float:
+            if not self.total:
+                # Sin SWAP (o sin datos) no hay nada usado.
+                return 0.0
             r_per = float(self.used) / float(self.total) * 100.0
             return r_per
 
@@ -55,53 +80,76 @@ class Mem(object):
         def free(self, val: int):
             self.__free = val
 
-    def __init__(self):
-        pass
-
-    @staticmethod
-    def __read_meminfo():
-        with open('/proc/meminfo', 'r') as mem:
-            ret = {'ram': {}, 'swap': {}}
-            for i in mem:
-                s_line = i.split()
-                if str(s_line[0]) == 'MemTotal:':
-                    ret['ram']['total'] = int(s_line[1])
-                elif str(s_line[0]) == 'MemFree:':
-                    ret['ram']['free'] = int(s_line[1])
-                elif str(s_line[0]) == 'Buffers:':
-                    ret['ram']['buffers'] = int(s_line[1])
-                elif str(s_line[0]) == 'Cached:':
-                    ret['ram']['cached'] = int(s_line[1])
-                elif str(s_line[0]) == 'SwapTotal:':
-                    ret['swap']['total'] = int(s_line[1])
-                elif str(s_line[0]) == 'SwapFree:':
-                    ret['swap']['free'] = int(s_line[1])
-        return ret
+    class Snapshot(dict):
+        """ Campos de meminfo {nombre: valor en kB} y el momento (time.monotonic) en que se leyeron. """
+
+        __slots__ = ('time', )
+
+        def __init__(self, data: bytes = b''):
+            super().__init__()
+            self.time = time.monotonic()
+            for line in data.split(b'\n'):
+                name, _, value = line.partition(b':')
+                value = value.split()
+                if value:
+                    try:
+                        self[name.decode()] = int(value[0])
+                    except ValueError:
+                        continue
+
+    def __init__(self, snapshot: Snapshot = None):
+        """
+        :param snapshot: Foto de meminfo que se usara, None se lee al usarla por primera vez.
+
+        """
+        self.__snapshot = snapshot
+
+    @classmethod
+    def read(cls) -> Snapshot:
+        """ Lee meminfo y retorna una foto nueva. """
+        with cls.__fd_lock:
+            if cls.__fd is None:
+                cls.__fd = os.open(cls.__path_meminfo, os.O_RDONLY)
+            # meminfo ocupa menos de una pagina, con un pread se lee completo.
+            data = os.pread(cls.__fd, 65536, 0)
+        return cls.Snapshot(data)
+
+    @property
+    def snapshot(self) -> Snapshot:
+        if self.__snapshot is None:
+            self.__snapshot = self.read()
+        return self.__snapshot
+
+    def refresh(self) -> Snapshot:
+        """ Vuelve a leer meminfo. """
+        self.__snapshot = self.read()
+        return self.__snapshot
 
     @property
     def ram(self) -> MemInfo:
-        mem_info = self.__read_meminfo()
+        mem_info = self.snapshot
         r_info = self.MemInfo()
-        r_info.total = int(mem_info['ram']['total'])
-        r_info.free = int(mem_info['ram']['free']) + int(mem_info['ram']['buffers']) + int(mem_info['ram']['cached'])
+        r_info.total = mem_info.get('MemTotal', 0)
+        if 'MemAvailable' in mem_info:
+            r_info.free = mem_info['MemAvailable']
+        else:
+            # Kernel < 3.14, no existe MemAvailable.
+            r_info.free = mem_info.get('MemFree', 0) + mem_info.get('Buffers', 0) + mem_info.get('Cached', 0)
         return r_info
 
     @property
     def swap(self) -> MemInfo:
-        mem_info = self.__read_meminfo()
+        mem_info = self.snapshot
         r_info = self.MemInfo()
-        r_info.total = int(mem_info['swap']['total'])
-        r_info.free = int(mem_info['swap']['free'])
+        r_info.total = mem_info.get('SwapTotal', 0)
+        r_info.free = mem_info.get('SwapFree', 0)
         return r_info
 
 
 if __name__ == "__main__":
     x = Mem()
     y = x.ram
-    print(y.total, y.free, y.used)
+    print(y.total, y.free, y.used, y.used_percent)
 
     y = x.swap
-    print(y.total, y.free, y.used)
-
-    print(Mem().ram.total, Mem().ram.free, Mem().ram.used, Mem().ram.used_percent)
-    print(Mem().swap.total, Mem().swap.free, Mem().swap.used, Mem().swap.used_percent)
+    print(y.total, y.free, y.used, y.used_percent)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tabla de puntos de montaje y uso de cada sistema de archivos sin ejecutar df.
+
+La tabla se lee de /proc/self/mountinfo y se guarda hasta que el kernel avisa (poll con POLLPRI) de que ha cambiado,
+así que en cada check solo se llama a os.statvfs de cada montaje. statvfs de un montaje de red caído (NFS, CIFS...)
+no retorna nunca, por eso se puede llamar con un timeout y los montajes de red solo se incluyen si se piden.
+
+Ejemplo:
+    >>> m = Mounts()
+    >>> for mount in m.mounts:
+    ...     print(mount.mount_point, m.usage(mount, timeout=5).used_percent)
+
+"""
+
+import os
+import re
+import select
+import threading
+import concurrent.futures
+
+__all__ = ['Mounts']
+
+
+class Mounts(object):
+
+    __path_mountinfo = '/proc/self/mountinfo'
+
+    # Sistemas de archivos que no son almacenamiento (los mismos que excluía df -x y los virtuales del kernel).
+    exclude_fstype = ('squashfs', 'tmpfs', 'devtmpfs', 'proc', 'sysfs', 'cgroup', 'cgroup2', 'devpts', 'mqueue',
+                      'debugfs', 'tracefs', 'securityfs', 'pstore', 'bpf', 'configfs', 'fusectl', 'hugetlbfs',
+                      'autofs', 'binfmt_misc', 'rpc_pipefs', 'nsfs', 'efivarfs', 'ramfs')
+
+    # Sistemas de archivos de red, si el servidor no responde statvfs se queda bloqueado.
+    network_fstype = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ncpfs', 'afs', 'ceph', 'glusterfs', '9p', 'davfs',
+                      'fuse.sshfs', 'fuse.glusterfs', 'fuse.s3fs', 'fuse.rclone', 'fuse.davfs2')
+
+    class Mount(object):
+
+        __slots__ = ('mount_id', 'dev_id', 'root', 'mount_point', 'fstype', 'source', 'options')
+
+        def __init__(self, mount_id: int, dev_id: str, root: str, mount_point: str, fstype: str, source: str,
+                     options: str):
+            self.mount_id = mount_id
+            self.dev_id = dev_id
+            self.root = root
+            self.mount_point = mount_point
+            self.fstype = fstype
+            self.source = source
+            self.options = options
+
+        @property
+        def name(self) -> str:
+            """ Nombre del dispositivo sin /dev/ (igual que df), si no es un dispositivo el punto de montaje. """
+            if self.source.startswith('/dev/'):
+                return self.source[5:]
+            return self.mount_point
+
+    class Usage(object):
+
+        __slots__ = ('size', 'used', 'avail', 'inodes', 'inodes_used', 'inodes_avail')
+
+        def __init__(self, st: os.statvfs_result):
+            self.size = st.f_blocks * st.f_frsize
+            self.used = (st.f_blocks - st.f_bfree) * st.f_frsize
+            self.avail = st.f_bavail * st.f_frsize
+            self.inodes = st.f_files
+            self.inodes_used = st.f_files - st.f_ffree
+            self.inodes_avail = st.f_favail
+
+        @property
+        def used_percent(self) -> float:
+            """ Porcentaje usado sobre el espacio que pueden usar los usuarios (igual que df). """
+            total = self.used + self.avail
+            return self.used * 100.0 / total if total else 0.0
+
+        @property
+        def inodes_used_percent(self) -> float:
+            total = self.inodes_used + self.inodes_avail
+            return self.inodes_used * 100.0 / total if total else 0.0
+
+    def __init__(self, exclude_fstype=None):
+        """
+        :param exclude_fstype: Lista de sistemas de archivos que no se incluyen, None usa la lista por defecto.
+
+        """
+        if isinstance(exclude_fstype, (list, tuple)):
+            self.exclude_fstype = tuple(exclude_fstype)
+        self.__lock = threading.Lock()
+        self.__fd = None
+        self.__poll = None
+        self.__mounts = None
+        self.__raw = None
+        # statvfs que no han terminado {punto de montaje: Future}.
+        self.__pending = {}
+
+    def close(self):
+        with self.__lock:
+            if self.__fd is not None:
+                os.close(self.__fd)
+                self.__fd = None
+                self.__poll = None
+
+    @staticmethod
+    def __unescape(val: str) -> str:
+        # mountinfo escapa espacio, tabulador, salto de linea y \ como \ooo (octal).
+        return re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), val)
+
+    @classmethod
+    def parse(cls, data: str) -> list:
+        """ Retorna la lista de Mount de un texto con el formato de mountinfo. """
+        mounts = []
+        for line in data.splitlines():
+            fields = line.split(' ')
+            try:
+                sep = fields.index('-', 6)
+                mounts.append(cls.Mount(int(fields[0]), fields[2], cls.__unescape(fields[3]),
+                                        cls.__unescape(fields[4]), fields[sep + 1], cls.__unescape(fields[sep + 2]),
+                                        fields[5]))
+            except (ValueError, IndexError):
+                continue
+        return mounts
+
+    def __read(self) -> str:
+        if self.__fd is None:
+            self.__fd = os.open(self.__path_mountinfo, os.O_RDONLY)
+            try:
+                self.__poll = select.poll()
+                self.__poll.register(self.__fd, select.POLLPRI | select.POLLERR)
+            except (AttributeError, OSError):
+                self.__poll = None
+        # Se lee con pread desde el inicio, un archivo con buffer no volvería a leer del kernel.
+        chunks = []
+        offset = 0
+        while True:
+            chunk = os.pread(self.__fd, 65536, offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            offset += len(chunk)
+        return b''.join(chunks).decode('utf-8', 'replace')
+
+    def __is_changed(self) -> bool:
+        if self.__mounts is None or self.__poll is None:
+            return True
+        # El aviso del kernel solo se recibe una vez por cada cambio, quien llama tiene que volver a leer la tabla.
+        return bool(self.__poll.poll(0))
+
+    @property
+    def mounts(self) -> list:
+        """ Lista de Mount, solo vuelve a leer mountinfo si ha cambiado. """
+        with self.__lock:
+            if self.__is_changed():
+                data = self.__read()
+                if data != self.__raw:
+                    self.__raw = data
+                    self.__mounts = self.parse(data)
+            return self.__mounts
+
+    def filesystems(self, include_network=()) -> list:
+        """
+        Montajes que son almacenamiento, uno por dispositivo (los bind mount del mismo dispositivo se omiten y se
+        queda el primero que se monto).
+
+        :param include_network: Puntos de montaje de red (network_fstype) que se incluyen, el resto se omiten.
+
+        """
+        list_return = []
+        devs = set()
+        for mount in self.mounts:
+            if mount.fstype in self.exclude_fstype or mount.dev_id in devs:
+                continue
+            if mount.fstype in self.network_fstype and mount.mount_point not in include_network:
+                continue
+            devs.add(mount.dev_id)
+            list_return.append(mount)
+        return list_return
+
+    def usage(self, mount, timeout: float = None) -> Usage:
+        """
+        Uso del sistema de archivos de un montaje (Mount o ruta).
+
+        Con timeout statvfs se llama en un hilo propio, un hilo bloqueado no se puede matar así que mientras no
+        termina los siguientes checks de ese montaje esperan al mismo hilo en vez de crear otro.
+
+        :param timeout: Segundos que se espera a statvfs, None espera sin limite.
+        :raises TimeoutError: Si statvfs no termina en timeout segundos.
+        :raises OSError: Si statvfs falla.
+
+        """
+        if isinstance(mount, self.Mount):
+            mount = mount.mount_point
+        if timeout is None:
+            return self.Usage(os.statvfs(mount))
+
+        with self.__lock:
+            future = self.__pending.get(mount, None)
+            if future is None:
+                future = concurrent.futures.Future()
+                self.__pending[mount] = future
+                threading.Thread(target=self.__statvfs, args=(mount, future), name='watchful-statvfs',
+                                 daemon=True).start()
+        try:
+            return self.Usage(future.result(timeout))
+        except concurrent.futures.TimeoutError:
+            raise TimeoutError("statvfs {0} did not finish in {1} s".format(mount, timeout)) from None
+
+    def __statvfs(self, mount_point: str, future: concurrent.futures.Future):
+        try:
+            future.set_result(os.statvfs(mount_point))
+        except OSError as e:
+            future.set_exception(e)
+        finally:
+            with self.__lock:
+                if self.__pending.get(mount_point, None) is future:
+                    del self.__pending[mount_point]
@@ -22,12 +22,14 @@
 import os.path
 from enum import Enum
 from lib.exe import Exec
+from lib import ObjectBase
 from lib import DictFilesPath
+from lib.debug import DebugLevel
 
 __all__ = ['RaidMdstat']
 
 
-class RaidMdstat(object):
+class RaidMdstat(ObjectBase):
 
     class UpdateStatus(Enum):
         unknown = 0
@@ -59,6 +61,11 @@ class RaidMdstat(object):
                 return True
         return False
 
+    def __warning_config(self):
+        """ Avisa de que la configuración remota no es valida, nunca se muestra la contraseña. """
+        self.debug.print(lambda: "** RAID_Mdstat ** >> REMOTE >> Config not valid ({0}@{1}:{2})!".format(
+            self.__user, self.__host, self.__port), DebugLevel.warning)
+
     @property
     def is_exist(self) -> bool:
         path_md_stat = self.paths.find('mdstat')
@@ -85,9 +92,7 @@ class RaidMdstat(object):
                 return True if stdout.strip() == str_check else False
 
             else:
-                print(
-                    "** RAID_Mdstat ** >> WARNING!! >> REMOTE >> CONFIG NOT VALID ({0}:{1}@{1}) NOT VALID!".format(
-                        self.__host, self.__pass, self.__user))
+                self.__warning_config()
                 return False
 
         else:
@@ -96,93 +101,109 @@ class RaidMdstat(object):
             else:
                 return os.path.exists(path_md_stat)
 
-    def read_status(self):
-        md_list = {}
-        md_actual = None
-
-        try:
-            is_exist = self.is_exist
-        except Exception as ex:
-            raise Exception(ex)
+    def __read_remote(self):
+        """
+        Comprueba si existe mdstat en el host remoto y lo lee en un solo round trip.
 
-        if is_exist:
-            f_buffer = None
-            if self.is_remote:
-                remote_cmd = "cat {0}".format(self.paths.find('mdstat'))
-                stdout, stderr, _, stdexcept = Exec.execute(remote_cmd,
-                                                            self.__host,
-                                                            self.__port,
-                                                            self.__user,
-                                                            self.__pass,
-                                                            self.__timeout)
+        :return: Lista de lineas de mdstat o None si no existe.
 
-                str_err = "** RAID_Mdstat ** >> {0}!! >> REMOTE >> ({1}): {2}!"
-                if stderr:
-                    raise Exception(str_err.format("ERROR", remote_cmd, stderr))
+        """
+        path_md_stat = self.paths.find('mdstat')
+        if not self.validate_remote:
+            self.__warning_config()
+            return None
+
+        str_check = "exists"
+        remote_cmds = ["test -e {0} && echo {1}".format(path_md_stat, str_check),
+                       "cat {0}".format(path_md_stat)]
+        results, stdexcept = Exec.execute_multi(remote_cmds,
+                                                self.__host,
+                                                self.__port,
+                                                self.__user,
+                                                self.__pass,
+                                                self.__timeout)
+
+        str_err = "** RAID_Mdstat ** >> {0}!! >> REMOTE >> ({1}): {2}!"
+        if stdexcept:
+            raise Exception(str_err.format("EXCEPTION", remote_cmds, stdexcept))
+
+        r_check, r_cat = results
+        if r_check['err']:
+            print(str_err.format("ERROR", remote_cmds[0], r_check['err']))
+            return None
+        if str(r_check['out']).strip() != str_check:
+            return None
+
+        if r_cat['err']:
+            raise Exception(str_err.format("ERROR", remote_cmds[1], r_cat['err']))
+        return str(r_cat['out']).splitlines()
 
-                if stdexcept:
-                    raise Exception(str_err.format("EXCEPTION", remote_cmd, stdexcept))
+    def read_status(self):
+        md_list = {}
+        md_actual = None
 
-                f_buffer = stdout.splitlines()
-            else:
-                f_buffer = open(self.paths.find('mdstat'), 'r')
+        f_buffer = None
+        if self.is_remote:
+            f_buffer = self.__read_remote()
+        elif self.is_exist:
+            f_buffer = open(self.paths.find('mdstat'), 'r')
+
+        if f_buffer:
+            for l_buffer in f_buffer:
+                l_buffer = str(l_buffer).strip()
+
+                if "Personalities :" in l_buffer:
+                    # Personalities : [linear] [raid0] [raid1] [raid10] [raid6] [raid5] [raid4] [multipath] [faulty]
+                    md_actual = None
+                    continue
+
+                elif "unused devices:" in l_buffer:
+                    # unused devices: <none>
+                    md_actual = None
+                    continue
+
+                elif l_buffer:
+                    if md_actual is None and len(l_buffer) > 2 and l_buffer[:2] == "md":
+                        #  md126 : active raid1 sdc1[2] sdb1[1]
+
+                        md_actual = l_buffer.split(":")[0].strip()
+                        tmp_split = l_buffer.split(":")[1].strip().split(" ")
+
+                        md_list[md_actual] = {}
+                        md_list[md_actual]['status'] = tmp_split.pop(0)
+                        md_list[md_actual]['type'] = tmp_split.pop(0)
+                        md_list[md_actual]['disk'] = tmp_split
+                        continue
 
-            if f_buffer:
-                for l_buffer in f_buffer:
-                    l_buffer = str(l_buffer).strip()
+                    elif "recovery" in l_buffer:
+                        # [===>.........]  recovery = 16.3% (39978944/244139648) finish=22.6min speed=149952K/sec
 
-                    if "Personalities :" in l_buffer:
-                        # Personalities : [linear] [raid0] [raid1] [raid10] [raid6] [raid5] [raid4] [multipath] [faulty]
-                        md_actual = None
+                        md_list[md_actual]['update'] = self.UpdateStatus.recovery
+                        tmp_split = l_buffer.split("]")[1].strip().split(" ")
+                        md_list[md_actual]['recovery'] = {}
+                        md_list[md_actual]['recovery']['percent'] = float(tmp_split[2][:-1])
+                        md_list[md_actual]['recovery']['blocks'] = tmp_split[3][1:-1].split("/")
+                        md_list[md_actual]['recovery']['finish'] = tmp_split[4].split("=")[1].strip()
+                        md_list[md_actual]['recovery']['speed'] = tmp_split[5].split("=")[1].strip()
                         continue
 
-                    elif "unused devices:" in l_buffer:
-                        # unused devices: <none>
-                        md_actual = None
-                        continue
+                    elif "blocks" in l_buffer:
+                        # 244139648 blocks [2/1] [_U]
 
-                    elif l_buffer:
-                        if md_actual is None and len(l_buffer) > 2 and l_buffer[:2] == "md":
-                            #  md126 : active raid1 sdc1[2] sdb1[1]
-
-                            md_actual = l_buffer.split(":")[0].strip()
-                            tmp_split = l_buffer.split(":")[1].strip().split(" ")
-
-                            md_list[md_actual] = {}
-                            md_list[md_actual]['status'] = tmp_split.pop(0)
-                            md_list[md_actual]['type'] = tmp_split.pop(0)
-                            md_list[md_actual]['disk'] = tmp_split
-                            continue
-
-                        elif "recovery" in l_buffer:
-                            # [===>.........]  recovery = 16.3% (39978944/244139648) finish=22.6min speed=149952K/sec
-
-                            md_list[md_actual]['update'] = self.UpdateStatus.recovery
-                            tmp_split = l_buffer.split("]")[1].strip().split(" ")
-                            md_list[md_actual]['recovery'] = {}
-                            md_list[md_actual]['recovery']['percent'] = float(tmp_split[2][:-1])
-                            md_list[md_actual]['recovery']['blocks'] = tmp_split[3][1:-1].split("/")
-                            md_list[md_actual]['recovery']['finish'] = tmp_split[4].split("=")[1].strip()
-                            md_list[md_actual]['recovery']['speed'] = tmp_split[5].split("=")[1].strip()
-                            continue
-
-                        elif "blocks" in l_buffer:
-                            # 244139648 blocks [2/1] [_U]
-
-                            tmp_split = l_buffer.split(" ")
-                            md_list[md_actual]['blocks'] = tmp_split[0]
-                            tmp_disks = tmp_split[2][1:-1].split("/")
-                            md_list[md_actual]['update'] = self.UpdateStatus.ok if tmp_disks[0] == tmp_disks[1] \
-                                else self.UpdateStatus.error
-                            continue
-
-                        else:
-                            print("** RAID_Mdstat ** >> WARNING!! >> {0} >> NOT CONTROL TEXT: {1}".format(md_actual,
-                                                                                                          l_buffer))
-                            continue
+                        tmp_split = l_buffer.split(" ")
+                        md_list[md_actual]['blocks'] = tmp_split[0]
+                        tmp_disks = tmp_split[2][1:-1].split("/")
+                        md_list[md_actual]['update'] = self.UpdateStatus.ok if tmp_disks[0] == tmp_disks[1] \
+                            else self.UpdateStatus.error
+                        continue
 
                     else:
-                        md_actual = None
+                        print("** RAID_Mdstat ** >> WARNING!! >> {0} >> NOT CONTROL TEXT: {1}".format(md_actual,
+                                                                                                      l_buffer))
                         continue
 
+                else:
+                    md_actual = None
+                    continue
+
         return md_list
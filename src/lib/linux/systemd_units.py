@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Estado de las unidades de systemd.
+
+Consulta el estado de todas las unidades con un solo "systemctl show -p ...", que retorna las propiedades en formato
+clave=valor (estable entre versiones de systemd) y no lee el journal como "systemctl status".
+
+Ejemplo:
+    >>> units = SystemdUnits()
+    >>> units.show(['nginx', 'ssh'])['nginx'].is_running
+    True
+
+"""
+
+import shlex
+from lib.exe import Exec
+
+__all__ = ['SystemdUnits']
+
+
+class SystemdUnits(object):
+
+    properties = ('Id', 'Names', 'LoadState', 'ActiveState', 'SubState', 'Result')
+
+    # Tipos de unidad, a un nombre sin tipo systemctl le añade .service.
+    unit_types = ('service', 'socket', 'target', 'device', 'mount', 'automount', 'swap', 'timer', 'path', 'slice',
+                  'scope')
+
+    class UnitState(object):
+
+        def __init__(self, name: str, props: dict):
+            self.name = name
+            self.props = props
+
+        @property
+        def load_state(self) -> str:
+            return self.props.get('LoadState', '')
+
+        @property
+        def active_state(self) -> str:
+            return self.props.get('ActiveState', '')
+
+        @property
+        def sub_state(self) -> str:
+            return self.props.get('SubState', '')
+
+        @property
+        def result(self) -> str:
+            return self.props.get('Result', '')
+
+        @property
+        def is_found(self) -> bool:
+            if self.load_state and self.load_state != 'not-found':
+                return True
+            return False
+
+        @property
+        def is_running(self) -> bool:
+            if self.active_state == 'active' and self.sub_state == 'running':
+                return True
+            return False
+
+    def __init__(self, systemctl: str = '/bin/systemctl', timeout: float = 30):
+        """
+        :param systemctl: Ruta de systemctl.
+        :param timeout: Segundos que tiene systemctl para responder, si no responde se mata.
+
+        """
+        self.systemctl = systemctl
+        self.timeout = timeout
+
+    class ShowParser(object):
+
+        """ Procesa la salida de systemctl show linea a linea (Exec on_line), sin guardar la salida entera. """
+
+        def __init__(self):
+            self.blocks = []
+            self.__props = {}
+
+        def feed(self, line: str):
+            if not line.strip():
+                if self.__props:
+                    self.blocks.append(self.__props)
+                    self.__props = {}
+                return
+            key, _, value = line.partition('=')
+            self.__props[key.strip()] = value.strip()
+
+        def close(self) -> list:
+            """ :return: Lista de bloques {propiedad: valor}. """
+            if self.__props:
+                self.blocks.append(self.__props)
+                self.__props = {}
+            return self.blocks
+
+    @classmethod
+    def unit_name(cls, unit: str) -> str:
+        """ Nombre completo de la unidad, el mismo que usa systemctl (nginx -> nginx.service). """
+        if unit.rpartition('.')[2] in cls.unit_types:
+            return unit
+        return "{0}.service".format(unit)
+
+    @classmethod
+    def units_from_blocks(cls, units: list, blocks: list) -> dict:
+        """
+        Asigna a cada unidad su bloque por Id y Names (alias), no por la posición: systemctl omite las unidades que
+        no puede cargar y un alias retorna el Id de la unidad a la que apunta. Las unidades que no tienen bloque se
+        marcan como not-found.
+
+        """
+        names = {}
+        for props in blocks:
+            for name in [props.get('Id', '')] + props.get('Names', '').split():
+                if name:
+                    names.setdefault(name, props)
+        not_found = {'LoadState': 'not-found'}
+        return {unit: cls.UnitState(unit, names.get(cls.unit_name(unit), not_found)) for unit in units}
+
+    @classmethod
+    def parse(cls, units: list, stdout: str) -> dict:
+        """ Procesa la salida de systemctl show, un bloque por unidad separados por una linea en blanco. """
+        parser = cls.ShowParser()
+        for line in stdout.split('\n'):
+            parser.feed(line)
+        return cls.units_from_blocks(units, parser.close())
+
+    def show(self, units: list) -> dict:
+        """
+        Consulta el estado de las unidades.
+
+        :param units: Lista de nombres de unidades (con o sin .service).
+        :return: Diccionario {unidad: UnitState}, las unidades que systemctl no retorna están como not-found.
+        :raises Exception: Si systemctl falla o no retorna ninguna unidad.
+
+        """
+        units = list(units)
+        if not units:
+            return {}
+
+        cmd = '{0} show --no-pager -p {1} {2}'.format(self.systemctl, ','.join(self.properties),
+                                                      ' '.join([shlex.quote(u) for u in units]))
+        parser = self.ShowParser()
+        _, stderr, _, stdexcept = Exec.execute(command=cmd, timeout=self.timeout, on_line=parser.feed)
+        if stdexcept:
+            raise Exception(stdexcept)
+
+        blocks = parser.close()
+        if not blocks:
+            raise Exception(str(stderr).strip() or "systemctl show returned no units")
+        return self.units_from_blocks(units, blocks)
@@ -19,22 +19,46 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-__all__ = ['ThermalInfoCollection']
+""" Sensores de temperatura (thermal zones y hwmon).
+
+Los sensores se buscan una sola vez (detect) y el archivo de cada sensor se mantiene abierto, cada lectura es un
+pread. Con start() un hilo toma muestras cada X segundos y stats() retorna min, max y media de las muestras desde la
+ultima vez, así se ven los picos de temperatura que hay entre dos checks.
+
+Ejemplo:
+    >>> x = ThermalInfoCollection(True)
+    >>> x.start(10)
+    >>> for node in x.nodes:
+    ...     print(node.dev, node.type, node.temp, node.stats())
+    >>> x.close()
+
+"""
 
 import os
 import glob
+import threading
+import collections
+
+__all__ = ['ThermalInfoCollection']
 
 
 class ThermalInfoCollection(object):
 
     __path_thermal = '/sys/class/thermal'
+    __path_hwmon = '/sys/class/hwmon'
 
-    class ThermalNode(object):
+    # Nº máximo de muestras que se guardan por sensor entre dos llamadas a stats().
+    __default_max_samples = 360
 
-        __path_thermal = '/sys/class/thermal'
+    class ThermalNode(object):
 
-        def __init__(self, dev):
+        def __init__(self, dev: str, path_temp: str, type_name: str = None, max_samples: int = 360):
             self.dev = dev
+            self.path_temp = path_temp
+            self.__type = type_name
+            self.__fd = None
+            self.__lock = threading.Lock()
+            self.__samples = collections.deque(maxlen=max_samples)
 
         @property
         def dev(self) -> str:
@@ -42,63 +66,92 @@ class ThermalInfoCollection(object):
 
         @dev.setter
         def dev(self, val: str):
-            if val.strip():
-                self.__dev = val
-            else:
-                pass
-                # TODO: Pendiente Controlar si no se define dev.
+            if not val or not val.strip():
+                raise ValueError("dev it can not be empty!")
+            self.__dev = val
 
         @property
         def type(self) -> str:
-            type_return = self.__read_file(self.__path_type)
-            if type_return is not None:
-                type_return = str(type_return).strip()
-            else:
-                type_return = "Unknown"
-            return type_return
+            if self.__type:
+                return self.__type
+            return "Unknown"
 
         @property
         def temp(self) -> float:
-            temp_return = self.__read_file(self.__path_temp)
-            if temp_return is not None:
-                temp_return = float(temp_return.split('\n')[0]) / 1000.0
-            else:
-                temp_return = float(0)
-            return temp_return
-
-        def __read_file(self, path_file, default_none=None):
-            if self.__is_exist_file(path_file):
-                output = default_none
-                with open(path_file, 'r') as f_buffer:
-                    output = f_buffer.read()
-                return output
-            else:
-                return default_none
-
-        def __is_exist_file(self, path_check):
-            if str(path_check).strip():
-                if os.path.isfile(self.__path_temp):
-                    return True
-            return False
+            """ Temperatura actual en ºC o None si no se puede leer el sensor. """
+            with self.__lock:
+                try:
+                    if self.__fd is None:
+                        self.__fd = os.open(self.path_temp, os.O_RDONLY)
+                    data = os.pread(self.__fd, 32, 0)
+                    return float(data.split(b'\n')[0]) / 1000.0
+                except (OSError, ValueError):
+                    # El sensor ha desaparecido o no responde, se vuelve a abrir en la siguiente lectura.
+                    self.__close_fd()
+                    return None
 
-        @property
-        def __path_dev(self):
-            return os.path.join(self.__path_thermal, self.dev)
+        def sample(self) -> float:
+            """ Lee la temperatura y la guarda como muestra. """
+            temp = self.temp
+            if temp is not None:
+                with self.__lock:
+                    self.__samples.append(temp)
+            return temp
 
-        @property
-        def __path_temp(self):
-            return os.path.join(self.__path_dev, 'temp')
+        def stats(self, clear: bool = True) -> dict:
+            """
+            Resumen de las muestras guardadas.
 
-        @property
-        def __path_type(self):
-            return os.path.join(self.__path_dev, 'type')
+            :param clear: True borra las muestras después de calcular el resumen.
+            :return: Diccionario {'min', 'max', 'mean', 'count'} o None si no hay muestras.
+
+            """
+            with self.__lock:
+                samples = list(self.__samples)
+                if clear:
+                    self.__samples.clear()
+            if not samples:
+                return None
+            return {
+                'min': min(samples),
+                'max': max(samples),
+                'mean': sum(samples) / len(samples),
+                'count': len(samples)
+            }
+
+        def __close_fd(self):
+            if self.__fd is not None:
+                try:
+                    os.close(self.__fd)
+                except OSError:
+                    pass
+                self.__fd = None
+
+        def close(self):
+            with self.__lock:
+                self.__close_fd()
+
+    def __init__(self, autodetect=False, path_thermal: str = None, path_hwmon: str = None, max_samples: int = None):
+        """
+        :param autodetect: True busca los sensores al crear el objeto.
+        :param path_thermal: Ruta de las thermal zones, por defecto /sys/class/thermal.
+        :param path_hwmon: Ruta de hwmon, por defecto /sys/class/hwmon.
+        :param max_samples: Nº máximo de muestras que se guardan por sensor.
 
-    def __init__(self, autodetect=False):
+        """
         self.nodes = []
+        self.path_thermal = path_thermal or self.__path_thermal
+        self.path_hwmon = path_hwmon or self.__path_hwmon
+        self.max_samples = max_samples or self.__default_max_samples
+        self.__thread = None
+        self.__thread_stop = threading.Event()
+        self.__interval = 0
         if autodetect:
             self.detect()
 
     def clear(self):
+        for node in self.nodes:
+            node.close()
         self.nodes.clear()
 
     @property
@@ -107,20 +160,92 @@ class ThermalInfoCollection(object):
             return 0
         return len(self.nodes)
 
+    @staticmethod
+    def __read_text(path_file: str) -> str:
+        try:
+            with open(path_file, 'r') as f_buffer:
+                return f_buffer.read().strip()
+        except OSError:
+            return None
+
     def detect(self):
+        """
+        Busca los sensores, las thermal zones (no los cooling_device) y las entradas temp*_input de hwmon.
+
+        Cada thermal zone registra también un hwmon (en la Raspberry Pi hwmon0 "cpu_thermal" es thermal_zone0), así
+        que se omiten los hwmon cuyo device es una thermal zone que ya se ha añadido y los que no tienen un device
+        detrás (los de las thermal zones en kernels antiguos).
+
+        """
         self.clear()
-        for dev_lnk in glob.glob(os.path.join(self.__path_thermal, '*')):
-            dev_name = os.path.splitext(os.path.basename(dev_lnk))[0]
-            self.__add_sensor(dev_name)
+        zones = set()
+        for path_dev in sorted(glob.glob(os.path.join(self.path_thermal, 'thermal_zone*'))):
+            path_temp = os.path.join(path_dev, 'temp')
+            if os.path.isfile(path_temp):
+                dev_name = os.path.basename(path_dev)
+                if self.__add_sensor(dev_name, path_temp, self.__read_text(os.path.join(path_dev, 'type'))):
+                    zones.add(os.path.realpath(path_dev))
+
+        for path_dev in sorted(glob.glob(os.path.join(self.path_hwmon, 'hwmon*'))):
+            path_device = os.path.join(path_dev, 'device')
+            if not os.path.exists(path_device) or os.path.realpath(path_device) in zones:
+                continue
+            hwmon_dev = os.path.basename(path_dev)
+            hwmon_name = self.__read_text(os.path.join(path_dev, 'name'))
+            for path_temp in sorted(glob.glob(os.path.join(path_dev, 'temp*_input'))):
+                sensor = os.path.basename(path_temp)[:-len('_input')]
+                label = self.__read_text(os.path.join(path_dev, '{0}_label'.format(sensor)))
+                type_name = ' '.join([x for x in (hwmon_name, label) if x]) or None
+                self.__add_sensor("{0}_{1}".format(hwmon_dev, sensor), path_temp, type_name)
 
-    def __add_sensor(self, dev: str):
+    def __add_sensor(self, dev: str, path_temp: str, type_name: str = None) -> bool:
         if dev.strip():
-            node = self.ThermalNode(dev)
+            node = self.ThermalNode(dev, path_temp, type_name, self.max_samples)
             self.nodes.append(node)
             return True
         else:
             return False
 
+    def sample(self):
+        """ Toma una muestra de todos los sensores. """
+        for node in list(self.nodes):
+            node.sample()
+
+    @property
+    def is_sampling(self) -> bool:
+        if self.__thread is not None and self.__thread.is_alive():
+            return True
+        return False
+
+    def start(self, interval: float):
+        """
+        Inicia el hilo que toma una muestra de todos los sensores cada interval segundos.
+
+        :param interval: Segundos entre muestras, si es 0 o menor no se inicia.
+
+        """
+        self.__interval = interval
+        if interval <= 0 or self.is_sampling:
+            return
+        self.__thread_stop.clear()
+        self.__thread = threading.Thread(target=self.__run, name='watchful-thermal', daemon=True)
+        self.__thread.start()
+
+    def __run(self):
+        while not self.__thread_stop.wait(self.__interval):
+            self.sample()
+
+    def stop(self):
+        if self.__thread is not None:
+            self.__thread_stop.set()
+            self.__thread.join()
+            self.__thread = None
+
+    def close(self):
+        """ Para el hilo de muestras y cierra los archivos de los sensores. """
+        self.stop()
+        self.clear()
+
 
 if __name__ == "__main__":
 
@@ -1,5 +1,7 @@
 from .dict_return_check import ReturnModuleCheck
 from .enum_config_options import EnumConfigOptions
 from .module_base import ModuleBase
+from .module_registry import ModuleRegistry
+from .module_pool import ModulePool
 
-__all__ = ['ReturnModuleCheck', 'EnumConfigOptions', 'ModuleBase']
+__all__ = ['ReturnModuleCheck', 'EnumConfigOptions', 'ModuleBase', 'ModuleRegistry', 'ModulePool']
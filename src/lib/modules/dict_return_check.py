@@ -123,6 +123,10 @@ class ReturnModuleCheck(object):
                     pass
         return False
 
+    def clear(self):
+        """ Elimina todos los returns. """
+        self.__dict_return.clear()
+
     def remove(self, key: str) -> bool:
         """
         Eliminamos el key que le especificamos de la lista de returns.
@@ -163,3 +167,24 @@ class ReturnModuleCheck(object):
     def get_other_data(self, key: str) -> dict:
         """ Obtenemos other_data del key que especificamos. """
         return self.get(key).get('other_data', {})
+
+    def pack(self) -> tuple:
+        """
+        Datos de los returns en tuplas (key, status, message, send, other_data), ocupan menos que los diccionarios al
+        enviarlos a otro proceso.
+
+        :return: Tupla con una tupla por cada return.
+
+        """
+        return tuple((key, value['status'], value['message'], value['send'], value['other_data'])
+                     for (key, value) in self.list.items())
+
+    def unpack(self, data: tuple):
+        """
+        Añade los returns creados con pack().
+
+        :param data: Tupla retornada por pack().
+
+        """
+        for (key, status, message, send_msg, other_data) in data:
+            self.set(key, status, message, send_msg, other_data)
@@ -19,13 +19,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import time
+import random
+import threading
 import lib.tools
 from lib import Switch
 from lib import ObjectBase
 from lib import DictFilesPath
 from lib.debug import DebugLevel
 from lib.config import ConfigTypeReturn
+from lib.config import ConfigSchema, ConfigList, ConfigOption
 from lib.modules import ReturnModuleCheck
+from lib.profiler import Profiler
 from enum import Enum
 
 __all__ = ['ModuleBase']
@@ -36,16 +41,27 @@ class ModuleBase(ObjectBase):
     # Nº de hilos que se usaran en los módulos para procesamiento en paralelo como valor por defecto.
     _default_threads = 5
 
+    # Margen en segundos con el que se considera que un target ya toca comprobarlo.
+    _interval_tolerance = 0.5
+
+    # Esquema de la configuración del modulo, cada modulo define el suyo con sus opciones y listas de targets. Los
+    # targets de las listas pueden definir su propio interval.
+    _config_schema = ConfigSchema(lists=(ConfigList('list', ConfigOption('enabled', bool, True)), ), strict=False)
+
     def __init__(self, obj_monitor, name=None):
         self._monitor = obj_monitor
         if name:
             self.__name_module = name
         else:
             self.__name_module = __name__
+        self.__debug = ObjectBase.debug.bind(self.__name_module)
 
         # Set var's
         self.paths = None
         self.dict_return = None
+        self.conf = None
+        self.__target_deadline = {}
+        self.__target_lock = threading.Lock()
 
         # Init Var's
         self.__init_var()
@@ -53,10 +69,36 @@ class ModuleBase(ObjectBase):
     def __init_var(self):
         self.paths = DictFilesPath()
         self.dict_return = ReturnModuleCheck()
+        self.__init_conf()
+
+    def __init_conf(self):
+        """
+        Compila la configuración del modulo una sola vez, al crear la instancia. El registro de módulos crea una
+        instancia nueva cuando cambia la configuración.
+
+        """
+        self.conf = self._config_schema.compile(self.get_conf(None, {}), {'interval': self.interval_default,
+                                                                          'threads': self._default_threads})
+        for error in self.conf.errors:
+            self.debug.print(lambda: ">> PlugIn >> {0} >> Config: {1}".format(self.name_module, error),
+                             DebugLevel.warning)
+
+    def clear_return(self):
+        """ Limpia los datos retornados en el check anterior, la instancia se reutiliza entre ciclos. """
+        self.dict_return.clear()
+
+    def close(self):
+        """ Libera los recursos del módulo (hilos, conexiones...), se llama cuando se descarta la instancia. """
+        pass
 
     def check(self):
         self.debug.debug_obj(self.name_module, self.dict_return.list, "Data Return")
 
+    @property
+    def debug(self):
+        """ Debug con el nombre del modulo, los mensajes usan el nivel del modulo si se ha definido en log.levels. """
+        return self.__debug
+
     @property
     def name_module(self) -> str:
         """ Nombre del modulo. """
@@ -95,7 +137,7 @@ class ModuleBase(ObjectBase):
         if self.is_monitor_exist:
             self._monitor.send_message(message, status)
         else:
-            self.debug.print(">> {0} > send_message: Error, Monitor is not defined!!".format(self.name_module),
+            self.debug.print(lambda: ">> {0} > send_message: Error, Monitor is not defined!!".format(self.name_module),
                              DebugLevel.error)
 
     def get_conf(self, find_key=None, default_val=None, select_module: str = None, str_split: str = None,
@@ -163,6 +205,86 @@ class ModuleBase(ObjectBase):
         value = self.get_conf(find_key, def_val)
         return value
 
+    @property
+    def interval_default(self) -> float:
+        """ Intervalo en segundos que se usara si el modulo no tiene definido ninguno. """
+        if self.is_monitor_exist:
+            return self._monitor.interval_default
+        return 0
+
+    def get_interval(self, key: str = None, key_name_list: str = "list"):
+        """
+        Obtenemos el intervalo y el jitter (en segundos) del modulo o de uno de los targets de su lista.
+
+        :param key: Key del target, si es None se retorna el intervalo del modulo.
+        :param key_name_list: Key de la configuración donde se almacena el listado de targets.
+        :return: Tupla (interval, jitter).
+
+        """
+        target = self.conf.target(key, key_name_list) if key is not None else None
+        if target is None:
+            return self.conf.interval, self.conf.jitter
+        return target.interval, target.jitter
+
+    def get_interval_min(self) -> float:
+        """ Intervalo mas pequeño entre el del modulo y los de todos los targets de sus listas. """
+        interval_min = self.conf.interval
+        for key_name_list in self._config_schema.lists.keys():
+            for target in getattr(self.conf, key_name_list).values():
+                interval_min = min(interval_min, target.interval)
+        return interval_min
+
+    def _is_target_due(self, key: str, key_name_list: str = "list") -> bool:
+        """
+        Nos dice si le toca comprobar el target y si es así calcula su siguiente deadline. Si nunca se ha comprobado
+        el target siempre retorna True, por lo que en modo single process se comprueban todos.
+
+        :param key: Key del target.
+        :param key_name_list: Key de la configuración donde se almacena el listado de targets.
+        :return: True hay que comprobarlo, False todavía no toca.
+
+        """
+        now = time.monotonic()
+        with self.__target_lock:
+            deadline = self.__target_deadline.get((key_name_list, key), None)
+            if deadline is not None and now < deadline - self._interval_tolerance:
+                return False
+            interval, jitter = self.get_interval(key, key_name_list)
+            if jitter > 0:
+                interval += random.uniform(0, jitter)
+            self.__target_deadline[(key_name_list, key)] = now + interval
+        return True
+
+    def clear_target_deadlines(self):
+        """ Olvida cuando se comprobó cada target, en el siguiente check se comprueban todos. """
+        with self.__target_lock:
+            self.__target_deadline.clear()
+
+    def get_target_deadlines(self) -> dict:
+        """ Copia de los deadlines de los targets {(key_name_list, key): time.monotonic()}. """
+        with self.__target_lock:
+            return dict(self.__target_deadline)
+
+    def set_target_deadlines(self, deadlines: dict):
+        """
+        Sustituye los deadlines de los targets. Se usa en el modo isolate para pasarlos entre el daemon y el proceso
+        que ejecuta el check, time.monotonic() es el mismo reloj en todos los procesos.
+
+        """
+        with self.__target_lock:
+            self.__target_deadline = dict(deadlines or {})
+
+    def _span(self, key: str) -> Profiler.Span:
+        """
+        Mide el tiempo de la comprobación de un target (span 'target' con nombre modulo/key).
+
+        Ejemplo:
+            >>> with self._span(host):
+            ...     status = self.__ping_return(host)
+
+        """
+        return Profiler.default().span('target', "{0}/{1}".format(self.name_module, key))
+
     def get_status(self, key_name_module: str, def_val=None):
         if def_val is None:
             def_val = {}
@@ -183,17 +305,18 @@ class ModuleBase(ObjectBase):
             return self._monitor.check_status(status, module, module_sub_key)
 
     @staticmethod
-    def _run_cmd(cmd, return_str_err: bool = False, return_exit_code: bool = False):
+    def _run_cmd(cmd, return_str_err: bool = False, return_exit_code: bool = False, timeout: float = None):
         """
         Ejecutamos el programa que le pasamos y leemos lo que retorna.
 
         :param cmd: Comando a ejecutar.
         :param return_str_err: True retornamos stdout y stderr, False retornamos solo stdout.
+        :param timeout: Segundos que tiene el comando para terminar, si no termina se mata y el exit code es None.
         :return: Retornamos el resultado de la ejecución del comando que hemos pasado.
 
         """
 
-        stdout, stderr, exit_code, _ = lib.Exec.execute(command=cmd)
+        stdout, stderr, exit_code, _ = lib.Exec.execute(command=cmd, timeout=timeout)
         if return_str_err and return_exit_code:
             return stdout, stderr, exit_code
         elif return_str_err and not return_exit_code:
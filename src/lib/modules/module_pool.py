@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Pool de procesos para los módulos con la opción isolate (modules.json).
+
+Cada proceso (worker) se crea al iniciar (pre-warm) con los módulos ya importados y va ejecutando los checks que le
+pide el daemon. La petición lleva la sección del módulo en modules.json, su estado y los deadlines de sus targets y la
+respuesta es el ReturnModuleCheck compactado (pack), los mensajes que hay que enviar, los deadlines nuevos y los spans
+del Profiler. Si un check no termina antes de su deadline se mata el worker (SIGKILL), se crea otro en su lugar y
+run() lanza DeadlineExceeded, así un módulo colgado (una librería que no respeta los timeouts, un NFS muerto...) no
+bloquea el resto de módulos ni deja hilos colgados en el daemon.
+
+Ejemplo:
+    >>> pool = ModulePool('/opt/watchful/watchfuls', workers=2, preload=('raid', ))
+    >>> pool.start()
+    >>> result = pool.run('raid', conf, status, 300, {}, timeout=60)
+    >>> pool.close()
+
+"""
+
+import os
+import sys
+import signal
+import importlib
+import threading
+import multiprocessing
+from lib import ObjectBase
+from lib.debug import DebugLevel
+
+__all__ = ['ModulePool']
+
+
+def _worker_main(conn, dir_modules: str, preload: tuple, debug_conf: dict):
+    """ Bucle de un worker, atiende peticiones hasta que recibe None o se cierra la conexión. """
+    # Ctrl+C llega a todo el grupo de procesos, el worker lo cierra el daemon.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if dir_modules and dir_modules not in sys.path:
+        sys.path.append(dir_modules)
+    ObjectBase.debug.enabled = debug_conf.pop('enabled', True)
+    ObjectBase.debug.configure(debug_conf)
+
+    from lib.modules.worker_monitor import WorkerMonitor
+    monitor = WorkerMonitor(dir_modules)
+    for name in preload:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            ObjectBase.debug.exception(e)
+
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+        try:
+            reply = ('ok', monitor.run_module(*request))
+        except Exception as e:
+            ObjectBase.debug.exception(e)
+            reply = ('error', "{0}: {1}".format(type(e).__name__, e))
+        try:
+            conn.send(reply)
+        except (EOFError, OSError):
+            break
+        except Exception as e:
+            # El resultado no se puede serializar (pickle).
+            conn.send(('error', "{0}: {1}".format(type(e).__name__, e)))
+    conn.close()
+
+
+class ModulePool(ObjectBase):
+
+    class DeadlineExceeded(TimeoutError):
+        """ El check no ha terminado antes de su deadline y se ha matado el worker. """
+
+        def __init__(self, message: str, timeout: float = None):
+            super().__init__(message)
+            self.timeout = timeout
+
+    class Result(object):
+
+        __slots__ = ('packed', 'data', 'messages', 'deadlines', 'spans')
+
+        def __init__(self, packed: bool, data, messages: list, deadlines: dict, spans: dict):
+            self.packed = packed
+            self.data = data
+            self.messages = messages
+            self.deadlines = deadlines
+            self.spans = spans
+
+    class Worker(object):
+
+        __slots__ = ('process', 'conn')
+
+        def __init__(self, process, conn):
+            self.process = process
+            self.conn = conn
+
+    # Segundos que se espera a que termine un worker al cerrar antes de matarlo.
+    __close_timeout = 5
+
+    def __init__(self, dir_modules: str, workers: int = 2, preload: tuple = ()):
+        """
+        :param dir_modules: Directorio de los módulos.
+        :param workers: Nº máximo de procesos, es el nº de módulos isolate que se pueden ejecutar a la vez.
+        :param preload: Módulos que se importan al crear cada worker.
+
+        """
+        self.dir_modules = dir_modules
+        self.workers = max(1, int(workers))
+        self.preload = tuple(preload or ())
+        # forkserver crea los workers desde un proceso limpio, sin los hilos ni los sockets del daemon.
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            self.__ctx = multiprocessing.get_context('forkserver')
+        else:
+            self.__ctx = multiprocessing.get_context('spawn')
+        self.__idle = []
+        self.__count = 0
+        self.__closed = False
+        self.__cond = threading.Condition()
+
+    @property
+    def count(self) -> int:
+        """ Nº de workers creados. """
+        with self.__cond:
+            return self.__count
+
+    def start(self):
+        """ Crea todos los workers (pre-warm), si no se llama se crean cuando hacen falta. """
+        while True:
+            with self.__cond:
+                if self.__closed or self.__count >= self.workers:
+                    return
+                self.__count += 1
+            self.__release(self.__spawn_safe())
+
+    def __spawn(self) -> Worker:
+        conn, conn_child = self.__ctx.Pipe()
+        debug_conf = {
+            'enabled': self.debug.enabled,
+            'level': self.debug.level.name,
+            'levels': {module: level.name for (module, level) in self.debug.levels.items()},
+            'output': self.debug.output,
+            'file': self.debug.file
+        }
+        process = self.__ctx.Process(target=_worker_main, name="watchful-worker",
+                                     args=(conn_child, self.dir_modules, self.preload, debug_conf), daemon=True)
+        process.start()
+        conn_child.close()
+        self.debug.print(lambda: "> ModulePool >> Worker {0} started".format(process.pid), DebugLevel.debug)
+        return self.Worker(process, conn)
+
+    def __spawn_safe(self):
+        """ Crea un worker, si falla libera su hueco y lanza la excepción. """
+        try:
+            return self.__spawn()
+        except Exception:
+            with self.__cond:
+                self.__count -= 1
+                self.__cond.notify()
+            raise
+
+    def __acquire(self) -> Worker:
+        with self.__cond:
+            while True:
+                if self.__closed:
+                    raise RuntimeError("ModulePool is closed")
+                if self.__idle:
+                    return self.__idle.pop()
+                if self.__count < self.workers:
+                    self.__count += 1
+                    break
+                self.__cond.wait()
+        return self.__spawn_safe()
+
+    def __release(self, worker: Worker):
+        with self.__cond:
+            if not self.__closed:
+                self.__idle.append(worker)
+                self.__cond.notify()
+                return
+        self.__stop_worker(worker)
+
+    def __kill(self, worker: Worker):
+        """ Mata el worker y crea otro en su lugar. """
+        self.__terminate(worker)
+        with self.__cond:
+            if self.__closed:
+                self.__count -= 1
+                self.__cond.notify()
+                return
+        self.__release(self.__spawn_safe())
+
+    @staticmethod
+    def __terminate(worker: Worker):
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+
+    def __stop_worker(self, worker: Worker):
+        try:
+            worker.conn.send(None)
+        except (EOFError, OSError):
+            pass
+        worker.process.join(self.__close_timeout)
+        self.__terminate(worker)
+
+    def run(self, name: str, conf: dict, status: dict, interval_default, deadlines: dict, timeout: float = None):
+        """
+        Ejecuta el check del módulo en un worker.
+
+        :param name: Nombre del módulo.
+        :param conf: Sección del módulo en modules.json.
+        :param status: Estado del módulo.
+        :param interval_default: Intervalo por defecto del daemon.
+        :param deadlines: Deadlines de los targets del módulo.
+        :param timeout: Segundos que tiene el check para terminar, None o 0 sin limite.
+        :return: ModulePool.Result
+        :raises ModulePool.DeadlineExceeded: El check no ha terminado a tiempo, el worker se ha matado.
+        :raises RuntimeError: El check ha lanzado una excepción o el worker ha muerto.
+
+        """
+        worker = self.__acquire()
+        try:
+            worker.conn.send((name, conf, status, interval_default, deadlines))
+            is_done = worker.conn.poll(timeout if timeout else None)
+            if is_done:
+                state, data = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            self.__kill(worker)
+            raise RuntimeError("Worker {0} of module {1} died (exit code {2}): {3}".format(
+                worker.process.pid, name, worker.process.exitcode, e))
+        except BaseException:
+            self.__kill(worker)
+            raise
+        if not is_done:
+            self.__kill(worker)
+            raise self.DeadlineExceeded("Module {0} did not finish in {1} s, worker {2} killed".format(
+                name, timeout, worker.process.pid), timeout)
+        self.__release(worker)
+        if state != 'ok':
+            raise RuntimeError("Module {0} failed in worker {1}: {2}".format(name, worker.process.pid, data))
+        return self.Result(*data)
+
+    def close(self):
+        """ Para los workers libres, los que están ejecutando un check se paran cuando terminan. """
+        with self.__cond:
+            self.__closed = True
+            idle = self.__idle
+            self.__idle = []
+            self.__count -= len(idle)
+            self.__cond.notify_all()
+        for worker in idle:
+            self.__stop_worker(worker)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Registro de módulos (watchfuls).
+
+Busca los módulos una sola vez al iniciar y guarda la instancia de cada módulo entre ciclos. Solo se vuelve a cargar
+un módulo cuando cambia la fecha de modificación de su archivo (se recarga el código) o cuando cambia su sección de
+configuración en modules.json (se crea una instancia nueva).
+
+"""
+
+import os
+import sys
+import copy
+import glob
+import importlib
+import threading
+from lib import ObjectBase
+from lib.debug import DebugLevel
+
+__all__ = ['ModuleRegistry']
+
+
+class ModuleRegistry(ObjectBase):
+
+    class ModuleNotFound(KeyError):
+        """ El módulo no esta en el registro o se ha borrado su archivo. """
+        pass
+
+    class ModuleEntry(object):
+
+        def __init__(self, name: str, path: str):
+            self.name = name
+            self.path = path
+            self.mtime = None
+            self.conf = None
+            self.module = None
+            self.instance = None
+
+    def __init__(self, obj_monitor, dir_modules: str):
+        self.__monitor = obj_monitor
+        self.__dir_modules = dir_modules
+        self.__entries = {}
+        self.__lock = threading.Lock()
+        self.discover()
+
+    @property
+    def dir_modules(self) -> str:
+        return self.__dir_modules
+
+    @property
+    def names(self) -> list:
+        """ Lista de nombres de los módulos encontrados. """
+        return list(self.__entries.keys())
+
+    def is_exist(self, name: str) -> bool:
+        if name and name in self.__entries.keys():
+            return True
+        return False
+
+    def discover(self) -> list:
+        """
+        Busca los archivos de los módulos en el directorio de módulos. Los módulos que ya estaban registrados
+        mantienen su instancia.
+
+        :return: Lista de nombres de los módulos encontrados.
+
+        """
+        found = {}
+        if self.dir_modules:
+            for module_path in sorted(glob.glob(os.path.join(self.dir_modules, '*.py'))):
+                module_name = os.path.splitext(os.path.basename(module_path))[0]
+                if module_name.find('__') == -1:
+                    found[module_name] = module_path
+
+        with self.__lock:
+            for module_name in list(self.__entries.keys()):
+                if module_name not in found:
+                    del self.__entries[module_name]
+            for (module_name, module_path) in found.items():
+                if module_name not in self.__entries:
+                    self.__entries[module_name] = self.ModuleEntry(module_name, module_path)
+
+        self.debug.print(lambda: "> ModuleRegistry > discover >> Modules: {0}".format(self.names), DebugLevel.debug)
+        return self.names
+
+    def get(self, name: str):
+        """
+        Retorna la instancia del módulo, la crea si no existe y la vuelve a crear si el archivo del módulo o su
+        configuración han cambiado desde la ultima vez.
+
+        :param name: Nombre del módulo.
+        :return: Instancia Watchful del módulo.
+
+        """
+        with self.__lock:
+            entry = self.__entries.get(name, None)
+            if entry is None:
+                raise self.ModuleNotFound("Module {0} is not registered!".format(name))
+
+            try:
+                mtime = os.stat(entry.path).st_mtime_ns
+            except FileNotFoundError:
+                # El archivo se ha borrado después de discover(), se quita del registro para no volver a intentarlo.
+                self.__remove(entry)
+                raise self.ModuleNotFound("Module {0} file not found ({1}), removed from the registry!".format(
+                    name, entry.path)) from None
+            conf = self.__monitor.config_modules.get_conf(name, {})
+
+            if entry.module is None:
+                self.debug.print(lambda: "> ModuleRegistry > get >> Load: {0}".format(name), DebugLevel.debug)
+                entry.module = importlib.import_module(name)
+                self.__release(entry)
+            elif entry.mtime != mtime:
+                self.debug.print(lambda: "> ModuleRegistry > get >> Reload (file changed): {0}".format(name),
+                                 DebugLevel.info)
+                self.__release(entry)
+                entry.module = importlib.reload(entry.module)
+            elif entry.conf != conf:
+                self.debug.print(lambda: "> ModuleRegistry > get >> Reload (config changed): {0}".format(name),
+                                 DebugLevel.info)
+                self.__release(entry)
+
+            if entry.instance is None:
+                entry.instance = entry.module.Watchful(self.__monitor)
+                entry.mtime = mtime
+                entry.conf = copy.deepcopy(conf)
+
+            return entry.instance
+
+    def __release(self, entry: ModuleEntry):
+        """ Descarta la instancia del módulo llamando antes a su close(). """
+        if entry.instance is not None:
+            try:
+                entry.instance.close()
+            except Exception as e:
+                self.debug.exception(e)
+        entry.instance = None
+
+    def __remove(self, entry: ModuleEntry):
+        """ Descarta la instancia y el código del módulo y lo elimina del registro. """
+        self.__release(entry)
+        self.__entries.pop(entry.name, None)
+        if entry.module is not None:
+            sys.modules.pop(entry.name, None)
+        self.debug.print(lambda: "> ModuleRegistry > get >> Removed (file not found): {0}".format(entry.name),
+                         DebugLevel.warning)
+
+    def unload(self, name: str = None):
+        """ Elimina la instancia del módulo (o de todos si no se especifica ninguno). """
+        with self.__lock:
+            for (module_name, entry) in self.__entries.items():
+                if name is None or module_name == name:
+                    self.__release(entry)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Monitor que usan los procesos del ModulePool (modo isolate).
+
+Solo tiene lo que necesitan los módulos para hacer el check: su sección de modules.json, su estado y el intervalo por
+defecto, que llegan del daemon en cada petición. Los mensajes que envía el módulo no se mandan a Telegram, se guardan y
+se retornan con el resultado para que los envíe el daemon.
+
+Este archivo solo se importa dentro de los procesos del pool (importa lib.monitor, que a su vez importa lib.modules).
+
+"""
+
+import asyncio
+from lib.config import ConfigControl
+from lib.config import StatusStore
+from lib.modules import ModuleRegistry
+from lib.modules import ReturnModuleCheck
+from lib.profiler import Profiler
+from lib.monitor import Monitor
+
+__all__ = ['WorkerMonitor']
+
+
+class WorkerMonitor(Monitor):
+
+    def __init__(self, dir_modules: str):
+        # No se llama a Monitor.__init__, no hace falta leer la configuración ni crear el scheduler ni Telegram.
+        self.dir_base = None
+        self.dir_config = None
+        self.dir_modules = dir_modules
+        self.dir_var = None
+        self.interval_default = None
+        self.config = ConfigControl(None, {})
+        self.config_monitor = ConfigControl(None, {})
+        self.config_modules = ConfigControl(None, {})
+        self.status = StatusStore(None, {})
+        self.tg = None
+        self.messages = []
+        self.modules = ModuleRegistry(self, dir_modules)
+
+    def send_message(self, message, status=None):
+        if message:
+            self.messages.append((message, status))
+
+    def run_module(self, name: str, conf: dict, status: dict, interval_default, deadlines: dict) -> tuple:
+        """
+        Ejecuta el check del módulo. La instancia del módulo se mantiene entre peticiones mientras no cambie su
+        configuración o su archivo (ModuleRegistry).
+
+        :param name: Nombre del módulo.
+        :param conf: Sección del módulo en modules.json.
+        :param status: Estado del módulo (status.db).
+        :param interval_default: Intervalo por defecto del daemon.
+        :param deadlines: Deadlines de los targets (ModuleBase.get_target_deadlines).
+        :return: Tupla (packed, resultado, mensajes, deadlines, spans). Si packed es True el resultado es
+                 ReturnModuleCheck.pack(), si no es lo que ha retornado el check.
+
+        """
+        self.config_modules = ConfigControl(None, {name: conf} if conf is not None else {})
+        self.status = StatusStore(None, {name: status} if status is not None else {})
+        self.interval_default = interval_default
+        self.messages = []
+        Profiler.default().clear()
+
+        module = self.modules.get(name)
+        module.clear_return()
+        module.set_target_deadlines(deadlines)
+        if asyncio.iscoroutinefunction(module.check):
+            r_mod_check = asyncio.run(module.check())
+        else:
+            r_mod_check = module.check()
+        packed = isinstance(r_mod_check, ReturnModuleCheck)
+        if packed:
+            r_mod_check = r_mod_check.pack()
+        return packed, r_mod_check, self.messages, module.get_target_deadlines(), Profiler.default().stats()
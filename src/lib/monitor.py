@@ -22,19 +22,30 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import glob
 import os
-import importlib
 import socket
+import threading
+import signal
 import time
-import pprint
+import heapq
+import random
+import asyncio
 import concurrent.futures
 
 from lib.modules import ReturnModuleCheck
+from lib.modules import ModuleRegistry
+from lib.modules import ModulePool
+from lib.db import MySQLPool
+from lib.ssh_pool import SSHPool
 from lib.debug import DebugLevel
 from lib.config import ConfigControl
+from lib.config import ConfigStore
+from lib.config import StatusStore
+from lib.history import HistoryStore
+from lib.profiler import Profiler
 from lib import ObjectBase
 from lib import Telegram
+from lib import Scheduler
 
 __all__ = ['Monitor']
 
@@ -44,16 +55,53 @@ class Monitor(ObjectBase):
     # Nº de hilos que se usaran para procesamiento en paralelo como valor por defecto.
     __default_threads = 5
     __default_enabled = True
+    # Intervalo en segundos entre checks de un modulo si no se define ningún otro (igual que daemon.timer_check).
+    __default_interval = 300
+    # Intervalo mínimo en segundos entre checks de un mismo modulo.
+    __min_interval = 1
+    # Segundos que se espera al cerrar a que se envíen los mensajes pendientes de Telegram.
+    __close_timeout = 30
+    # Nº de procesos y segundos que tiene un modulo isolate para terminar si no se define en monitor.json.
+    __default_pool_workers = 2
+    __default_pool_deadline = 300
+    # Key del resultado con el que se notifica que un modulo isolate no ha terminado antes de su deadline.
+    __module_key = '_module'
+    # Archivos de configuración y atributo en el que se guarda cada uno.
+    __config_files = {'config.json': 'config', 'monitor.json': 'config_monitor', 'modules.json': 'config_modules'}
 
     def __init__(self, dir_base, dir_config, dir_modules, dir_var):
         self.dir_base = dir_base
         self.dir_config = dir_config
         self.dir_modules = dir_modules
         self.dir_var = dir_var
+        self.interval_default = self.__default_interval
+
+        # Cola de prioridad (deadline, seq, module) que usa el modo daemon.
+        self.__queue = []
+        self.__queue_seq = 0
+        self.__queue_last_run = {}
+        self.__daemon_stop = None
+        self.__daemon_wake = None
+        # Módulos que se están ejecutando en el daemon {task: modulo}.
+        self.__daemon_running = {}
+        # Ejecuciones pedidas por el socket de control {modulo: [futures que esperan el resultado]}.
+        self.__run_requests = {}
+        self.__daemon_started = None
+        # Archivos de configuración que han cambiado y que se vuelven a leer en el siguiente paso del daemon.
+        self.__config_pending = set()
+        self.metrics = None
+        self.control = None
+        self.process_pool = None
+        # Datos de la ultima ejecución de cada modulo {modulo: {'time', 'duration', 'ok'}}.
+        self.module_runs = {}
 
         self.__read_config()
         self.__read_status()
+        self.__init_history()
         self.__init_telegram()
+        self.__init_scheduler()
+        self.__init_modules()
+        self.__init_process_pool()
         self.debug.print("> Monitor >> Monitor Init OK")
 
     @staticmethod
@@ -63,43 +111,161 @@ class Monitor(ObjectBase):
                 os.makedirs(path_dir, exist_ok=True)
 
     def __read_config(self):
-        if self.dir_config:
-            self.config = ConfigControl(os.path.join(self.dir_config, 'config.json'))
-            self.config.read()
-            self.config_monitor = ConfigControl(os.path.join(self.dir_config, 'monitor.json'))
-            self.config_monitor.read()
-            self.config_modules = ConfigControl(os.path.join(self.dir_config, 'modules.json'))
-            self.config_modules.read()
-        else:
-            self.config = ConfigControl(None, {})
-            self.config_monitor = ConfigControl(None, {})
-            self.config_modules = ConfigControl(None, {})
+        for (file_name, attr) in self.__config_files.items():
+            if self.dir_config:
+                config = ConfigControl(os.path.join(self.dir_config, file_name))
+                config.read()
+            else:
+                config = ConfigControl(None, {})
+            setattr(self, attr, config)
+
+    def reload_config(self, files=None) -> set:
+        """
+        Vuelve a leer los archivos de configuración y aplica los cambios. Cada archivo se cambia de una sola vez
+        (se sustituye el objeto ConfigControl), así un modulo nunca ve la mitad de una configuración. Si un archivo no
+        se puede leer (JSON no valido...) se mantiene la configuración anterior.
+
+        Los módulos cuya sección de modules.json ha cambiado se vuelven a crear (con su configuración compilada de
+        nuevo) la próxima vez que se ejecutan, el resto mantiene su instancia.
+
+        :param files: Nombres de los archivos (config.json, monitor.json, modules.json), None todos.
+        :return: Nombres de los módulos cuya configuración ha cambiado.
+
+        """
+        modules_changed = set()
+        if not self.dir_config:
+            return modules_changed
+
+        for file_name in (files if files is not None else self.__config_files.keys()):
+            attr = self.__config_files.get(file_name, None)
+            if attr is None:
+                continue
+            file_path = os.path.join(self.dir_config, file_name)
+            data = ConfigStore(file_path).read()
+            if not isinstance(data, dict):
+                self.debug.print(lambda: "> Monitor > reload_config >> {0} is not valid, the current config is "
+                                         "kept".format(file_name), DebugLevel.warning)
+                continue
+
+            old = getattr(self, attr).data
+            if data == old:
+                continue
+            config = ConfigControl(file_path)
+            config.data = data
+            setattr(self, attr, config)
+
+            keys_changed = sorted([key for key in set(old.keys()) | set(data.keys()) if old.get(key) != data.get(key)])
+            self.debug.print(lambda: "> Monitor > reload_config >> {0} changed: {1}".format(file_name, keys_changed),
+                             DebugLevel.info)
+            if attr == 'config_modules':
+                modules_changed.update(keys_changed)
+            elif attr == 'config':
+                self.__apply_config(keys_changed)
+            else:
+                self.debug.print(lambda: "> Monitor > reload_config >> {0}: the changes are applied on restart".format(
+                    file_name), DebugLevel.warning)
+        return modules_changed
+
+    def __apply_config(self, keys_changed: list):
+        """ Aplica los cambios de config.json que no necesitan reiniciar. """
+        if 'log' in keys_changed:
+            self.debug.configure(self.config.get_conf('log', {}))
+        if 'telegram' in keys_changed and self.tg is not None:
+            self.tg.token = self.config.get_conf(['telegram', 'token'], '')
+            self.tg.chat_id = self.config.get_conf(['telegram', 'chat_id'], '')
+            self.tg.retries = self.config.get_conf(['telegram', 'retries'], 3)
+            self.tg.backoff = self.config.get_conf(['telegram', 'backoff'], 1)
+            self.tg.group_messages = self.config.get_conf(['telegram', 'group_messages'], False)
+        if 'metrics' in keys_changed and self.__daemon_stop is not None:
+            self.__stop_metrics()
+            self.__start_metrics()
+        if 'control' in keys_changed and self.__daemon_stop is not None:
+            self.scheduler.submit(self.__control_restart())
 
     def __read_status(self):
         if self.dir_var:
             self.__check_dir(self.dir_var)
-            self.status = ConfigControl(os.path.join(self.dir_var, 'status.json'), {})
-            if not self.status.is_exist_file:
+            file_status = os.path.join(self.dir_var, 'status.db')
+            file_status_json = os.path.join(self.dir_var, 'status.json')
+            is_new = not os.path.isfile(file_status)
+            self.status = StatusStore(file_status)
+            if is_new and os.path.isfile(file_status_json):
+                # Importamos el estado del formato anterior (status.json).
+                self.status.data = ConfigControl(file_status_json).read()
+            else:
+                self.status.read()
+            if self.status.is_changed or is_new:
                 self.status.save()
         else:
-            self.status = ConfigControl(None, {})
+            self.status = StatusStore(None, {})
 
     def clear_status(self):
-        # TODO: Pendiente crear funcion clear en el objeto config
         self.debug.print("> Monitor >> Clear Status", DebugLevel.info)
-        self.__read_status()
-        self.status.data = {}
-        self.status.save()
+        self.status.clear()
+
+    def __init_history(self):
+        file_history = None
+        if self.dir_var and self.get_conf(['history', 'enabled'], True):
+            file_history = os.path.join(self.dir_var, 'history.db')
+        self.history = HistoryStore(file_history,
+                                    self.get_conf(['history', 'max_series'], None),
+                                    self.get_conf(['history', 'save_interval'], None),
+                                    self.get_conf(['history', 'exclude'], None))
 
     def __init_telegram(self):
         if self.config:
             self.tg = Telegram(self.config.get_conf(['telegram', 'token'], ''),
-                               self.config.get_conf(['telegram', 'chat_id'], '')
+                               self.config.get_conf(['telegram', 'chat_id'], ''),
+                               self.config.get_conf(['telegram', 'retries'], 3),
+                               self.config.get_conf(['telegram', 'backoff'], 1)
                                )
             self.tg.group_messages = self.config.get_conf(['telegram', 'group_messages'], False)
         else:
             self.tg = None
 
+    def __init_scheduler(self):
+        self.scheduler = Scheduler(self.get_conf('threads', self.__default_threads))
+
+    def __init_modules(self):
+        self.modules = ModuleRegistry(self, self.dir_modules)
+
+    def __isolated_modules(self) -> list:
+        """ Módulos habilitados con la opción isolate. """
+        return [name for name in self.modules.names
+                if self.config_modules.get_conf([name, 'enabled'], self.__default_enabled) and
+                self.config_modules.get_conf([name, 'isolate'], False)]
+
+    def __init_process_pool(self):
+        """ Crea los procesos del pool al iniciar si hay módulos isolate, si no se crean al necesitarlos. """
+        if self.__isolated_modules():
+            self.__get_process_pool().start()
+
+    def __get_process_pool(self) -> ModulePool:
+        if self.process_pool is None:
+            self.process_pool = ModulePool(self.dir_modules,
+                                           self.get_conf(['process_pool', 'workers'], self.__default_pool_workers),
+                                           self.__isolated_modules())
+        return self.process_pool
+
+    def close(self):
+        """ Para el scheduler y el envío de mensajes y libera los hilos que usan. """
+        if self.scheduler:
+            self.scheduler.stop()
+        if self.modules is not None:
+            self.modules.unload()
+        # Las conexiones y sesiones SSH de los pools compartidos se cierran ya, no esperan a su max_idle.
+        MySQLPool.close_default()
+        SSHPool.close_default()
+        if self.tg is not None:
+            self.tg.close(self.__close_timeout)
+        self.__stop_metrics()
+        if self.process_pool is not None:
+            self.process_pool.close()
+        if self.history is not None:
+            self.history.close()
+        if self.status is not None:
+            self.status.close()
+
     @property
     def dir_base(self):
         return self.__dir_base
@@ -132,6 +298,16 @@ class Monitor(ObjectBase):
     def dir_var(self, val):
         self.__dir_var = val
 
+    @property
+    def interval_default(self) -> float:
+        return self.__interval_default
+
+    @interval_default.setter
+    def interval_default(self, val: float):
+        if not isinstance(val, (int, float)) or isinstance(val, bool) or val <= 0:
+            val = self.__default_interval
+        self.__interval_default = val
+
     def get_conf(self, find_key=None, default_val=None):
         if self.config_monitor:
             return self.config_monitor.get_conf(find_key, default_val)
@@ -164,90 +340,502 @@ class Monitor(ObjectBase):
         return False
 
     def check_module(self, module_name):
-        try:
-            self.debug.print("> Monitor > check_module >> Module: {0}".format(module_name), DebugLevel.info)
-            module_import = importlib.import_module(module_name)
-            module = module_import.Watchful(self)
-            r_mod_check = module.check()
+        """ Ejecuta el modulo y espera a que termine, retorna True si el modulo ha retornado datos validos. """
+        return self.scheduler.submit(self.check_module_async(module_name)).result()
 
-            if isinstance(r_mod_check, ReturnModuleCheck):
-                for (key, value) in r_mod_check.items():
-                    self.debug.print(
-                        "> Monitor > check_module >> Module: {0} - Key: {1} - Val: {2}".format(
-                            module_name, key, value
-                        )
-                    )
-                    tmp_status = r_mod_check.get_status(key)
-                    tmp_message = r_mod_check.get_message(key)
-                    tmp_send = r_mod_check.get_send(key)
-                    tmp_other_data = r_mod_check.get_other_data(key)
-
-                    self.status.set_conf([module_name, key, 'other_data'], tmp_other_data)
-                    if self.check_status(tmp_status, module_name, key):
-                        self.status.set_conf([module_name, key, 'status'], tmp_status)
-                        if tmp_send:
-                            self.send_message(tmp_message, tmp_status)
-                        self.debug.print(
-                            '> Monitor > check_module >> Module: {0}/{1} - New Status: {2}'.format(
-                                module_name, key, tmp_status
-                            )
-                        )
-                return True
+    async def check_module_async(self, module_name, all_targets: bool = False):
+        """
+        Ejecuta el modulo dentro del event loop del scheduler. Si el check del modulo es async se ejecuta en el propio
+        loop, si es sync se ejecuta en el pool de hilos del scheduler.
 
+        :param all_targets: True se comprueban todos los targets aunque no les toque por su intervalo.
+
+        """
+        time_start = time.monotonic()
+        return_ok = False
+        try:
+            self.debug.print(lambda: "> Monitor > check_module >> Module: {0}".format(module_name), DebugLevel.info)
+            # get() mira la fecha del archivo y puede importar o recargar el modulo, no se hace en el event loop.
+            module = await self.scheduler.run_sync(self.modules.get, module_name)
+            if all_targets:
+                module.clear_target_deadlines()
+            module.clear_return()
+            if module.conf.isolate:
+                r_mod_check = await self.scheduler.run_sync(self.__check_module_isolated, module_name, module)
+            elif asyncio.iscoroutinefunction(module.check):
+                r_mod_check = await module.check()
             else:
-                msg_debug = '\n\n'+'*'*60 + '\n'
-                msg_debug += "WARNING: check_module({0}) - Format not implement: {1}\n".format(module_name,
-                                                                                               type(r_mod_check))
-                msg_debug += 'Data Return: {0}\n'.format(pprint.pprint(r_mod_check))
-                msg_debug += '*'*60 + '\n'
-                msg_debug += '*'*60 + '\n\n'
-                self.debug.print(msg_debug, DebugLevel.warning)
+                r_mod_check = await self.scheduler.run_sync(module.check)
+            return_ok = self.__check_module_return(module_name, r_mod_check)
+
+        except ModuleRegistry.ModuleNotFound as e:
+            self.debug.print(lambda: "> Monitor > check_module >> {0}".format(e), DebugLevel.error)
+
+        except ModulePool.DeadlineExceeded as e:
+            self.debug.print(lambda: "> Monitor > check_module >> {0}".format(e), DebugLevel.error)
+            # El fallo se guarda como un resultado mas del modulo, así pasa por check_status y se envía el mensaje.
+            module.clear_return()
+            module.dict_return.set(self.__module_key, False,
+                                   "Module: {0} - Error: did not finish in {1} s".format(module_name, e.timeout))
+            self.__check_module_return(module_name, module.dict_return)
 
         except Exception as e:
             self.debug.exception(e)
+
+        finally:
+            duration = time.monotonic() - time_start
+            self.module_runs[module_name] = {
+                'time': time.time(),
+                'duration': duration,
+                'ok': return_ok
+            }
+            Profiler.default().record('module', module_name, duration)
+        return return_ok
+
+    def __check_module_isolated(self, module_name, module):
+        """
+        Ejecuta el check del modulo en un proceso del ModulePool. La instancia del daemon solo guarda los deadlines de
+        los targets y el resultado, el check lo hace la instancia del worker.
+
+        """
+        deadline = module.conf.deadline or self.get_conf(['process_pool', 'deadline'], self.__default_pool_deadline)
+        result = self.__get_process_pool().run(module_name, self.config_modules.get_conf(module_name, {}),
+                                               self.status.get_conf(module_name, None), self.interval_default,
+                                               module.get_target_deadlines(), deadline)
+        module.set_target_deadlines(result.deadlines)
+        for (message, status) in result.messages:
+            self.send_message(message, status)
+        Profiler.default().merge(result.spans)
+        if not result.packed:
+            return result.data
+        module.dict_return.unpack(result.data)
+        if self.status.get_conf([module_name, self.__module_key, 'status'], True) is False:
+            # La vez anterior no termino a tiempo, se notifica que ya termina.
+            module.dict_return.set(self.__module_key, True,
+                                   "Module: {0} - Finished in time again".format(module_name))
+        return module.dict_return
+
+    def __check_module_return(self, module_name, r_mod_check):
+        if isinstance(r_mod_check, ReturnModuleCheck):
+            for (key, value) in r_mod_check.items():
+                self.debug.print(
+                    lambda: "> Monitor > check_module >> Module: {0} - Key: {1} - Val: {2}".format(
+                        module_name, key, value
+                    ), DebugLevel.debug, module=module_name
+                )
+                tmp_status = r_mod_check.get_status(key)
+                tmp_message = r_mod_check.get_message(key)
+                tmp_send = r_mod_check.get_send(key)
+                tmp_other_data = r_mod_check.get_other_data(key)
+
+                self.status.set_conf([module_name, key, 'other_data'], tmp_other_data)
+                self.history.add(module_name, key, tmp_other_data, tmp_status)
+                if self.check_status(tmp_status, module_name, key):
+                    self.status.set_conf([module_name, key, 'status'], tmp_status)
+                    if tmp_send:
+                        self.send_message(tmp_message, tmp_status)
+                    self.debug.print(
+                        lambda: '> Monitor > check_module >> Module: {0}/{1} - New Status: {2}'.format(
+                            module_name, key, tmp_status
+                        ), DebugLevel.debug, module=module_name
+                    )
+            return True
+
+        if self.debug.is_enabled(DebugLevel.warning, module_name):
+            import pprint
+            msg_debug = '\n\n'+'*'*60 + '\n'
+            msg_debug += "WARNING: check_module({0}) - Format not implement: {1}\n".format(module_name,
+                                                                                           type(r_mod_check))
+            msg_debug += 'Data Return: {0}\n'.format(pprint.pformat(r_mod_check))
+            msg_debug += '*'*60 + '\n'
+            msg_debug += '*'*60 + '\n\n'
+            self.debug.print(msg_debug, DebugLevel.warning, module=module_name)
         return False
 
-    def check(self):
+    def is_module_enabled(self, module_name) -> bool:
+        return bool(self.config_modules.get_conf([module_name, "enabled"], self.__default_enabled))
+
+    def check(self, all_targets: bool = False):
+        """
+        Ejecuta una vez todos los módulos habilitados.
+
+        :param all_targets: True comprueba todos los targets aunque no les toque por su intervalo (--profile).
+
+        """
         # cont_break = 0  # Debug - Count
 
-        self.debug.print("> Monitor > check >> Check Init: {0}".format(time.strftime("%c")), DebugLevel.info)
+        self.debug.print(lambda: "> Monitor > check >> Check Init: {0}".format(time.strftime("%c")), DebugLevel.info)
         list_modules = []
-        for module_def in glob.glob(os.path.join(self.dir_modules, '*.py')):
-            module_def = os.path.splitext(os.path.basename(module_def))[0]
-            if module_def.find('__') == -1:
-                # Debug Control Run Modules
-                # --- MODE NAME -------------------
-                # if module_def != "mysql":
-                #     continue
-                # --- MODE COUNT ------------------
-                # if cont_break < 1:
-                #     list_modules.append(module_def)
-                # cont_break = cont_break + 1
-                # continue
-                # Debug - End
-
-                if self.config_modules.get_conf([module_def, "enabled"], self.__default_enabled):
-                    list_modules.append(module_def)
+        for module_def in self.modules.names:
+            # Debug Control Run Modules
+            # --- MODE NAME -------------------
+            # if module_def != "mysql":
+            #     continue
+            # --- MODE COUNT ------------------
+            # if cont_break < 1:
+            #     list_modules.append(module_def)
+            # cont_break = cont_break + 1
+            # continue
+            # Debug - End
+
+            if self.is_module_enabled(module_def):
+                list_modules.append(module_def)
+                if all_targets:
+                    self.modules.get(module_def).clear_target_deadlines()
 
         changed = False
 
-        self.status.read()
+        self.status.refresh()
 
-        max_threads = self.get_conf('threads', self.__default_threads)
-        self.debug.print("> Monitor > check >> Monitor Max Threads: {0}".format(max_threads))
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:
-            future_to_run_module = {executor.submit(self.check_module, module): module for module in list_modules}
-            for future in concurrent.futures.as_completed(future_to_run_module):
-                module = future_to_run_module[future]
-                try:
-                    if future.result():
-                        changed = True
-                except Exception as exc:
-                    self.debug.exception(exc)
+        self.debug.print(lambda: "> Monitor > check >> Monitor Max Threads: {0}".format(self.scheduler.max_workers))
+        future_to_run_module = self.scheduler.map(self.check_module_async, list_modules)
+        for future in concurrent.futures.as_completed(future_to_run_module):
+            try:
+                if future.result():
+                    changed = True
+            except Exception as exc:
+                self.debug.exception(exc)
 
         self.debug.debug_obj(__name__, self.status.data, "Debug Status Save")
         if changed is True:
             self.status.save()
+        self.history.save()
 
         self.send_message_end()
-        self.debug.print("> Monitor > check >> Check End: {0}".format(time.strftime("%c")), DebugLevel.info)
+        self.debug.print(lambda: "> Monitor > check >> Check End: {0}".format(time.strftime("%c")), DebugLevel.info)
+
+    async def __queue_push(self, module_name, last_run: float = None):
+        """
+        Añade el modulo a la cola calculando su siguiente deadline a partir de la ultima ejecución. Si no se especifica
+        last_run el modulo se pone en cola para ejecutarse ya. Los módulos que ya no están en el registro (se ha
+        borrado su archivo) no se vuelven a poner en cola.
+
+        """
+        if not self.modules.is_exist(module_name):
+            return
+        if last_run is None:
+            deadline = time.monotonic()
+        else:
+            interval, jitter = await self.scheduler.run_sync(self.__get_module_interval, module_name)
+            deadline = last_run + interval
+            if jitter > 0:
+                deadline += random.uniform(0, jitter)
+        self.__queue_seq += 1
+        heapq.heappush(self.__queue, (deadline, self.__queue_seq, module_name))
+
+    def __get_module_interval(self, module_name):
+        interval, jitter = self.interval_default, 0
+        try:
+            module = self.modules.get(module_name)
+            _, jitter = module.get_interval()
+            interval = module.get_interval_min()
+        except Exception as e:
+            self.debug.exception(e)
+        return max(interval, self.__min_interval), jitter
+
+    def run_daemon(self, interval_default: float = None):
+        """
+        Modo daemon, cada modulo se ejecuta cuando le llega su deadline sin esperar a los demás módulos. Bloquea hasta
+        que se llama a stop_daemon().
+
+        :param interval_default: Intervalo en segundos de los módulos que no tienen definido ninguno.
+
+        """
+        if interval_default is not None:
+            self.interval_default = interval_default
+        # systemd para el servicio con SIGTERM, el bucle termina y main.py llama a close() (guarda el histórico, envía
+        # los mensajes pendientes, para los workers y borra el socket de control). Las señales solo se pueden
+        # capturar en el hilo principal, el bucle del daemon se ejecuta en el hilo del scheduler.
+        signals_prev = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signals_prev[signum] = signal.signal(signum, self.__daemon_signal)
+        self.__start_metrics()
+        try:
+            self.scheduler.submit(self.__daemon_loop()).result()
+        finally:
+            self.__stop_metrics()
+            for (signum, handler) in signals_prev.items():
+                signal.signal(signum, handler)
+
+    def __daemon_signal(self, signum, frame):
+        self.debug.print(lambda: "> Monitor > daemon >> Signal {0}, stopping...".format(signal.Signals(signum).name),
+                         DebugLevel.info)
+        self.stop_daemon()
+
+    def __start_metrics(self):
+        """ Inicia el endpoint /metrics si esta habilitado en la configuración (metrics.enabled). """
+        if self.metrics is not None or not self.config.get_conf(['metrics', 'enabled'], False):
+            return
+        # Solo se usa en modo daemon, no se importa en cada arranque del modo oneshot (watchful.timer).
+        from lib.net import MetricsServer
+        metrics = MetricsServer(self.config.get_conf(['metrics', 'host'], ''),
+                                self.config.get_conf(['metrics', 'port'], 9110),
+                                self.config.get_conf(['metrics', 'exclude'], None))
+        try:
+            metrics.start()
+        except OSError as e:
+            self.debug.exception(e)
+            return
+        self.metrics = metrics
+        self.update_metrics()
+
+    def __stop_metrics(self):
+        if self.metrics is not None:
+            self.metrics.stop()
+            self.metrics = None
+
+    def update_metrics(self):
+        """ Genera la foto de las métricas que se sirve en /metrics con el estado actual en memoria. """
+        if self.metrics is not None:
+            self.metrics.update(self.status.snapshot(), dict(self.module_runs), Profiler.default().stats())
+
+    def stop_daemon(self):
+        if self.__daemon_stop is not None:
+            self.scheduler.loop.call_soon_threadsafe(self.__daemon_stop.set)
+            self.scheduler.loop.call_soon_threadsafe(self.__daemon_wake.set)
+
+    def __watch_config_start(self):
+        """ Vigila el directorio de configuración con inotify, los cambios se aplican en el bucle del daemon. """
+        from lib.linux import Inotify
+        if not self.dir_config or not Inotify.is_available():
+            return None
+        try:
+            watch = Inotify()
+            # Los editores escriben el archivo (IN_CLOSE_WRITE) o escriben uno temporal y lo renombran (IN_MOVED_TO).
+            watch.add_watch(self.dir_config, Inotify.IN_CLOSE_WRITE | Inotify.IN_MOVED_TO)
+        except OSError as e:
+            self.debug.exception(e)
+            return None
+        self.scheduler.loop.add_reader(watch.fileno(), self.__watch_config_event, watch)
+        self.debug.print(lambda: "> Monitor > daemon >> Watch config: {0}".format(self.dir_config), DebugLevel.debug)
+        return watch
+
+    def __watch_config_stop(self, watch):
+        if watch is not None:
+            self.scheduler.loop.remove_reader(watch.fileno())
+            watch.close()
+
+    def __watch_config_event(self, watch):
+        for event in watch.read():
+            if event.is_overflow:
+                self.__config_pending.update(self.__config_files.keys())
+            elif event.name in self.__config_files:
+                self.__config_pending.add(event.name)
+        if self.__config_pending:
+            self.__daemon_wake.set()
+
+    async def __daemon_reload_config(self, running: dict) -> set:
+        """
+        Aplica los cambios de la configuración y vuelve a calcular el deadline de los módulos afectados.
+
+        :return: Nombres de los módulos cuya configuración ha cambiado.
+
+        """
+        files = sorted(self.__config_pending)
+        self.__config_pending.clear()
+        modules_changed = await self.scheduler.run_sync(self.reload_config, files)
+
+        # Los que se están ejecutando se vuelven a poner en cola al terminar, ya con la configuración nueva.
+        modules_queue = [module_name for module_name in modules_changed
+                         if self.modules.is_exist(module_name) and module_name not in running.values()]
+        if modules_queue:
+            self.__queue[:] = [item for item in self.__queue if item[2] not in modules_queue]
+            heapq.heapify(self.__queue)
+            for module_name in modules_queue:
+                await self.__queue_push(module_name, self.__queue_last_run.get(module_name, None))
+        return modules_changed
+
+    async def __control_start(self):
+        """ Inicia el socket de control si esta habilitado (control.enabled, por defecto si). """
+        if self.control is not None or not self.config.get_conf(['control', 'enabled'], True):
+            return
+        path = self.config.get_conf(['control', 'socket'], None)
+        if not path:
+            if not self.dir_var:
+                return
+            path = os.path.join(self.dir_var, 'control.sock')
+        mode = self.config.get_conf(['control', 'mode'], '0600')
+        try:
+            mode = int(mode, 8) if isinstance(mode, str) else int(mode)
+        except ValueError:
+            self.debug.print(lambda: "> Monitor > control >> Mode {0} is not valid, using 0600".format(mode),
+                             DebugLevel.warning)
+            mode = 0o600
+
+        from lib.net import ControlServer
+        control = ControlServer(path, self.__control_command, mode)
+        try:
+            await control.start()
+        except OSError as e:
+            self.debug.exception(e)
+            return
+        self.control = control
+
+    async def __control_stop(self):
+        if self.control is not None:
+            await self.control.stop()
+            self.control = None
+
+    async def __control_restart(self):
+        await self.__control_stop()
+        await self.__control_start()
+
+    async def __control_run(self, modules: list) -> dict:
+        """ Ejecuta ya los módulos (todos sus targets) en el daemon y espera a que terminen. """
+        waiters = []
+        for module_name in modules:
+            waiter = asyncio.get_running_loop().create_future()
+            self.__run_requests.setdefault(module_name, []).append(waiter)
+            waiters.append(waiter)
+        self.__daemon_wake.set()
+        await asyncio.gather(*waiters)
+        return {'modules': {module_name: self.module_runs.get(module_name, None) for module_name in modules}}
+
+    async def __control_command(self, command: str, args: list) -> dict:
+        """ Comandos del socket de control, los datos se leen de la memoria del daemon. """
+        if command == 'help':
+            return {'commands': {
+                'check': 'run now all the enabled modules and wait for them',
+                'run MODULE...': 'run now the modules and wait for them',
+                'status [MODULE [KEY]]': 'current status of the checks',
+                'modules': 'enabled, running, seconds to the next run and last run of each module',
+                'reload': 'read the config files again',
+                'ping': 'check that the daemon answers'
+            }}
+
+        if command == 'ping':
+            return {'pong': True, 'uptime': time.monotonic() - self.__daemon_started}
+
+        if command == 'status':
+            data = self.status.snapshot()
+            for key in args[:2]:
+                if not isinstance(data, dict) or key not in data:
+                    raise KeyError("{0} not found".format(key))
+                data = data[key]
+            return {'status': data}
+
+        if command == 'modules':
+            now = time.monotonic()
+            deadlines = {}
+            for (deadline, _, module_name) in self.__queue:
+                deadlines[module_name] = min(deadline, deadlines.get(module_name, deadline))
+            running = set(self.__daemon_running.values())
+            return {'modules': {module_name: {
+                'enabled': self.is_module_enabled(module_name),
+                'running': module_name in running,
+                'next_run': max(deadlines[module_name] - now, 0) if module_name in deadlines else None,
+                'last_run': self.module_runs.get(module_name, None)
+            } for module_name in self.modules.names}}
+
+        if command == 'run':
+            if not args:
+                raise ValueError("Module name missing")
+            for module_name in args:
+                if not self.modules.is_exist(module_name):
+                    raise KeyError("Module {0} not found".format(module_name))
+            return await self.__control_run(args)
+
+        if command == 'check':
+            return await self.__control_run([m for m in self.modules.names if self.is_module_enabled(m)])
+
+        if command == 'reload':
+            self.__config_pending.update(self.__config_files.keys())
+            modules_changed = await self.__daemon_reload_config(self.__daemon_running)
+            return {'modules_changed': sorted(modules_changed)}
+
+        raise ValueError("Unknown command {0}, use help".format(command))
+
+    def __daemon_start_requested(self, running: dict, waiting: dict):
+        """ Inicia los módulos pedidos por el socket de control, si ya se están ejecutando esperan a que terminen. """
+        for module_name in list(self.__run_requests.keys()):
+            if module_name in running.values():
+                continue
+            waiters = self.__run_requests.pop(module_name)
+            self.__queue[:] = [item for item in self.__queue if item[2] != module_name]
+            heapq.heapify(self.__queue)
+            task = asyncio.ensure_future(self.check_module_async(module_name, all_targets=True))
+            running[task] = module_name
+            waiting[task] = waiters
+            self.__queue_last_run[module_name] = time.monotonic()
+
+    async def __daemon_loop(self):
+        self.__daemon_wake = asyncio.Event()
+        self.__daemon_stop = asyncio.Event()
+        self.__daemon_started = time.monotonic()
+        self.__config_pending.clear()
+        self.__queue.clear()
+        for module_name in self.modules.names:
+            await self.__queue_push(module_name)
+        watch = self.__watch_config_start()
+        await self.__control_start()
+
+        running = self.__daemon_running
+        running.clear()
+        waiting = {}
+        try:
+            while not self.__daemon_stop.is_set():
+                if self.__config_pending:
+                    await self.__daemon_reload_config(running)
+
+                self.__daemon_start_requested(running, waiting)
+
+                now = time.monotonic()
+                while self.__queue and self.__queue[0][0] <= now:
+                    _, _, module_name = heapq.heappop(self.__queue)
+                    if module_name in running.values():
+                        continue
+                    if not self.is_module_enabled(module_name):
+                        # Lo dejamos en cola por si se habilita más adelante.
+                        await self.__queue_push(module_name, now)
+                        continue
+                    task = asyncio.ensure_future(self.check_module_async(module_name))
+                    running[task] = module_name
+                    self.__queue_last_run[module_name] = now
+
+                timeout = max(self.__queue[0][0] - now, 0) if self.__queue else self.interval_default
+                # Se despierta al llegar el siguiente deadline, al terminar un modulo, al parar o si cambia la
+                # configuración.
+                wake_task = asyncio.ensure_future(self.__daemon_wake.wait())
+                done, _ = await asyncio.wait(list(running.keys()) + [wake_task], timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                wake_task.cancel()
+                self.__daemon_wake.clear()
+
+                changed = False
+                finished = False
+                for task in done:
+                    if task is wake_task:
+                        continue
+                    finished = True
+                    module_name = running.pop(task)
+                    await self.__queue_push(module_name, self.__queue_last_run.get(module_name, None))
+                    for waiter in waiting.pop(task, []):
+                        if not waiter.done():
+                            waiter.set_result(None)
+                    try:
+                        if task.result():
+                            changed = True
+                    except Exception as exc:
+                        self.debug.exception(exc)
+
+                if changed:
+                    await self.scheduler.run_sync(self.status.save)
+                    await self.scheduler.run_sync(self.history.save)
+                if finished and self.metrics is not None:
+                    await self.scheduler.run_sync(self.update_metrics)
+                if finished and not running:
+                    await self.scheduler.run_sync(self.send_message_end)
+
+        finally:
+            self.__watch_config_stop(watch)
+            await self.__control_stop()
+            for task in running.keys():
+                task.cancel()
+            running.clear()
+            for waiters in list(waiting.values()) + list(self.__run_requests.values()):
+                for waiter in waiters:
+                    waiter.cancel()
+            self.__run_requests.clear()
+            self.__daemon_stop = None
+            self.__daemon_wake = None
@@ -0,0 +1,6 @@
+from .icmp_ping import IcmpPing
+from .http_check import HttpCheck
+from .metrics_server import MetricsServer
+from .control_server import ControlServer
+
+__all__ = ['IcmpPing', 'HttpCheck', 'MetricsServer', 'ControlServer']
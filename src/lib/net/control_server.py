@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Socket Unix de control del daemon.
+
+Se ejecuta dentro del event loop del daemon. Cada linea que se recibe es un comando con sus argumentos separados por
+espacios ("run ping") y se responde con una linea JSON ({"ok": true, ...} o {"ok": false, "error": "..."}). Una
+conexión puede enviar varios comandos. Los comandos los ejecuta la función handler (async) que recibe el comando y la
+lista de argumentos y retorna un diccionario.
+
+Ejemplo:
+    >>> server = ControlServer('/var/lib/watchful/control.sock', monitor_handler)
+    >>> await server.start()
+    $ echo "status ping" | socat - UNIX-CONNECT:/var/lib/watchful/control.sock
+    >>> await server.stop()
+
+"""
+
+import os
+import json
+import stat
+import socket
+import asyncio
+from lib import ObjectBase
+from lib.debug import DebugLevel
+
+__all__ = ['ControlServer']
+
+
+class ControlServer(ObjectBase):
+
+    # Tamaño máximo de una linea de comando.
+    __max_line = 4096
+
+    def __init__(self, path: str, handler, mode: int = 0o600):
+        """
+        :param path: Ruta del socket.
+        :param handler: Función async (command: str, args: list) -> dict.
+        :param mode: Permisos del socket, quien puede escribir en el puede controlar el daemon.
+
+        """
+        self.path = path
+        self.handler = handler
+        self.mode = mode
+        self.__server = None
+
+    @property
+    def is_running(self) -> bool:
+        if self.__server is not None:
+            return True
+        return False
+
+    def __remove_stale(self):
+        """ Borra el socket de una ejecución anterior, falla si hay otro daemon escuchando en el. """
+        try:
+            if not stat.S_ISSOCK(os.lstat(self.path).st_mode):
+                raise OSError("{0} exists and is not a socket".format(self.path))
+        except FileNotFoundError:
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(self.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.path)
+                return
+        raise OSError("{0} is in use by another process".format(self.path))
+
+    async def start(self):
+        """ :raises OSError: Si no se puede crear el socket. """
+        if self.__server is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.__remove_stale()
+        # El umask evita que otro usuario pueda conectar antes del chmod.
+        umask = os.umask(0o177)
+        try:
+            self.__server = await asyncio.start_unix_server(self.__client, self.path, limit=self.__max_line)
+        finally:
+            os.umask(umask)
+        os.chmod(self.path, self.mode)
+        self.debug.print(lambda: "> Control >> Listen {0}".format(self.path), DebugLevel.info)
+
+    async def stop(self):
+        if self.__server is None:
+            return
+        self.__server.close()
+        await self.__server.wait_closed()
+        self.__server = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    async def __client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    writer.write(self.encode({'ok': False, 'error': 'Line too long'}))
+                    break
+                if not line:
+                    break
+                args = line.decode('utf-8', 'replace').split()
+                if not args:
+                    continue
+                writer.write(self.encode(await self.__run(args[0].lower(), args[1:])))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def __run(self, command: str, args: list) -> dict:
+        try:
+            data = await self.handler(command, args)
+        except (KeyError, ValueError) as e:
+            return {'ok': False, 'error': str(e).strip("'")}
+        except Exception as e:
+            self.debug.exception(e)
+            return {'ok': False, 'error': str(e)}
+        data = dict(data or {})
+        data.setdefault('ok', True)
+        return data
+
+    @staticmethod
+    def encode(data: dict) -> bytes:
+        return (json.dumps(data, default=str, separators=(',', ':')) + '\n').encode('utf-8')
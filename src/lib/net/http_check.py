@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Cliente HTTP(S) para los checks web sin procesos externos.
+
+Mantiene un pool de conexiones keep-alive por host (scheme, host, port) que se reutilizan entre checks, soporta HTTPS,
+limita el numero de redirecciones y aplica un timeout distinto a cada fase de la petición (DNS, conexión, TLS y primer
+byte). El resultado guarda el tiempo de cada fase y el tiempo de lectura del body.
+
+Ejemplo:
+    >>> http = HttpCheck()
+    >>> result = http.check('http://www.example.com')
+    >>> result.code
+    200
+    >>> http.close()
+
+"""
+
+import ssl
+import time
+import socket
+import threading
+import http.client
+import concurrent.futures
+from urllib.parse import urlsplit, urljoin
+
+__all__ = ['HttpCheck']
+
+
+class HttpCheck(object):
+
+    __redirect_codes = (301, 302, 303, 307, 308)
+    __default_ports = {'http': 80, 'https': 443}
+
+    # Pool compartido para poder aplicar un timeout a getaddrinfo, que no tiene timeout propio.
+    __dns_executor = None
+    __dns_executor_lock = threading.Lock()
+
+    class Result(object):
+
+        def __init__(self, url: str):
+            self.url = url
+            self.url_final = url
+            self.code = 0
+            self.error = None
+            self.phase = None
+            self.redirects = 0
+            self.reused = False
+            self.timings = {'dns': 0.0, 'connect': 0.0, 'tls': 0.0, 'ttfb': 0.0, 'body': 0.0, 'total': 0.0}
+
+        @property
+        def is_ok(self) -> bool:
+            if self.error is None and self.code > 0:
+                return True
+            return False
+
+        def add_time(self, phase: str, seconds: float):
+            self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+        def as_dict(self) -> dict:
+            """ Datos del resultado con los tiempos en milisegundos. """
+            data = {'code': self.code, 'redirects': self.redirects, 'reused': self.reused}
+            for (phase, seconds) in self.timings.items():
+                data['time_{0}'.format(phase)] = round(seconds * 1000.0, 3)
+            if self.error is not None:
+                data['error'] = self.error
+                data['error_phase'] = self.phase
+            return data
+
+    class PhaseError(Exception):
+
+        def __init__(self, phase: str, message):
+            super().__init__(message)
+            self.phase = phase
+
+    class Deadline(object):
+
+        """
+        Limite total de tiempo de las lecturas del socket. http.client lee la respuesta con varios recv y el timeout
+        del socket se aplica a cada uno, un servidor que envía la respuesta byte a byte podría superar el timeout
+        muchas veces. Antes de cada recv se ajusta el timeout al tiempo que queda hasta deadline.
+
+        """
+
+        deadline = None
+
+        def recv_into(self, buffer, nbytes=0, flags=0):
+            if self.deadline is not None:
+                remaining = self.deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout("timed out")
+                self.settimeout(remaining)
+            return super().recv_into(buffer, nbytes, flags)
+
+    class DeadlineSocket(Deadline, socket.socket):
+        pass
+
+    class DeadlineSSLSocket(Deadline, ssl.SSLSocket):
+        pass
+
+    def __init__(self, timeout_dns: float = 5, timeout_connect: float = 5, timeout_tls: float = 5,
+                 timeout_ttfb: float = 10, max_redirects: int = 5, max_idle: int = 4, idle_timeout: float = 60,
+                 verify_ssl: bool = True, max_body: int = 65536, dns_ttl: float = 60):
+        """
+        :param timeout_dns: Timeout en segundos de la resolución DNS.
+        :param timeout_connect: Timeout en segundos de la conexión TCP.
+        :param timeout_tls: Timeout en segundos del handshake TLS.
+        :param timeout_ttfb: Timeout total en segundos hasta recibir la cabecera de la respuesta (y para leer el body).
+        :param max_redirects: Numero máximo de redirecciones que se siguen.
+        :param max_idle: Conexiones libres que se guardan por host.
+        :param idle_timeout: Segundos que se guarda una conexión libre antes de cerrarla.
+        :param verify_ssl: True se comprueba el certificado del servidor.
+        :param max_body: Bytes del body que se leen como máximo, si la respuesta es mayor se cierra la conexión.
+        :param dns_ttl: Segundos que se guarda la resolución DNS de un host.
+
+        """
+        self.timeout_dns = timeout_dns
+        self.timeout_connect = timeout_connect
+        self.timeout_tls = timeout_tls
+        self.timeout_ttfb = timeout_ttfb
+        self.max_redirects = max_redirects
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.verify_ssl = verify_ssl
+        self.max_body = max_body
+        self.dns_ttl = dns_ttl
+        self.__pool = {}
+        self.__dns_cache = {}
+        self.__lock = threading.Lock()
+        self.__ssl_context = None
+
+    @property
+    def ssl_context(self) -> ssl.SSLContext:
+        if self.__ssl_context is None:
+            context = ssl.create_default_context()
+            context.sslsocket_class = self.DeadlineSSLSocket
+            if not self.verify_ssl:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            self.__ssl_context = context
+        return self.__ssl_context
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """ Añade http:// a las url que no definen el protocolo. """
+        url = str(url).strip()
+        if '://' not in url:
+            url = 'http://' + url
+        return url
+
+    def check(self, url: str, method: str = 'GET') -> Result:
+        """
+        Hace la petición a la url siguiendo las redirecciones.
+
+        :param url: Url, si no tiene protocolo se usa http.
+        :param method: Método HTTP.
+        :return: Objeto Result.
+
+        """
+        result = self.Result(url)
+        url = self.normalize_url(url)
+        time_start = time.monotonic()
+        try:
+            while True:
+                result.url_final = url
+                code, location = self.__request(url, method, result)
+                result.code = code
+                if code not in self.__redirect_codes or not location:
+                    break
+                if result.redirects >= self.max_redirects:
+                    raise self.PhaseError('redirect', "Too many redirects ({0})".format(result.redirects))
+                result.redirects += 1
+                url = urljoin(url, location)
+                if code == 303:
+                    method = 'GET'
+
+        except self.PhaseError as ex:
+            result.error = str(ex)
+            result.phase = ex.phase
+
+        result.timings['total'] = time.monotonic() - time_start
+        return result
+
+    def __request(self, url: str, method: str, result: Result):
+        url_split = urlsplit(url)
+        scheme = url_split.scheme.lower()
+        if scheme not in self.__default_ports:
+            raise self.PhaseError('url', "Scheme {0} not supported".format(scheme))
+        host = url_split.hostname
+        if not host:
+            raise self.PhaseError('url', "Host not valid")
+        try:
+            port = url_split.port or self.__default_ports[scheme]
+        except ValueError as ex:
+            raise self.PhaseError('url', ex)
+        path = url_split.path or '/'
+        if url_split.query:
+            path += '?' + url_split.query
+
+        key = (scheme, host, port)
+        headers = {'User-Agent': 'watchful', 'Accept': '*/*', 'Connection': 'keep-alive'}
+
+        # Si falla una conexión reutilizada (el servidor la ha cerrado) se vuelve a intentar con una nueva.
+        for _ in range(2):
+            conn = self.__acquire(key)
+            reused = conn is not None
+            if conn is None:
+                conn = self.__connect(key, result)
+            result.reused = reused
+
+            try:
+                time_start = time.monotonic()
+                conn.sock.settimeout(self.timeout_ttfb)
+                conn.sock.deadline = time_start + self.timeout_ttfb
+                conn.request(method, path, headers=headers)
+                response = conn.getresponse()
+                result.add_time('ttfb', time.monotonic() - time_start)
+
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as ex:
+                conn.close()
+                if reused:
+                    continue
+                raise self.PhaseError('ttfb', ex)
+
+            except socket.timeout:
+                conn.close()
+                raise self.PhaseError('ttfb', "Timeout waiting for the first byte")
+
+            except (OSError, http.client.HTTPException) as ex:
+                conn.close()
+                raise self.PhaseError('ttfb', ex)
+
+            location = response.getheader('Location')
+            time_start = time.monotonic()
+            conn.sock.deadline = time_start + self.timeout_ttfb
+            self.__drain(key, conn, response)
+            result.add_time('body', time.monotonic() - time_start)
+            return response.status, location
+
+        raise self.PhaseError('ttfb', "Connection closed by the server")
+
+    def __drain(self, key, conn, response):
+        """ Lee el body (hasta max_body) y devuelve la conexión al pool si se puede reutilizar. """
+        try:
+            if response.length is not None and response.length > self.max_body:
+                conn.close()
+                return
+            data = response.read(self.max_body + 1)
+            if len(data) > self.max_body or not response.isclosed():
+                conn.close()
+                return
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            return
+
+        if response.will_close:
+            conn.close()
+        else:
+            conn.sock.deadline = None
+            self.__release(key, conn)
+
+    def __acquire(self, key):
+        now = time.monotonic()
+        with self.__lock:
+            idle = self.__pool.get(key, [])
+            while idle:
+                conn, last_used = idle.pop()
+                if now - last_used <= self.idle_timeout:
+                    return conn
+                conn.close()
+        return None
+
+    def __release(self, key, conn):
+        with self.__lock:
+            idle = self.__pool.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def close(self):
+        """ Cierra todas las conexiones del pool. """
+        with self.__lock:
+            for idle in self.__pool.values():
+                for (conn, _) in idle:
+                    conn.close()
+            self.__pool.clear()
+
+    @classmethod
+    def __get_dns_executor(cls):
+        with cls.__dns_executor_lock:
+            if cls.__dns_executor is None:
+                cls.__dns_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4,
+                                                                           thread_name_prefix='watchful-dns')
+            return cls.__dns_executor
+
+    def __resolve(self, host: str, port: int, result: Result):
+        now = time.monotonic()
+        with self.__lock:
+            cache = self.__dns_cache.get((host, port), None)
+        if cache is not None and now - cache[1] <= self.dns_ttl:
+            return cache[0]
+
+        time_start = time.monotonic()
+        future = self.__get_dns_executor().submit(socket.getaddrinfo, host, port, 0, socket.SOCK_STREAM)
+        try:
+            addr_info = future.result(timeout=self.timeout_dns)
+        except concurrent.futures.TimeoutError:
+            raise self.PhaseError('dns', "Timeout resolving {0}".format(host))
+        except (socket.gaierror, UnicodeError) as ex:
+            raise self.PhaseError('dns', ex)
+        finally:
+            result.add_time('dns', time.monotonic() - time_start)
+
+        with self.__lock:
+            self.__dns_cache[(host, port)] = (addr_info, time.monotonic())
+        return addr_info
+
+    def __connect(self, key, result: Result) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        addr_info = self.__resolve(host, port, result)
+
+        sock = None
+        error = None
+        time_start = time.monotonic()
+        for (family, sock_type, proto, _, sock_addr) in addr_info:
+            try:
+                sock = self.DeadlineSocket(family, sock_type, proto)
+                sock.settimeout(self.timeout_connect)
+                sock.connect(sock_addr)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                break
+            except OSError as ex:
+                error = ex
+                if sock is not None:
+                    sock.close()
+                sock = None
+        result.add_time('connect', time.monotonic() - time_start)
+
+        if sock is None:
+            if isinstance(error, socket.timeout):
+                error = "Timeout connecting to {0}:{1}".format(host, port)
+            raise self.PhaseError('connect', error or "No address for {0}".format(host))
+
+        if scheme == 'https':
+            time_start = time.monotonic()
+            try:
+                sock.settimeout(self.timeout_tls)
+                sock = self.ssl_context.wrap_socket(sock, server_hostname=host)
+            except socket.timeout:
+                sock.close()
+                raise self.PhaseError('tls', "Timeout in TLS handshake")
+            except (ssl.SSLError, OSError) as ex:
+                sock.close()
+                raise self.PhaseError('tls', ex)
+            finally:
+                result.add_time('tls', time.monotonic() - time_start)
+
+        # HTTPSConnection para que la cabecera Host no lleve el puerto cuando es el 443.
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, port, context=self.ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, port)
+        conn.sock = sock
+        return conn
+
+
+if __name__ == "__main__":
+    import sys
+
+    x = HttpCheck()
+    for item in sys.argv[1:] or ['www.example.com']:
+        r = x.check(item)
+        print(item, r.code, r.as_dict())
+        r = x.check(item)
+        print(item, r.code, r.as_dict())
+    x.close()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Motor ICMP (ping) sin procesos externos.
+
+Usa un único socket ICMP para todos los hosts. Primero intenta abrir un socket datagram ICMP (no necesita root si el
+usuario esta dentro de net.ipv4.ping_group_range) y si no es posible usa un socket raw. Todos los paquetes se envían
+sin esperar respuesta y las respuestas se asocian a su host por id y numero de secuencia, de forma que un barrido de
+cientos de hosts tarda lo mismo que el timeout mas largo.
+
+Ejemplo:
+    >>> engine = IcmpPing(interval=0.2)
+    >>> result = engine.sweep({'127.0.0.1': {'timeout': 2, 'attempt': 3}})
+    >>> result['127.0.0.1'].is_alive
+    True
+
+"""
+
+import os
+import time
+import errno
+import socket
+import struct
+import select
+import threading
+import concurrent.futures
+from lib.profiler import Profiler
+
+__all__ = ['IcmpPing']
+
+
+class IcmpPing(object):
+
+    __icmp_echo_request = 8
+    __icmp_echo_reply = 0
+
+    # Nº máximo de hilos que resuelven los nombres de los hosts a la vez.
+    __resolve_workers = 16
+
+    # Error de los hosts que no se han resuelto antes del deadline de resolve_all.
+    error_dns_timeout = "DNS timeout"
+
+    # None = no se ha comprobado, True/False = se puede o no se puede abrir un socket ICMP.
+    __available = None
+    __available_lock = threading.Lock()
+
+    class HostResult(object):
+
+        def __init__(self, host: str, address: str = None):
+            self.host = host
+            self.address = address
+            self.sent = 0
+            self.received = 0
+            self.rtt = []
+            self.error = None
+
+        @property
+        def is_alive(self) -> bool:
+            if self.received > 0:
+                return True
+            return False
+
+        @property
+        def loss(self) -> float:
+            """ Porcentaje de paquetes perdidos. """
+            if self.sent == 0:
+                return 100.0
+            return (self.sent - self.received) * 100.0 / self.sent
+
+        @property
+        def rtt_min(self) -> float:
+            return min(self.rtt) if self.rtt else None
+
+        @property
+        def rtt_max(self) -> float:
+            return max(self.rtt) if self.rtt else None
+
+        @property
+        def rtt_avg(self) -> float:
+            return sum(self.rtt) / len(self.rtt) if self.rtt else None
+
+        @property
+        def jitter(self) -> float:
+            """ Media de la diferencia entre RTT consecutivos (RFC 3550). """
+            if len(self.rtt) < 2:
+                return 0.0 if self.rtt else None
+            diff = [abs(self.rtt[i] - self.rtt[i - 1]) for i in range(1, len(self.rtt))]
+            return sum(diff) / len(diff)
+
+        def as_dict(self) -> dict:
+            """ Datos del resultado con los tiempos en milisegundos. """
+            def ms(val):
+                return round(val * 1000.0, 3) if val is not None else None
+
+            return {
+                'address': self.address,
+                'sent': self.sent,
+                'received': self.received,
+                'loss': round(self.loss, 1),
+                'rtt_min': ms(self.rtt_min),
+                'rtt_avg': ms(self.rtt_avg),
+                'rtt_max': ms(self.rtt_max),
+                'jitter': ms(self.jitter)
+            }
+
+    def __init__(self, timeout: float = 5, attempt: int = 3, interval: float = 0.2, payload_size: int = 56):
+        """
+        :param timeout: Segundos que se espera la respuesta de cada paquete si el host no define otro.
+        :param attempt: Paquetes que se envían a cada host si el host no define otro valor.
+        :param interval: Segundos entre cada ronda de paquetes.
+        :param payload_size: Tamaño en bytes de los datos del paquete.
+
+        """
+        self.timeout = timeout
+        self.attempt = attempt
+        self.interval = interval
+        self.payload_size = payload_size
+        self.__seq = 0
+
+    @staticmethod
+    def open_socket():
+        """
+        Abre el socket ICMP, primero datagram y si no se tiene permiso raw.
+
+        :return: Tupla (socket, is_raw).
+
+        """
+        try:
+            return socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+        except OSError:
+            return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """ Nos dice si se puede abrir un socket ICMP, el resultado se guarda para no volver a comprobarlo. """
+        with cls.__available_lock:
+            if cls.__available is None:
+                try:
+                    sock, _ = cls.open_socket()
+                    sock.close()
+                    cls.__available = True
+                except OSError:
+                    cls.__available = False
+            return cls.__available
+
+    @staticmethod
+    def resolve(host: str):
+        """ Retorna la IPv4 del host o None si no tiene. """
+        try:
+            info = socket.getaddrinfo(host, None, socket.AF_INET, socket.SOCK_RAW)
+        except (socket.gaierror, UnicodeError):
+            return None
+        return info[0][4][0] if info else None
+
+    @classmethod
+    def resolve_all(cls, hosts, timeout: float = None) -> dict:
+        """
+        Resuelve los hosts a la vez en un pool de hilos propio. Las direcciones IPv4 se retornan sin consultar el DNS.
+
+        :param hosts: Lista de hosts.
+        :param timeout: Segundos que se espera en total a que se resuelvan todos, None sin limite.
+        :return: Diccionario {host: (address, is_timeout)}, address es None si el host no tiene IPv4 o no se ha
+                 resuelto a tiempo.
+
+        """
+        data_return = {}
+        pending = []
+        for host in hosts:
+            try:
+                socket.inet_pton(socket.AF_INET, host)
+                data_return[host] = (host, False)
+            except (OSError, TypeError):
+                pending.append(host)
+        if not pending:
+            return data_return
+
+        # No se usa "with", al salir esperaría a los hilos que siguen bloqueados en getaddrinfo.
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(cls.__resolve_workers, len(pending)),
+                                                         thread_name_prefix='IcmpResolve')
+        futures = {}
+        try:
+            futures = {executor.submit(cls.resolve, host): host for host in pending}
+            done, _ = concurrent.futures.wait(futures, timeout)
+        finally:
+            # Los hosts que aun no han empezado no se resuelven (shutdown(cancel_futures) es de python 3.9).
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+        for (future, host) in futures.items():
+            if future in done:
+                data_return[host] = (future.result(), False)
+            else:
+                data_return[host] = (None, True)
+        return data_return
+
+    @staticmethod
+    def __checksum(data: bytes) -> int:
+        if len(data) % 2:
+            data += b'\x00'
+        total = sum(struct.unpack('!{0}H'.format(len(data) // 2), data))
+        total = (total >> 16) + (total & 0xffff)
+        total += total >> 16
+        return ~total & 0xffff
+
+    def __packet(self, ident: int, seq: int) -> bytes:
+        payload = bytes(i & 0xff for i in range(self.payload_size))
+        header = struct.pack('!BBHHH', self.__icmp_echo_request, 0, 0, ident, seq)
+        checksum = self.__checksum(header + payload)
+        return struct.pack('!BBHHH', self.__icmp_echo_request, 0, checksum, ident, seq) + payload
+
+    def __next_seq(self, pending: dict) -> int:
+        for _ in range(0x10000):
+            self.__seq = (self.__seq + 1) & 0xffff
+            if self.__seq not in pending:
+                return self.__seq
+        raise OverflowError("Too many ICMP probes in flight!")
+
+    def sweep(self, targets) -> dict:
+        """
+        Envía los pings a todos los hosts a la vez y espera las respuestas.
+
+        :param targets: Lista de hosts o diccionario {host: {'timeout': x, 'attempt': y}}.
+        :return: Diccionario {host: HostResult}.
+
+        """
+        if not isinstance(targets, dict):
+            targets = {host: {} for host in targets}
+
+        results = {}
+        probes = []
+        with Profiler.default().span('icmp', 'resolve'):
+            addresses = self.resolve_all(targets.keys(), self.timeout)
+        for (host, opts) in targets.items():
+            address, is_timeout = addresses[host]
+            results[host] = self.HostResult(host, address)
+            if address is None:
+                results[host].error = self.error_dns_timeout if is_timeout else "Unknown host"
+                continue
+            timeout = opts.get('timeout', self.timeout) or self.timeout
+            attempt = opts.get('attempt', self.attempt) or self.attempt
+            for n in range(int(attempt)):
+                probes.append((n, host, address, float(timeout)))
+
+        if not probes:
+            return results
+
+        # Ordenamos por ronda para enviar primero el paquete 0 de todos los hosts, luego el 1, etc.
+        probes.sort(key=lambda p: p[0])
+
+        sock, is_raw = self.open_socket()
+        try:
+            sock.setblocking(False)
+            if is_raw:
+                ident = os.getpid() & 0xffff
+            else:
+                # En los sockets datagram el kernel usa el puerto local como id.
+                sock.bind(('', 0))
+                ident = sock.getsockname()[1]
+            with Profiler.default().span('icmp', 'sweep'):
+                self.__run(sock, is_raw, ident, probes, results)
+        finally:
+            sock.close()
+
+        return results
+
+    def __run(self, sock, is_raw: bool, ident: int, probes: list, results: dict):
+        pending = {}
+        start = time.monotonic()
+        next_probe = 0
+        while next_probe < len(probes) or pending:
+            now = time.monotonic()
+
+            # Enviamos los paquetes de las rondas que ya toca enviar.
+            while next_probe < len(probes) and start + probes[next_probe][0] * self.interval <= now:
+                _, host, address, timeout = probes[next_probe]
+                seq = self.__next_seq(pending)
+                try:
+                    sock.sendto(self.__packet(ident, seq), (address, 0))
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError as ex:
+                    if ex.errno == errno.ENOBUFS:
+                        break
+                    results[host].error = str(ex)
+                    results[host].sent += 1
+                    next_probe += 1
+                    continue
+                pending[seq] = (host, address, time.monotonic(), time.monotonic() + timeout)
+                results[host].sent += 1
+                next_probe += 1
+
+            # Eliminamos los paquetes que han superado su timeout.
+            now = time.monotonic()
+            for seq in [s for (s, p) in pending.items() if p[3] <= now]:
+                del pending[seq]
+
+            if next_probe >= len(probes) and not pending:
+                break
+
+            wait = [p[3] for p in pending.values()]
+            if next_probe < len(probes):
+                wait.append(start + probes[next_probe][0] * self.interval)
+            wait_time = max(min(wait) - now, 0) if wait else 0
+
+            readable, _, _ = select.select([sock], [], [], wait_time)
+            if readable:
+                self.__read_replies(sock, is_raw, ident, pending, results)
+
+    def __read_replies(self, sock, is_raw: bool, ident: int, pending: dict, results: dict):
+        while True:
+            try:
+                data, addr = sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            recv_time = time.monotonic()
+
+            if is_raw:
+                # El socket raw incluye la cabecera IP.
+                data = data[(data[0] & 0x0f) * 4:]
+            if len(data) < 8:
+                continue
+
+            icmp_type, _, _, reply_id, reply_seq = struct.unpack('!BBHHH', data[:8])
+            if icmp_type != self.__icmp_echo_reply:
+                continue
+            if is_raw and reply_id != ident:
+                continue
+
+            probe = pending.get(reply_seq, None)
+            if probe is None or probe[1] != addr[0]:
+                continue
+            del pending[reply_seq]
+
+            host_result = results[probe[0]]
+            host_result.received += 1
+            host_result.rtt.append(recv_time - probe[2])
+
+
+if __name__ == "__main__":
+    import sys
+
+    x = IcmpPing(timeout=2, attempt=3)
+    for (k, v) in x.sweep(sys.argv[1:] or ['127.0.0.1']).items():
+        print(k, v.is_alive, v.error, v.as_dict())
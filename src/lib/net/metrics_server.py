@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Endpoint /metrics con formato Prometheus.
+
+El texto que se sirve es una foto (snapshot) que se genera con update() una vez por ciclo. Las peticiones solo
+devuelven esa foto, nunca ejecutan checks ni leen archivos, así que un scrape no cuesta nada al equipo.
+
+Ejemplo:
+    >>> server = MetricsServer('0.0.0.0', 9110)
+    >>> server.start()
+    >>> server.update(status.data, {'ping': {'time': 1571400000.0, 'duration': 0.5, 'ok': True}})
+    >>> server.stop()
+
+"""
+
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from lib import ObjectBase
+from lib.debug import DebugLevel
+from lib.history import HistoryStore
+
+__all__ = ['MetricsServer']
+
+
+class MetricsServer(ObjectBase):
+
+    __content_type = 'text/plain; version=0.0.4; charset=utf-8'
+    # Campos de other_data que no se exportan (umbrales de la configuración).
+    __default_exclude = ('alert', )
+
+    def __init__(self, host: str = '', port: int = 9110, exclude=None):
+        """
+        :param host: IP en la que se escucha, '' todas.
+        :param port: Puerto TCP.
+        :param exclude: Lista de campos de other_data que no se exportan.
+
+        """
+        self.host = host
+        self.port = port
+        self.exclude = tuple(exclude) if isinstance(exclude, (list, tuple)) else self.__default_exclude
+        self.__server = None
+        self.__thread = None
+        self.__lock = threading.Lock()
+        self.__snapshot = self.render({})
+
+    @property
+    def is_running(self) -> bool:
+        if self.__server is not None:
+            return True
+        return False
+
+    @property
+    def snapshot(self) -> bytes:
+        with self.__lock:
+            return self.__snapshot
+
+    def start(self):
+        """ Inicia el servidor HTTP en un hilo propio. """
+        if self.__server is not None:
+            return
+        metrics = self
+        content_type = self.__content_type
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.snapshot
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                metrics.debug.print(lambda: "> Metrics >> {0} - {1}".format(self.address_string(), format % args),
+                                    DebugLevel.debug)
+
+        self.__server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name='watchful-metrics', daemon=True)
+        self.__thread.start()
+        self.debug.print(lambda: "> Metrics >> Listen {0}:{1}/metrics".format(self.host or '*', self.port),
+                         DebugLevel.info)
+
+    def stop(self):
+        if self.__server is None:
+            return
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+        self.__server = None
+        self.__thread = None
+
+    @staticmethod
+    def __label(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+    @staticmethod
+    def __number(value: float) -> str:
+        return repr(float(value))
+
+    def __values(self, data: dict, prefix: str = '') -> list:
+        values = []
+        for (key, value) in data.items():
+            if isinstance(value, bool) or key in self.exclude:
+                continue
+            name = "{0}{1}".format(prefix, key)
+            if isinstance(value, dict):
+                if not prefix:
+                    values.extend(self.__values(value, name + '.'))
+                continue
+            value = HistoryStore.to_number(value)
+            if value is not None:
+                values.append((name, value))
+        return values
+
+    def render(self, status: dict, modules: dict = None, spans: dict = None) -> bytes:
+        """
+        Genera el texto de las métricas.
+
+        :param status: Datos del estado {modulo: {key: {'status': bool, 'other_data': dict}}}.
+        :param modules: Datos de la ultima ejecución de cada modulo {modulo: {'time', 'duration', 'ok'}}.
+        :param spans: Tiempos medidos por el profiler {(kind, name): Histogram}.
+        :return: Texto en formato Prometheus.
+
+        """
+        lines_status = []
+        lines_value = []
+        for (module, items) in sorted(status.items()):
+            if not isinstance(items, dict):
+                continue
+            for (key, item) in sorted(items.items()):
+                if not isinstance(item, dict):
+                    continue
+                labels = 'module="{0}",key="{1}"'.format(self.__label(module), self.__label(key))
+                if isinstance(item.get('status', None), bool):
+                    lines_status.append('watchful_check_status{{{0}}} {1}'.format(labels, int(item['status'])))
+                other_data = item.get('other_data', None)
+                if isinstance(other_data, dict):
+                    for (field, value) in self.__values(other_data):
+                        lines_value.append('watchful_check_value{{{0},field="{1}"}} {2}'.format(
+                            labels, self.__label(field), self.__number(value)))
+
+        lines = [
+            '# HELP watchful_check_status Status of the check (1 ok, 0 error).',
+            '# TYPE watchful_check_status gauge'
+        ]
+        lines.extend(lines_status)
+        lines.extend([
+            '# HELP watchful_check_value Numeric values of the check (other_data).',
+            '# TYPE watchful_check_value gauge'
+        ])
+        lines.extend(lines_value)
+
+        if modules:
+            for (metric, field, m_help) in (
+                    ('watchful_module_last_run_timestamp_seconds', 'time', 'Time of the last run of the module.'),
+                    ('watchful_module_duration_seconds', 'duration', 'Duration of the last run of the module.'),
+                    ('watchful_module_ok', 'ok', 'Last run of the module returned valid data (1) or failed (0).')):
+                lines.append('# HELP {0} {1}'.format(metric, m_help))
+                lines.append('# TYPE {0} gauge'.format(metric))
+                for (module, data) in sorted(modules.items()):
+                    lines.append('{0}{{module="{1}"}} {2}'.format(metric, self.__label(module),
+                                                                 self.__number(data[field])))
+
+        if spans:
+            lines.extend([
+                '# HELP watchful_span_seconds Duration of the spans (modules, targets, commands, telegram...).',
+                '# TYPE watchful_span_seconds summary'
+            ])
+            lines_max = [
+                '# HELP watchful_span_max_seconds Maximum duration of the spans.',
+                '# TYPE watchful_span_max_seconds gauge'
+            ]
+            for ((kind, name), hist) in sorted(spans.items()):
+                labels = 'kind="{0}",name="{1}"'.format(self.__label(kind), self.__label(name))
+                for q in (0.5, 0.95):
+                    lines.append('watchful_span_seconds{{{0},quantile="{1}"}} {2}'.format(
+                        labels, q, self.__number(hist.quantile(q))))
+                lines.append('watchful_span_seconds_sum{{{0}}} {1}'.format(labels, self.__number(hist.sum)))
+                lines.append('watchful_span_seconds_count{{{0}}} {1}'.format(labels, hist.count))
+                lines_max.append('watchful_span_max_seconds{{{0}}} {1}'.format(labels, self.__number(hist.max)))
+            lines.extend(lines_max)
+
+        lines.extend([
+            '# HELP watchful_snapshot_timestamp_seconds Time the metrics were generated.',
+            '# TYPE watchful_snapshot_timestamp_seconds gauge',
+            'watchful_snapshot_timestamp_seconds {0}'.format(self.__number(time.time()))
+        ])
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def update(self, status: dict, modules: dict = None, spans: dict = None):
+        """ Genera la foto nueva que se servirá en /metrics. """
+        snapshot = self.render(status, modules, spans)
+        with self.__lock:
+            self.__snapshot = snapshot
@@ -0,0 +1,4 @@
+from .histogram import Histogram
+from .profiler import Profiler
+
+__all__ = ['Histogram', 'Profiler']
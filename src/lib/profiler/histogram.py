@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Histograma de duraciones con memoria fija.
+
+Las duraciones se cuentan en cubos con limites en escala logarítmica (cada cubo es un 19% mayor que el anterior,
+desde 10 µs hasta mas de 15 minutos), así el histograma ocupa lo mismo con 10 muestras que con un millón y los
+percentiles tienen un error menor que el ancho de un cubo.
+
+Ejemplo:
+    >>> h = Histogram()
+    >>> for x in (0.010, 0.012, 0.011, 0.250):
+    ...     h.add(x)
+    >>> h.count, h.max
+    (4, 0.25)
+    >>> h.quantile(0.95)        # Aproximado, dentro del cubo de 0.25.
+
+"""
+
+import math
+from array import array
+
+__all__ = ['Histogram']
+
+
+class Histogram(object):
+
+    # Limite inferior del primer cubo (segundos) y factor entre cubos (2 ** (1/4)).
+    __min = 1e-5
+    __factor = 2 ** 0.25
+    __buckets = 112
+
+    __slots__ = ('counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self):
+        self.counts = array('L', [0] * (self.__buckets + 1))
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def bound(cls, index: int) -> float:
+        """ Limite superior del cubo. """
+        return cls.__min * cls.__factor ** index
+
+    @classmethod
+    def __index(cls, value: float) -> int:
+        if value <= cls.__min:
+            return 0
+        return min(int(math.ceil(math.log(value / cls.__min, cls.__factor))), cls.__buckets)
+
+    def add(self, value: float):
+        if value < 0:
+            value = 0.0
+        self.counts[self.__index(value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q: float) -> float:
+        """ Percentil q (0..1) interpolando dentro del cubo, None si no hay muestras. """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for (index, count) in enumerate(self.counts):
+            if not count:
+                continue
+            if seen + count >= rank:
+                low = self.bound(index - 1) if index > 0 else 0.0
+                # El ultimo cubo no tiene limite superior, cuenta todo lo que pasa de bound(__buckets - 1).
+                high = self.bound(index) if index < self.__buckets else max(self.max, low)
+                value = low + (high - low) * max(rank - seen, 0) / count
+                return min(max(value, self.min), self.max)
+            seen += count
+        return self.max
+
+    def merge(self, other):
+        for (index, count) in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95)
+        }
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Medición del tiempo (spans) de los checks, los targets, los comandos y los envíos de Telegram.
+
+Cada span tiene un tipo (kind) y un nombre, por ejemplo ('module', 'ping'), ('target', 'ping/192.168.1.1'),
+('exec', 'systemctl') o ('telegram', 'sendMessage'). Las duraciones se guardan en un Histogram por span, en memoria, y
+se pueden consultar (stats), mostrar en una tabla (report, main.py --profile) o exportar (/metrics).
+
+Ejemplo:
+    >>> with Profiler.default().span('target', 'web/www.atareao.es'):
+    ...     check_url()
+    >>> print(Profiler.default().report())
+
+"""
+
+import time
+import threading
+from lib.profiler import Histogram
+
+__all__ = ['Profiler']
+
+
+class Profiler(object):
+
+    __default = None
+    __default_lock = threading.Lock()
+
+    class Span(object):
+
+        __slots__ = ('profiler', 'kind', 'name', 'start')
+
+        def __init__(self, profiler, kind: str, name: str):
+            self.profiler = profiler
+            self.kind = kind
+            self.name = name
+            self.start = None
+
+        def __enter__(self):
+            self.start = time.perf_counter()
+            return self
+
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            self.profiler.record(self.kind, self.name, time.perf_counter() - self.start)
+            return False
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.__spans = {}
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """ Profiler compartido por todo el proceso. """
+        if cls.__default is None:
+            with cls.__default_lock:
+                if cls.__default is None:
+                    cls.__default = cls()
+        return cls.__default
+
+    def span(self, kind: str, name: str) -> Span:
+        """ Context manager que mide el tiempo del bloque. """
+        return self.Span(self, kind, name)
+
+    def record(self, kind: str, name: str, seconds: float):
+        if not self.enabled:
+            return
+        key = (kind, name)
+        with self.__lock:
+            hist = self.__spans.get(key, None)
+            if hist is None:
+                hist = self.__spans[key] = Histogram()
+            hist.add(seconds)
+
+    def clear(self):
+        with self.__lock:
+            self.__spans.clear()
+
+    def merge(self, stats: dict):
+        """ Suma los histogramas de stats() de otro Profiler (por ejemplo el de un proceso del ModulePool). """
+        if not self.enabled:
+            return
+        with self.__lock:
+            for (key, other) in stats.items():
+                hist = self.__spans.get(key, None)
+                if hist is None:
+                    hist = self.__spans[key] = Histogram()
+                hist.merge(other)
+
+    def stats(self) -> dict:
+        """ Copia de los histogramas {(kind, name): Histogram}. """
+        with self.__lock:
+            stats = {}
+            for (key, hist) in self.__spans.items():
+                stats[key] = Histogram()
+                stats[key].merge(hist)
+            return stats
+
+    def report(self, kind: str = None) -> str:
+        """ Tabla con count, total, p50, p95 y max (ms) de cada span, ordenada por tiempo total. """
+        stats = self.stats()
+        lines = ["{0:<10} {1:<50} {2:>7} {3:>11} {4:>10} {5:>10} {6:>10}".format(
+            "Kind", "Span", "Count", "Total (s)", "p50 (ms)", "p95 (ms)", "Max (ms)")]
+        for ((span_kind, name), hist) in sorted(stats.items(), key=lambda item: item[1].sum, reverse=True):
+            if kind is not None and span_kind != kind:
+                continue
+            lines.append("{0:<10} {1:<50} {2:>7} {3:>11.3f} {4:>10.2f} {5:>10.2f} {6:>10.2f}".format(
+                span_kind, name[:50], hist.count, hist.sum, hist.quantile(0.5) * 1000, hist.quantile(0.95) * 1000,
+                hist.max * 1000))
+        return "\n".join(lines)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Motor de ejecución persistente.
+
+El Scheduler mantiene un event loop de asyncio en un hilo propio y un pool de hilos que se reutiliza entre ciclos.
+Las funciones async se ejecutan directamente en el loop y las funciones sync se ejecutan en el pool de hilos, de
+forma que las dos pueden convivir dentro del mismo ciclo.
+
+Ejemplo:
+    >>> s = Scheduler(2)
+    >>> s.submit(sum, [1, 2, 3]).result()
+    6
+    >>> s.stop()
+
+"""
+
+import asyncio
+import functools
+import threading
+import concurrent.futures
+from lib import ObjectBase
+from lib.debug import DebugLevel
+
+__all__ = ['Scheduler']
+
+
+class Scheduler(ObjectBase):
+
+    # Nº de hilos que se usaran en el pool como valor por defecto.
+    __default_workers = 5
+
+    def __init__(self, max_workers: int = None):
+        self.__loop = None
+        self.__thread = None
+        self.__executor = None
+        self.__lock = threading.Lock()
+        # Marca los hilos del pool, desde ellos no se puede parar el scheduler.
+        self.__pool_local = threading.local()
+        self.max_workers = max_workers
+
+    @property
+    def max_workers(self) -> int:
+        return self.__max_workers
+
+    @max_workers.setter
+    def max_workers(self, val: int):
+        if not isinstance(val, int) or val <= 0:
+            val = self.__default_workers
+        self.__max_workers = val
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """ Event loop del scheduler, se inicia si aun no se ha iniciado. """
+        self.start()
+        return self.__loop
+
+    @property
+    def is_running(self) -> bool:
+        if self.__loop is not None and self.__loop.is_running():
+            return True
+        return False
+
+    @property
+    def is_loop_thread(self) -> bool:
+        """ Nos dice si estamos en el hilo del event loop. """
+        if self.__thread is not None and threading.current_thread() is self.__thread:
+            return True
+        return False
+
+    @property
+    def is_pool_thread(self) -> bool:
+        """ Nos dice si estamos en uno de los hilos del pool. """
+        return getattr(self.__pool_local, 'is_pool', False)
+
+    def __init_pool_thread(self):
+        self.__pool_local.is_pool = True
+
+    def start(self) -> bool:
+        """
+        Inicia el event loop y el pool de hilos. Si ya están iniciados no hace nada.
+
+        :return: True si se ha iniciado ahora, False si ya estaba iniciado.
+
+        """
+        with self.__lock:
+            if self.__loop is not None:
+                return False
+
+            self.__executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers,
+                                                                    thread_name_prefix='watchful',
+                                                                    initializer=self.__init_pool_thread)
+            self.__loop = asyncio.new_event_loop()
+            self.__loop.set_default_executor(self.__executor)
+
+            loop_ready = threading.Event()
+            self.__thread = threading.Thread(target=self.__run_loop, args=(loop_ready,),
+                                             name='watchful-scheduler', daemon=True)
+            self.__thread.start()
+            loop_ready.wait()
+            self.debug.print(lambda: "> Scheduler >> Start (Workers: {0})".format(self.max_workers), DebugLevel.debug)
+            return True
+
+    def __run_loop(self, loop_ready: threading.Event):
+        asyncio.set_event_loop(self.__loop)
+        self.__loop.call_soon(loop_ready.set)
+        self.__loop.run_forever()
+
+    def stop(self, wait: bool = True):
+        """
+        Para el event loop y el pool de hilos. Si se llama desde el hilo del event loop (una corutina o un callback
+        del loop) no se puede esperar a que el loop termine, se le pide que pare y el cierre se hace en otro hilo
+        cuando termina, la función retorna sin esperar.
+
+        :param wait: True espera a que terminen los trabajos que se están ejecutando en el pool de hilos.
+        :raises RuntimeError: Si se llama desde un hilo del pool, el pool no puede esperar a su propio hilo.
+
+        """
+        if self.is_pool_thread:
+            raise RuntimeError("Scheduler.stop() can not be called from a thread of its own pool")
+        with self.__lock:
+            if self.__loop is None:
+                return
+            loop, thread, executor = self.__loop, self.__thread, self.__executor
+            self.__loop = self.__thread = self.__executor = None
+
+        if thread is threading.current_thread():
+            threading.Thread(target=self.__close, args=(loop, thread, executor, wait),
+                             name='watchful-scheduler-stop', daemon=True).start()
+            return
+        self.__close(loop, thread, executor, wait)
+
+    def __close(self, loop: asyncio.AbstractEventLoop, thread: threading.Thread,
+                executor: concurrent.futures.ThreadPoolExecutor, wait: bool):
+        try:
+            asyncio.run_coroutine_threadsafe(self.__cancel_tasks(), loop).result()
+        except concurrent.futures.CancelledError:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        executor.shutdown(wait=wait)
+        loop.close()
+        self.debug.print("> Scheduler >> Stop", DebugLevel.debug)
+
+    @staticmethod
+    async def __cancel_tasks():
+        """ Cancela las tareas pendientes del loop para que no queden a medias al parar. """
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run_sync(self, func, *args, **kwargs):
+        """ Ejecuta una función sync en el pool de hilos sin bloquear el event loop. """
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    def submit(self, func, *args, **kwargs) -> concurrent.futures.Future:
+        """
+        Envía un trabajo al scheduler. Acepta funciones sync, funciones async y corutinas ya creadas.
+
+        :param func: Función o corutina a ejecutar.
+        :return: Future (concurrent.futures) con el resultado del trabajo.
+
+        """
+        if asyncio.iscoroutine(func):
+            coro = func
+        elif asyncio.iscoroutinefunction(func):
+            coro = func(*args, **kwargs)
+        else:
+            coro = self.run_sync(func, *args, **kwargs)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def map(self, func, items) -> dict:
+        """
+        Envía un trabajo por cada item.
+
+        :param func: Función (sync o async) que recibirá el item como parámetro.
+        :param items: Lista de items.
+        :return: Diccionario {future: item}, preparado para usar con concurrent.futures.as_completed.
+
+        """
+        return {self.submit(func, item): item for item in items}
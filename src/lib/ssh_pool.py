@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Pool de sesiones SSH.
+
+Guarda un cliente SSH autenticado por (host, port, user) para todo el proceso. Cada comando abre un canal nuevo sobre
+el transporte que ya existe, así que solo se negocian claves y se autentica la primera vez. Los transportes envían
+keepalive y los que no se usan durante max_idle segundos se cierran.
+
+paramiko (y toda su parte de criptografía) se importa al crear la primera sesión, los procesos que no usan SSH no
+pagan el coste de importarlo.
+
+Ejemplo:
+    >>> client = SSHPool.default().get_client('192.168.1.10', 22, 'pi', 'pi', 10)
+    >>> _, stdout, _ = client.exec_command('uptime')
+
+"""
+
+import time
+import threading
+
+__all__ = ['SSHPool']
+
+
+class SSHPool(object):
+
+    __default_pool = None
+    __default_pool_lock = threading.Lock()
+
+    class PoolEntry(object):
+
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.client = None
+            self.password = None
+            self.last_used = 0
+
+        @property
+        def is_active(self) -> bool:
+            if self.client is not None:
+                transport = self.client.get_transport()
+                if transport is not None and transport.is_active():
+                    return True
+            return False
+
+        def close(self):
+            if self.client is not None:
+                try:
+                    self.client.close()
+                except Exception:
+                    pass
+                self.client = None
+
+    def __init__(self, max_idle: float = 600, keepalive: int = 30):
+        """
+        :param max_idle: Segundos sin usar una sesión antes de cerrarla.
+        :param keepalive: Segundos entre cada keepalive del transporte, 0 para desactivarlo.
+
+        """
+        self.max_idle = max_idle
+        self.keepalive = keepalive
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """ Pool compartido por todo el proceso. """
+        with cls.__default_pool_lock:
+            if cls.__default_pool is None:
+                cls.__default_pool = cls()
+            return cls.__default_pool
+
+    @classmethod
+    def close_default(cls):
+        """ Cierra las sesiones del pool compartido si se ha creado, no lo crea. """
+        with cls.__default_pool_lock:
+            pool = cls.__default_pool
+        if pool is not None:
+            pool.close()
+
+    @property
+    def count(self) -> int:
+        """ Numero de sesiones abiertas. """
+        with self.__lock:
+            return len([e for e in self.__entries.values() if e.client is not None])
+
+    def __get_entry(self, key):
+        now = time.monotonic()
+        with self.__lock:
+            for (entry_key, entry) in list(self.__entries.items()):
+                if entry_key != key and entry.client is not None and now - entry.last_used > self.max_idle:
+                    if entry.lock.acquire(blocking=False):
+                        try:
+                            entry.close()
+                        finally:
+                            entry.lock.release()
+            return self.__entries.setdefault(key, self.PoolEntry())
+
+    def get_client(self, host: str, port: int, user: str, password: str = None,
+                   timeout: float = None) -> 'paramiko.SSHClient':
+        """
+        Retorna un cliente SSH conectado y autenticado, si no existe o la sesión se ha perdido se conecta de nuevo.
+
+        :param host: Nombre del host o IP.
+        :param port: Puerto que usa SSH.
+        :param user: Nombre de usuario.
+        :param password: Password del usuario.
+        :param timeout: Timeout al intentar conectar.
+        :return: paramiko.SSHClient
+
+        """
+        entry = self.__get_entry((host, port, user))
+        with entry.lock:
+            if entry.client is not None and (entry.password != password or not entry.is_active):
+                entry.close()
+
+            if entry.client is None:
+                import paramiko
+                client = paramiko.SSHClient()
+                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+                try:
+                    client.connect(hostname=host,
+                                   port=port,
+                                   username=user,
+                                   password=password,
+                                   timeout=timeout)
+                except Exception:
+                    client.close()
+                    raise
+                if self.keepalive:
+                    client.get_transport().set_keepalive(self.keepalive)
+                entry.client = client
+                entry.password = password
+
+            entry.last_used = time.monotonic()
+            return entry.client
+
+    def is_active(self, host: str, port: int, user: str) -> bool:
+        """ Nos dice si ya existe una sesión activa para (host, port, user). """
+        with self.__lock:
+            entry = self.__entries.get((host, port, user), None)
+        return entry is not None and entry.is_active
+
+    def discard(self, host: str, port: int, user: str):
+        """ Cierra la sesión, se usa cuando falla un comando sobre una sesión que ya existía. """
+        with self.__lock:
+            entry = self.__entries.pop((host, port, user), None)
+        if entry is not None:
+            with entry.lock:
+                entry.close()
+
+    def close(self):
+        """ Cierra todas las sesiones del pool. """
+        with self.__lock:
+            entries = list(self.__entries.values())
+            self.__entries.clear()
+        for entry in entries:
+            with entry.lock:
+                entry.close()
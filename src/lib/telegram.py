@@ -23,33 +23,58 @@
 
 
 import threading
-import requests
+import collections
 from lib.debug import DebugLevel
 from lib import ObjectBase
-from time import sleep
+from lib.profiler import Profiler
 
 __all__ = ['Telegram']
 
 
 class Telegram(ObjectBase):
 
-    def __init__(self, token, chat_id):
+    # Tamaño máximo de un mensaje de Telegram.
+    __max_len_message = 4096
+
+    def __init__(self, token, chat_id, retries: int = 3, backoff: float = 1, timeout: float = 10):
+        """
+        :param token: Token del bot.
+        :param chat_id: Chat al que se envían los mensajes.
+        :param retries: Nº de reintentos si falla el envío de un mensaje.
+        :param backoff: Segundos de espera antes del primer reintento, se dobla en cada reintento.
+        :param timeout: Timeout en segundos de cada petición a la API.
+
+        """
         self.token = token
         self.chat_id = chat_id
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
         # Set values
         self.list_msg = None
         self.count_msg = None
         self.count_msg_send = None
         self.group_messages = None
-        self.stop = None
+        self.__session = None
+        self.__stop = False
+        self.__busy = False
+        self.__cond = threading.Condition()
+        # El hilo de envío se crea con el primer mensaje, si no hay token no se crea.
+        self.pool_send_msg = None
         self.__default()
-        self.__init_pool()
 
     def __init_pool(self):
-        self.stop = False
-        self.pool_send_msg = threading.Thread(target=self.pool_run, daemon=True)
+        self.__stop = False
+        self.pool_send_msg = threading.Thread(target=self.pool_run, name='watchful-telegram', daemon=True)
         self.pool_send_msg.start()
 
+    @property
+    def is_configured(self) -> bool:
+        """ Nos dice si hay token y chat, sin ellos no se envían mensajes. """
+        if self.token and self.chat_id:
+            return True
+        return False
+
     @property
     def group_messages(self) -> bool:
         return self.__group_messages
@@ -58,13 +83,27 @@ class Telegram(ObjectBase):
     def group_messages(self, val: bool):
         self.__group_messages = val
 
+    @property
+    def session(self) -> 'requests.Session':
+        """
+        Sesión HTTP que se reutiliza en todos los envíos (keep-alive con la API). requests se importa aquí, con el
+        primer envío, para no cargarlo en cada arranque.
+
+        """
+        if self.__session is None:
+            import requests
+            self.__session = requests.Session()
+        return self.__session
+
     def __default(self):
         self.group_messages = False
         self.clear()
 
     def clear(self):
-        self.list_msg = []
-        self.reset_count()
+        with self.__cond:
+            self.list_msg = collections.deque()
+            self.reset_count()
+            self.__cond.notify_all()
 
     def reset_count(self):
         self.count_msg = 0
@@ -73,20 +112,52 @@ class Telegram(ObjectBase):
     def send_message(self, message):
         self.add_list(message)
 
-    def send_message_end(self, hostname):
+    def send_message_end(self, hostname, timeout: float = None) -> bool:
+        """
+        Envía el resumen de los mensajes y espera a que se hayan enviado todos.
+
+        :param hostname: Nombre del host que se muestra en el resumen.
+        :param timeout: Segundos que se espera como máximo, None espera sin limite.
+        :return: True si se han enviado todos los mensajes, False si se ha superado el timeout.
+
+        """
         if self.count_msg > 0:
             s_message = "Summary *{0}*, get *{1}* new Message.".format(hostname, self.count_msg)
             s_message = "{0} {1} {2}{2}{2}".format(u'\U00002139', s_message, u'\U0000261D')
             self.add_list(s_message)
-            # Sleep para asegurarnos de que el mensaje anterior esta en la lista antes de iniciar el siguiente While.
-            sleep(1)
-
-        # Esperamos a que la lista de mensajes esta vacía.
-        while True:
-            if self.is_entry_list:
-                break
 
+        is_flush = self.flush(timeout)
         self.reset_count()
+        return is_flush
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Espera a que la lista de mensajes este vacía y no se este enviando ninguno.
+
+        :param timeout: Segundos que se espera como máximo, None espera sin limite.
+        :return: True si se han enviado todos los mensajes, False si se ha superado el timeout.
+
+        """
+        with self.__cond:
+            return self.__cond.wait_for(lambda: self.is_entry_list and not self.__busy, timeout)
+
+    def close(self, timeout: float = None):
+        """
+        Envía los mensajes pendientes, para el hilo de envío y cierra la sesión HTTP.
+
+        :param timeout: Segundos que se espera como máximo a que se envíen los mensajes pendientes.
+
+        """
+        self.flush(timeout)
+        with self.__cond:
+            self.__stop = True
+            self.__cond.notify_all()
+        if self.pool_send_msg is not None:
+            self.pool_send_msg.join(timeout)
+            self.pool_send_msg = None
+        if self.__session is not None:
+            self.__session.close()
+            self.__session = None
 
     @property
     def is_entry_list(self) -> bool:
@@ -95,42 +166,110 @@ class Telegram(ObjectBase):
         return True
 
     def add_list(self, message):
-        # Efectuamos insert para mantener el orden.
-        if self.list_msg is None:
-            self.clear()
-        self.list_msg.append(message)
-        self.count_msg += 1
+        if not self.is_configured:
+            self.debug.print(lambda: "Telegram >> Not configured (token/chat id), message discarded: "
+                                     "{0}".format(message), DebugLevel.debug)
+            return
+        with self.__cond:
+            if self.list_msg is None:
+                self.clear()
+            self.list_msg.append(message)
+            self.count_msg += 1
+            if self.pool_send_msg is None:
+                self.__init_pool()
+            self.__cond.notify_all()
+
+    def __get_messages(self) -> list:
+        """ Espera hasta que haya mensajes y los saca de la lista. Retorna None cuando se para el hilo. """
+        with self.__cond:
+            self.__busy = False
+            self.__cond.notify_all()
+            self.__cond.wait_for(lambda: self.__stop or not self.is_entry_list)
+            if self.is_entry_list:
+                return None
+            self.__busy = True
+            if self.group_messages:
+                msgs = list(self.list_msg)
+                self.list_msg.clear()
+            else:
+                msgs = [self.list_msg.popleft()]
+            return msgs
 
     def pool_run(self):
-        self.stop = False
-        msg_group = ''
-        while_run = True
-        while while_run:
-            if not self.is_entry_list:
-                msg = self.list_msg.pop(0)
-                self.debug.print("Telegram > Send >> Msg: {0}".format(msg))
-                if self.group_messages:
-                    msg_group += msg + "\n"
-                else:
-                    # TODO: Pendiente que hacer cuando falle el envío.
-                    self.api_send_message(msg)
-                self.count_msg_send += 1
+        while True:
+            msgs = self.__get_messages()
+            if msgs is None:
+                break
+            for msg in msgs:
+                self.debug.print(lambda: "Telegram > Send >> Msg: {0}".format(msg))
+            if self.group_messages:
+                for msg_group in self.__group(msgs):
+                    self.__send_retry(msg_group)
             else:
-                if self.group_messages:
-                    if msg_group:
-                        self.api_send_message(msg_group)
-                        msg_group = ''
-                else:
-                    if self.stop:
-                        while_run = False
-        return
+                self.__send_retry(msgs[0])
+            with self.__cond:
+                self.count_msg_send += len(msgs)
+
+    def __group(self, msgs: list) -> list:
+        """ Une los mensajes en bloques que no superen el tamaño máximo de un mensaje de Telegram. """
+        groups = []
+        msg_group = ''
+        for msg in msgs:
+            if msg_group and len(msg_group) + len(msg) + 1 > self.__max_len_message:
+                groups.append(msg_group)
+                msg_group = ''
+            msg_group += msg + "\n"
+        if msg_group:
+            groups.append(msg_group)
+        return groups
+
+    def __send_retry(self, message) -> bool:
+        wait = self.backoff
+        for attempt in range(self.retries + 1):
+            is_send, code_return, retry_after = self.__api_send(message)
+            if is_send:
+                return True
+            # Solo se reintentan los errores de red (0), limite de peticiones (429) y los errores del servidor (5xx).
+            if code_return < 0 or (code_return != 0 and code_return != 429 and code_return < 500):
+                break
+            if attempt >= self.retries:
+                break
+            wait_time = max(wait, retry_after or 0)
+            self.debug.print(lambda: "Telegram >> API >> Retry in {0} seg (Code: {1})".format(wait_time, code_return),
+                             DebugLevel.warning)
+            with self.__cond:
+                # Si nos piden parar no seguimos esperando.
+                if self.__cond.wait_for(lambda: self.__stop, wait_time):
+                    break
+            wait *= 2
+
+        self.debug.print(lambda: "Telegram >> API >> Error: Message not sent (Code: {0})".format(code_return),
+                         DebugLevel.error)
+        return False
 
     def api_send_message(self, message):
+        is_send, code_return, _ = self.__api_send(message)
+        return is_send, code_return
+
+    def __api_send(self, message):
+        import requests
         code_return = 0
+        retry_after = None
         if message and self.token and self.chat_id:
-            result = requests.post('https://api.telegram.org/bot{0}/sendMessage'.format(self.token),
-                                   data={'chat_id': self.chat_id, 'text': message, 'parse_mode': 'Markdown'})
-            code_return = result.status_code
+            try:
+                with Profiler.default().span('telegram', 'sendMessage'):
+                    result = self.session.post('https://api.telegram.org/bot{0}/sendMessage'.format(self.token),
+                                               data={'chat_id': self.chat_id, 'text': message,
+                                                     'parse_mode': 'Markdown'},
+                                               timeout=self.timeout)
+                code_return = result.status_code
+                if code_return == 429:
+                    try:
+                        retry_after = result.json().get('parameters', {}).get('retry_after', None)
+                    except ValueError:
+                        pass
+            except requests.RequestException as ex:
+                self.debug.print(lambda: "Telegram >> API >> Exception: {0}".format(ex), DebugLevel.warning)
         else:
             if not self.token:
                 self.debug.print("Telegram >> API >> Error: Telegram Token is Null", DebugLevel.error)
@@ -140,9 +279,10 @@ class Telegram(ObjectBase):
                 code_return -= 2
 
         # >0 = HTTP Status_Code
+        #  0 = Error de red
         # -1 = Token is Null
         # -2 = Chat Id is Null
         # -3 = Token And Chat Id is Null
-        return True if code_return == 200 else False, code_return
+        return True if code_return == 200 else False, code_return, retry_after
 
 # https://apps.timwhitlock.info/emoji/tables/unicode
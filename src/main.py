@@ -27,10 +27,27 @@ import sys
 import time
 import argparse
 
-from lib import Monitor
-from lib import ObjectBase
-from lib.debug import DebugLevel
-from lib.config import ConfigControl
+# Inicio de los imports de lib, los tiempos del arranque se muestran con --startup.
+time_imports = time.perf_counter()
+
+from lib import Monitor  # noqa: E402
+from lib import ObjectBase  # noqa: E402
+from lib.debug import DebugLevel  # noqa: E402
+from lib.config import ConfigControl  # noqa: E402
+from lib.profiler import Profiler  # noqa: E402
+
+time_imports = time.perf_counter() - time_imports
+
+
+def time_process() -> float:
+    """ Segundos desde que se creo el proceso (arranque del interprete incluido), None si no hay /proc. """
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            # El campo 22 (starttime) esta en ticks desde el arranque del sistema, el nombre (2) puede tener espacios.
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
 
 
 class Main(ObjectBase):
@@ -44,14 +61,28 @@ class Main(ObjectBase):
     __cfg_file_modules = 'modules.json'
 
     def __init__(self, args_get):
+        self.__history = None
+        self.__profile = None
+        self.__startup = False
+        self.__timing = {}
+        self.__timing_mark('interpreter', time_process(), time_imports)
+        self.__timing_mark('imports', time_imports)
         self._daemon_mode = False
         self._timer_check = 0
         self.__sys_path_append([self._modules_dir])
         self.__args_set(args_get)
+        time_start = time.perf_counter()
         self.__init_config()
+        self.__timing_mark('config', time.perf_counter() - time_start)
+        time_start = time.perf_counter()
         self.__init_monitor()
+        self.__timing_mark('monitor', time.perf_counter() - time_start)
         self.__args_cmd(args_get)
 
+    def __timing_mark(self, name: str, seconds: float, minus: float = 0):
+        if seconds is not None:
+            self.__timing[name] = max(seconds - minus, 0)
+
     def __init_config(self):
         self.cfg_general = ConfigControl(self._config_file)
         self.cfg_general.read()
@@ -79,14 +110,13 @@ class Main(ObjectBase):
 
     def __read_config(self):
 
+        self.debug.level = DebugLevel.info
+        self.debug.enabled = True
+        # self.debug.enabled = self.cfg_general.get_conf(['global', 'debug'], self.debug.enabled)
+        # Salida, nivel y nivel de cada modulo (log.output, log.file, log.level, log.levels).
+        self.debug.configure(self.cfg_general.get_conf('log', {}))
         if self.__verbose:
-            self.debug.enabled = True
             self.debug.level = DebugLevel.null
-        else:
-            self.debug.level = DebugLevel.info
-            # TODO: Actualizar configuracin para que use level
-            self.debug.enabled = True
-            # self.debug.enabled = self.cfg_general.get_conf(['global', 'debug'], self.debug.enabled)
 
         if self.__timer_check_force:
             self._timer_check = self.__timer_check_force
@@ -186,6 +216,15 @@ class Main(ObjectBase):
                 elif key == 'daemon_mode':
                     self.__daemon_mode = value
 
+                elif key == 'history':
+                    self.__history = value
+
+                elif key == 'profile':
+                    self.__profile = value
+
+                elif key == 'startup':
+                    self.__startup = value
+
     def __args_cmd(self, args_get):
         if args_get:
             for key, value in args_get.items():
@@ -228,26 +267,80 @@ class Main(ObjectBase):
         self.__timer_check = int(val)
 
     def start(self):
+        try:
+            self.__start()
+        finally:
+            time_start = time.perf_counter()
+            self.monitor.close()
+            self.__timing_mark('close', time.perf_counter() - time_start)
+            self.__print_startup()
+            self.debug.close()
+
+    def __print_startup(self):
+        """ Tiempo de cada fase del arranque (interprete, imports, config, monitor) y del primer check. """
+        if self.__startup:
+            print("{0:<12} {1:>10}".format("Phase", "Time (ms)"))
+            for (name, seconds) in self.__timing.items():
+                print("{0:<12} {1:>10.1f}".format(name, seconds * 1000))
+            print("{0:<12} {1:>10.1f}".format("total", sum(self.__timing.values()) * 1000))
+        else:
+            self.debug.print(lambda: "* Main >> Startup: {0}".format(', '.join(
+                ["{0} {1:.1f} ms".format(name, seconds * 1000) for (name, seconds) in self.__timing.items()])),
+                DebugLevel.debug)
+
+    def __print_history(self, find: str):
+        history = self.monitor.history
+        names = [n for n in history.names if not find or n.startswith(find)]
+        if not names:
+            print("No history data.")
+            return
+        print("{0:<50} {1:>12} {2:>30} {3:>30}".format("Series", "Last", "1h (avg/min/max)", "24h (avg/min/max)"))
+        for name in names:
+            _, last_value = history.last(name)
+            cols = []
+            for (seconds, rollup) in ((3600, '1m'), (86400, '1h')):
+                data = history.summary(name, seconds, rollup)
+                if data is None:
+                    cols.append('-')
+                else:
+                    cols.append("{0:.2f}/{1:.2f}/{2:.2f}".format(data['avg'], data['min'], data['max']))
+            print("{0:<50} {1:>12.2f} {2:>30} {3:>30}".format(name, last_value, cols[0], cols[1]))
+
+    def __print_profile(self, cycles: int):
+        profiler = Profiler.default()
+        profiler.clear()
+        for cycle in range(cycles):
+            self.debug.print("* Main >> Profile >> Cycle {0}/{1}".format(cycle + 1, cycles))
+            # Todos los targets en cada ciclo, sin esperar a su intervalo.
+            self.monitor.check(all_targets=True)
+        print(profiler.report())
+
+    def __start(self):
+        if self.__history is not None:
+            self.__print_history(self.__history)
+            return
+
+        if self.__profile is not None:
+            self.__print_profile(self.__profile)
+            return
+
         if not self._daemon_mode:
             self.debug.print("* Main >> Run Mode Single Process")
+            time_start = time.perf_counter()
             self.monitor.check()
+            self.__timing_mark('check', time.perf_counter() - time_start)
         else:
             self.debug.print("* Main >> Run Mode Daemon")
-            while True:
+            if self._timer_check == 0:
                 self.monitor.check()
-                if self._timer_check == 0:
-                    break
-                self.debug.print("* Main >> Waiting {0} seconds...".format(args['timer_check']))
-                try:
-                    time.sleep(self._timer_check)
-                except KeyboardInterrupt:
-                    self.debug.print("* Main >> Process cancel  by the user!!", DebugLevel.info)
-                    try:
-                        sys.exit(0)
-                    except SystemExit:
-                        os._exit(0)
-                except Exception as e:
-                    self.debug.exception(e)
+                return
+            self.debug.print("* Main >> Default interval {0} seconds...".format(self._timer_check))
+            try:
+                self.monitor.run_daemon(self._timer_check)
+            except KeyboardInterrupt:
+                self.debug.print("* Main >> Process cancel  by the user!!", DebugLevel.info)
+            except Exception as e:
+                self.debug.exception(e)
 
 
 def arg_check_dir_path(path):
@@ -259,6 +352,13 @@ def arg_check_dir_path(path):
         raise argparse.ArgumentTypeError("{0} is not a valid path".format(path))
 
 
+def arg_check_cycles(cycles):
+    if cycles.isnumeric() and int(cycles) > 0:
+        return int(cycles)
+    else:
+        raise argparse.ArgumentTypeError("{0} is not a valid number of cycles".format(cycles))
+
+
 def arg_check_timer(timer_check):
     if timer_check.isnumeric() and int(timer_check) > 0:
         return timer_check
@@ -275,7 +375,7 @@ if __name__ == "__main__":
         default=False,
         action="store_true",
         dest="clear_status",
-        help="clear status.json"
+        help="clear status"
     )
     ap.add_argument(
         '-d', '--daemon',
@@ -298,6 +398,32 @@ if __name__ == "__main__":
         dest="verbose",
         help="verbose mode true"
     )
+    ap.add_argument(
+        '--history',
+        default=None,
+        nargs='?',
+        const='',
+        dest="history",
+        metavar="SERIES",
+        help="show the history summary of the series (all or those starting with SERIES) and exit"
+    )
+    ap.add_argument(
+        '--profile',
+        default=None,
+        nargs='?',
+        const=1,
+        type=arg_check_cycles,
+        dest="profile",
+        metavar="CYCLES",
+        help="run CYCLES checks of all the targets (default 1), show the time of each span and exit"
+    )
+    ap.add_argument(
+        '--startup',
+        default=False,
+        action="store_true",
+        dest="startup",
+        help="show the time of each startup phase (interpreter, imports, config, monitor, check) at the end"
+    )
     ap.add_argument(
         '-p', '--path',
         default=None,
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Benchmark de Monitor.check con todos los targets contra servicios locales (standins.py).
+
+Para cada nº de targets se crea una configuración (config.json, monitor.json y modules.json) en un directorio temporal
+y se ejecuta Monitor.check en un proceso hijo, así el consumo de CPU y memoria (RSS máximo) es solo el del monitor y no
+el de los servicios de prueba, que se ejecutan en el proceso padre. El primer ciclo (arranque en frio, todos los
+targets cambian de estado y se envían los mensajes) se muestra aparte de la mediana del resto de ciclos.
+
+Los módulos que se usan y lo que los sustituye:
+    web             servidor HTTP local con latencia (--latency).
+    hddtemp         demonio hddtemp local.
+    mysql           servidor con el protocolo de MySQL (necesita pymysql).
+    ping            direcciones 127.x.y.z (motor ICMP) o el comando ping de mentira si no hay ICMP.
+    service_status  systemctl de mentira.
+    raid            /proc/mdstat de mentira con un array por target.
+
+El kernel limita las respuestas ICMP que envía (net.ipv4.icmp_msgs_per_sec y icmp_msgs_burst), con miles de targets de
+ping parte de los pings a 127.x.y.z no tienen respuesta y salen como fallidos (columna Failed), no es un error del
+motor ICMP.
+
+Los módulos que solo leen el propio equipo (filesystemusage, ram_swap, temperature) no dependen del nº de targets y
+están deshabilitados.
+
+Ejemplo:
+    $ python3 benchmark.py
+    $ python3 benchmark.py --targets 10,100,1000 --cycles 5 --modules web,ping --latency 0.02
+    $ python3 benchmark.py --json result.json
+
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import statistics
+import subprocess
+
+from standins import HttpStandIn, HddtempStandIn, MySQLStandIn, StubBin, write_mdstat
+
+dir_src = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+modules_all = ('web', 'hddtemp', 'mysql', 'ping', 'service_status', 'raid')
+modules_local = ('filesystemusage', 'ram_swap', 'temperature')
+
+
+def raise_nofile():
+    """ Sube el limite de archivos abiertos al máximo, con miles de targets hay miles de conexiones. """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def is_pymysql():
+    try:
+        import pymysql  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def conf_modules(spec: dict) -> dict:
+    """ Sección de modules.json de cada modulo con spec['targets'] targets. """
+    n = spec['targets']
+    threads = spec['threads']
+    modules = {name: {'enabled': False} for name in modules_all + modules_local}
+
+    if 'web' in spec['modules']:
+        modules['web'] = {
+            'enabled': True, 'threads': threads, 'timeout': 10,
+            'list': {"http://127.0.0.1:{0}/{1}".format(spec['http'], i): True for i in range(n)}
+        }
+    if 'hddtemp' in spec['modules']:
+        modules['hddtemp'] = {
+            'enabled': True, 'threads': threads, 'timeout': 10,
+            'list': {"disk{0}".format(i): {'host': '127.0.0.1', 'port': spec['hddtemp']} for i in range(n)}
+        }
+    if 'mysql' in spec['modules']:
+        modules['mysql'] = {
+            'enabled': True, 'threads': threads,
+            'list': {"db{0}".format(i): {'host': '127.0.0.1', 'port': spec['mysql'], 'user': 'bench',
+                                         'password': 'bench', 'db': "db{0}".format(i)} for i in range(n)}
+        }
+    if 'ping' in spec['modules']:
+        # 127.0.0.0/8 es todo loopback, cada target es una dirección distinta.
+        modules['ping'] = {
+            'enabled': True, 'threads': threads, 'attempt': 1, 'timeout': 2,
+            'list': {"127.{0}.{1}.{2}".format((i + 1) >> 16 & 0xff, (i + 1) >> 8 & 0xff, (i + 1) & 0xff): True
+                     for i in range(n)}
+        }
+    if 'service_status' in spec['modules']:
+        modules['service_status'] = {
+            'enabled': True, 'threads': threads,
+            'list': {"standin{0}.service".format(i): True for i in range(n)}
+        }
+    if 'raid' in spec['modules']:
+        modules['raid'] = {'enabled': True, 'threads': threads, 'local': True}
+    return modules
+
+
+def write_json(path: str, data: dict):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def child(spec_file: str):
+    """ Proceso hijo, ejecuta los ciclos y guarda el resultado en spec['result']. """
+    with open(spec_file, 'r') as f:
+        spec = json.load(f)
+
+    raise_nofile()
+    sys.path.insert(0, dir_src)
+    sys.path.append(os.path.join(dir_src, 'watchfuls'))
+    from lib import Monitor, ObjectBase
+    from lib.debug import DebugLevel
+
+    dir_etc = os.path.join(spec['dir'], 'etc')
+    dir_var = os.path.join(spec['dir'], 'var')
+    os.makedirs(dir_etc, exist_ok=True)
+    os.makedirs(dir_var, exist_ok=True)
+    write_json(os.path.join(dir_etc, 'config.json'), {'telegram': {'token': '', 'chat_id': ''}})
+    write_json(os.path.join(dir_etc, 'monitor.json'), {'threads': spec['monitor_threads']})
+    write_json(os.path.join(dir_etc, 'modules.json'), conf_modules(spec))
+
+    ObjectBase.debug.level = DebugLevel.emergency
+    monitor = Monitor(dir_src, dir_etc, os.path.join(dir_src, 'watchfuls'), dir_var)
+    try:
+        # Los comandos y archivos del sistema se sustituyen por los de mentira.
+        if 'service_status' in spec['modules']:
+            module = monitor.modules.get('service_status')
+            module.paths.set('systemctl', spec['systemctl'])
+            module.units.systemctl = spec['systemctl']
+        if 'ping' in spec['modules']:
+            monitor.modules.get('ping').paths.set('ping', spec['ping'])
+        if 'raid' in spec['modules']:
+            monitor.modules.get('raid').paths.set('mdstat', spec['mdstat'])
+
+        cycles = []
+        for _ in range(spec['cycles']):
+            children = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu = time.process_time()
+            wall = time.perf_counter()
+            monitor.check(all_targets=True)
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            children_now = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu_children = (children_now.ru_utime - children.ru_utime) + (children_now.ru_stime - children.ru_stime)
+            cycles.append({'wall': wall, 'cpu': cpu, 'cpu_children': cpu_children})
+
+        checks = 0
+        failed = {}
+        for (name, items) in monitor.status.data.items():
+            if name not in spec['modules'] or not isinstance(items, dict):
+                continue
+            for item in items.values():
+                if isinstance(item, dict) and 'status' in item:
+                    checks += 1
+                    if not item['status']:
+                        failed[name] = failed.get(name, 0) + 1
+    finally:
+        monitor.close()
+
+    write_json(spec['result'], {
+        'targets': spec['targets'],
+        'cycles': cycles,
+        'checks': checks,
+        'failed': failed,
+        # ru_maxrss esta en KiB en Linux.
+        'rss_max_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    })
+
+
+def run_scale(spec: dict) -> dict:
+    spec = dict(spec)
+    spec['dir'] = tempfile.mkdtemp(prefix='watchful-bench-')
+    try:
+        spec['result'] = os.path.join(spec['dir'], 'result.json')
+        spec['mdstat'] = write_mdstat(os.path.join(spec['dir'], 'mdstat'), spec['targets'])
+        spec_file = os.path.join(spec['dir'], 'spec.json')
+        write_json(spec_file, spec)
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--child', spec_file], check=True,
+                       stdout=subprocess.DEVNULL if not spec['verbose'] else None)
+        with open(spec['result'], 'r') as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(spec['dir'], ignore_errors=True)
+
+
+def print_row(result: dict):
+    first = result['cycles'][0]
+    steady = result['cycles'][1:] or result['cycles']
+    print("{0:>8} {1:>8} {2:>7} {3:>10.3f} {4:>10.3f} {5:>10.3f} {6:>10.3f} {7:>10.3f} {8:>9.1f}".format(
+        result['targets'], result['checks'], sum(result['failed'].values()),
+        first['wall'], first['cpu'] + first['cpu_children'],
+        statistics.median([c['wall'] for c in steady]),
+        statistics.median([c['cpu'] for c in steady]),
+        statistics.median([c['cpu_children'] for c in steady]),
+        result['rss_max_mb']), flush=True)
+    if result['failed']:
+        print("{0:>8} Failed: {1}".format('', ', '.join(["{0} {1}".format(name, count)
+                                                        for (name, count) in sorted(result['failed'].items())])))
+
+
+def arg_list_int(value: str) -> list:
+    try:
+        values = [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError("{0} is not a valid list of numbers".format(value))
+    if not values or min(values) < 1:
+        raise argparse.ArgumentTypeError("{0} is not a valid list of numbers".format(value))
+    return values
+
+
+def arg_list_modules(value: str) -> list:
+    values = [v.strip() for v in value.split(',') if v.strip()]
+    for v in values:
+        if v not in modules_all:
+            raise argparse.ArgumentTypeError("{0} is not a valid module ({1})".format(v, ', '.join(modules_all)))
+    return values
+
+
+def main():
+    ap = argparse.ArgumentParser(allow_abbrev=False, description="Benchmark of Monitor.check with local stand-ins.")
+    ap.add_argument('--targets', default=[10, 100, 1000, 10000], type=arg_list_int,
+                    help="number of targets of each module, comma separated (default 10,100,1000,10000)")
+    ap.add_argument('--cycles', default=3, type=int, help="checks for each number of targets (default 3)")
+    ap.add_argument('--modules', default=list(modules_all), type=arg_list_modules,
+                    help="modules to check, comma separated (default all)")
+    ap.add_argument('--latency', default=0.005, type=float, help="latency of the HTTP responses (default 0.005)")
+    ap.add_argument('--threads', default=5, type=int, help="threads of each module (default 5)")
+    ap.add_argument('--monitor-threads', default=5, type=int, dest='monitor_threads',
+                    help="modules checked at the same time (default 5)")
+    ap.add_argument('--json', default=None, dest='json_file', help="save the results in a JSON file")
+    ap.add_argument('-v', '--verbose', default=False, action='store_true', help="show the output of the monitor")
+    ap.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    modules = list(args.modules)
+    if 'mysql' in modules and not is_pymysql():
+        print("* mysql >> pymysql is not installed, skipped.")
+        modules.remove('mysql')
+
+    raise_nofile()
+    stub_bin = None
+    stand_ins = []
+    try:
+        http = HttpStandIn(latency=args.latency).start()
+        hddtemp = HddtempStandIn().start()
+        mysql = MySQLStandIn().start()
+        stand_ins.extend([http, hddtemp, mysql])
+        stub_bin = StubBin(tempfile.mkdtemp(prefix='watchful-bin-'))
+
+        spec = {
+            'modules': modules,
+            'cycles': max(args.cycles, 1),
+            'threads': args.threads,
+            'monitor_threads': args.monitor_threads,
+            'verbose': args.verbose,
+            'http': http.port,
+            'hddtemp': hddtemp.port,
+            'mysql': mysql.port,
+            'systemctl': stub_bin.find('systemctl'),
+            'ping': stub_bin.find('ping')
+        }
+
+        print("Modules: {0} - Cycles: {1} - Threads: {2} - HTTP latency: {3} s".format(
+            ', '.join(modules), spec['cycles'], args.threads, args.latency))
+        print("{0:>8} {1:>8} {2:>7} {3:>10} {4:>10} {5:>10} {6:>10} {7:>10} {8:>9}".format(
+            "Targets", "Checks", "Failed", "1st (s)", "1st CPU", "Wall (s)", "CPU (s)", "Child CPU", "RSS (MB)"))
+        results = []
+        for targets in args.targets:
+            spec['targets'] = targets
+            result = run_scale(spec)
+            results.append(result)
+            print_row(result)
+
+        if args.json_file:
+            write_json(args.json_file, {'spec': spec, 'results': results})
+    finally:
+        for stand_in in stand_ins:
+            stand_in.stop()
+        if stub_bin is not None:
+            shutil.rmtree(stub_bin.path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Servicios locales que sustituyen a los reales en el benchmark (benchmark.py).
+
+Todos escuchan en 127.0.0.1 en un puerto libre (port=0) y se ejecutan en hilos daemon:
+
+- HttpStandIn: servidor HTTP/1.1 con keep-alive que responde 200 después de una latencia configurable (web).
+- HddtempStandIn: demonio hddtemp, envía la lista de discos y cierra la conexión (hddtemp).
+- MySQLStandIn: responde al protocolo de MySQL lo justo para que pymysql conecte, haga ping y salga (mysql).
+- StubBin: directorio con los comandos systemctl y ping de mentira (service_status, ping sin ICMP).
+- write_mdstat: archivo con el formato de /proc/mdstat (raid).
+
+Ejemplo:
+    >>> with HttpStandIn(latency=0.005) as http:
+    ...     print(http.url(1))
+    http://127.0.0.1:40313/1
+
+"""
+
+import os
+import time
+import stat
+import struct
+import socket
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+__all__ = ['HttpStandIn', 'HddtempStandIn', 'MySQLStandIn', 'StubBin', 'write_mdstat']
+
+
+class StandIn(object):
+
+    """ Servidor TCP en un hilo daemon, se para con stop() o al salir del bloque with. """
+
+    host = '127.0.0.1'
+
+    def __init__(self):
+        self._server = None
+        self._thread = None
+
+    def _create(self) -> socketserver.BaseServer:
+        raise NotImplementedError()
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        self._server = self._create()
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+
+class ThreadingTCPServer(socketserver.ThreadingTCPServer):
+
+    allow_reuse_address = True
+    # Con miles de targets las conexiones llegan todas a la vez.
+    request_queue_size = 1024
+
+
+class HttpStandIn(StandIn):
+
+    def __init__(self, latency: float = 0.0, code: int = 200):
+        """
+        :param latency: Segundos que se espera antes de responder cada petición.
+        :param code: Código HTTP de las respuestas.
+
+        """
+        super().__init__()
+        self.latency = latency
+        self.code = code
+
+    def _create(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if stand_in.latency > 0:
+                    time.sleep(stand_in.latency)
+                body = b'ok\n'
+                self.send_response(stand_in.code)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_HEAD(self):
+                self.do_GET()
+
+            def log_message(self, fmt, *args):
+                pass
+
+        server = ThreadingHTTPServer((self.host, 0), Handler)
+        server.request_queue_size = ThreadingTCPServer.request_queue_size
+        return server
+
+    def url(self, n: int) -> str:
+        return "http://{0}:{1}/{2}".format(self.host, self.port, n)
+
+
+class HddtempStandIn(StandIn):
+
+    def __init__(self, disks: int = 2, temp: int = 35):
+        """
+        :param disks: Nº de discos que se envían en cada conexión.
+        :param temp: Temperatura de los discos.
+
+        """
+        super().__init__()
+        self.data = ''.join(["|/dev/sd{0}|STANDIN-DISK-{1}|{2}|C|".format(chr(ord('a') + n), n, temp)
+                             for n in range(disks)]).encode('ascii')
+
+    def _create(self):
+        data = self.data
+
+        class Handler(socketserver.BaseRequestHandler):
+
+            def handle(self):
+                self.request.sendall(data)
+
+        return ThreadingTCPServer((self.host, 0), Handler)
+
+
+class MySQLStandIn(StandIn):
+
+    """
+    Servidor con el protocolo de MySQL (handshake v10, mysql_native_password) que acepta cualquier usuario y
+    contraseña. COM_PING, COM_QUERY y COM_INIT_DB responden OK, COM_QUIT cierra la conexión.
+
+    """
+
+    # CLIENT_LONG_PASSWORD | CLIENT_CONNECT_WITH_DB | CLIENT_PROTOCOL_41 | CLIENT_TRANSACTIONS |
+    # CLIENT_SECURE_CONNECTION | CLIENT_PLUGIN_AUTH
+    capabilities = 0x00000001 | 0x00000008 | 0x00000200 | 0x00002000 | 0x00008000 | 0x00080000
+    com_quit = 0x01
+    com_ping = 0x0e
+
+    @classmethod
+    def packet(cls, seq: int, payload: bytes) -> bytes:
+        return struct.pack('<I', len(payload))[:3] + bytes([seq & 0xff]) + payload
+
+    @classmethod
+    def handshake(cls, thread_id: int) -> bytes:
+        salt = os.urandom(20).replace(b'\0', b'x')
+        return b''.join([
+            b'\x0a',                                        # Protocolo 10.
+            b'5.7.99-standin\0',
+            struct.pack('<I', thread_id),
+            salt[:8], b'\0',
+            struct.pack('<H', cls.capabilities & 0xffff),
+            b'\x21',                                        # utf8_general_ci
+            struct.pack('<H', 0x0002),                      # SERVER_STATUS_AUTOCOMMIT
+            struct.pack('<H', cls.capabilities >> 16),
+            bytes([21]),
+            b'\0' * 10,
+            salt[8:], b'\0',
+            b'mysql_native_password\0'
+        ])
+
+    @staticmethod
+    def ok() -> bytes:
+        # header, affected rows, insert id, status, warnings
+        return b'\x00\x00\x00' + struct.pack('<HH', 0x0002, 0)
+
+    def _create(self):
+        stand_in = self
+
+        class Handler(socketserver.BaseRequestHandler):
+
+            def recv_packet(self):
+                header = self.recv_exact(4)
+                if header is None:
+                    return None, None
+                length = header[0] | header[1] << 8 | header[2] << 16
+                return header[3], self.recv_exact(length) if length else b''
+
+            def recv_exact(self, size: int):
+                data = b''
+                while len(data) < size:
+                    chunk = self.request.recv(size - len(data))
+                    if not chunk:
+                        return None
+                    data += chunk
+                return data
+
+            def handle(self):
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self.request.sendall(stand_in.packet(0, stand_in.handshake(threading.get_ident() & 0xffffffff)))
+                seq, _ = self.recv_packet()
+                if seq is None:
+                    return
+                self.request.sendall(stand_in.packet(seq + 1, stand_in.ok()))
+                while True:
+                    seq, payload = self.recv_packet()
+                    if seq is None or not payload or payload[0] == stand_in.com_quit:
+                        return
+                    self.request.sendall(stand_in.packet(seq + 1, stand_in.ok()))
+
+        return ThreadingTCPServer((self.host, 0), Handler)
+
+
+class StubBin(object):
+
+    """
+    Directorio temporal con comandos de mentira. systemctl responde a "show -p ... unidad..." con todas las unidades
+    activas (running) y a "start" con exit 0, ping siempre retorna 0.
+
+    """
+
+    __systemctl = """#!/bin/sh
+[ "$1" = "show" ] || exit 0
+shift
+for arg in "$@"; do
+    case "$arg" in
+        -*) continue ;;
+        Id,*) continue ;;
+    esac
+    printf 'Id=%s\\nLoadState=loaded\\nActiveState=active\\nSubState=running\\nResult=success\\n\\n' "$arg"
+done
+"""
+
+    __ping = """#!/bin/sh
+exit 0
+"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        self.commands = {}
+        for (name, script) in (('systemctl', self.__systemctl), ('ping', self.__ping)):
+            self.commands[name] = os.path.join(self.path, name)
+            with open(self.commands[name], 'w') as f:
+                f.write(script)
+            os.chmod(self.commands[name], os.stat(self.commands[name]).st_mode | stat.S_IXUSR | stat.S_IXGRP)
+
+    def find(self, name: str) -> str:
+        return self.commands[name]
+
+
+def write_mdstat(path: str, arrays: int) -> str:
+    """ Crea un archivo con el formato de /proc/mdstat con arrays RAID1 sanos. """
+    lines = ["Personalities : [raid1]"]
+    for n in range(arrays):
+        lines.append("md{0} : active raid1 sdb{1}[1] sda{1}[0]".format(n, n + 1))
+        lines.append("      1953382464 blocks [2/2] [UU]")
+        lines.append("")
+    lines.append("unused devices: <none>")
+    with open(path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    return path
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de ConfigSchema, se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.config import ConfigSchema, ConfigList, ConfigOption
+
+
+class TestConfigSchema(unittest.TestCase):
+
+    def setUp(self):
+        self.schema = ConfigSchema(
+            ConfigOption('timeout', int, 5, min_val=1),
+            ConfigOption('alert', float, 85, min_val=0, max_val=100),
+            ConfigOption('paths', list, None),
+            lists=(ConfigList('list', ConfigOption('enabled', bool, True), ConfigOption('timeout', int, 5, min_val=1),
+                              ConfigOption('label', str, '')), )
+        )
+
+    def test_defaults(self):
+        conf = self.schema.compile(None, {'interval': 30})
+        self.assertEqual(conf.timeout, 5)
+        self.assertEqual(conf.alert, 85.0)
+        self.assertIsNone(conf.paths)
+        self.assertTrue(conf.enabled)
+        self.assertEqual(conf.interval, 30)
+        self.assertEqual(len(conf.list), 0)
+        self.assertEqual(conf.errors, ())
+
+    def test_convert_values(self):
+        conf = self.schema.compile({'timeout': '7', 'alert': 90, 'enabled': 'off', 'paths': ['/a', '/b']})
+        self.assertEqual(conf.timeout, 7)
+        self.assertEqual(conf.alert, 90.0)
+        self.assertFalse(conf.enabled)
+        self.assertEqual(conf.paths, ('/a', '/b'))
+        self.assertEqual(conf.errors, ())
+
+    def test_invalid_values_use_default(self):
+        conf = self.schema.compile({'timeout': 0, 'alert': 'abc', 'threads': 2.5, 'enabled': 'maybe'})
+        self.assertEqual(conf.timeout, 5)
+        self.assertEqual(conf.alert, 85.0)
+        self.assertEqual(conf.threads, 5)
+        self.assertTrue(conf.enabled)
+        self.assertEqual(len(conf.errors), 4)
+        self.assertIn("timeout: invalid value 0 (int >= 1), using 5", conf.errors)
+        self.assertIn("alert: invalid value 'abc' (float 0..100), using 85", conf.errors)
+
+    def test_bool_is_not_a_number(self):
+        conf = self.schema.compile({'timeout': True})
+        self.assertEqual(conf.timeout, 5)
+        self.assertEqual(len(conf.errors), 1)
+
+    def test_unknown_options(self):
+        conf = self.schema.compile({'timeout': 3, 'foo': 1, 'list': {'h1': {'bar': 2}}})
+        self.assertEqual(sorted(conf.errors), ["foo: unknown option", "list/h1/bar: unknown option"])
+        conf = ConfigSchema(strict=False).compile({'foo': 1})
+        self.assertEqual(conf.errors, ())
+
+    def test_targets_inherit_module_values(self):
+        conf = self.schema.compile({'timeout': 3, 'list': {'h1': {}, 'h2': {'timeout': 9, 'label': ' Router '},
+                                                           'h3': {'timeout': 'x'}}})
+        self.assertEqual(conf.list['h1'].timeout, 3)
+        self.assertEqual(conf.list['h2'].timeout, 9)
+        self.assertEqual(conf.list['h2'].label, 'Router')
+        self.assertEqual(conf.list['h3'].timeout, 3)
+        self.assertEqual(conf.errors, ("list/h3/timeout: invalid value 'x' (int >= 1), using 3", ))
+        self.assertEqual(conf.list['h2'].key, 'h2')
+
+    def test_target_value_option(self):
+        conf = self.schema.compile({'list': {'h1': False, 'h2': None}})
+        self.assertFalse(conf.list['h1'].enabled)
+        self.assertTrue(conf.list['h2'].enabled)
+
+        schema = ConfigSchema(ConfigOption('alert', float, 80),
+                              lists=(ConfigList('list', ConfigOption('alert', float, 80), value_option='alert'), ))
+        conf = schema.compile({'alert': 70, 'list': {'/': 90, '/home': {}}})
+        self.assertEqual(conf.list['/'].alert, 90.0)
+        self.assertEqual(conf.list['/home'].alert, 70.0)
+
+    def test_target_not_configured(self):
+        conf = self.schema.compile({'timeout': 4, 'interval': 60, 'list': {'h1': {'interval': 10}}})
+        target = conf.target('other')
+        self.assertIsNone(target.key)
+        self.assertEqual(target.timeout, 4)
+        self.assertEqual(target.interval, 60)
+        self.assertEqual(conf.target('h1').interval, 10)
+        self.assertIsNone(conf.target('h1', 'no_list'))
+
+    def test_invalid_sections(self):
+        conf = self.schema.compile(['x'])
+        self.assertEqual(conf.timeout, 5)
+        self.assertEqual(len(conf.errors), 1)
+        conf = self.schema.compile({'list': ['h1']})
+        self.assertEqual(len(conf.list), 0)
+        self.assertEqual(conf.errors, ("list: invalid value ['h1'], it must be a dict", ))
+
+    def test_read_only(self):
+        conf = self.schema.compile({'list': {'h1': {}}})
+        with self.assertRaises(AttributeError):
+            conf.timeout = 1
+        with self.assertRaises(AttributeError):
+            conf.list['h1'].timeout = 1
+        with self.assertRaises(TypeError):
+            conf.list['h2'] = None
+        self.assertEqual(conf.list['h1'].as_dict()['timeout'], 5)
+
+    def test_schema_errors(self):
+        with self.assertRaises(TypeError):
+            ConfigOption('x', dict)
+        with self.assertRaises(ValueError):
+            ConfigSchema(ConfigOption('list', int, 0), lists=(ConfigList('list'), ))
+
+
+if __name__ == '__main__':
+    unittest.main()
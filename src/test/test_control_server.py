@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests del socket de control del daemon, se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import json
+import stat
+import time
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import Monitor, ObjectBase
+from lib.debug import DebugLevel
+
+# Modulo de prueba, cuenta las veces que se ejecuta sin depender de nada del sistema.
+MODULE_SOURCE = '''
+from lib.modules import ModuleBase
+
+RUNS = [0]
+
+
+class Watchful(ModuleBase):
+
+    def __init__(self, monitor):
+        super().__init__(monitor, __name__)
+
+    def check(self):
+        RUNS[0] += 1
+        self.dict_return.set('count', True, '', send_msg=False, other_data={'runs': RUNS[0]})
+        super().check()
+        return self.dict_return
+'''
+
+
+class TestControlServer(unittest.TestCase):
+
+    # Segundos que se espera a que arranque el daemon y a cada respuesta.
+    timeout = 10
+
+    def setUp(self):
+        ObjectBase.debug.level = DebugLevel.emergency
+        self.dir = tempfile.mkdtemp()
+        self.dir_etc = os.path.join(self.dir, 'etc')
+        self.dir_modules = os.path.join(self.dir, 'watchfuls')
+        self.dir_var = os.path.join(self.dir, 'var')
+        for path in (self.dir_etc, self.dir_modules, self.dir_var):
+            os.makedirs(path)
+        with open(os.path.join(self.dir_modules, 'ctl_counter.py'), 'w') as f:
+            f.write(MODULE_SOURCE)
+        with open(os.path.join(self.dir_modules, 'ctl_off.py'), 'w') as f:
+            f.write(MODULE_SOURCE)
+        self.write_json('config.json', {'telegram': {'token': '', 'chat_id': ''}})
+        self.write_json('monitor.json', {'history': {'enabled': False}})
+        self.write_json('modules.json', {'ctl_counter': {'enabled': True, 'interval': 3600},
+                                         'ctl_off': {'enabled': False, 'interval': 3600}})
+        sys.path.append(self.dir_modules)
+
+        self.path = os.path.join(self.dir_var, 'control.sock')
+        self.monitor = Monitor(self.dir, self.dir_etc, self.dir_modules, self.dir_var)
+        self.daemon = threading.Thread(target=self.monitor.run_daemon, args=(3600, ), daemon=True)
+        self.daemon.start()
+        limit = time.monotonic() + self.timeout
+        while not os.path.exists(self.path):
+            self.assertLess(time.monotonic(), limit, "control socket not created")
+            time.sleep(0.01)
+
+    def tearDown(self):
+        self.monitor.stop_daemon()
+        self.daemon.join(self.timeout)
+        self.monitor.close()
+        sys.path.remove(self.dir_modules)
+        for name in ('ctl_counter', 'ctl_off'):
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.dir)
+
+    def write_json(self, file_name: str, data: dict):
+        with open(os.path.join(self.dir_etc, file_name), 'w') as f:
+            json.dump(data, f)
+
+    def send(self, *lines: str) -> list:
+        """ Envía los comandos por una sola conexión y retorna las respuestas. """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            sock.sendall(''.join(line + '\n' for line in lines).encode('utf-8'))
+            sock.shutdown(socket.SHUT_WR)
+            with sock.makefile('rb') as f:
+                return [json.loads(line) for line in f]
+
+    def command(self, line: str) -> dict:
+        (answer, ) = self.send(line)
+        return answer
+
+    def test_socket_mode(self):
+        self.assertTrue(stat.S_ISSOCK(os.stat(self.path).st_mode))
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_ping_and_help(self):
+        answer = self.command('ping')
+        self.assertTrue(answer['ok'])
+        self.assertTrue(answer['pong'])
+        self.assertGreaterEqual(answer['uptime'], 0)
+
+        answer = self.command('help')
+        self.assertTrue(answer['ok'])
+        self.assertIn('run MODULE...', answer['commands'])
+        self.assertIn('status [MODULE [KEY]]', answer['commands'])
+
+    def test_several_commands_per_connection(self):
+        # Las lineas vacías se ignoran y el comando no distingue mayúsculas.
+        answers = self.send('PING', '', '   ', 'help')
+        self.assertEqual(len(answers), 2)
+        self.assertTrue(answers[0]['pong'])
+        self.assertIn('commands', answers[1])
+
+    def test_errors(self):
+        self.assertEqual(self.command('nope'), {'ok': False, 'error': 'Unknown command nope, use help'})
+        self.assertEqual(self.command('run'), {'ok': False, 'error': 'Module name missing'})
+        self.assertEqual(self.command('run ctl_counter missing'), {'ok': False, 'error': 'Module missing not found'})
+        self.assertEqual(self.command('status missing'), {'ok': False, 'error': 'missing not found'})
+        self.assertEqual(self.send('x' * 5000), [{'ok': False, 'error': 'Line too long'}])
+        # El daemon sigue respondiendo después de los errores.
+        self.assertTrue(self.command('ping')['pong'])
+
+    def test_run_and_status(self):
+        answer = self.command('run ctl_counter')
+        self.assertTrue(answer['ok'])
+        self.assertTrue(answer['modules']['ctl_counter']['ok'])
+        runs = self.command('status ctl_counter count')['status']['other_data']['runs']
+        # La primera ejecución del daemon puede haber terminado antes o no, run siempre hace una nueva.
+        self.assertGreaterEqual(runs, 1)
+
+        self.command('run ctl_counter')
+        status = self.command('status ctl_counter')['status']
+        self.assertEqual(status['count']['other_data']['runs'], runs + 1)
+        self.assertIn('ctl_counter', self.command('status')['status'])
+
+    def test_run_disabled_module(self):
+        # run ejecuta el modulo aunque este deshabilitado, check solo los habilitados.
+        self.assertTrue(self.command('run ctl_off')['modules']['ctl_off']['ok'])
+        answer = self.command('check')
+        self.assertTrue(answer['ok'])
+        self.assertEqual(sorted(answer['modules'].keys()), ['ctl_counter'])
+
+    def test_modules(self):
+        self.command('run ctl_counter')
+        modules = self.command('modules')['modules']
+        self.assertEqual(sorted(modules.keys()), ['ctl_counter', 'ctl_off'])
+        self.assertTrue(modules['ctl_counter']['enabled'])
+        self.assertFalse(modules['ctl_counter']['running'])
+        self.assertGreater(modules['ctl_counter']['next_run'], 3000)
+        self.assertTrue(modules['ctl_counter']['last_run']['ok'])
+        self.assertFalse(modules['ctl_off']['enabled'])
+
+    def test_reload(self):
+        self.assertEqual(self.command('reload'), {'ok': True, 'modules_changed': []})
+        self.write_json('modules.json', {'ctl_counter': {'enabled': True, 'interval': 3600},
+                                         'ctl_off': {'enabled': True, 'interval': 3600}})
+        # El cambio lo puede aplicar inotify antes que el comando, en los dos casos el daemon ya lo tiene.
+        self.assertTrue(self.command('reload')['ok'])
+        self.assertTrue(self.command('modules')['modules']['ctl_off']['enabled'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de Debug (niveles y salidas del log), se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import io
+import os
+import sys
+import json
+import socket
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.debug import Debug
+from lib.debug import DebugLevel
+
+
+class TestDebugLevel(unittest.TestCase):
+
+    def setUp(self):
+        self.debug = Debug(True, DebugLevel.info)
+
+    def test_to_level(self):
+        self.assertEqual(Debug.to_level(' Warning '), DebugLevel.warning)
+        self.assertEqual(Debug.to_level(DebugLevel.error.value), DebugLevel.error)
+        self.assertIsNone(Debug.to_level('verbose'))
+        self.assertIsNone(Debug.to_level(True))
+
+    def test_lazy_message(self):
+        calls = []
+
+        def message():
+            calls.append(1)
+            return "msg"
+
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.debug.print(message, DebugLevel.debug)
+            self.assertEqual(calls, [])
+            self.debug.print(message, DebugLevel.info)
+            self.assertEqual(calls, [1])
+            self.debug.print(message, DebugLevel.debug, force=True)
+            self.assertEqual(calls, [1, 1])
+        self.assertEqual(stdout.getvalue(), "msg\nmsg\n")
+
+    def test_disabled(self):
+        self.debug.enabled = False
+        self.assertFalse(self.debug.is_enabled(DebugLevel.emergency))
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.debug.print("msg", DebugLevel.emergency, force=True)
+        self.assertEqual(stdout.getvalue(), "")
+
+    def test_module_levels(self):
+        self.debug.configure({'level': 'warning', 'levels': {'ping': 'debug', 'web': 'not valid'}})
+        self.assertEqual(self.debug.levels, {'ping': DebugLevel.debug})
+        self.assertTrue(self.debug.is_enabled(DebugLevel.debug, 'ping'))
+        self.assertFalse(self.debug.is_enabled(DebugLevel.info, 'web'))
+        bound = self.debug.bind('ping')
+        self.assertEqual(bound.level, DebugLevel.debug)
+        self.assertTrue(bound.is_enabled(DebugLevel.debug))
+
+    def test_debug_obj(self):
+        with mock.patch('pprint.pformat') as pformat:
+            self.debug.debug_obj('ping', {'a': 1})
+            pformat.assert_not_called()
+
+
+class TestDebugOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.debug = Debug(True, DebugLevel.info)
+
+    def tearDown(self):
+        self.debug.close()
+        shutil.rmtree(self.dir)
+
+    def test_file(self):
+        path = os.path.join(self.dir, 'watchful.log')
+        self.debug.configure({'output': 'file', 'file': path})
+        self.debug.bind('ping').print("host down", DebugLevel.warning)
+        self.debug.print({'a': 1}, DebugLevel.error)
+        self.debug.print("hidden", DebugLevel.debug)
+        with open(path, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual((lines[0]['level'], lines[0]['module'], lines[0]['message']),
+                         ('warning', 'ping', "host down"))
+        self.assertEqual(lines[1]['message'], "{'a': 1}")
+        self.assertIsNone(lines[1]['module'])
+
+    def test_file_not_valid(self):
+        with mock.patch('sys.stdout', new_callable=io.StringIO):
+            self.debug.configure({'output': 'file'})
+        self.assertEqual(self.debug.output, 'stdout')
+
+    def test_file_error(self):
+        # Si no se puede escribir el archivo el mensaje sale por stdout.
+        self.debug.set_output('file', os.path.join(self.dir, 'not_exist', 'watchful.log'))
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.debug.print("msg", DebugLevel.error)
+        self.assertIn("msg", stdout.getvalue())
+
+    def test_journald(self):
+        path = os.path.join(self.dir, 'journal.socket')
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        server.bind(path)
+        self.addCleanup(server.close)
+        self.debug._Debug__path_journald = path
+        self.debug.set_output('journald')
+        self.debug.print("line 1\nline 2", DebugLevel.warning, module='ping')
+        data = server.recv(65536)
+        self.assertIn(b'MESSAGE\n' + (13).to_bytes(8, 'little') + b'line 1\nline 2\n', data)
+        self.assertIn(b'PRIORITY=4\n', data)
+        self.assertIn(b'SYSLOG_IDENTIFIER=watchful\n', data)
+        self.assertIn(b'WATCHFUL_MODULE=ping\n', data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de Exec en local (timeout, limite de salida y lineas), se ejecutan desde src con:
+python3 -m unittest discover -s test
+"""
+
+import os
+import sys
+import time
+import subprocess
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import Exec
+
+
+class TestExecOutput(unittest.TestCase):
+
+    def test_max_bytes(self):
+        out = Exec.Output(5)
+        out.write(b'abc')
+        out.write(b'defgh')
+        self.assertTrue(out.truncated)
+        self.assertEqual(out.close(), 'abcde')
+
+    def test_unlimited(self):
+        out = Exec.Output(0)
+        out.write(b'x' * 100000)
+        self.assertFalse(out.truncated)
+        self.assertEqual(len(out.close()), 100000)
+
+    def test_on_line(self):
+        lines = []
+        out = Exec.Output(0, lines.append)
+        for chunk in (b'one\ntw', b'o\n', b'\nthree'):
+            out.write(chunk)
+        self.assertEqual(lines, ['one', 'two', ''])
+        self.assertEqual(out.close(), '')
+        self.assertEqual(lines, ['one', 'two', '', 'three'])
+
+    def test_on_line_too_long(self):
+        lines = []
+        out = Exec.Output(4, lines.append)
+        out.write(b'abcdefgh')
+        out.write(b'ij\nok\n')
+        self.assertTrue(out.truncated)
+        self.assertEqual(lines, ['abcd', 'ij', 'ok'])
+
+    def test_decode_errors(self):
+        out = Exec.Output(0)
+        out.write(b'a\xffb')
+        self.assertEqual(out.close(), 'a�b')
+
+
+class TestExecLocal(unittest.TestCase):
+
+    def test_execute(self):
+        stdout, stderr, code, stdexcept = Exec.execute("sh -c 'echo out; echo err >&2; exit 4'")
+        self.assertEqual((stdout, stderr, code, stdexcept), ('out\n', 'err\n', 4, None))
+
+    def test_timeout_kills_process_group(self):
+        start = time.monotonic()
+        stdout, _, code, stdexcept = Exec.execute("sh -c 'sleep 30 & echo $!; echo ready; wait'", timeout=0.5)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertIsInstance(stdexcept, subprocess.TimeoutExpired)
+        self.assertIsNone(code)
+        # La salida leída antes del timeout se retorna.
+        pid, ready = stdout.split()
+        self.assertEqual(ready, 'ready')
+        # El hijo del shell (sleep) también se ha matado.
+        for _ in range(50):
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                break
+            time.sleep(0.05)
+        else:
+            self.fail("sleep {0} is still running".format(pid))
+
+    def test_timeout_with_closed_streams(self):
+        # El comando cierra stdout y stderr pero no termina.
+        _, _, code, stdexcept = Exec.execute("sh -c 'exec >/dev/null 2>&1; sleep 30'", timeout=0.5)
+        self.assertIsInstance(stdexcept, subprocess.TimeoutExpired)
+        self.assertIsNone(code)
+
+    def test_max_output(self):
+        tmp_exec = Exec("sh -c 'head -c 300000 /dev/zero; head -c 10 /dev/zero >&2'")
+        tmp_exec.max_output = 1000
+        stdout, stderr, code, _ = tmp_exec.start()
+        self.assertEqual(code, 0)
+        self.assertEqual(len(stdout), 1000)
+        self.assertEqual(len(stderr), 10)
+        self.assertTrue(tmp_exec.truncated)
+
+        stdout, _, _, _ = Exec.execute("sh -c 'head -c 300000 /dev/zero'", max_output=0)
+        self.assertEqual(len(stdout), 300000)
+
+    def test_on_line(self):
+        lines = []
+        stdout, _, code, _ = Exec.execute("printf 'a\\nb\\nc'", on_line=lines.append)
+        self.assertEqual(code, 0)
+        self.assertEqual(stdout, '')
+        self.assertEqual(lines, ['a', 'b', 'c'])
+
+    def test_command_not_found(self):
+        with self.assertRaises(FileNotFoundError):
+            Exec.execute("/nonexistent/command")
+        self.assertEqual(Exec.execute("  "), (None, None, None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de los lotes de comandos de Exec, se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import shlex
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import Exec
+
+
+class TestExecBatch(unittest.TestCase):
+
+    token = 'a1b2c3'
+
+    @classmethod
+    def run_batch(cls, commands: list) -> list:
+        """ Ejecuta en local el script que start_multi envía por SSH y separa la salida de cada comando. """
+        script = Exec._Exec__batch_script(commands, cls.token)
+        stdout, stderr, _, stdexcept = Exec.execute("sh -c {0}".format(shlex.quote(script)), timeout=10)
+        if stdexcept is not None:
+            raise stdexcept
+        return Exec._Exec__batch_parse(stdout, stderr, cls.token, len(commands))
+
+    def test_output_and_exit_code(self):
+        results = self.run_batch(["echo one; echo two", "printf 'no newline'", "echo err >&2; exit 3", "true"])
+        self.assertEqual(results[0], {'out': 'one\ntwo\n', 'err': '', 'code': 0})
+        self.assertEqual(results[1], {'out': 'no newline', 'err': '', 'code': 0})
+        self.assertEqual(results[2], {'out': '', 'err': 'err\n', 'code': 3})
+        self.assertEqual(results[3], {'out': '', 'err': '', 'code': 0})
+
+    def test_commands_are_isolated(self):
+        # exit y cd de un comando no afectan a los siguientes, stdin es /dev/null.
+        results = self.run_batch(["cd /; exit 7", "pwd", "cat", "echo last"])
+        self.assertEqual(results[0]['code'], 7)
+        self.assertEqual(results[1]['out'], os.getcwd() + '\n')
+        self.assertEqual(results[2], {'out': '', 'err': '', 'code': 0})
+        self.assertEqual(results[3]['out'], 'last\n')
+
+    def test_quotes(self):
+        results = self.run_batch(["echo \"it's\" '$HOME'", "printf '%s\\n' a b"])
+        self.assertEqual(results[0]['out'], "it's $HOME\n")
+        self.assertEqual(results[1]['out'], "a\nb\n")
+
+    def test_parse_truncated(self):
+        stdout = ("__WATCHFUL_{0}_0_BEGIN__\nfirst\n__WATCHFUL_{0}_0_END_0__\n"
+                  "__WATCHFUL_{0}_1_BEGIN__\nsecond without end\n").format(self.token)
+        results = Exec._Exec__batch_parse(stdout, None, self.token, 3)
+        self.assertEqual(results[0], {'out': 'first', 'err': None, 'code': 0})
+        self.assertEqual(results[1], {'out': None, 'err': None, 'code': None})
+        self.assertEqual(results[2], {'out': None, 'err': None, 'code': None})
+
+    def test_parse_other_token(self):
+        stdout = "__WATCHFUL_other_0_BEGIN__\nx\n__WATCHFUL_other_0_END_0__\n"
+        self.assertEqual(Exec._Exec__batch_parse(stdout, "", self.token, 1), [{'out': None, 'err': None, 'code': None}])
+
+    def test_start_multi_local(self):
+        results, stdexcept = Exec.execute_multi(["echo a", "  ", "sh -c 'echo b >&2; exit 2'"], timeout=10)
+        self.assertIsNone(stdexcept)
+        self.assertEqual(results, [{'out': 'a\n', 'err': '', 'code': 0}, {'out': '', 'err': 'b\n', 'code': 2}])
+        self.assertEqual(Exec.execute_multi([]), ([], None))
+
+    def test_start_multi_local_failure(self):
+        results, stdexcept = Exec.execute_multi(["echo a", "sleep 5", "echo c"], timeout=0.5)
+        self.assertIsNotNone(stdexcept)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]['out'], 'a\n')
+        self.assertEqual(results[1:], [{'out': None, 'err': None, 'code': None}] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de Histogram y Profiler, se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.profiler import Histogram, Profiler
+
+
+class TestHistogram(unittest.TestCase):
+
+    # Error relativo máximo de un percentil, el ancho de un cubo (2 ** (1/4)).
+    max_error = 2 ** 0.25 - 1
+
+    @staticmethod
+    def exact(values: list, q: float) -> float:
+        values = sorted(values)
+        return values[max(int(round(q * len(values))) - 1, 0)]
+
+    def test_empty(self):
+        hist = Histogram()
+        self.assertIsNone(hist.quantile(0.5))
+        self.assertIsNone(hist.mean)
+        self.assertEqual(hist.as_dict()['count'], 0)
+
+    def test_single_value(self):
+        hist = Histogram()
+        hist.add(0.0123)
+        for q in (0, 0.5, 0.95, 1):
+            self.assertEqual(hist.quantile(q), 0.0123)
+
+    def test_quantiles(self):
+        rnd = random.Random(1)
+        for values in ([rnd.uniform(0.001, 1.0) for _ in range(5000)],
+                       [rnd.lognormvariate(-4, 1.5) for _ in range(5000)],
+                       [0.010] * 90 + [0.500] * 10):
+            hist = Histogram()
+            for value in values:
+                hist.add(value)
+            for q in (0.5, 0.9, 0.95, 0.99):
+                expected = self.exact(values, q)
+                self.assertAlmostEqual(hist.quantile(q), expected, delta=expected * self.max_error)
+            self.assertEqual(hist.count, len(values))
+            self.assertAlmostEqual(hist.sum, sum(values))
+            self.assertEqual((hist.min, hist.max), (min(values), max(values)))
+
+    def test_quantile_is_monotonic(self):
+        hist = Histogram()
+        for value in (0.001, 0.002, 0.004, 0.1, 0.2, 3.0):
+            hist.add(value)
+        quantiles = [hist.quantile(q / 20) for q in range(21)]
+        self.assertEqual(quantiles, sorted(quantiles))
+        self.assertEqual(quantiles[-1], 3.0)
+
+    def test_out_of_range(self):
+        hist = Histogram()
+        hist.add(-1)
+        hist.add(0)
+        hist.add(1e-9)
+        hist.add(1e6)
+        self.assertEqual(hist.min, 0.0)
+        self.assertLessEqual(hist.quantile(0.25), Histogram.bound(0))
+        self.assertEqual(hist.quantile(1), 1e6)
+        self.assertEqual(hist.counts[0], 3)
+        self.assertEqual(hist.counts[-1], 1)
+
+    def test_bounds(self):
+        self.assertEqual(Histogram.bound(0), 1e-5)
+        self.assertAlmostEqual(Histogram.bound(4), 2e-5)
+        self.assertGreater(Histogram.bound(111), 900)
+
+    def test_merge(self):
+        rnd = random.Random(2)
+        values = [rnd.uniform(0, 0.1) for _ in range(1000)]
+        whole, first, second = Histogram(), Histogram(), Histogram()
+        for (i, value) in enumerate(values):
+            whole.add(value)
+            (first if i % 2 else second).add(value)
+        first.merge(second)
+        self.assertEqual(list(first.counts), list(whole.counts))
+        self.assertEqual((first.count, first.min, first.max), (whole.count, whole.min, whole.max))
+        self.assertEqual(first.quantile(0.95), whole.quantile(0.95))
+        first.merge(Histogram())
+        self.assertEqual(first.count, whole.count)
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_record_and_stats(self):
+        profiler = Profiler()
+        with profiler.span('module', 'ping'):
+            pass
+        profiler.record('module', 'ping', 0.5)
+        profiler.record('exec', 'systemctl', 0.1)
+        stats = profiler.stats()
+        self.assertEqual(stats[('module', 'ping')].count, 2)
+        self.assertEqual(stats[('module', 'ping')].max, 0.5)
+
+        # stats() es una copia.
+        stats[('exec', 'systemctl')].add(1)
+        self.assertEqual(profiler.stats()[('exec', 'systemctl')].count, 1)
+
+    def test_disabled(self):
+        profiler = Profiler(enabled=False)
+        profiler.record('module', 'ping', 0.5)
+        profiler.merge(Profiler.default().stats())
+        self.assertEqual(profiler.stats(), {})
+
+    def test_merge_and_report(self):
+        profiler, worker = Profiler(), Profiler()
+        profiler.record('module', 'ping', 0.2)
+        worker.record('module', 'ping', 0.4)
+        worker.record('target', 'raid/md0', 1.0)
+        profiler.merge(worker.stats())
+        stats = profiler.stats()
+        self.assertEqual(stats[('module', 'ping')].count, 2)
+        self.assertEqual(stats[('target', 'raid/md0')].count, 1)
+
+        lines = profiler.report().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('raid/md0', lines[1])
+        self.assertEqual(len(profiler.report('module').splitlines()), 2)
+        profiler.clear()
+        self.assertEqual(profiler.stats(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
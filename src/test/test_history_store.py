@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de HistoryStore (rings y rollups), se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.history import HistoryStore
+
+
+class TestRing(unittest.TestCase):
+
+    def setUp(self):
+        # Los rings pequeños (10 puntos de 1 minuto) solo muestran los últimos 10 minutos.
+        self.minute = (int(time.time()) // 60 - 5) * 60
+        # Inicio de una hora que tiene detrás otra hora completa, todo dentro de las 24 h del ring de 1 minuto.
+        self.base = (int(time.time()) // 3600 - 2) * 3600
+
+    def test_same_bucket(self):
+        ring = HistoryStore.Ring(60, 10)
+        for (offset, value) in ((1, 4.0), (20, 1.5), (59, 8.25)):
+            ring.add(self.minute + offset, value)
+        points = ring.points()
+        self.assertEqual(len(points), 1)
+        self.assertEqual(points[0], {'time': self.minute, 'avg': 13.75 / 3, 'min': 1.5, 'max': 8.25, 'count': 3})
+
+    def test_wrap_replaces_old_bucket(self):
+        ring = HistoryStore.Ring(60, 10)
+        ring.add(self.minute - 300, 1.0)
+        ring.add(self.minute + 300, 2.0)
+        points = ring.points()
+        self.assertEqual(len(points), 1)
+        self.assertEqual(points[0]['time'], self.minute + 300)
+        self.assertEqual(points[0]['count'], 1)
+
+    def test_points_range(self):
+        ring = HistoryStore.Ring(60, 1440)
+        for minute in range(5):
+            ring.add(self.base + minute * 60, float(minute))
+        self.assertEqual([p['avg'] for p in ring.points()], [0.0, 1.0, 2.0, 3.0, 4.0])
+        self.assertEqual([p['avg'] for p in ring.points(self.base + 120, self.base + 180)], [2.0, 3.0])
+
+    def test_double_precision(self):
+        ring = HistoryStore.Ring(60, 10)
+        ring.add(self.minute, 123456789.123)
+        ring.add(self.minute + 1, 0.1)
+        point = ring.points()[0]
+        self.assertEqual(point['max'], 123456789.123)
+        self.assertEqual(point['min'], 0.1)
+
+    def test_dirty_slots(self):
+        ring = HistoryStore.Ring(60, 10)
+        ring.add(self.minute, 1.0)
+        ring.add(self.minute + 60, 2.0)
+        slots = ring.dirty_slots()
+        self.assertEqual([s[2] for s in slots], [1, 1])
+        self.assertEqual(sorted(s[1] for s in slots), [self.minute // 60, self.minute // 60 + 1])
+        ring.dirty.clear()
+        self.assertEqual(ring.dirty_slots(), [])
+
+    def test_sparse_until_dense(self):
+        # Con pocos puntos no se reservan los arrays, con más de size / 8 se pasan a arrays sin perder datos.
+        start = self.minute - 200 * 60
+        ring = HistoryStore.Ring(60, 1440)
+        self.assertFalse(ring.is_dense)
+        self.assertIsNone(ring.count)
+        for minute in range(180):
+            ring.add(start + minute * 60, float(minute))
+        self.assertFalse(ring.is_dense)
+        ring.add(start + 180 * 60, 180.0)
+        self.assertTrue(ring.is_dense)
+        self.assertEqual(len(ring.count), 1440)
+        self.assertEqual([p['avg'] for p in ring.points()], [float(m) for m in range(181)])
+        self.assertEqual(len(ring.dirty_slots()), 181)
+
+        ring.clear_slots(list(ring.dirty))
+        self.assertFalse(ring.is_dense)
+        self.assertEqual(ring.points(), [])
+
+    def test_series_rollups(self):
+        series = HistoryStore.Series('x', HistoryStore.rollups)
+        for minute in range(90):
+            series.add(self.base + minute * 60, float(minute))
+        self.assertEqual(len(series.rings['1m'].points()), 90)
+        hours = series.rings['1h'].points()
+        self.assertEqual([p['count'] for p in hours], [60, 30])
+        self.assertEqual(hours[0]['avg'], 29.5)
+        self.assertEqual((hours[1]['min'], hours[1]['max']), (60.0, 89.0))
+        days = series.rings['1d'].points()
+        self.assertEqual(sum(p['count'] for p in days), 90)
+        self.assertEqual(series.last_value, 89.0)
+
+
+class TestHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, 'history.db')
+        self.base = (int(time.time()) // 3600 - 1) * 3600
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_add_other_data(self):
+        history = HistoryStore(None)
+        count = history.add('web', 'url', {'code': 200, 'time_total': '12.5', 'alert': 80, 'ssl': True,
+                                           'host': 'x', 'phase': {'dns': 1, 'deep': {'x': 1}}}, True, self.base)
+        self.assertEqual(count, 4)
+        self.assertEqual(history.names, ['web/url/code', 'web/url/phase.dns', 'web/url/status', 'web/url/time_total'])
+        self.assertEqual(history.last('web/url/time_total'), (self.base, 12.5))
+
+    def test_max_series(self):
+        history = HistoryStore(None, max_series=2)
+        self.assertTrue(history.add_value('a', 1, self.base))
+        self.assertTrue(history.add_value('b', 1, self.base))
+        self.assertFalse(history.add_value('c', 1, self.base))
+        self.assertTrue(history.add_value('a', 2, self.base))
+        self.assertFalse(history.add_value('a', 'nan', self.base))
+
+    def test_save_and_load(self):
+        history = HistoryStore(self.file)
+        for minute in range(3):
+            history.add_value('ping/h/rtt', 10.0 + minute, self.base + minute * 60)
+        self.assertTrue(history.save(True))
+        self.assertFalse(history.is_changed)
+        history.close()
+
+        history = HistoryStore(self.file)
+        self.assertEqual(history.names, ['ping/h/rtt'])
+        self.assertEqual(history.last('ping/h/rtt'), (self.base + 120, 12.0))
+        self.assertEqual([p['avg'] for p in history.get('ping/h/rtt')], [10.0, 11.0, 12.0])
+        self.assertEqual(history.get('ping/h/rtt', '1h')[0]['count'], 3)
+        summary = history.summary('ping/h/rtt', time.time() - self.base + 60)
+        self.assertEqual((summary['min'], summary['max'], summary['count']), (10.0, 12.0, 3))
+        history.close()
+
+    def test_save_interval(self):
+        history = HistoryStore(self.file, save_interval=3600)
+        history.add_value('a', 1, self.base)
+        self.assertTrue(history.save(True))
+        history.add_value('a', 2, self.base)
+        self.assertTrue(history.save())
+        # No ha pasado save_interval, el valor sigue pendiente.
+        self.assertTrue(history.is_changed)
+        history.close()
+        self.assertFalse(history.is_changed)
+
+    def test_merge_unloaded_series(self):
+        history = HistoryStore(self.file)
+        history.add_value('a', 1.0, self.base)
+        history.close()
+
+        # Los puntos de la serie no se leen al abrir, los valores nuevos se suman a los guardados al escribir.
+        history = HistoryStore(self.file)
+        history.add_value('a', 5.0, self.base + 10)
+        history.add_value('a', 7.0, self.base + 60)
+        history.save(True)
+        history.add_value('a', 3.0, self.base + 20)
+        history.close()
+
+        history = HistoryStore(self.file)
+        points = history.get('a')
+        self.assertEqual([(p['count'], p['min'], p['max']) for p in points], [(3, 1.0, 5.0), (1, 7.0, 7.0)])
+        self.assertEqual(points[0]['avg'], 3.0)
+        history.close()
+
+    def test_unloaded_series_memory(self):
+        history = HistoryStore(self.file)
+        for name in ('a', 'b'):
+            history.add_value(name, 1.0, self.base)
+        history.close()
+
+        # Como en el modo oneshot: las series no se leen y solo se guardan los puntos añadidos, sin arrays.
+        history = HistoryStore(self.file)
+        for name in ('a', 'b'):
+            history.add_value(name, 2.0, self.base + 60)
+        series = history._HistoryStore__series['a']
+        self.assertFalse(series.is_loaded)
+        self.assertFalse(any(ring.is_dense for ring in series.rings.values()))
+        self.assertEqual(len(series.rings['1m'].sparse), 1)
+        history.close()
+
+    def test_read_before_save(self):
+        history = HistoryStore(self.file)
+        history.add_value('a', 1.0, self.base)
+        history.close()
+        history = HistoryStore(self.file)
+        history.add_value('a', 3.0, self.base)
+        self.assertEqual(history.get('a')[0]['count'], 2)
+        history.close()
+        history = HistoryStore(self.file)
+        self.assertEqual(history.get('a')[0]['avg'], 2.0)
+        history.close()
+
+    def test_to_number(self):
+        self.assertEqual(HistoryStore.to_number('85%'), 85.0)
+        self.assertEqual(HistoryStore.to_number(False), 0.0)
+        self.assertIsNone(HistoryStore.to_number('inf'))
+        self.assertIsNone(HistoryStore.to_number(None))
+        self.assertIsNone(HistoryStore.to_number('abc'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de HttpCheck contra un servidor HTTP local, se ejecutan desde src con:
+python3 -m unittest discover -s test
+"""
+
+import os
+import sys
+import time
+import socket
+import threading
+import unittest
+import http.server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.net import HttpCheck
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/redirect':
+            self.reply(302, b'', {'Location': '/ok'})
+        elif self.path == '/loop':
+            self.reply(302, b'', {'Location': '/loop'})
+        elif self.path == '/slow':
+            time.sleep(2)
+            self.reply(200, b'slow')
+        elif self.path == '/big':
+            self.reply(200, b'x' * 1024)
+        elif self.path == '/ok':
+            self.reply(200, b'ok')
+        else:
+            self.reply(404, b'not found')
+
+    def reply(self, code: int, body: bytes, headers: dict = None):
+        self.send_response(code)
+        for (key, value) in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(http.server.ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # El cliente cierra la conexión en los tests de timeout, no es un error.
+        pass
+
+
+class TestHttpCheck(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = Server(('127.0.0.1', 0), Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = 'http://127.0.0.1:{0}'.format(cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.http = HttpCheck(timeout_ttfb=5, max_body=512)
+
+    def tearDown(self):
+        self.http.close()
+
+    def test_ok(self):
+        result = self.http.check(self.base + '/ok')
+        self.assertTrue(result.is_ok)
+        self.assertEqual(result.code, 200)
+        self.assertFalse(result.reused)
+        data = result.as_dict()
+        self.assertEqual(data['code'], 200)
+        self.assertIn('time_ttfb', data)
+        self.assertNotIn('error', data)
+
+    def test_keep_alive(self):
+        self.http.check(self.base + '/ok')
+        result = self.http.check(self.base + '/ok')
+        self.assertTrue(result.is_ok)
+        self.assertTrue(result.reused)
+
+    def test_not_found(self):
+        # Un código de error HTTP no es un error del check, el modulo decide con el código.
+        result = self.http.check(self.base + '/missing')
+        self.assertTrue(result.is_ok)
+        self.assertEqual(result.code, 404)
+
+    def test_redirect(self):
+        result = self.http.check(self.base + '/redirect')
+        self.assertEqual(result.code, 200)
+        self.assertEqual(result.redirects, 1)
+        self.assertEqual(result.url_final, self.base + '/ok')
+
+    def test_too_many_redirects(self):
+        self.http.max_redirects = 2
+        result = self.http.check(self.base + '/loop')
+        self.assertFalse(result.is_ok)
+        self.assertEqual(result.phase, 'redirect')
+        self.assertEqual(result.redirects, 2)
+
+    def test_ttfb_timeout(self):
+        self.http.timeout_ttfb = 0.3
+        start = time.monotonic()
+        result = self.http.check(self.base + '/slow')
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertFalse(result.is_ok)
+        self.assertEqual(result.phase, 'ttfb')
+
+    def test_body_over_max_not_reused(self):
+        result = self.http.check(self.base + '/big')
+        self.assertEqual(result.code, 200)
+        result = self.http.check(self.base + '/ok')
+        self.assertFalse(result.reused)
+
+    def test_connect_refused(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        result = self.http.check('http://127.0.0.1:{0}/'.format(port))
+        self.assertFalse(result.is_ok)
+        self.assertEqual(result.phase, 'connect')
+
+    def test_scheme_not_supported(self):
+        result = self.http.check('ftp://127.0.0.1/')
+        self.assertEqual(result.phase, 'url')
+
+    def test_normalize_url(self):
+        self.assertEqual(HttpCheck.normalize_url(' www.example.com '), 'http://www.example.com')
+        self.assertEqual(HttpCheck.normalize_url('https://example.com'), 'https://example.com')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de IcmpPing, se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import time
+import struct
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.net import IcmpPing
+
+
+class TestIcmpPacket(unittest.TestCase):
+
+    def test_checksum(self):
+        checksum = IcmpPing._IcmpPing__checksum
+        # Ejemplo de RFC 1071 (sin complementar 0xddf2).
+        self.assertEqual(checksum(bytes([0x00, 0x01, 0xf2, 0x03, 0xf4, 0xf5, 0xf6, 0xf7])), 0x220d)
+        self.assertEqual(checksum(b'\x01'), checksum(b'\x01\x00'))
+
+    def test_packet(self):
+        packet = IcmpPing(payload_size=7)._IcmpPing__packet(0x1234, 5)
+        self.assertEqual(len(packet), 15)
+        icmp_type, code, _, ident, seq = struct.unpack('!BBHHH', packet[:8])
+        self.assertEqual((icmp_type, code, ident, seq), (8, 0, 0x1234, 5))
+        # La suma de un paquete con su checksum es 0.
+        self.assertEqual(IcmpPing._IcmpPing__checksum(packet), 0)
+
+
+class TestHostResult(unittest.TestCase):
+
+    def test_stats(self):
+        result = IcmpPing.HostResult('h', '10.0.0.1')
+        self.assertFalse(result.is_alive)
+        self.assertEqual(result.loss, 100.0)
+        self.assertIsNone(result.jitter)
+        result.sent = 4
+        result.received = 3
+        result.rtt = [0.010, 0.014, 0.011]
+        self.assertTrue(result.is_alive)
+        self.assertEqual(result.loss, 25.0)
+        self.assertEqual((result.rtt_min, result.rtt_max), (0.010, 0.014))
+        data = result.as_dict()
+        self.assertEqual((data['rtt_avg'], data['jitter'], data['loss']), (11.667, 3.5, 25.0))
+
+
+class TestResolve(unittest.TestCase):
+
+    def test_ipv4_without_dns(self):
+        with mock.patch.object(IcmpPing, 'resolve', side_effect=AssertionError("DNS lookup")):
+            self.assertEqual(IcmpPing.resolve_all(['10.0.0.1', '127.0.0.1']),
+                             {'10.0.0.1': ('10.0.0.1', False), '127.0.0.1': ('127.0.0.1', False)})
+
+    def test_localhost(self):
+        self.assertEqual(IcmpPing.resolve_all(['localhost'], 5), {'localhost': ('127.0.0.1', False)})
+
+    def test_total_timeout(self):
+        # Los hosts se resuelven a la vez y el deadline es del total, no de cada host.
+        release = threading.Event()
+
+        def resolve(host):
+            if host.startswith('slow'):
+                release.wait(5)
+            return '10.0.0.{0}'.format(host[-1])
+
+        with mock.patch.object(IcmpPing, 'resolve', side_effect=resolve):
+            start = time.monotonic()
+            data = IcmpPing.resolve_all(['slow1', 'slow2', 'fast3'], 0.2)
+            elapsed = time.monotonic() - start
+            release.set()
+        self.assertLess(elapsed, 1)
+        self.assertEqual(data, {'slow1': (None, True), 'slow2': (None, True), 'fast3': ('10.0.0.3', False)})
+
+
+@unittest.skipUnless(IcmpPing.is_available(), "ICMP socket not allowed")
+class TestSweep(unittest.TestCase):
+
+    def test_localhost(self):
+        results = IcmpPing(timeout=2, attempt=3, interval=0.01).sweep({'127.0.0.1': {}, 'localhost': {'attempt': 1}})
+        self.assertTrue(results['127.0.0.1'].is_alive)
+        self.assertEqual((results['127.0.0.1'].sent, results['127.0.0.1'].received), (3, 3))
+        self.assertEqual((results['localhost'].address, results['localhost'].received), ('127.0.0.1', 1))
+
+    def test_dns_timeout(self):
+        with mock.patch.object(IcmpPing, 'resolve', side_effect=lambda host: time.sleep(2)):
+            result = IcmpPing(timeout=0.1).sweep(['slow.example'])['slow.example']
+        self.assertFalse(result.is_alive)
+        self.assertEqual(result.error, IcmpPing.error_dns_timeout)
+        self.assertEqual(result.sent, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
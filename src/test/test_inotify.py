@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de Inotify, se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import select
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.linux import Inotify
+
+
+@unittest.skipUnless(Inotify.is_available(), "inotify not available")
+class TestInotify(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.watch = Inotify()
+        self.wd = self.watch.add_watch(self.dir, Inotify.IN_CLOSE_WRITE | Inotify.IN_MOVED_TO)
+
+    def tearDown(self):
+        self.watch.close()
+        shutil.rmtree(self.dir)
+
+    def wait_events(self) -> list:
+        """ Espera a que el descriptor este listo, como hace el event loop del daemon. """
+        readable, _, _ = select.select([self.watch], [], [], 5)
+        self.assertTrue(readable)
+        return self.watch.read()
+
+    def test_no_events(self):
+        self.assertEqual(self.watch.read(), [])
+
+    def test_close_write(self):
+        with open(os.path.join(self.dir, 'monitor.json'), 'w') as f:
+            f.write('{}')
+        events = self.wait_events()
+        self.assertEqual([event.name for event in events], ['monitor.json'])
+        self.assertEqual(events[0].wd, self.wd)
+        self.assertTrue(events[0].mask & Inotify.IN_CLOSE_WRITE)
+        self.assertFalse(events[0].is_overflow)
+
+    def test_moved_to(self):
+        # Muchos editores guardan en un archivo temporal y lo renombran.
+        path_tmp = os.path.join(tempfile.mkdtemp(), 'tmp')
+        with open(path_tmp, 'w') as f:
+            f.write('{}')
+        os.rename(path_tmp, os.path.join(self.dir, 'modules.json'))
+        shutil.rmtree(os.path.dirname(path_tmp))
+        events = self.wait_events()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].name, 'modules.json')
+        self.assertTrue(events[0].mask & Inotify.IN_MOVED_TO)
+
+    def test_several_events(self):
+        for name in ('a.json', 'b.json', 'c.json'):
+            with open(os.path.join(self.dir, name), 'w') as f:
+                f.write(name)
+        events = self.wait_events()
+        self.assertEqual(sorted(event.name for event in events), ['a.json', 'b.json', 'c.json'])
+
+    def test_add_watch_error(self):
+        with self.assertRaises(OSError):
+            self.watch.add_watch(os.path.join(self.dir, 'not_exist'), Inotify.IN_CLOSE_WRITE)
+
+    def test_close(self):
+        self.watch.close()
+        self.assertFalse(self.watch.is_open)
+        self.assertEqual(self.watch.read(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de la carga diferida de dependencias (arranque con watchful.timer), se ejecutan desde src con:
+python3 -m unittest discover -s test
+"""
+
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DIR_SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Se importa en un proceso nuevo, en este proceso otros tests ya han cargado parte de los módulos.
+CODE = '''
+import sys
+import json
+import main
+from lib import Monitor, Telegram
+from lib.db import MySQLPool
+from lib.ssh_pool import SSHPool
+tg = Telegram('', '')
+tg.send_message("msg")
+print(json.dumps({'modules': sorted(sys.modules), 'thread': tg.pool_send_msg is not None}))
+'''
+
+
+class TestLazyImports(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(path for path in sys.path if path)
+        output = subprocess.check_output([sys.executable, '-c', CODE], cwd=DIR_SRC, env=env)
+        cls.result = json.loads(output.decode().strip().splitlines()[-1])
+
+    def assertNotLoaded(self, *names):
+        for name in names:
+            self.assertNotIn(name, self.result['modules'])
+
+    def test_dependencies(self):
+        self.assertNotLoaded('paramiko', 'pymysql', 'requests')
+
+    def test_daemon_only(self):
+        self.assertNotLoaded('lib.net.metrics_server', 'lib.linux.inotify', 'http.server')
+
+    def test_pprint(self):
+        self.assertNotLoaded('pprint')
+
+    def test_telegram_not_configured(self):
+        # Sin token ni chat no se crea el hilo de envío.
+        self.assertFalse(self.result['thread'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de Mem (/proc/meminfo), se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.linux import Mem
+
+MEMINFO = b'''MemTotal:        8000000 kB
+MemFree:         1000000 kB
+MemAvailable:    6000000 kB
+Buffers:          200000 kB
+Cached:          2000000 kB
+SwapTotal:       2000000 kB
+SwapFree:        1500000 kB
+HugePages_Total:       0
+Bad line
+'''
+
+
+class TestMem(unittest.TestCase):
+
+    def test_snapshot(self):
+        snapshot = Mem.Snapshot(MEMINFO)
+        self.assertEqual(snapshot['MemTotal'], 8000000)
+        self.assertEqual(snapshot['HugePages_Total'], 0)
+        self.assertNotIn('Bad line', snapshot)
+        self.assertIsInstance(snapshot.time, float)
+
+    def test_ram_swap(self):
+        mem = Mem(Mem.Snapshot(MEMINFO))
+        self.assertEqual(mem.ram.total, 8000000)
+        self.assertEqual(mem.ram.used, 2000000)
+        self.assertAlmostEqual(mem.ram.used_percent, 25.0)
+        self.assertEqual(mem.swap.used, 500000)
+        self.assertAlmostEqual(mem.swap.used_percent, 25.0)
+
+    def test_without_mem_available(self):
+        # Kernel < 3.14, libre es MemFree + Buffers + Cached.
+        data = b'\n'.join(line for line in MEMINFO.split(b'\n') if not line.startswith(b'MemAvailable'))
+        mem = Mem(Mem.Snapshot(data))
+        self.assertEqual(mem.ram.free, 3200000)
+
+    def test_without_swap(self):
+        mem = Mem(Mem.Snapshot(b'MemTotal: 100 kB\nSwapTotal: 0 kB\nSwapFree: 0 kB\n'))
+        self.assertEqual(mem.swap.used_percent, 0.0)
+
+    @unittest.skipUnless(os.path.exists('/proc/meminfo'), "/proc/meminfo not found")
+    def test_read(self):
+        mem = Mem()
+        snapshot = mem.snapshot
+        self.assertGreater(snapshot['MemTotal'], 0)
+        # La misma foto hasta que se llama a refresh.
+        self.assertIs(mem.snapshot, snapshot)
+        self.assertIsNot(mem.refresh(), snapshot)
+        self.assertGreater(Mem.read()['MemTotal'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de MetricsServer (formato y endpoint /metrics), se ejecutan desde src con:
+python3 -m unittest discover -s test
+"""
+
+import os
+import sys
+import unittest
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import ObjectBase
+from lib.debug import DebugLevel
+from lib.net import MetricsServer
+
+STATUS = {
+    'ping': {
+        '10.0.0.1': {'status': True, 'other_data': {'time': '1.5', 'alert': 3}},
+        'host "b"': {'status': False, 'other_data': {'time': 'timeout', 'remediation': True}}
+    },
+    'hddtemp': {
+        'sda': {'status': True, 'other_data': {'temp': 35, 'smart': {'reallocated': 0, 'deep': {'x': 1}}}}
+    },
+    'broken': 'not a dict'
+}
+
+
+class TestMetricsRender(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = MetricsServer().render(STATUS).decode('utf-8').splitlines()
+
+    def test_status(self):
+        self.assertIn('watchful_check_status{module="ping",key="10.0.0.1"} 1', self.lines)
+        self.assertIn('watchful_check_status{module="ping",key="host \\"b\\""} 0', self.lines)
+
+    def test_values(self):
+        self.assertIn('watchful_check_value{module="ping",key="10.0.0.1",field="time"} 1.5', self.lines)
+        self.assertIn('watchful_check_value{module="hddtemp",key="sda",field="temp"} 35.0', self.lines)
+        # Un nivel de dict anidado, el resto se ignora.
+        self.assertIn('watchful_check_value{module="hddtemp",key="sda",field="smart.reallocated"} 0.0', self.lines)
+        text = '\n'.join(self.lines)
+        self.assertNotIn('deep', text)
+        # Ni los umbrales (alert), ni los bool, ni los textos que no son números.
+        self.assertNotIn('field="alert"', text)
+        self.assertNotIn('remediation', text)
+        self.assertNotIn('module="ping",key="host \\"b\\"",field="time"', text)
+        self.assertNotIn('broken', text)
+
+    def test_modules(self):
+        text = MetricsServer().render({}, {'ping': {'time': 100, 'duration': 0.25, 'ok': False}}).decode('utf-8')
+        self.assertIn('watchful_module_last_run_timestamp_seconds{module="ping"} 100.0', text)
+        self.assertIn('watchful_module_duration_seconds{module="ping"} 0.25', text)
+        self.assertIn('watchful_module_ok{module="ping"} 0.0', text)
+
+    def test_exclude(self):
+        text = MetricsServer(exclude=['time']).render(STATUS).decode('utf-8')
+        self.assertNotIn('field="time"', text)
+        self.assertIn('field="alert"', text)
+
+
+class TestMetricsServer(unittest.TestCase):
+
+    def setUp(self):
+        ObjectBase.debug.level = DebugLevel.emergency
+        self.server = MetricsServer('127.0.0.1', 0)
+        self.server.start()
+        self.url = 'http://127.0.0.1:{0}'.format(self.server._MetricsServer__server.server_address[1])
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_snapshot(self):
+        self.server.update(STATUS)
+        with urllib.request.urlopen(self.url + '/metrics', timeout=5) as response:
+            self.assertEqual(response.status, 200)
+            self.assertTrue(response.headers['Content-Type'].startswith('text/plain; version=0.0.4'))
+            body = response.read()
+        self.assertEqual(body, self.server.snapshot)
+        self.assertIn(b'watchful_check_status{module="ping",key="10.0.0.1"} 1', body)
+
+    def test_not_found(self):
+        with self.assertRaises(urllib.error.HTTPError) as cm:
+            urllib.request.urlopen(self.url + '/other', timeout=5)
+        self.assertEqual(cm.exception.code, 404)
+
+    def test_stop(self):
+        self.server.stop()
+        self.assertFalse(self.server.is_running)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de los intervalos de los targets (ModuleBase), se ejecutan desde src con:
+python3 -m unittest discover -s test
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import Monitor, ObjectBase
+from lib.debug import DebugLevel
+from lib.modules import ModuleBase, module_base
+
+
+class FakeClock(object):
+
+    """ Sustituye a time en module_base, el tiempo solo avanza cuando lo pide el test. """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class Watchful(ModuleBase):
+
+    def __init__(self, monitor):
+        super().__init__(monitor, 'tgt')
+
+
+class TestTargetDue(unittest.TestCase):
+
+    def setUp(self):
+        ObjectBase.debug.level = DebugLevel.emergency
+        self.dir = tempfile.mkdtemp()
+        dir_etc = os.path.join(self.dir, 'etc')
+        dir_modules = os.path.join(self.dir, 'watchfuls')
+        for path in (dir_etc, dir_modules):
+            os.makedirs(path)
+        conf = {
+            'config.json': {'telegram': {'token': '', 'chat_id': ''}},
+            'monitor.json': {},
+            'modules.json': {'tgt': {'interval': 60, 'list': {'fast': {'interval': 10},
+                                                              'slow': {'interval': 300, 'jitter': 30},
+                                                              'plain': True}}}
+        }
+        for (file_name, data) in conf.items():
+            with open(os.path.join(dir_etc, file_name), 'w') as f:
+                json.dump(data, f)
+        self.monitor = Monitor(self.dir, dir_etc, dir_modules, os.path.join(self.dir, 'var'))
+        self.module = Watchful(self.monitor)
+        self.clock = FakeClock()
+        patcher = mock.patch.object(module_base, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.monitor.close()
+        shutil.rmtree(self.dir)
+
+    def due(self, seconds: float, key: str, key_name_list: str = 'list') -> bool:
+        self.clock.now = 1000.0 + seconds
+        return self.module._is_target_due(key, key_name_list)
+
+    def test_get_interval(self):
+        self.assertEqual(self.module.get_interval(), (60, 0))
+        self.assertEqual(self.module.get_interval('fast'), (10, 0))
+        self.assertEqual(self.module.get_interval('slow'), (300, 30))
+        # Los targets sin interval y los que no están en la lista usan el del modulo.
+        self.assertEqual(self.module.get_interval('plain'), (60, 0))
+        self.assertEqual(self.module.get_interval('missing'), (60, 0))
+        self.assertEqual(self.module.get_interval_min(), 10)
+
+    def test_first_check_always_due(self):
+        for key in ('fast', 'slow', 'plain', 'missing'):
+            self.assertTrue(self.due(0, key))
+
+    def test_interval(self):
+        self.assertTrue(self.due(0, 'fast'))
+        self.assertFalse(self.due(5, 'fast'))
+        self.assertFalse(self.due(9, 'fast'))
+        # Con la tolerancia (0.5 s) un target que llega un poco antes no espera a la siguiente vuelta.
+        self.assertTrue(self.due(9.6, 'fast'))
+        self.assertFalse(self.due(15, 'fast'))
+        self.assertTrue(self.due(20, 'fast'))
+
+        self.assertTrue(self.due(0, 'plain'))
+        self.assertFalse(self.due(20, 'plain'))
+        self.assertTrue(self.due(60, 'plain'))
+
+    def test_jitter(self):
+        # El siguiente deadline esta entre interval e interval + jitter.
+        for _ in range(20):
+            self.module = Watchful(self.monitor)
+            self.assertTrue(self.due(0, 'slow'))
+            self.assertFalse(self.due(299, 'slow'))
+            self.assertTrue(self.due(330, 'slow'))
+
+    def test_lists_are_independent(self):
+        self.assertTrue(self.due(0, 'fast'))
+        self.assertTrue(self.due(1, 'fast', 'remote'))
+        self.assertFalse(self.due(2, 'fast'))
+        self.assertFalse(self.due(2, 'fast', 'remote'))
+
+
+if __name__ == '__main__':
+    unittest.main()
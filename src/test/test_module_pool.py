@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de ModulePool (modo isolate), se ejecutan desde src con:
+python3 -m unittest discover -s test
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import ObjectBase
+from lib.debug import DebugLevel
+from lib.modules import ModulePool
+from lib.modules import ReturnModuleCheck
+
+# Modulo de prueba, espera los segundos de la opción sleep y retorna un target con el pid del worker.
+MODULE_SOURCE = '''
+import os
+import time
+from lib.modules import ModuleBase
+
+
+class Watchful(ModuleBase):
+
+    def __init__(self, monitor):
+        super().__init__(monitor, __name__)
+
+    def check(self):
+        time.sleep(self.get_conf('sleep', 0))
+        if self.get_conf('fail', False):
+            raise ValueError("check failed")
+        self.dict_return.set('pid', True, str(os.getpid()))
+        self.send_message("checked")
+        return self.dict_return
+'''
+
+
+class TestModulePool(unittest.TestCase):
+
+    def setUp(self):
+        ObjectBase.debug.level = DebugLevel.emergency
+        self.dir = tempfile.mkdtemp()
+        with open(os.path.join(self.dir, 'pool_mod.py'), 'w') as f:
+            f.write(MODULE_SOURCE)
+        self.pool = ModulePool(self.dir, workers=1, preload=('pool_mod', ))
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.dir)
+
+    def run_check(self, conf: dict, timeout: float = 10) -> ModulePool.Result:
+        return self.pool.run('pool_mod', conf, {}, 60, {}, timeout=timeout)
+
+    def test_run(self):
+        result = self.run_check({'enabled': True})
+        self.assertTrue(result.packed)
+        r_check = ReturnModuleCheck()
+        r_check.unpack(result.data)
+        self.assertTrue(r_check.get_status('pid'))
+        self.assertNotEqual(r_check.get_message('pid'), str(os.getpid()))
+        self.assertEqual(result.messages, [("checked", None)])
+        self.assertEqual(self.pool.count, 1)
+
+    def test_worker_reused(self):
+        pids = set()
+        for _ in range(3):
+            r_check = ReturnModuleCheck()
+            r_check.unpack(self.run_check({'enabled': True}).data)
+            pids.add(r_check.get_message('pid'))
+        self.assertEqual(len(pids), 1)
+
+    def test_deadline_exceeded(self):
+        r_check = ReturnModuleCheck()
+        r_check.unpack(self.run_check({'enabled': True}).data)
+        pid_old = r_check.get_message('pid')
+
+        with self.assertRaises(ModulePool.DeadlineExceeded) as cm:
+            self.run_check({'enabled': True, 'sleep': 30}, timeout=0.5)
+        self.assertIsInstance(cm.exception, TimeoutError)
+        self.assertEqual(cm.exception.timeout, 0.5)
+
+        # El worker colgado se ha matado y hay otro en su lugar que atiende el siguiente check.
+        self.assertEqual(self.pool.count, 1)
+        r_check = ReturnModuleCheck()
+        r_check.unpack(self.run_check({'enabled': True}).data)
+        self.assertNotEqual(r_check.get_message('pid'), pid_old)
+
+    def test_check_error(self):
+        with self.assertRaises(RuntimeError) as cm:
+            self.run_check({'enabled': True, 'fail': True})
+        self.assertIn("check failed", str(cm.exception))
+        # El worker sigue vivo y se reutiliza.
+        self.assertTrue(self.run_check({'enabled': True}).packed)
+        self.assertEqual(self.pool.count, 1)
+
+    def test_closed(self):
+        self.pool.close()
+        with self.assertRaises(RuntimeError):
+            self.run_check({'enabled': True})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de ModuleRegistry (carga y recarga de módulos), se ejecutan desde src con:
+python3 -m unittest discover -s test
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import importlib
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.config import ConfigControl
+from lib.modules import ModuleRegistry
+
+# Modulo de prueba, no hereda de ModuleBase para no necesitar un Monitor.
+MODULE_SOURCE = '''
+VERSION = {0}
+CLOSED = []
+
+
+class Watchful(object):
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.version = VERSION
+
+    def close(self):
+        CLOSED.append(self)
+'''
+
+
+class FakeMonitor(object):
+
+    """ Lo único que usa el registro del Monitor, la configuración de los módulos. """
+
+    def __init__(self):
+        self.config_modules = ConfigControl(None, {})
+
+
+class TestModuleRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.names = ('reg_mod_a', 'reg_mod_b')
+        for name in self.names:
+            self.write(name, 1)
+        self.write('__init__', 1)
+        sys.path.append(self.dir)
+        self.monitor = FakeMonitor()
+        self.registry = ModuleRegistry(self.monitor, self.dir)
+
+    def tearDown(self):
+        self.registry.unload()
+        sys.path.remove(self.dir)
+        for name in self.names + ('reg_mod_c', ):
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.dir)
+
+    def write(self, name: str, version: int):
+        """ Escribe el modulo, cada versión con otra fecha de modificación. """
+        path = os.path.join(self.dir, '{0}.py'.format(name))
+        with open(path, 'w') as f:
+            f.write(MODULE_SOURCE.format(version))
+        mtime = 1500000000 + version
+        os.utime(path, (mtime, mtime))
+        importlib.invalidate_caches()
+
+    def test_discover(self):
+        self.assertEqual(self.registry.names, ['reg_mod_a', 'reg_mod_b'])
+        self.assertTrue(self.registry.is_exist('reg_mod_a'))
+        self.assertFalse(self.registry.is_exist('__init__'))
+        self.assertFalse(self.registry.is_exist(''))
+
+    def test_instance_kept(self):
+        instance = self.registry.get('reg_mod_a')
+        self.assertIs(instance.monitor, self.monitor)
+        self.assertIs(self.registry.get('reg_mod_a'), instance)
+        self.assertEqual(sys.modules['reg_mod_a'].CLOSED, [])
+
+    def test_config_changed(self):
+        # Instancia nueva con el mismo código, la anterior se cierra.
+        instance = self.registry.get('reg_mod_a')
+        module = sys.modules['reg_mod_a']
+        self.monitor.config_modules.set_conf(['reg_mod_a', 'enabled'], True)
+        new_instance = self.registry.get('reg_mod_a')
+        self.assertIsNot(new_instance, instance)
+        self.assertIs(sys.modules['reg_mod_a'], module)
+        self.assertEqual(module.CLOSED, [instance])
+        # Los cambios de otros módulos no le afectan.
+        self.monitor.config_modules.set_conf(['reg_mod_b', 'enabled'], False)
+        self.assertIs(self.registry.get('reg_mod_a'), new_instance)
+
+    def test_file_changed(self):
+        instance = self.registry.get('reg_mod_a')
+        self.assertEqual(instance.version, 1)
+        closed = sys.modules['reg_mod_a'].CLOSED
+        self.write('reg_mod_a', 2)
+        new_instance = self.registry.get('reg_mod_a')
+        self.assertEqual(new_instance.version, 2)
+        self.assertEqual(closed, [instance])
+        self.assertIs(self.registry.get('reg_mod_a'), new_instance)
+
+    def test_file_deleted(self):
+        self.registry.get('reg_mod_b')
+        os.remove(os.path.join(self.dir, 'reg_mod_b.py'))
+        with self.assertRaises(ModuleRegistry.ModuleNotFound):
+            self.registry.get('reg_mod_b')
+        self.assertEqual(self.registry.names, ['reg_mod_a'])
+        self.assertNotIn('reg_mod_b', sys.modules)
+
+    def test_not_registered(self):
+        with self.assertRaises(KeyError):
+            self.registry.get('missing')
+
+    def test_discover_changes(self):
+        instance = self.registry.get('reg_mod_a')
+        self.write('reg_mod_c', 1)
+        os.remove(os.path.join(self.dir, 'reg_mod_b.py'))
+        self.assertEqual(self.registry.discover(), ['reg_mod_a', 'reg_mod_c'])
+        # Los módulos que ya estaban mantienen su instancia.
+        self.assertIs(self.registry.get('reg_mod_a'), instance)
+        self.assertEqual(self.registry.get('reg_mod_c').version, 1)
+
+    def test_unload(self):
+        instance = self.registry.get('reg_mod_a')
+        self.registry.unload('reg_mod_b')
+        self.assertEqual(sys.modules['reg_mod_a'].CLOSED, [])
+        self.registry.unload()
+        self.assertEqual(sys.modules['reg_mod_a'].CLOSED, [instance])
+        self.assertIsNot(self.registry.get('reg_mod_a'), instance)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de Mounts (mountinfo y statvfs), se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.linux import Mounts
+
+
+MOUNTINFO = """\
+22 1 8:2 / / rw,relatime shared:1 - ext4 /dev/sda2 rw,errors=remount-ro
+23 22 0:21 / /proc rw,nosuid,nodev,noexec,relatime shared:12 - proc proc rw
+24 22 0:22 / /run rw,nosuid,nodev shared:5 master:1 - tmpfs tmpfs rw,size=1611428k,mode=755
+25 22 8:1 / /boot/efi rw,relatime - vfat /dev/sda1 rw,fmask=0077
+26 22 8:3 / /mnt/my\\040disk rw,relatime shared:30 - ext4 /dev/sdb1 rw
+27 22 8:2 /srv /var/www rw,relatime shared:1 - ext4 /dev/sda2 rw,errors=remount-ro
+28 22 0:50 / /mnt/nas rw,relatime shared:40 - nfs4 nas:/export/data rw,vers=4.2
+bad line
+29 22 0:51 / /broken rw
+"""
+
+
+class TestMountinfo(unittest.TestCase):
+
+    def test_parse(self):
+        mounts = Mounts.parse(MOUNTINFO)
+        self.assertEqual([m.mount_id for m in mounts], [22, 23, 24, 25, 26, 27, 28])
+        root = mounts[0]
+        self.assertEqual((root.dev_id, root.root, root.mount_point, root.fstype, root.source, root.options),
+                         ('8:2', '/', '/', 'ext4', '/dev/sda2', 'rw,relatime'))
+
+    def test_optional_fields(self):
+        # Los campos opcionales (shared:N master:N) son variables, el tipo va después del separador "-".
+        mounts = {m.mount_point: m for m in Mounts.parse(MOUNTINFO)}
+        self.assertEqual(mounts['/run'].fstype, 'tmpfs')
+        self.assertEqual(mounts['/boot/efi'].fstype, 'vfat')
+        self.assertEqual(mounts['/boot/efi'].source, '/dev/sda1')
+
+    def test_unescape(self):
+        mounts = {m.mount_id: m for m in Mounts.parse(MOUNTINFO)}
+        self.assertEqual(mounts[26].mount_point, '/mnt/my disk')
+        mount = Mounts.parse("30 22 0:1 /a\\134b /x\\011y rw - ext4 /dev/x\\040y rw\n")[0]
+        self.assertEqual((mount.root, mount.mount_point, mount.source), ('/a\\b', '/x\ty', '/dev/x y'))
+
+    def test_name(self):
+        mounts = {m.mount_id: m for m in Mounts.parse(MOUNTINFO)}
+        self.assertEqual(mounts[22].name, 'sda2')
+        self.assertEqual(mounts[28].name, '/mnt/nas')
+
+    def test_empty(self):
+        self.assertEqual(Mounts.parse(""), [])
+
+
+class TestMounts(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, 'mountinfo')
+        with open(self.file, 'w') as f:
+            f.write(MOUNTINFO)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def new_mounts(self, exclude_fstype=None) -> Mounts:
+        mounts = Mounts(exclude_fstype)
+        mounts._Mounts__path_mountinfo = self.file
+        self.addCleanup(mounts.close)
+        return mounts
+
+    def test_filesystems(self):
+        # Sin proc ni tmpfs, y el bind mount de /dev/sda2 (/var/www) solo se cuenta una vez.
+        mount_points = [m.mount_point for m in self.new_mounts().filesystems()]
+        self.assertEqual(mount_points, ['/', '/boot/efi', '/mnt/my disk'])
+
+    def test_network_only_if_included(self):
+        mount_points = [m.mount_point for m in self.new_mounts().filesystems(['/mnt/nas'])]
+        self.assertEqual(mount_points, ['/', '/boot/efi', '/mnt/my disk', '/mnt/nas'])
+
+    def test_exclude_fstype(self):
+        # La lista sustituye a la de por defecto.
+        mount_points = [m.mount_point for m in self.new_mounts(['nfs4', 'vfat']).filesystems()]
+        self.assertEqual(mount_points, ['/', '/proc', '/run', '/mnt/my disk'])
+
+    def test_read_once(self):
+        mounts = self.new_mounts()
+        first = mounts.mounts
+        self.assertIs(mounts.mounts, first)
+        self.assertEqual(len(first), 7)
+
+    def test_proc_mountinfo(self):
+        mounts = Mounts()
+        self.addCleanup(mounts.close)
+        self.assertIn('/', [m.mount_point for m in mounts.mounts])
+        self.assertIs(mounts.mounts, mounts.mounts)
+
+    def test_usage(self):
+        usage = Mounts.Usage(os.statvfs_result((4096, 4096, 1000, 300, 250, 100, 40, 30, 0, 255)))
+        self.assertEqual((usage.size, usage.used, usage.avail), (4096000, 2867200, 1024000))
+        self.assertEqual((usage.inodes, usage.inodes_used, usage.inodes_avail), (100, 60, 30))
+        self.assertAlmostEqual(usage.used_percent, 700 * 100.0 / 950)
+        self.assertAlmostEqual(usage.inodes_used_percent, 60 * 100.0 / 90)
+
+        empty = Mounts.Usage(os.statvfs_result((4096, 4096, 0, 0, 0, 0, 0, 0, 0, 255)))
+        self.assertEqual((empty.used_percent, empty.inodes_used_percent), (0.0, 0.0))
+
+    def test_usage_path(self):
+        mounts = Mounts()
+        for timeout in (None, 5):
+            usage = mounts.usage('/', timeout)
+            self.assertGreater(usage.size, 0)
+            self.assertLessEqual(usage.used + usage.avail, usage.size)
+        with self.assertRaises(FileNotFoundError):
+            mounts.usage(os.path.join(self.dir, 'missing'), 5)
+
+    def test_usage_timeout(self):
+        # statvfs de un montaje de red caído no retorna, el check no espera más del timeout y no crea otro hilo.
+        release = threading.Event()
+        calls = []
+
+        def statvfs(path):
+            calls.append(path)
+            release.wait(5)
+            return statvfs_real('/')
+
+        statvfs_real = os.statvfs
+        mounts = Mounts()
+        with mock.patch('os.statvfs', statvfs):
+            self.addCleanup(release.set)
+            for _ in range(2):
+                start = time.monotonic()
+                with self.assertRaises(TimeoutError):
+                    mounts.usage('/mnt/nas', 0.1)
+                self.assertLess(time.monotonic() - start, 1)
+            self.assertEqual(calls, ['/mnt/nas'])
+            release.set()
+            self.assertGreater(mounts.usage('/mnt/nas', 5).size, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de MySQLPool, se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.db import MySQLPool
+
+
+class FakeConnection(object):
+
+    """ Conexión sin servidor, solo lo que usa el pool (ping y close). """
+
+    def __init__(self, *args):
+        self.args = args
+        self.pings = 0
+        self.is_closed = False
+        self.fail_ping = False
+
+    def ping(self, reconnect: bool = True):
+        self.pings += 1
+        if self.fail_ping:
+            raise ConnectionError("Lost connection")
+
+    def close(self):
+        self.is_closed = True
+
+
+class TestMySQLPool(unittest.TestCase):
+
+    def setUp(self):
+        self.connections = []
+        patcher = mock.patch.object(MySQLPool, '_MySQLPool__connect', side_effect=self.connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = MySQLPool()
+        self.addCleanup(self.pool.close)
+
+    def connect(self, *args) -> FakeConnection:
+        conn = FakeConnection(*args)
+        self.connections.append(conn)
+        return conn
+
+    def use(self, password: str = 'pass', host: str = 'db1'):
+        with self.pool.connection(host=host, user='u', password=password, db='x') as conn:
+            return conn
+
+    def test_reuse(self):
+        # La segunda vez no se conecta, solo se comprueba con un ping.
+        first = self.use()
+        self.assertIs(self.use(), first)
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(first.pings, 1)
+        self.assertEqual(first.args, ('db1', 3306, 'u', 'pass', 'x', ''))
+        self.assertEqual(self.pool.count, 1)
+
+    def test_password_change(self):
+        first = self.use()
+        second = self.use('other')
+        self.assertIsNot(second, first)
+        self.assertTrue(first.is_closed)
+
+    def test_error_closes(self):
+        with self.assertRaises(ValueError):
+            with self.pool.connection(host='db1', user='u', password='pass', db='x'):
+                raise ValueError("query failed")
+        self.assertTrue(self.connections[0].is_closed)
+        self.assertIsNot(self.use(), self.connections[0])
+
+    def test_ping_fails(self):
+        self.use().fail_ping = True
+        with self.assertRaises(ConnectionError):
+            self.use()
+        self.assertTrue(self.connections[0].is_closed)
+        self.assertEqual(self.pool.count, 0)
+        self.assertIsNot(self.use(), self.connections[0])
+
+    def test_max_idle(self):
+        self.pool.max_idle = 0
+        first = self.use(host='db1')
+        self.use(host='db2')
+        self.assertTrue(first.is_closed)
+        self.assertEqual(self.pool.count, 1)
+
+    def test_close(self):
+        self.use(host='db1')
+        self.use(host='db2')
+        self.pool.close()
+        self.assertTrue(all(conn.is_closed for conn in self.connections))
+        self.assertEqual(self.pool.count, 0)
+
+    def test_close_default(self):
+        with mock.patch.object(MySQLPool, '_MySQLPool__default_pool', None):
+            # Sin pool compartido no se crea uno para cerrarlo.
+            MySQLPool.close_default()
+            self.assertIsNone(MySQLPool._MySQLPool__default_pool)
+            with MySQLPool.default().connection(host='db1') as conn:
+                pass
+            MySQLPool.close_default()
+            self.assertTrue(conn.is_closed)
+            self.assertEqual(MySQLPool.default().count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests del Scheduler, se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import time
+import asyncio
+import unittest
+import concurrent.futures
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.scheduler import Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+
+    timeout = 5
+
+    def setUp(self):
+        self.scheduler = Scheduler(2)
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_start_once(self):
+        self.assertTrue(self.scheduler.start())
+        self.assertFalse(self.scheduler.start())
+        self.assertTrue(self.scheduler.is_running)
+
+    def test_submit_sync_async_and_coroutine(self):
+        async def add(a, b):
+            await asyncio.sleep(0)
+            return a + b
+
+        self.assertEqual(self.scheduler.submit(sum, [1, 2, 3]).result(self.timeout), 6)
+        self.assertEqual(self.scheduler.submit(add, 1, 2).result(self.timeout), 3)
+        self.assertEqual(self.scheduler.submit(add(2, 3)).result(self.timeout), 5)
+
+    def test_threads(self):
+        # Las funciones sync van al pool y las async al hilo del loop.
+        self.assertTrue(self.scheduler.submit(lambda: self.scheduler.is_pool_thread).result(self.timeout))
+        self.assertFalse(self.scheduler.submit(lambda: self.scheduler.is_loop_thread).result(self.timeout))
+
+        async def where():
+            return self.scheduler.is_loop_thread, self.scheduler.is_pool_thread
+        self.assertEqual(self.scheduler.submit(where).result(self.timeout), (True, False))
+        self.assertFalse(self.scheduler.is_loop_thread)
+        self.assertFalse(self.scheduler.is_pool_thread)
+
+    def test_map(self):
+        futures = self.scheduler.map(lambda x: x * 2, [1, 2, 3])
+        result = {futures[f]: f.result() for f in concurrent.futures.as_completed(futures, self.timeout)}
+        self.assertEqual(result, {1: 2, 2: 4, 3: 6})
+
+    def test_run_sync_does_not_block_loop(self):
+        async def both():
+            ticks = []
+
+            async def tick():
+                for _ in range(5):
+                    ticks.append(time.monotonic())
+                    await asyncio.sleep(0.02)
+            start = time.monotonic()
+            await asyncio.gather(self.scheduler.run_sync(time.sleep, 0.2), self.scheduler.run_sync(time.sleep, 0.2),
+                                 tick())
+            return time.monotonic() - start, len(ticks)
+
+        elapsed, ticks = self.scheduler.submit(both).result(self.timeout)
+        # Los dos sleep se ejecutan a la vez en el pool y el loop sigue atendiendo a las corutinas.
+        self.assertLess(elapsed, 0.35)
+        self.assertEqual(ticks, 5)
+
+    def test_stop_cancels_pending(self):
+        future = self.scheduler.submit(asyncio.sleep(60))
+        self.scheduler.stop()
+        self.assertTrue(future.cancelled())
+        self.assertFalse(self.scheduler.is_running)
+        # Se puede volver a iniciar.
+        self.assertEqual(self.scheduler.submit(sum, [1, 1]).result(self.timeout), 2)
+
+    def test_stop_from_loop_thread(self):
+        async def stop():
+            # Retorna sin esperar, el loop se para y se cierra en otro hilo.
+            self.scheduler.stop()
+            return asyncio.get_running_loop()
+
+        loop = self.scheduler.submit(stop).result(self.timeout)
+        self.assertFalse(self.scheduler.is_running)
+        limit = time.monotonic() + self.timeout
+        while not loop.is_closed():
+            self.assertLess(time.monotonic(), limit, "loop not closed")
+            time.sleep(0.01)
+
+    def test_stop_from_pool_thread(self):
+        with self.assertRaises(RuntimeError):
+            self.scheduler.submit(self.scheduler.stop).result(self.timeout)
+        self.assertTrue(self.scheduler.is_running)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de SSHPool (sin conectar), se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.ssh_pool import SSHPool
+
+
+class FakeTransport(object):
+
+    def __init__(self):
+        self.active = True
+
+    def is_active(self) -> bool:
+        return self.active
+
+
+class FakeClient(object):
+
+    """ Cliente SSH ya conectado, solo lo que usa el pool (get_transport y close). """
+
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.is_closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.is_closed = True
+        self.transport.active = False
+
+
+class TestSSHPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = SSHPool()
+        self.addCleanup(self.pool.close)
+
+    def add(self, host: str, pool: SSHPool = None) -> FakeClient:
+        """ Sesión abierta como la deja get_client, sin negociar con un servidor. """
+        entry = (pool or self.pool)._SSHPool__get_entry((host, 22, 'pi'))
+        entry.client = FakeClient()
+        entry.password = 'pass'
+        entry.last_used = 0
+        return entry.client
+
+    def test_active(self):
+        client = self.add('h1')
+        self.assertTrue(self.pool.is_active('h1', 22, 'pi'))
+        self.assertFalse(self.pool.is_active('h2', 22, 'pi'))
+        client.transport.active = False
+        self.assertFalse(self.pool.is_active('h1', 22, 'pi'))
+
+    def test_max_idle(self):
+        # Al pedir otra sesión se cierran las que llevan más de max_idle sin usarse.
+        self.pool.max_idle = 0
+        first = self.add('h1')
+        self.add('h2')
+        self.assertTrue(first.is_closed)
+        self.assertEqual(self.pool.count, 1)
+
+    def test_discard(self):
+        client = self.add('h1')
+        self.pool.discard('h1', 22, 'pi')
+        self.assertTrue(client.is_closed)
+        self.assertEqual(self.pool.count, 0)
+        self.pool.discard('h1', 22, 'pi')
+
+    def test_close(self):
+        clients = [self.add('h1'), self.add('h2')]
+        self.pool.close()
+        self.assertTrue(all(client.is_closed for client in clients))
+        self.assertEqual(self.pool.count, 0)
+
+    def test_close_default(self):
+        with mock.patch.object(SSHPool, '_SSHPool__default_pool', None):
+            # Sin pool compartido no se crea uno para cerrarlo.
+            SSHPool.close_default()
+            self.assertIsNone(SSHPool._SSHPool__default_pool)
+            client = self.add('h1', SSHPool.default())
+            SSHPool.close_default()
+            self.assertTrue(client.is_closed)
+            self.assertEqual(SSHPool.default().count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de StatusStore, se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.config import ConfigControl, StatusStore
+
+
+class TestStatusStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, 'status.db')
+        self.stores = []
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        shutil.rmtree(self.dir)
+
+    def new_store(self) -> StatusStore:
+        store = StatusStore(self.file)
+        self.stores.append(store)
+        store.read()
+        return store
+
+    def rows(self) -> dict:
+        conn = sqlite3.connect(self.file)
+        try:
+            return {(module, key): json.loads(value)
+                    for (module, key, value) in conn.execute("SELECT module, key, value FROM status")}
+        finally:
+            conn.close()
+
+    def test_migrate_status_json(self):
+        # Igual que Monitor al arrancar sin status.db y con el status.json del formato anterior.
+        file_json = os.path.join(self.dir, 'status.json')
+        legacy = {'ping': {'192.168.1.1': {'status': True, 'other_data': {}}, '10.0.0.1': {'status': False}},
+                  'ram_swap': {'ram': {'status': True}},
+                  'old_flag': 1}
+        with open(file_json, 'w') as f:
+            json.dump(legacy, f)
+
+        store = self.new_store()
+        store.data = ConfigControl(file_json).read()
+        self.assertTrue(store.is_changed)
+        self.assertTrue(store.save())
+        self.assertFalse(store.is_changed)
+
+        self.assertEqual(self.rows()[('ping', '10.0.0.1')], {'status': False})
+        self.assertEqual(self.rows()[('old_flag', '')], 1)
+        self.assertEqual(self.new_store().data, legacy)
+
+    def test_save_only_dirty_rows(self):
+        store = self.new_store()
+        store.set_conf(['ping', 'a', 'status'], True)
+        store.set_conf(['ping', 'b', 'status'], True)
+        self.assertTrue(store.save())
+
+        # Se cambia una fila por fuera, si save() la vuelve a escribir se pierde el cambio.
+        conn = sqlite3.connect(self.file)
+        conn.execute("UPDATE status SET value = ? WHERE module = 'ping' AND key = 'b'", (json.dumps('external'), ))
+        conn.commit()
+        conn.close()
+
+        store.set_conf(['ping', 'a', 'status'], False)
+        self.assertTrue(store.is_changed)
+        self.assertTrue(store.save())
+        rows = self.rows()
+        self.assertEqual(rows[('ping', 'a')], {'status': False})
+        self.assertEqual(rows[('ping', 'b')], 'external')
+
+    def test_save_without_changes(self):
+        store = self.new_store()
+        self.assertFalse(store.is_changed)
+        self.assertTrue(store.save())
+        self.assertEqual(self.rows(), {})
+
+    def test_module_value(self):
+        store = self.new_store()
+        store.set_conf(['web', 'x'], {'status': True})
+        store.save()
+        store.set_conf('web', 'disabled')
+        store.save()
+        self.assertEqual(self.rows(), {('web', ''): 'disabled'})
+        self.assertEqual(self.new_store().data, {'web': 'disabled'})
+
+        store.set_conf(['web', 'y'], {'status': False})
+        store.save()
+        self.assertEqual(self.rows(), {('web', 'y'): {'status': False}})
+
+    def test_refresh(self):
+        store = self.new_store()
+        store.set_conf(['ping', 'a', 'status'], True)
+        store.save()
+        self.assertFalse(store.refresh())
+
+        other = self.new_store()
+        other.set_conf(['ping', 'a', 'status'], False)
+        other.save()
+        self.assertTrue(store.refresh())
+        self.assertFalse(store.get_conf(['ping', 'a', 'status'], None))
+        self.assertFalse(store.refresh())
+
+    def test_clear(self):
+        store = self.new_store()
+        store.set_conf(['ping', 'a', 'status'], True)
+        store.set_conf(['web', 'b', 'status'], True)
+        store.save()
+        self.assertTrue(store.clear())
+        self.assertEqual(store.data, {})
+        self.assertEqual(self.rows(), {})
+
+    def test_snapshot_is_a_copy(self):
+        store = self.new_store()
+        store.set_conf(['ping', 'a', 'status'], True)
+        snapshot = store.snapshot()
+        snapshot['ping']['a']['status'] = False
+        self.assertTrue(store.get_conf(['ping', 'a', 'status'], None))
+
+    def test_without_file(self):
+        store = StatusStore(None, {'ping': {'a': {'status': True}}})
+        self.assertFalse(store.save())
+        self.assertFalse(store.refresh())
+        self.assertTrue(store.get_conf(['ping', 'a', 'status'], None))
+
+
+if __name__ == '__main__':
+    unittest.main()
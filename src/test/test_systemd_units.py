@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de SystemdUnits (salida de systemctl show), se ejecutan desde src con:
+python3 -m unittest discover -s test
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.linux import SystemdUnits
+
+
+class TestShowParser(unittest.TestCase):
+
+    output = ("Id=nginx.service\nLoadState=loaded\nActiveState=active\nSubState=running\nResult=success\n\n"
+              "Id=foo.service\nLoadState=not-found\nActiveState=inactive\nSubState=dead\nResult=success\n\n"
+              "Id=ssh.service\nLoadState=loaded\nActiveState=failed\nSubState=failed\nResult=exit-code\n")
+
+    def test_parse(self):
+        units = SystemdUnits.parse(['nginx', 'foo.service', 'ssh'], self.output)
+        self.assertEqual(list(units.keys()), ['nginx', 'foo.service', 'ssh'])
+        self.assertTrue(units['nginx'].is_found)
+        self.assertTrue(units['nginx'].is_running)
+        self.assertFalse(units['foo.service'].is_found)
+        self.assertFalse(units['foo.service'].is_running)
+        self.assertEqual((units['ssh'].active_state, units['ssh'].sub_state, units['ssh'].result),
+                         ('failed', 'failed', 'exit-code'))
+        self.assertEqual(units['ssh'].props['Id'], 'ssh.service')
+
+    def test_feed_lines(self):
+        parser = SystemdUnits.ShowParser()
+        for line in ['', 'Id=a', 'Description=x = y', '  ', '', 'Id=b', 'Empty=']:
+            parser.feed(line)
+        self.assertEqual(parser.close(), [{'Id': 'a', 'Description': 'x = y'}, {'Id': 'b', 'Empty': ''}])
+
+    def test_missing_properties(self):
+        units = SystemdUnits.parse(['x'], "Id=x.service\n")
+        self.assertEqual(units['x'].load_state, '')
+        self.assertFalse(units['x'].is_found)
+        self.assertFalse(units['x'].is_running)
+
+    def test_match_by_id(self):
+        # systemctl omite las unidades que no puede cargar, el bloque de ssh no se asigna a foo.
+        output = "Id=nginx.service\nLoadState=loaded\n\nId=ssh.service\nLoadState=loaded\nActiveState=active\n"
+        units = SystemdUnits.parse(['foo', 'nginx', 'ssh'], output)
+        self.assertEqual(list(units.keys()), ['foo', 'nginx', 'ssh'])
+        self.assertFalse(units['foo'].is_found)
+        self.assertEqual(units['foo'].load_state, 'not-found')
+        self.assertEqual(units['ssh'].active_state, 'active')
+        self.assertEqual(units['nginx'].props['Id'], 'nginx.service')
+
+    def test_alias_and_template(self):
+        output = ("Id=ssh.service\nNames=ssh.service sshd.service\nLoadState=loaded\nActiveState=active\n"
+                  "SubState=running\n\n"
+                  "Id=getty@tty1.service\nNames=getty@tty1.service\nLoadState=loaded\nActiveState=inactive\n\n"
+                  "Id=apt-daily.timer\nNames=apt-daily.timer\nLoadState=loaded\nActiveState=active\n")
+        units = SystemdUnits.parse(['getty@tty1', 'sshd', 'apt-daily.timer'], output)
+        self.assertTrue(units['sshd'].is_running)
+        self.assertEqual(units['getty@tty1'].active_state, 'inactive')
+        self.assertEqual(units['apt-daily.timer'].active_state, 'active')
+
+    def test_unit_name(self):
+        self.assertEqual(SystemdUnits.unit_name('nginx'), 'nginx.service')
+        self.assertEqual(SystemdUnits.unit_name('nginx.service'), 'nginx.service')
+        self.assertEqual(SystemdUnits.unit_name('dbus.socket'), 'dbus.socket')
+        self.assertEqual(SystemdUnits.unit_name('node.js'), 'node.js.service')
+
+
+class TestSystemdUnitsShow(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def systemctl(self, script: str) -> SystemdUnits:
+        """ systemctl de mentira, guarda los argumentos en args.txt y ejecuta script. """
+        path = os.path.join(self.dir, 'systemctl')
+        with open(path, 'w') as f:
+            f.write("#!/bin/sh\nprintf '%s\\n' \"$@\" > {0}\n{1}\n".format(os.path.join(self.dir, 'args.txt'),
+                                                                          script))
+        os.chmod(path, 0o755)
+        return SystemdUnits(path, timeout=2)
+
+    def test_show(self):
+        units = self.systemctl("printf '{0}'".format(TestShowParser.output.replace('\n', '\\n')))
+        data = units.show(['nginx', 'foo', "ssh"])
+        self.assertTrue(data['nginx'].is_running)
+        self.assertFalse(data['foo'].is_found)
+        with open(os.path.join(self.dir, 'args.txt')) as f:
+            args = f.read().split()
+        self.assertEqual(args, ['show', '--no-pager', '-p', 'Id,Names,LoadState,ActiveState,SubState,Result',
+                                'nginx', 'foo', 'ssh'])
+        self.assertEqual(units.show([]), {})
+
+    def test_show_missing_units(self):
+        units = self.systemctl("echo 'Id=a.service'; echo 'LoadState=loaded'; echo 'Failed to get properties' >&2")
+        data = units.show(['a', 'b'])
+        self.assertTrue(data['a'].is_found)
+        self.assertFalse(data['b'].is_found)
+
+    def test_show_no_units(self):
+        units = self.systemctl("echo 'Failed to connect to bus' >&2; exit 1")
+        with self.assertRaisesRegex(Exception, 'Failed to connect to bus'):
+            units.show(['a'])
+
+    def test_show_timeout(self):
+        units = self.systemctl("sleep 30")
+        with self.assertRaises(Exception):
+            units.show(['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de Telegram (reintentos y envío pendiente, sin conectar), se ejecutan desde src con:
+python3 -m unittest discover -s test
+"""
+
+import os
+import sys
+import time
+import threading
+import unittest
+import importlib.util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib import ObjectBase
+from lib.debug import DebugLevel
+from lib.telegram import Telegram
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code: int, data: dict = None):
+        self.status_code = status_code
+        self.data = data or {}
+
+    def json(self) -> dict:
+        return self.data
+
+
+class FakeSession(object):
+
+    """ Sesión HTTP que retorna los códigos de la lista, cuando se acaban retorna el último. """
+
+    def __init__(self, *codes):
+        self.codes = list(codes)
+        self.posts = []
+        self.is_closed = False
+        self.release = threading.Event()
+        self.release.set()
+
+    def post(self, url, data=None, timeout=None):
+        self.release.wait()
+        self.posts.append(data['text'])
+        code = self.codes.pop(0) if len(self.codes) > 1 else self.codes[0]
+        if isinstance(code, FakeResponse):
+            return code
+        return FakeResponse(code)
+
+    def close(self):
+        self.is_closed = True
+
+
+@unittest.skipUnless(importlib.util.find_spec('requests'), "requests not installed")
+class TestTelegram(unittest.TestCase):
+
+    def setUp(self):
+        ObjectBase.debug.level = DebugLevel.emergency
+        self.tg = Telegram('token', 'chat', retries=3, backoff=0.01, timeout=1)
+
+    def tearDown(self):
+        self.tg.close(1)
+
+    def set_session(self, *codes) -> FakeSession:
+        session = FakeSession(*codes)
+        self.tg._Telegram__session = session
+        return session
+
+    def test_not_configured(self):
+        # Sin token no se envía nada y no queda ningún mensaje pendiente.
+        tg = Telegram('', '')
+        tg.send_message("msg")
+        self.assertTrue(tg.flush(5))
+        tg.close(1)
+
+    def test_send(self):
+        session = self.set_session(200)
+        self.tg.send_message("msg")
+        self.assertTrue(self.tg.flush(5))
+        self.assertEqual(session.posts, ["msg"])
+        self.assertEqual(self.tg.count_msg_send, 1)
+
+    def test_retry_server_error(self):
+        session = self.set_session(502, 0, 200)
+        self.tg.send_message("msg")
+        self.assertTrue(self.tg.flush(5))
+        self.assertEqual(session.posts, ["msg"] * 3)
+
+    def test_retry_limit(self):
+        session = self.set_session(500)
+        self.tg.send_message("msg")
+        self.assertTrue(self.tg.flush(5))
+        # El primer intento y los 3 reintentos.
+        self.assertEqual(len(session.posts), 4)
+
+    def test_no_retry_client_error(self):
+        session = self.set_session(400, 200)
+        self.tg.send_message("msg")
+        self.assertTrue(self.tg.flush(5))
+        self.assertEqual(len(session.posts), 1)
+
+    def test_retry_after(self):
+        session = self.set_session(FakeResponse(429, {'parameters': {'retry_after': 0.3}}), 200)
+        start = time.monotonic()
+        self.tg.send_message("msg")
+        self.assertTrue(self.tg.flush(5))
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+        self.assertEqual(len(session.posts), 2)
+
+    def test_flush_timeout(self):
+        session = self.set_session(200)
+        session.release.clear()
+        self.tg.send_message("msg")
+        self.assertFalse(self.tg.flush(0.2))
+        session.release.set()
+        self.assertTrue(self.tg.flush(5))
+
+    def test_send_message_end(self):
+        session = self.set_session(200)
+        self.tg.send_message("msg 1")
+        self.tg.send_message("msg 2")
+        self.assertTrue(self.tg.send_message_end('host', 5))
+        self.assertEqual(len(session.posts), 3)
+        self.assertIn("*host*", session.posts[-1])
+        self.assertEqual(self.tg.count_msg, 0)
+
+    def test_close_stops_retry(self):
+        # Con el backoff largo close no espera a los reintentos, para el hilo y cierra la sesión.
+        self.tg.backoff = 60
+        session = self.set_session(500)
+        self.tg.send_message("msg")
+        thread = self.tg.pool_send_msg
+        start = time.monotonic()
+        self.tg.close(0.3)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(session.is_closed)
+        self.assertEqual(len(session.posts), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Monitorize your Raspberry Pi
+#
+# Copyright © 2019  Javier Pastor (aka VSC55)
+# <jpastor at cerebelum dot net>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Tests de ThermalInfoCollection, se ejecutan desde src con: python3 -m unittest discover -s test """
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.linux import ThermalInfoCollection
+
+
+class TestThermalInfoCollection(unittest.TestCase):
+
+    def setUp(self):
+        # Copia reducida de /sys: class/thermal y class/hwmon son enlaces a devices, igual que en el kernel.
+        self.dir = tempfile.mkdtemp()
+        self.path_thermal = self.mkdir('class', 'thermal')
+        self.path_hwmon = self.mkdir('class', 'hwmon')
+
+        zone = self.mkdir('devices', 'virtual', 'thermal', 'thermal_zone0')
+        self.write(zone, 'type', 'cpu-thermal')
+        self.write(zone, 'temp', '45123')
+        os.symlink(zone, os.path.join(self.path_thermal, 'thermal_zone0'))
+        cooling = self.mkdir('devices', 'virtual', 'thermal', 'cooling_device0')
+        os.symlink(cooling, os.path.join(self.path_thermal, 'cooling_device0'))
+
+        # hwmon de la thermal zone (kernel actual), su device es thermal_zone0.
+        hwmon0 = self.mkdir('devices', 'virtual', 'thermal', 'thermal_zone0', 'hwmon0')
+        self.write(hwmon0, 'name', 'cpu_thermal')
+        self.write(hwmon0, 'temp1_input', '45123')
+        os.symlink(os.path.join('..', '..', 'thermal_zone0'), os.path.join(hwmon0, 'device'))
+        os.symlink(hwmon0, os.path.join(self.path_hwmon, 'hwmon0'))
+
+        # Sensor real con device.
+        platform = self.mkdir('devices', 'platform', 'coretemp.0')
+        hwmon1 = self.mkdir('devices', 'platform', 'coretemp.0', 'hwmon', 'hwmon1')
+        self.write(hwmon1, 'name', 'coretemp')
+        self.write(hwmon1, 'temp1_input', '51000')
+        self.write(hwmon1, 'temp1_label', 'Core 0')
+        self.write(hwmon1, 'temp2_input', '52500')
+        os.symlink(platform, os.path.join(hwmon1, 'device'))
+        os.symlink(hwmon1, os.path.join(self.path_hwmon, 'hwmon1'))
+
+        # hwmon de una thermal zone en un kernel antiguo, sin device.
+        hwmon2 = self.mkdir('devices', 'virtual', 'hwmon', 'hwmon2')
+        self.write(hwmon2, 'name', 'cpu_thermal')
+        self.write(hwmon2, 'temp1_input', '45123')
+        os.symlink(hwmon2, os.path.join(self.path_hwmon, 'hwmon2'))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def mkdir(self, *path) -> str:
+        path = os.path.join(self.dir, *path)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def write(path_dir: str, name: str, data: str):
+        with open(os.path.join(path_dir, name), 'w') as f:
+            f.write(data + '\n')
+
+    def new_thermal(self) -> ThermalInfoCollection:
+        thermal = ThermalInfoCollection(True, self.path_thermal, self.path_hwmon)
+        self.addCleanup(thermal.close)
+        return thermal
+
+    def test_detect(self):
+        # Cada sensor una sola vez, sin el hwmon de la thermal zone.
+        nodes = {node.dev: node for node in self.new_thermal().nodes}
+        self.assertEqual(sorted(nodes.keys()), ['hwmon1_temp1', 'hwmon1_temp2', 'thermal_zone0'])
+        self.assertEqual(nodes['thermal_zone0'].type, 'cpu-thermal')
+        self.assertEqual(nodes['hwmon1_temp1'].type, 'coretemp Core 0')
+        self.assertEqual(nodes['hwmon1_temp2'].type, 'coretemp')
+
+    def test_temp(self):
+        node = {node.dev: node for node in self.new_thermal().nodes}['thermal_zone0']
+        self.assertEqual(node.temp, 45.123)
+        # El archivo sigue abierto, se vuelve a leer desde el inicio.
+        self.write(os.path.join(self.dir, 'devices', 'virtual', 'thermal', 'thermal_zone0'), 'temp', '47000')
+        self.assertEqual(node.temp, 47.0)
+
+    def test_missing_sensor(self):
+        node = ThermalInfoCollection.ThermalNode('x', os.path.join(self.dir, 'missing'))
+        self.assertIsNone(node.temp)
+        self.assertIsNone(node.sample())
+        self.assertIsNone(node.stats())
+
+    def test_stats(self):
+        node = {node.dev: node for node in self.new_thermal().nodes}['hwmon1_temp1']
+        path_dir = os.path.join(self.dir, 'devices', 'platform', 'coretemp.0', 'hwmon', 'hwmon1')
+        for temp in ('50000', '60000', '55000'):
+            self.write(path_dir, 'temp1_input', temp)
+            node.sample()
+        self.assertEqual(node.stats(False), {'min': 50.0, 'max': 60.0, 'mean': 55.0, 'count': 3})
+        self.assertEqual(node.stats()['count'], 3)
+        self.assertIsNone(node.stats())
+
+    def test_sampling_thread(self):
+        thermal = self.new_thermal()
+        thermal.start(0.01)
+        self.assertTrue(thermal.is_sampling)
+        limit = time.monotonic() + 5
+        while thermal.nodes[0].stats(False) is None:
+            self.assertLess(time.monotonic(), limit, "no samples")
+            time.sleep(0.01)
+        thermal.stop()
+        self.assertFalse(thermal.is_sampling)
+        # 0 no inicia el hilo.
+        thermal.start(0)
+        self.assertFalse(thermal.is_sampling)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,49 +22,73 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import re
+from lib.config import ConfigSchema, ConfigList, ConfigOption
+from lib.debug import DebugLevel
+from lib.linux import Mounts
 from lib.modules import ModuleBase
 
 
 class Watchful(ModuleBase):
 
-    # porcentaje que se usara si no se ha configurado el modulo, o se ha definido un valor que no esté entre 0 y 100.
-    __default_alert = 85
+    # El porcentaje (alert) se usara si no se ha configurado el punto de montaje en la lista ("/": 80). Los montajes
+    # de red (NFS, CIFS...) solo se comprueban si están en la lista. timeout son los segundos que se espera a statvfs.
+    _config_schema = ConfigSchema(
+        ConfigOption('alert', float, 85, min_val=0, max_val=100),
+        ConfigOption('exclude_fstype', list, None),
+        ConfigOption('timeout', float, 5, min_val=0.1),
+        lists=(ConfigList('list', ConfigOption('alert', float, 85, min_val=0, max_val=100), value_option='alert'), )
+    )
 
     def __init__(self, monitor):
         super().__init__(monitor, __name__)
-        self.paths.set('df', '/bin/df')
+        self.mounts = Mounts(self.conf.exclude_fstype)
 
     def check(self):
-        list_partition = self.get_conf('list', {})
+        for mount in self.mounts.filesystems(self.conf.list.keys()):
+            mount_point = mount.mount_point
+            for_usage_alert = self.conf.target(mount_point).alert
 
-        usage_alert = self.get_conf("alert", self.__default_alert)
-        if isinstance(usage_alert, str):
-            usage_alert = usage_alert.strip()
-        if not usage_alert or usage_alert < 0 or usage_alert > 100:
-            usage_alert = self.__default_alert
+            try:
+                usage = self.mounts.usage(mount, self.conf.timeout)
+            except TimeoutError:
+                tmp_message = 'Filesystem partition {0} ({1}) not responding in {2} s {3}'.format(
+                    mount.name, mount_point, self.conf.timeout, u'\U000026A0')
+                self.dict_return.set(mount.name, False, tmp_message, other_data={'mount': mount_point,
+                                                                                  'fstype': mount.fstype})
+                continue
+            except OSError as e:
+                self.debug.print(lambda: "Filesystem >> {0} ({1}) >> Error: {2}".format(mount.name, mount_point, e),
+                                 DebugLevel.warning)
+                continue
+            if usage.size == 0:
+                # Sistemas de archivos sin tamaño (pseudo sistemas de archivos que no están en exclude_fstype).
+                continue
 
-        cmd = '{0} -x squashfs -x tmpfs  -x devtmpfs'.format(self.paths.find('df'))
-        stdout = self._run_cmd(cmd)
-        reg = r'\/dev\/([^\s]*)\s+\d+\s+\d+\s+\d+\s+(\d+)\%\s+([^\n]*)'
-
-        for fs in re.findall(reg, stdout):
-            # fs = ('mmcblk0p6', '32', '/boot')
-            mount_point = fs[2]
-            if mount_point in list_partition.keys():
-                for_usage_alert = list_partition[mount_point]
-            else:
-                for_usage_alert = usage_alert
-
-            if float(fs[1]) > float(for_usage_alert):
+            # Los valores se guardan sin redondear, solo se redondean en el texto del mensaje.
+            used = usage.used_percent
+            if used > for_usage_alert:
                 tmp_status = False
-                tmp_message = 'Warning partition {0} ({1}) used {2}% {3}'.format(fs[0], fs[2], fs[1], u'\U000026A0')
+                tmp_message = 'Warning partition {0} ({1}) used {2:.1f}% {3}'.format(mount.name, mount_point, used,
+                                                                                    u'\U000026A0')
             else:
                 tmp_status = True
-                tmp_message = 'Filesystem partition {0} ({1}) used {2}% {3}'.format(fs[0], fs[2], fs[1], u'\U00002705')
+                tmp_message = 'Filesystem partition {0} ({1}) used {2:.1f}% {3}'.format(mount.name, mount_point, used,
+                                                                                       u'\U00002705')
 
-            other_data = {'used': fs[1], 'mount': fs[2], 'alert': for_usage_alert}
-            self.dict_return.set(fs[0], tmp_status, tmp_message, other_data=other_data)
+            other_data = {
+                'used': used,
+                'mount': mount_point,
+                'alert': for_usage_alert,
+                'fstype': mount.fstype,
+                'size': usage.size,
+                'avail': usage.avail,
+                'bytes_used': usage.used,
+                'inodes_used': usage.inodes_used_percent,
+                'inodes_total': usage.inodes,
+                'inodes_avail': usage.inodes_avail,
+                'inodes_in_use': usage.inodes_used
+            }
+            self.dict_return.set(mount.name, tmp_status, tmp_message, other_data=other_data)
 
         super().check()
         return self.dict_return
@@ -21,24 +21,31 @@
 
 import concurrent.futures
 import telnetlib
-from lib import Switch
+from lib.config import ConfigSchema, ConfigList, ConfigOption
 from lib.debug import DebugLevel
 from lib.modules import ModuleBase
 
 
 class Watchful(ModuleBase):
 
-    __default_enabled = True
-    __default_port = 7634
-    __default_alert = 50
-    __default_threads = 5
-    __default_timeout = 5
+    _config_schema = ConfigSchema(
+        ConfigOption('alert', int, 50, min_val=1),
+        ConfigOption('timeout', float, 5, min_val=0),
+        ConfigOption('port', int, 7634, min_val=1, max_val=65535),
+        lists=(ConfigList('list',
+                          ConfigOption('enabled', bool, True),
+                          ConfigOption('host', str, ''),
+                          ConfigOption('port', int, 7634, min_val=1, max_val=65535),
+                          ConfigOption('exclude', list, ())), )
+    )
 
     def __init__(self, monitor):
         super().__init__(monitor, __name__)
 
-    def __debug(self, msg: str, level: DebugLevel = DebugLevel.debug):
-        super().debug.print(">> PlugIn >> {0} >> {1}".format(self.name_module, msg), level)
+    def __debug(self, msg, level: DebugLevel = DebugLevel.debug):
+        """ msg es el texto o una función que lo retorna, solo se llama si el mensaje se va a mostrar. """
+        super().debug.print(lambda: ">> PlugIn >> {0} >> {1}".format(self.name_module, msg() if callable(msg) else msg),
+                            level)
 
     def check(self):
         list_hosts = self.__check_get_list_hosts()
@@ -48,31 +55,24 @@ class Watchful(ModuleBase):
 
     def __check_get_list_hosts(self):
         return_list = []
-        for (key, value) in self.get_conf('list', {}).items():
-            is_enabled = self.__default_enabled
-            with Switch(value, check_isinstance=True) as case:
-                if case(bool):
-                    is_enabled = value
-                elif case(dict):
-                    is_enabled = value.get("enabled", is_enabled)
-
-            self.__debug("{0} - Enabled: {1}".format(key, is_enabled), DebugLevel.info)
-            if is_enabled:
-                if not value.get("host", None):
-                    self.__debug("{0} - Host is not defined!".format(key), DebugLevel.warning)
+        for (key, target) in self.conf.list.items():
+            self.__debug(lambda: "{0} - Enabled: {1}".format(key, target.enabled), DebugLevel.info)
+            if target.enabled and self._is_target_due(key):
+                if not target.host:
+                    self.__debug(lambda: "{0} - Host is not defined!".format(key), DebugLevel.warning)
                 else:
                     new_hddtemp = self.Hddtemp_Info(key)
-                    new_hddtemp.host = value.get("host")
-                    new_hddtemp.port = value.get("port", self.__default_port)
-                    new_hddtemp.alert = self.get_conf('alert', self.__default_alert)
-                    new_hddtemp.exclude = value.get("exclude", [])
+                    new_hddtemp.host = target.host
+                    new_hddtemp.port = target.port
+                    new_hddtemp.alert = self.conf.alert
+                    new_hddtemp.exclude = target.exclude
                     return_list.append(new_hddtemp)
 
         return return_list
 
     def __check_run(self, list_hosts):
         with concurrent.futures.ThreadPoolExecutor(
-                max_workers=self.get_conf('threads', self._default_threads)) as executor:
+                max_workers=self.conf.threads) as executor:
             future_to_hddtemp = {executor.submit(self.__hddtemp_check, hddtemp): hddtemp for hddtemp in list_hosts}
             for future in concurrent.futures.as_completed(future_to_hddtemp):
                 hddtemp = future_to_hddtemp[future]
@@ -83,42 +83,43 @@ class Watchful(ModuleBase):
                     self.dict_return.set(hddtemp, False, message)
 
     def __hddtemp_check(self, hddtemp):
-        if self.__hddtemp_return(hddtemp):
-            for (key, value) in hddtemp.list_hdd.items():
-                if key not in hddtemp.exclude:
-                    # print("dev:", key)
-                    # print("prop:", value)
-                    hdd_name = hddtemp.label + '_' + key
-                    hdd_dev = key
-                    hdd_alert = value['ALERT']
-                    hdd_temp = value['TEMP']
-                    hdd_unit = value['TEMP_UNIT']
-                    status = True if hdd_alert >= hdd_temp else False
-                    s_message = '({}): *{}* *({}º{})*'.format(hddtemp.label, hdd_dev, hdd_temp, hdd_unit)
-                    if status:
-                        s_message += u'\U0001F53C'
-                    else:
-                        s_message += u'\U0001F53D'
-
-                    other_data = value
-                    self.dict_return.set(hdd_name, status, s_message, False, other_data)
-
-                    if self.check_status(status, self.name_module, hdd_name):
-                        self.send_message(s_message, status)
+        with self._span(hddtemp.label):
+            if self.__hddtemp_return(hddtemp):
+                for (key, value) in hddtemp.list_hdd.items():
+                    if key not in hddtemp.exclude:
+                        # print("dev:", key)
+                        # print("prop:", value)
+                        hdd_name = hddtemp.label + '_' + key
+                        hdd_dev = key
+                        hdd_alert = value['ALERT']
+                        hdd_temp = value['TEMP']
+                        hdd_unit = value['TEMP_UNIT']
+                        status = True if hdd_alert >= hdd_temp else False
+                        s_message = '({}): *{}* *({}º{})*'.format(hddtemp.label, hdd_dev, hdd_temp, hdd_unit)
+                        if status:
+                            s_message += u'\U0001F53C'
+                        else:
+                            s_message += u'\U0001F53D'
+
+                        other_data = value
+                        self.dict_return.set(hdd_name, status, s_message, False, other_data)
+
+                        if self.check_status(status, self.name_module, hdd_name):
+                            self.send_message(s_message, status)
 
-        else:
-            self.__debug("{0} >> Exception: {1}".format(hddtemp.label, hddtemp.error), DebugLevel.warning)
-            s_message = 'HddTemp: {} - *Error:* *{}*'.format(hddtemp.label, hddtemp.error)
-            s_message += u'\U0001F53D'
+            else:
+                self.__debug(lambda: "{0} >> Exception: {1}".format(hddtemp.label, hddtemp.error), DebugLevel.warning)
+                s_message = 'HddTemp: {} - *Error:* *{}*'.format(hddtemp.label, hddtemp.error)
+                s_message += u'\U0001F53D'
 
-            other_data = {'message': str(hddtemp.error)}
-            self.dict_return.set(hddtemp.label, False, s_message, False, other_data)
+                other_data = {'message': str(hddtemp.error)}
+                self.dict_return.set(hddtemp.label, False, s_message, False, other_data)
 
-            if self.check_status_custom(False, hddtemp.label, hddtemp.error):
-                self.send_message(s_message, False)
+                if self.check_status_custom(False, hddtemp.label, hddtemp.error):
+                    self.send_message(s_message, False)
 
     def __hddtemp_return(self, hddtemp):
-        timeout = self.get_conf('timeout', self.__default_timeout)
+        timeout = self.conf.timeout
         try:
             if timeout > 0:
                 tn = telnetlib.Telnet(hddtemp.host, hddtemp.port, timeout)
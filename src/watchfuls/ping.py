@@ -21,32 +21,32 @@
 
 import time
 import concurrent.futures
-from lib import Switch
+from lib.config import ConfigSchema, ConfigList, ConfigOption
 from lib.debug import DebugLevel
 from lib.modules import ModuleBase
-from enum import Enum
-
-
-class ConfigOptions(Enum):
-    enabled = 1
-    # alert = 2
-    label = 3
-    timeout = 100
-    attempt = 101
+from lib.net import IcmpPing
 
 
 class Watchful(ModuleBase):
 
-    __default_attempt = 3
-    __default_timeout = 5
-    __default_enabled = True
+    _config_schema = ConfigSchema(
+        ConfigOption('attempt', int, 3, min_val=1),
+        ConfigOption('timeout', int, 5, min_val=1),
+        lists=(ConfigList('list',
+                          ConfigOption('enabled', bool, True),
+                          ConfigOption('label', str, ''),
+                          ConfigOption('attempt', int, 3, min_val=1),
+                          ConfigOption('timeout', int, 5, min_val=1)), )
+    )
 
     def __init__(self, monitor):
         super().__init__(monitor, __name__)
         self.paths.set('ping', '/bin/ping')
 
-    def __debug(self, msg: str, level: DebugLevel = DebugLevel.debug):
-        super().debug.print(">> PlugIn >> {0} >> {1}".format(self.name_module, msg), level)
+    def __debug(self, msg, level: DebugLevel = DebugLevel.debug):
+        """ msg es el texto o una función que lo retorna, solo se llama si el mensaje se va a mostrar. """
+        super().debug.print(lambda: ">> PlugIn >> {0} >> {1}".format(self.name_module, msg() if callable(msg) else msg),
+                            level)
 
     def check(self):
         list_host = self.__check_get_list_hosts()
@@ -56,24 +56,55 @@ class Watchful(ModuleBase):
 
     def __check_get_list_hosts(self):
         return_list = []
-        for (key, value) in self.get_conf('list', {}).items():
-            if isinstance(value, bool):
-                is_enabled = value
-            elif isinstance(value, dict):
-                is_enabled = self.__get_conf(ConfigOptions.enabled, key)
-            else:
-                is_enabled = self.__default_enabled
+        for (key, target) in self.conf.list.items():
+            self.__debug(lambda: "Ping: {0} - Enabled: {1}".format(key, target.enabled), DebugLevel.info)
 
-            self.__debug("Ping: {0} - Enabled: {1}".format(key, is_enabled), DebugLevel.info)
-
-            if is_enabled:
+            if target.enabled and self._is_target_due(key):
                 return_list.append(key)
 
         return return_list
 
     def __check_run(self, list_host):
+        if IcmpPing.is_available():
+            list_host = self.__check_run_icmp(list_host)
+        if list_host:
+            self.__check_run_cmd(list_host)
+
+    def __check_run_icmp(self, list_host):
+        """
+        Hace ping a todos los hosts a la vez con el motor ICMP.
+
+        :return: Lista de hosts que el motor no ha podido procesar (sin IPv4) y que hay que comprobar con el comando.
+
+        """
+        targets = {}
+        for host in list_host:
+            targets[host] = {
+                'timeout': self.conf.list[host].timeout,
+                'attempt': self.conf.list[host].attempt
+            }
+
+        try:
+            results = IcmpPing().sweep(targets)
+        except OSError as exc:
+            self.__debug(lambda: "ICMP Engine >> Exception: {0}".format(exc), DebugLevel.warning)
+            return list_host
+
+        return_list = []
+        for (host, result) in results.items():
+            if result.error == IcmpPing.error_dns_timeout:
+                # El comando ping también se quedaría esperando al DNS.
+                self.__ping_set_return(host, False, result.as_dict())
+                continue
+            if result.address is None:
+                return_list.append(host)
+                continue
+            self.__ping_set_return(host, result.is_alive, result.as_dict())
+        return return_list
+
+    def __check_run_cmd(self, list_host):
         with concurrent.futures.ThreadPoolExecutor(
-                max_workers=self.get_conf('threads', self._default_threads)) as executor:
+                max_workers=self.conf.threads) as executor:
             future_to_ping = {executor.submit(self.__ping_check, host): host for host in list_host}
             for future in concurrent.futures.as_completed(future_to_ping):
                 host = future_to_ping[future]
@@ -84,13 +115,13 @@ class Watchful(ModuleBase):
                     self.dict_return.set(host, False, message)
 
     def __ping_check(self, host):
-        # TODO: Pendiente poder configurar número de intentos y timeout para cada IP
+        with self._span(host):
+            target = self.conf.list[host]
+            status = self.__ping_return(host, target.timeout, target.attempt)
+            self.__ping_set_return(host, status)
 
-        tmp_host_name = self.__get_conf(ConfigOptions.label, host, host)
-        tmp_timeout = self.__get_conf(ConfigOptions.timeout, host)
-        tmp_attempt = self.__get_conf(ConfigOptions.attempt, host)
-
-        status = self.__ping_return(host, tmp_timeout, tmp_attempt)
+    def __ping_set_return(self, host, status, other_data: dict = None):
+        tmp_host_name = self.conf.list[host].label or host
 
         s_message = 'Ping: *{0}* '.format(tmp_host_name)
         if status:
@@ -98,7 +129,7 @@ class Watchful(ModuleBase):
         else:
             s_message += u'\U0001F53D'
 
-        self.dict_return.set(host, status, s_message, False)
+        self.dict_return.set(host, status, s_message, False, other_data)
 
         if self.check_status(status, self.name_module, host):
             self.send_message(s_message, status)
@@ -107,53 +138,10 @@ class Watchful(ModuleBase):
         counter = 0
         while counter < attempt:
             cmd = '{0} -c 1 -W {1} {2}'.format(self.paths.find('ping'), timeout, host)
-            _, r_code = self._run_cmd(cmd, return_exit_code=True)
+            # ping termina solo a los timeout segundos (-W), el margen es para arrancar el proceso y resolver el host.
+            _, r_code = self._run_cmd(cmd, return_exit_code=True, timeout=timeout + 5)
             if r_code == 0:
                 return True
             time.sleep(1)
             counter += 1
         return False
-
-    def __get_conf(self, opt_find: Enum, dev_name: str, default_val=None):
-        # Sec - Get Default Val
-        if default_val is None:
-            with Switch(opt_find) as case:
-                if case(ConfigOptions.attempt):
-                    val_def = self.get_conf(opt_find.name, self.__default_attempt)
-
-                elif case(ConfigOptions.timeout):
-                    val_def = self.get_conf(opt_find.name, self.__default_timeout)
-
-                elif case(ConfigOptions.enabled):
-                    val_def = self.get_conf(opt_find.name, self.__default_enabled)
-
-                else:
-                    if opt_find is None:
-                        raise ValueError("opt_find it can not be None!")
-                    else:
-                        raise TypeError("{0} is not valid option!".format(opt_find.name))
-        else:
-            val_def = default_val
-
-        # Sec - Get Data
-        value = self.get_conf_in_list(opt_find, dev_name, val_def)
-
-        # Sec - Format Return Data
-        with Switch(opt_find) as case:
-            if case(ConfigOptions.attempt, ConfigOptions.timeout):
-                value = str(value).strip()
-                if not value or not value.isnumeric() or int(value) <= 0:
-                    value = val_def
-                return int(value)
-
-            elif case(ConfigOptions.enabled):
-                return bool(value)
-
-            elif case(ConfigOptions.label):
-                value = str(value).strip()
-                if not value:
-                    value = val_def
-                return str(value)
-
-            else:
-                return value
@@ -21,34 +21,39 @@
 
 import concurrent.futures
 from lib import Switch
+from lib.config import ConfigSchema, ConfigList, ConfigOption
 from lib.debug import DebugLevel
 from lib.modules import ModuleBase
 from lib.linux import RaidMdstat
-from enum import Enum
-
-
-class ConfigOptions(Enum):
-    enabled = 1
-    # alert = 2
-    label = 3
-    host = 100
-    port = 101
-    user = 102
-    password = 103
 
 
 class Watchful(ModuleBase):
 
-    __default_enabled = True
-    __default_port = 22
-    __default_timeout = 30
+    _config_schema = ConfigSchema(
+        ConfigOption('local', bool, True),
+        ConfigOption('timeout', float, 30, min_val=0),
+        ConfigOption('label', str, ''),
+        ConfigOption('host', str, ''),
+        ConfigOption('port', int, 22, min_val=1, max_val=65535),
+        ConfigOption('user', str, ''),
+        ConfigOption('password', str, ''),
+        lists=(ConfigList('remote',
+                          ConfigOption('enabled', bool, True),
+                          ConfigOption('label', str, ''),
+                          ConfigOption('host', str, ''),
+                          ConfigOption('port', int, 22, min_val=1, max_val=65535),
+                          ConfigOption('user', str, ''),
+                          ConfigOption('password', str, '')), )
+    )
 
     def __init__(self, monitor):
         super().__init__(monitor, __name__)
         self.paths.set('mdstat', '/proc/mdstat')
 
-    def __debug(self, msg: str, level: DebugLevel = DebugLevel.debug):
-        super().debug.print(">> PlugIn >> {0} >> {1}".format(self.name_module, msg), level)
+    def __debug(self, msg, level: DebugLevel = DebugLevel.debug):
+        """ msg es el texto o una función que lo retorna, solo se llama si el mensaje se va a mostrar. """
+        super().debug.print(lambda: ">> PlugIn >> {0} >> {1}".format(self.name_module, msg() if callable(msg) else msg),
+                            level)
 
     def check(self):
         self.__check_local()
@@ -58,11 +63,11 @@ class Watchful(ModuleBase):
         return self.dict_return
 
     def __check_local(self):
-        is_enable = self.get_conf("local", self.__default_enabled)
-        self.__debug("{0} - Enabled: {1}".format("Local", is_enable), DebugLevel.info)
-        if is_enable:
-            list_md = RaidMdstat(self.paths.find('mdstat')).read_status()
-            self.__md_analyze(list_md)
+        self.__debug(lambda: "{0} - Enabled: {1}".format("Local", self.conf.local), DebugLevel.info)
+        if self.conf.local and self._is_target_due("local"):
+            with self._span("local"):
+                list_md = RaidMdstat(self.paths.find('mdstat')).read_status()
+                self.__md_analyze(list_md)
 
     def __check_remote(self):
         list_remote = self.__get_list_remote_enable()
@@ -80,18 +85,15 @@ class Watchful(ModuleBase):
                     tmp_label = self.get_label_by_id(remote_id)
                     message = 'RAID: {0} - *Error: {1}* {2}'.format(tmp_label, exc, u'\U0001F4A5')
                     self.dict_return.set(remote_id, False, message)
-                    self.__debug("{0}/{1} - Exception: {2}".format(remote_id, tmp_label, exc), DebugLevel.error)
+                    self.__debug(lambda: "{0}/{1} - Exception: {2}".format(remote_id, tmp_label, exc), DebugLevel.error)
                     # self.debug.exception(exc)
 
     def __check_remotes_process(self, remote_id):
-        tmp_host = self.get_conf_item(ConfigOptions.host, remote_id)
-        tmp_port = self.get_conf_item(ConfigOptions.port, remote_id)
-        tmp_user = self.get_conf_item(ConfigOptions.user, remote_id)
-        tmp_pass = self.get_conf_item(ConfigOptions.password, remote_id)
-
-        list_md = RaidMdstat(host=tmp_host, port=tmp_port, user=tmp_user, password=tmp_pass,
-                             timeout=self.conf_timeout).read_status()
-        self.__md_analyze(list_md, remote_id)
+        with self._span(remote_id):
+            target = self.conf.remote[remote_id]
+            list_md = RaidMdstat(host=target.host, port=target.port, user=target.user, password=target.password,
+                                 timeout=self.conf_timeout).read_status()
+            self.__md_analyze(list_md, remote_id)
 
     def __md_analyze(self, list_md, remote_id=None):
 
@@ -135,75 +137,20 @@ class Watchful(ModuleBase):
 
     def __get_list_remote_enable(self):
         return_list = []
-        for (key, value) in self.get_conf('remote', {}).items():
+        for (key, target) in self.conf.remote.items():
             if not str(key).isnumeric():
                 continue
 
-            if isinstance(value, dict):
-                is_enabled = self.get_conf_item(ConfigOptions.enabled, key)
-            else:
-                is_enabled = self.__default_enabled
-
-            self.__debug("Remote/{0} - Enabled: {1}".format(key, is_enabled), DebugLevel.info)
-            if is_enabled:
+            self.__debug(lambda: "Remote/{0} - Enabled: {1}".format(key, target.enabled), DebugLevel.info)
+            if target.enabled and self._is_target_due(key, "remote"):
                 return_list.append(key)
 
         return return_list
 
-    def get_conf_item(self, opt_find: Enum, dev_name: str, default_val=None):
-        # Sec - Set Default Val
-        if default_val is None:
-            with Switch(opt_find) as case:
-                if case(ConfigOptions.port):
-                    val_def = self.get_conf(opt_find.name, self.__default_port)
-
-                elif case(ConfigOptions.label,
-                          ConfigOptions.host,
-                          ConfigOptions.user,
-                          ConfigOptions.password):
-                    val_def = self.get_conf(opt_find.name, "")
-
-                elif case(ConfigOptions.enabled):
-                    val_def = self.get_conf(opt_find.name, self.__default_enabled)
-
-                else:
-                    if opt_find is None:
-                        raise ValueError("opt_find it can not be None!")
-                    else:
-                        raise TypeError("{0} is not valid option!".format(opt_find.name))
-        else:
-            val_def = default_val
-
-        # Sec - Get Data config
-        value = self.get_conf_in_list(opt_find, dev_name, val_def, key_name_list="remote")
-
-        # Sec - Format Return Data
-        with Switch(opt_find) as case:
-            if case(ConfigOptions.port):
-                value = str(value).strip()
-                if not value or not value.isnumeric() or int(value) <= 0:
-                    value = val_def
-                return int(value)
-
-            elif case(ConfigOptions.enabled):
-                return bool(value)
-
-            elif case(ConfigOptions.label,
-                      ConfigOptions.host,
-                      ConfigOptions.user,
-                      ConfigOptions.password):
-                value = str(value).strip()
-                if not value:
-                    value = val_def
-                return str(value)
-
-            else:
-                return value
-
     def get_label_by_id(self, remote_id) -> str:
         label = ""
         if remote_id:
-            label = self.get_conf_item(ConfigOptions.label, remote_id)
+            label = self.conf.remote[remote_id].label
             if not label:
                 label = "Remote{0}".format(remote_id)
         else:
@@ -212,8 +159,8 @@ class Watchful(ModuleBase):
 
     @property
     def conf_timeout(self) -> float:
-        return self.get_conf('timeout', self.__default_timeout)
+        return self.conf.timeout
 
     @property
     def conf_threads(self) -> int:
-        return self.get_conf('threads', self._default_threads)
+        return self.conf.threads
@@ -22,8 +22,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from lib.config import ConfigSchema, ConfigOption
 from lib.linux import Mem
-from lib.debug import DebugLevel
 from lib.modules import ModuleBase
 
 
@@ -31,42 +31,27 @@ class Watchful(ModuleBase):
 
     # porcentaje de RAM/SWAP que se usara si no se ha configurado el modulo, o se ha definido un
     # valor que no esté entre 0 y 100.
-    __default_alert_ram = 60
-    __default_alert_swap = 60
+    _config_schema = ConfigSchema(
+        ConfigOption('alert_ram', float, 60, min_val=0, max_val=100),
+        ConfigOption('alert_swap', float, 60, min_val=0, max_val=100)
+    )
 
     def __init__(self, monitor):
         super().__init__(monitor, __name__)
 
-    def __check_config(self, key_conf, default_val):
-        val_conf = self.get_conf(key_conf, default_val)
-
-        if isinstance(val_conf, str):
-            val_conf = val_conf.strip()
-            if not val_conf.isnumeric():
-                val_conf = default_val
-                self.debug("PlugIn > {0} > Warning, config {1} type incorrect!".format(self.name_module, key_conf),
-                           DebugLevel.warning)
-            else:
-                val_conf = int(val_conf)
-
-        if not val_conf or val_conf < 0 or val_conf > 100:
-            val_conf = default_val
-            self.debug("PlugIn > {0} > Warning, config {1} value not valid!".format(self.name_module, key_conf),
-                       DebugLevel.warning)
-
-        return val_conf
-
     def check(self):
+        # Una sola lectura de meminfo para RAM y SWAP.
+        mem = Mem()
         x = {
             'ram': {
                 'caption': 'RAM',
-                'alarm': self.__check_config("alert_ram", self.__default_alert_ram),
-                'used': Mem().ram.used_percent
+                'alarm': self.conf.alert_ram,
+                'used': mem.ram.used_percent
             },
             'swap': {
                 'caption': 'SWAP',
-                'alarm': self.__check_config("alert_swap", self.__default_alert_swap),
-                'used': Mem().swap.used_percent
+                'alarm': self.conf.alert_swap,
+                'used': mem.swap.used_percent
             }
         }
 
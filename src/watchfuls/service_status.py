@@ -20,29 +20,51 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import concurrent.futures
+from lib.config import ConfigSchema, ConfigList, ConfigOption
 from lib.debug import DebugLevel
+from lib.linux import SystemdUnits
 from lib.modules import ModuleBase
 
 
 class Watchful(ModuleBase):
 
+    _config_schema = ConfigSchema(
+        lists=(ConfigList('list',
+                          ConfigOption('enabled', bool, True),
+                          ConfigOption('remediation', bool, False)), )
+    )
+
     def __init__(self, monitor):
         super().__init__(monitor, __name__)
         self.paths.set('systemctl', '/bin/systemctl')
+        self.units = SystemdUnits(self.paths.find('systemctl'))
 
     def check(self):
         list_service = []
-        for (key, value) in self.get_conf('list', {}).items():
-            enabled = value['enabled']
-            remediation = value['remediation']
-            self.debug.print(">> PlugIn >> {0} >> Service: {1} - Enabled: {2} - Remediation: {3}".format(self.name_module, key, enabled, remediation),
-                             DebugLevel.info)
-            if enabled:
-                list_service.append({"service": key, "remediation": remediation})
+        for (key, target) in self.conf.list.items():
+            self.debug.print(lambda: ">> PlugIn >> {0} >> Service: {1} - Enabled: {2} - Remediation: {3}".format(
+                self.name_module, key, target.enabled, target.remediation), DebugLevel.info)
+            if target.enabled and self._is_target_due(key):
+                list_service.append({"service": key, "remediation": target.remediation})
+
+        if not list_service:
+            super().check()
+            return self.dict_return
+
+        # Una sola consulta a systemd con el estado de todos los servicios.
+        try:
+            units = self.units.show([service['service'] for service in list_service])
+        except Exception as exc:
+            for service in list_service:
+                message = 'Service: {0} - *Error: {1}* {2}'.format(service['service'], exc, u'\U0001F4A5')
+                self.dict_return.set(service['service'], False, message)
+            super().check()
+            return self.dict_return
 
         with concurrent.futures.ThreadPoolExecutor(
-                max_workers=self.get_conf('threads', self._default_threads)) as executor:
-            future_to_service = {executor.submit(self.__service_check, service): service for service in list_service}
+                max_workers=self.conf.threads) as executor:
+            future_to_service = {executor.submit(self.__service_check, service, units[service['service']]): service
+                                 for service in list_service}
             for future in concurrent.futures.as_completed(future_to_service):
                 service = future_to_service[future]
                 try:
@@ -54,76 +76,68 @@ class Watchful(ModuleBase):
         super().check()
         return self.dict_return
 
-    def __service_check(self, service):
+    def __service_check(self, service, unit: SystemdUnits.UnitState):
         remediation_use = None
         service_name = service['service']
-        status, error, message = self.__service_return(service_name)
-
-        s_message = 'Service: {0} '.format(service_name)
-        if status:
-            s_message += ' - *Running* ' + u'\U00002705'
-        else:
-            if message:
-                s_message += '- *Error: {0}* '.format(message)
+        with self._span(service_name):
+            status, error, message = self.__service_return(unit)
+
+            s_message = 'Service: {0} '.format(service_name)
+            if status:
+                s_message += ' - *Running* ' + u'\U00002705'
             else:
-                s_message += '- *Stop* '
-            s_message += u'\U000026A0'
-
-        # Solo se ejecuta la primera vez, cuando cambia de estado.
-        if self.check_status(status, self.name_module, service_name):
-            self.send_message(s_message, status)
-            if not status and service['remediation']:
-                self.__service_remediation(service_name)
-                status, error, message = self.__service_return(service_name)
-
-                s_message = '*Recovery* Service: {0} '.format(service_name)
-                if status:
-                    remediation_use = True
-                    s_message += ' - *OK* ' + u'\U00002705'
+                if message:
+                    s_message += '- *Error: {0}* '.format(message)
                 else:
-                    remediation_use = False
-                    if message:
-                        s_message += '- *Error: {0}* '.format(message)
-                    else:
-                        s_message += '- *UNSUCCESSFUL* '
-                    s_message += u'\U000026A0'
+                    s_message += '- *Stop* '
+                s_message += u'\U000026A0'
 
+            # Solo se ejecuta la primera vez, cuando cambia de estado.
+            if self.check_status(status, self.name_module, service_name):
                 self.send_message(s_message, status)
+                if not status and service['remediation']:
+                    self.__service_remediation(service_name)
+                    status, error, message = self.__service_return(self.units.show([service_name])[service_name])
+
+                    s_message = '*Recovery* Service: {0} '.format(service_name)
+                    if status:
+                        remediation_use = True
+                        s_message += ' - *OK* ' + u'\U00002705'
+                    else:
+                        remediation_use = False
+                        if message:
+                            s_message += '- *Error: {0}* '.format(message)
+                        else:
+                            s_message += '- *UNSUCCESSFUL* '
+                        s_message += u'\U000026A0'
+
+                    self.send_message(s_message, status)
 
-        other_data = {'error': error, 'status_detail': message, 'remediation': remediation_use}
-        self.dict_return.set(service_name, status, s_message, False, other_data)
+            other_data = {'error': error, 'status_detail': message, 'remediation': remediation_use}
+            self.dict_return.set(service_name, status, s_message, False, other_data)
 
     def __service_remediation(self, service_name):
         cmd = '{0} start {1}'.format(self.paths.find('systemctl'), service_name)
         self._run_cmd(cmd)
 
-    def __service_return(self, service_name):
-        cmd = '{0} status {1}'.format(self.paths.find('systemctl'), service_name)
-        stdout, stderr = self._run_cmd(cmd, True)
-        if stdout == '':
-            return False, True, stderr[:-1]
-
-        for line in stdout.split('\n'):
-            s_line = line.split()
-            if str(s_line[0]) == 'Active:':
-                if str(s_line[1]) == "active":
-                    #    Active: active (running) since Mon 2019-05-27 11:28:46 CEST; 1min 48s ago
-                    if str(s_line[2]) == "(running)":
-                        return True, False, self.__clear_str(s_line[2])
-                    else:
-                        return False, False, self.__clear_str(s_line[2])
-                elif str(s_line[1]) == "inactive":
-                    #    Active: inactive (dead) since Mon 2019-05-27 11:30:51 CEST; 1s ago
-                    if str(s_line[2]) == "(dead)":
-                        return False, False, ''
-                    else:
-                        return False, False, self.__clear_str(s_line[2])
-                else:
-                    return False, True, line
-
-        return False, 'Not detect status in the data!!!'
-
     @staticmethod
-    def __clear_str(text: str) -> str:
-        if text:
-            return str(text).strip().replace("(", "").replace(")", "")
+    def __service_return(unit: SystemdUnits.UnitState):
+        """ Retorna (status, error, mensaje) del estado de la unidad. """
+        if not unit.is_found:
+            return False, True, 'Unit {0} not found'.format(unit.name)
+
+        if unit.active_state == "active":
+            if unit.is_running:
+                return True, False, unit.sub_state
+            return False, False, unit.sub_state
+
+        elif unit.active_state == "inactive":
+            if unit.sub_state == "dead":
+                return False, False, ''
+            return False, False, unit.sub_state
+
+        message = '{0} ({1})'.format(unit.active_state, unit.sub_state)
+        if unit.result and unit.result != 'success':
+            message += ' Result: {0}'.format(unit.result)
+        return False, True, message
+
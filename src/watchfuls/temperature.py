@@ -22,34 +22,47 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from lib import Switch
+from lib.config import ConfigSchema, ConfigList, ConfigOption
 from lib.linux import ThermalInfoCollection
 from lib.modules import ModuleBase
-from lib.modules import EnumConfigOptions as ConfigOptions
-from enum import Enum
 
 
 class Watchful(ModuleBase):
 
-    # temperatura en ºC que se usara si no se ha configurado el modulo, o se ha definido un valor igual o menor que 0.
-    __default_alert = 80
-    __default_enabled = True
+    # alert: temperatura en ºC que se usara si no se ha configurado el sensor.
+    # sample_interval: segundos entre cada muestra de temperatura entre dos checks, 0 desactiva las muestras.
+    _config_schema = ConfigSchema(
+        ConfigOption('alert', float, 80, min_val=1),
+        ConfigOption('sample_interval', float, 15, min_val=0),
+        lists=(ConfigList('list',
+                          ConfigOption('enabled', bool, True),
+                          ConfigOption('label', str, ''),
+                          ConfigOption('alert', float, 80, min_val=1)), )
+    )
 
     def __init__(self, monitor):
         super().__init__(monitor, __name__)
+        self.thermal = ThermalInfoCollection(True)
 
-    def check(self):
-        termal_info = ThermalInfoCollection(True)
+    def close(self):
+        self.thermal.close()
 
-        for item in termal_info.nodes:
-            if not self.__get_conf(ConfigOptions.enabled, item.dev):
+    def check(self):
+        for item in self.thermal.nodes:
+            target = self.conf.target(item.dev)
+            if not target.enabled:
+                continue
+            if not self._is_target_due(item.dev):
                 continue
 
             dev_name = item.dev
             type_name = item.type
-            type_label = self.__get_conf(ConfigOptions.label, dev_name, type_name)
-            temp = item.temp
-            temp_alert = self.__get_conf(ConfigOptions.alert, dev_name)
+            type_label = target.label or type_name
+            temp = item.sample()
+            if temp is None:
+                continue
+            temp_stats = item.stats()
+            temp_alert = target.alert
 
             if temp <= temp_alert:  # Función OK :)
                 is_warning = False
@@ -63,48 +76,17 @@ class Watchful(ModuleBase):
                 message += 'temperature Ok *{0:.1f} ºC* {1}'.format(temp, u'\U00002705')
 
             other_data = {'type': type_name, 'temp': temp, 'alert': temp_alert}
+            if temp_stats is not None and temp_stats['count'] > 1:
+                if temp_stats['max'] > temp_alert and not is_warning:
+                    message += ' (peak *{0:.1f} ºC*)'.format(temp_stats['max'])
+                other_data['temp_min'] = temp_stats['min']
+                other_data['temp_max'] = temp_stats['max']
+                other_data['temp_mean'] = round(temp_stats['mean'], 3)
+                other_data['samples'] = temp_stats['count']
             self.dict_return.set(dev_name, not is_warning, message, other_data=other_data)
 
+        # Las muestras entre checks empiezan después del primer check.
+        self.thermal.start(self.conf.sample_interval)
+
         super().check()
         return self.dict_return
-
-    def __get_conf(self, opt_find: Enum, dev_name: str, default_val=None):
-        # Sec - Get Default Val
-        if default_val is None:
-            with Switch(opt_find) as case:
-                if case(ConfigOptions.alert):
-                    val_def = self.get_conf(opt_find.name, self.__default_alert)
-
-                elif case(ConfigOptions.enabled):
-                    val_def = self.get_conf(opt_find.name, self.__default_enabled)
-
-                else:
-                    if opt_find is None:
-                        raise ValueError("opt_find it can not be None!")
-                    else:
-                        raise TypeError("{0} is not valid option!".format(opt_find.name))
-        else:
-            val_def = default_val
-
-        # Sec - Get Data
-        value = self.get_conf_in_list(opt_find, dev_name, val_def)
-
-        # Sec - Format Return Data
-        with Switch(opt_find) as case:
-            if case(ConfigOptions.alert):
-                value = str(value).strip()
-                if not value or not value.isnumeric() or float(value) <= 0:
-                    value = val_def
-                return float(value)
-
-            elif case(ConfigOptions.enabled):
-                return bool(value)
-
-            elif case(ConfigOptions.label):
-                value = str(value).strip()
-                if not value:
-                    value = val_def
-                return str(value)
-
-            else:
-                return value
@@ -23,38 +23,48 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import concurrent.futures
-from lib import Switch
+from lib.config import ConfigSchema, ConfigList, ConfigOption
 from lib.debug import DebugLevel
 from lib.modules import ModuleBase
+from lib.net import HttpCheck
 
 
 class Watchful(ModuleBase):
 
-    __default_enabled = True
-    __default_http_code = 200
+    _config_schema = ConfigSchema(
+        ConfigOption('timeout', float, 10, min_val=0),
+        ConfigOption('max_redirects', int, 5, min_val=0),
+        ConfigOption('verify_ssl', bool, True),
+        lists=(ConfigList('list',
+                          ConfigOption('enabled', bool, True),
+                          ConfigOption('code', int, 200, min_val=100, max_val=599)), )
+    )
 
     def __init__(self, monitor):
         super().__init__(monitor, __name__)
-        self.paths.set('curl', '/usr/bin/curl')
+        # El pool de conexiones se mantiene entre ciclos junto con la instancia del modulo.
+        timeout = self.conf.timeout
+        self.http = HttpCheck(timeout_dns=timeout,
+                              timeout_connect=timeout,
+                              timeout_tls=timeout,
+                              timeout_ttfb=timeout,
+                              max_redirects=self.conf.max_redirects,
+                              verify_ssl=self.conf.verify_ssl)
+
+    def close(self):
+        self.http.close()
 
     def check(self):
         list_url = []
-        for (key, value) in self.get_conf('list', {}).items():
-
-            is_enabled = self.__default_enabled
-            with Switch(value, check_isinstance=True) as case:
-                if case(bool):
-                    is_enabled = value
-                elif case(dict):
-                    is_enabled = value.get("enabled", is_enabled)
-
-            self.debug.print(">> PlugIn >> {0} >> Web: {1} - Enabled: {2}".format(self.name_module, key, is_enabled),
+        for (key, target) in self.conf.list.items():
+            self.debug.print(lambda: ">> PlugIn >> {0} >> Web: {1} - Enabled: {2}".format(self.name_module, key,
+                                                                                        target.enabled),
                              DebugLevel.info)
-            if is_enabled:
+            if target.enabled and self._is_target_due(key):
                 list_url.append(key)
 
         with concurrent.futures.ThreadPoolExecutor(
-                max_workers=self.get_conf('threads', self._default_threads)) as executor:
+                max_workers=self.conf.threads) as executor:
             future_to_url = {executor.submit(self.__web_check, url): url for url in list_url}
             for future in concurrent.futures.as_completed(future_to_url):
                 url = future_to_url[future]
@@ -68,25 +78,28 @@ class Watchful(ModuleBase):
         return self.dict_return
 
     def __web_check(self, url):
-        code = int(self.__web_return(url))
-        code_true = self.get_conf_in_list("code", url, self.__default_http_code)
-        status = True if code == code_true else False
+        with self._span(url):
+            result = self.__web_return(url)
+            code = result.code
+            code_true = self.conf.list[url].code
+            status = True if code == code_true else False
 
-        s_message = 'Web: {0} - *({1})*'.format(url, code)
-        if status:
-            s_message += u'\U0001F53C'
-        else:
-            s_message += u'\U0001F53D'
+            s_message = 'Web: {0} - *({1})*'.format(url, code)
+            if status:
+                s_message += u'\U0001F53C'
+            else:
+                s_message += u'\U0001F53D'
 
-        other_data = {'code': code}
-        self.dict_return.set(url, status, s_message, False, other_data)
+            other_data = result.as_dict()
+            self.dict_return.set(url, status, s_message, False, other_data)
 
-        if self.check_status(status, self.name_module, url):
-            self.send_message(s_message, status)
+            if self.check_status(status, self.name_module, url):
+                self.send_message(s_message, status)
 
     def __web_return(self, url):
-        # TODO: Pendiente añadir soporte https.
-        cmd = self.paths.find('curl')
-        cmd += ' -sL -w "%{http_code}" http://' + url + ' -o /dev/null'
-        stdout = self._run_cmd(cmd)
-        return str(stdout).strip()
+        result = self.http.check(url)
+        if result.error is not None:
+            self.debug.print(lambda: ">> PlugIn >> {0} >> Web: {1} - Error ({2}): {3}".format(self.name_module, url,
+                                                                                            result.phase, result.error),
+                             DebugLevel.warning)
+        return result
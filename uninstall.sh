@@ -31,8 +31,10 @@ fi
 
 systemctl disable watchful.timer
 systemctl stop watchful.timer
+systemctl stop watchful-daemon.service 2>/dev/null
 rm '/lib/systemd/system/watchful.service'
 rm '/lib/systemd/system/watchful.timer'
+rm -f '/lib/systemd/system/watchful-daemon.service'
 systemctl daemon-reload
 rm -rf '/opt/watchful'
 rm -rf '/var/lib/watchful'
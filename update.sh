@@ -8,11 +8,14 @@ systemctl disable watchful.timer
 systemctl stop watchful.timer
 rm '/lib/systemd/system/watchful.service'
 rm '/lib/systemd/system/watchful.timer'
+rm -f '/lib/systemd/system/watchful-daemon.service'
 systemctl daemon-reload
 
 rm -f '/etc/watchful/status.json'
 rm -f '/var/lib/watchful/status.json'
 rm -f '/var/lib/watchful/dev/status.json'
+rm -f '/var/lib/watchful/status.db' '/var/lib/watchful/status.db-wal' '/var/lib/watchful/status.db-shm'
+rm -f '/var/lib/watchful/dev/status.db' '/var/lib/watchful/dev/status.db-wal' '/var/lib/watchful/dev/status.db-shm'
 rm -rf '/opt/watchful'
 mkdir -p '/var/lib/watchful'
 mkdir -p '/opt/watchful'
@@ -48,6 +51,7 @@ done
 
 cp data/watchful.service /lib/systemd/system/
 cp data/watchful.timer /lib/systemd/system/
+cp data/watchful-daemon.service /lib/systemd/system/
 
 systemctl daemon-reload
 systemctl enable watchful.timer